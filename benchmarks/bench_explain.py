@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compare the time taken to answer many ptolemy explain queries against a
+large mapping with the rule index, including building it, and by matching
+every rule against each query, checking both find the same rules.
+
+Run with ``make benchmark``.
+
+"""
+
+import json
+import random
+import timeit
+
+from ptolemy.explain import RuleIndex
+from ptolemy.patterns import compile_pattern
+from ptolemy.source import Source
+
+import synthetic
+
+
+QUERIES = 1000
+
+# Scanning is slow, so only this many queries are answered by scanning.
+SCANNED_QUERIES = 20
+
+
+def scan(rules, names):
+    """
+    Return the rules which apply to an object by matching every rule.
+
+    """
+    names = [name.lower() for name in names]
+    matched = []
+    for rule in rules:
+        locator = rule["object-locator"]
+        levels = [
+            locator[key].lower() for key in
+            ("schema-name", "table-name", "column-name") if key in locator
+        ]
+        if all(
+                compile_pattern(level).match(name)
+                for level, name in zip(levels, names)
+        ):
+            matched.append(rule)
+    return matched
+
+
+def main():
+    source = synthetic.generate_source(
+        include_items=200, exclude_items=20, schemas=5, tables=100,
+        columns=2, transformation_items=1
+    )
+    rules = json.loads(Source().compile_string(source))["rules"]
+    generator = random.Random(0)
+    queries = []
+    for _ in range(QUERIES):
+        rule = generator.choice(rules)
+        locator = rule["object-locator"]
+        queries.append(tuple(
+            locator[key].replace("%", "x") for key in
+            ("schema-name", "table-name", "column-name") if key in locator
+        ))
+
+    def explain_indexed():
+        index = RuleIndex(rules)
+        return [index.explain(names) for names in queries]
+
+    def explain_scanned():
+        return [scan(rules, names) for names in queries[:SCANNED_QUERIES]]
+
+    same = explain_indexed()[:SCANNED_QUERIES] == explain_scanned()
+    print("Answering queries against {0} rules:".format(len(rules)))
+    print("  {0:<10} {1:8.1f} ms per query".format(
+        "scanned", timeit.timeit(explain_scanned, number=1) * 1e3 /
+        SCANNED_QUERIES
+    ))
+    seconds = min(timeit.repeat(explain_indexed, number=1, repeat=3))
+    print("  {0:<10} {1:8.3f} ms per query, including the index {2}".format(
+        "indexed", seconds * 1e3 / QUERIES,
+        "(same rules)" if same else "(DIFFERENT rules)"
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compare the time taken to plan a batch of sources which each repeat the same
+long table-names list, with the same sources including the list from a
+shared fragment, which is parsed once.
+
+Run with ``make benchmark``.
+
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+import yaml
+
+from ptolemy.source import Source
+
+
+SOURCES = 50
+TABLES = 5000
+
+
+def write_sources(directory, table_names):
+    """
+    Write SOURCES sources, each of which selects table_names from its own
+    schema, and return their paths.
+
+    """
+    paths = []
+    for i in range(SOURCES):
+        path = os.path.join(directory, "source{0}.yaml".format(i))
+        with open(path, "w") as source_file:
+            yaml.safe_dump({
+                "selection": {
+                    "include": [{
+                        "object-locators": {
+                            "schema-names": ["Schema{0}".format(i)],
+                            "table-names": table_names
+                        }
+                    }]
+                }
+            }, source_file, default_flow_style=False)
+        paths.append(path)
+    return paths
+
+
+def time_sources(paths):
+    """
+    Return the seconds taken to plan every source.
+
+    """
+    start = time.perf_counter()
+    for path in paths:
+        Source(path).plan()
+    return time.perf_counter() - start
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        table_names = ["Table{0}".format(i) for i in range(TABLES)]
+        with open(os.path.join(directory, "_tables.yaml"), "w") as f:
+            yaml.safe_dump(table_names, f, default_flow_style=False)
+
+        inlined_dir = os.path.join(directory, "inlined")
+        included_dir = os.path.join(directory, "included")
+        os.makedirs(inlined_dir)
+        os.makedirs(included_dir)
+        inlined_paths = write_sources(inlined_dir, table_names)
+        included_paths = write_sources(
+            included_dir, {"$ref": "../_tables.yaml"}
+        )
+
+        print("Planning {0} sources of {1} tables each:".format(
+            SOURCES, TABLES
+        ))
+        print("  {0:<10} {1:8.1f} ms".format(
+            "inlined", time_sources(inlined_paths) * 1e3
+        ))
+        print("  {0:<10} {1:8.1f} ms".format(
+            "included", time_sources(included_paths) * 1e3
+        ))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
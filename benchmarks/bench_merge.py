@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compare the time taken, and the peak memory used, to merge many mappings
+streamed a rule at a time, as ptolemy merge does, and loaded whole first.
+Each merge runs in its own process, and the peak memory is traced by
+tracemalloc in a second run, as --stats reports it.
+
+Run with ``make benchmark``.
+
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from ptolemy.source import Source
+
+import synthetic
+
+
+MAPPINGS = 100
+
+# The rules in each mapping, half of which are in the next mapping too.
+MAPPING_RULES = 4000
+
+# Merge the mappings in argv[3:], streamed if argv[1] is "1", and print the
+# time taken, or with argv[2] "1", the peak memory traced.
+MERGE = """
+import os, sys, time
+from ptolemy import merge
+from ptolemy.ids import load_mapping
+from ptolemy.stats import Stats
+def merge_mappings(paths, output, stats):
+    if sys.argv[1] != "1":
+        loaded = {path: load_mapping(path) for path in paths}
+        merge.iter_mapping = loaded.pop
+    merge.merge_mappings(paths, output, stats=stats)
+paths = sys.argv[3:]
+stats = Stats()
+start = time.perf_counter()
+with open(os.devnull, "w") as output:
+    if sys.argv[2] == "1":
+        with stats.trace_memory():
+            merge_mappings(paths, output, stats)
+    else:
+        merge_mappings(paths, output, stats)
+print(stats.peak_memory or time.perf_counter() - start)
+"""
+
+
+def run(paths, streaming, trace):
+    """
+    Merge paths in a process of its own, and return the time taken, or the
+    peak memory traced.
+
+    """
+    return float(subprocess.check_output([
+        sys.executable, "-c", MERGE, str(int(streaming)), str(int(trace))
+    ] + paths))
+
+
+def main():
+    source = synthetic.generate_source(
+        include_items=(MAPPINGS + 1) * MAPPING_RULES // 2 // 20,
+        exclude_items=0, schemas=1, tables=20, columns=0,
+        transformation_items=0
+    )
+    rules = json.loads(Source().compile_string(source))["rules"]
+    directory = tempfile.mkdtemp()
+    try:
+        paths = []
+        for i in range(MAPPINGS):
+            start = i * MAPPING_RULES // 2
+            mapping_rules = rules[start:start + MAPPING_RULES]
+            for j, rule in enumerate(mapping_rules):
+                rule = dict(rule, **{"rule-id": str(j + 1)})
+                rule["rule-name"] = rule["rule-id"]
+                mapping_rules[j] = rule
+            paths.append(os.path.join(directory, "{0}.json".format(i)))
+            with open(paths[-1], "w") as mapping_file:
+                json.dump(
+                    {"rules": mapping_rules}, mapping_file, indent=4,
+                    sort_keys=True
+                )
+
+        print("Merging {0} mappings of {1} rules:".format(
+            MAPPINGS, MAPPING_RULES
+        ))
+        for streaming in [False, True]:
+            print("  {0:<10} {1:8.1f} ms {2:8.1f} MB peak".format(
+                "streamed" if streaming else "loaded",
+                run(paths, streaming, False) * 1e3,
+                run(paths, streaming, True) / 1e6
+            ))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compare the size of the mapping, and the time taken to number and serialise
+it, in each JSON format.
+
+Run with ``make benchmark``.
+
+"""
+
+import itertools
+import time
+
+from ptolemy.mapping import JSONFormat, Mapping
+from ptolemy.source import Source
+
+import synthetic
+
+
+def main():
+    source = Source()
+    source.source = synthetic.generate_source(
+        include_items=100, exclude_items=10, schemas=5, tables=40, columns=2,
+        filters=1, transformation_items=5
+    )
+    rules = source._get_rules()
+    encoders = ["json"]
+    try:
+        import orjson  # noqa: F401 pylint: disable=unused-import
+        encoders.append("orjson")
+    except ImportError:
+        pass
+
+    print("Serialising {0} rules:".format(len(rules)))
+    for minified, key_order, encoder in itertools.product(
+            [False, True], ["sorted", "canonical"], encoders
+    ):
+        mapping = Mapping(json_format=JSONFormat(minified, key_order, encoder))
+        mapping.mapping["rules"] = rules
+        start = time.perf_counter()
+        size = len(mapping.to_json())
+        seconds = time.perf_counter() - start
+        print("  {0:<10} {1:<10} {2:<8} {3:8.1f} MB {4:8.1f} ms".format(
+            "minified" if minified else "pretty", key_order, encoder,
+            size / 1e6, seconds * 1e3
+        ))
+
+
+if __name__ == "__main__":
+    main()
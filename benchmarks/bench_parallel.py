@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compare the time taken to write the mapping of a single large source with
+one process, and with its rules expanded and serialised across a pool of
+worker processes, checking that every mapping is identical. The speedup is
+bounded by the CPUs available.
+
+Run with ``make benchmark``.
+
+"""
+
+import hashlib
+import multiprocessing
+import timeit
+
+from ptolemy.source import Source
+
+import synthetic
+
+
+class DigestStream(object):
+    """
+    A stream which keeps only the digest of what is written to it.
+
+    """
+
+    def __init__(self):
+        self.digest = hashlib.sha256()
+
+    def write(self, output):
+        self.digest.update(output.encode("utf-8"))
+
+
+def write(source, jobs):
+    """
+    Write the mapping of source with jobs processes, and return its digest.
+
+    """
+    stream = DigestStream()
+    Source(jobs=jobs).write(stream, source)
+    return stream.digest.hexdigest()
+
+
+def main():
+    # A few items, each of which expands to many rules.
+    source = synthetic.generate_source(
+        include_items=4, exclude_items=0, schemas=20, tables=5000,
+        transformation_items=0
+    )
+    print("Writing {0} rules, with {1} CPUs:".format(
+        4 * 20 * 5000, multiprocessing.cpu_count()
+    ))
+    serial_digest = None
+    serial_time = None
+    for jobs in [1, 2, 4, 0]:
+        digest = write(source, jobs)
+        seconds = min(timeit.repeat(
+            lambda: write(source, jobs), number=1, repeat=3
+        ))
+        if jobs == 1:
+            serial_digest, serial_time = digest, seconds
+        print("  {0:<10} {1:8.1f} ms {2:6.2f}x {3}".format(
+            "{0} jobs".format(jobs or multiprocessing.cpu_count()),
+            seconds * 1e3, serial_time / seconds,
+            "identical" if digest == serial_digest else "DIFFERENT"
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compare the time taken to parse a large generated source with the
+pure-Python YAML loader, as ptolemy originally did, with the libyaml-backed
+loader, and with the same source written as JSON.
+
+Run with ``make benchmark``.
+
+"""
+
+import json
+import timeit
+
+import yaml
+
+from ptolemy import loader
+
+
+def generate_source(item_count, table_count):
+    return {
+        "selection": {
+            "include": [
+                {
+                    "object-locators": {
+                        "schema-names": ["Schema{0}".format(i)],
+                        "table-names": [
+                            "Table{0}".format(j) for j in range(table_count)
+                        ]
+                    }
+                }
+                for i in range(item_count)
+            ]
+        },
+        "transformation": {
+            "convert-lowercase": [
+                {
+                    "object-locators": {
+                        "schema-names": ["Schema{0}".format(i)],
+                        "table-names": ["%"]
+                    },
+                    "rule-target": "table"
+                }
+                for i in range(item_count)
+            ]
+        }
+    }
+
+
+def main():
+    source = generate_source(100, 100)
+    yaml_source = yaml.safe_dump(source, default_flow_style=False).encode(
+        "utf-8"
+    )
+    json_source = json.dumps(source, indent=2).encode("utf-8")
+
+    parsers = [
+        ("YAML, pure-Python loader",
+         lambda: yaml.load(yaml_source, Loader=yaml.SafeLoader),
+         yaml_source),
+        ("YAML, libyaml loader",
+         lambda: yaml.load(yaml_source, Loader=loader.get_yaml_loader()),
+         yaml_source),
+        ("JSON",
+         lambda: loader.load_source(json_source, "source.json"),
+         json_source)
+    ]
+    print("Parsing a source of {0} tables, best of 3 runs:".format(
+        100 * 100
+    ))
+    if loader.get_yaml_loader() is yaml.SafeLoader:
+        print("  (PyYAML was built without libyaml)")
+    for name, function, source_string in parsers:
+        seconds = min(timeit.repeat(function, number=1, repeat=3))
+        print("  {0:<26} {1:8.1f} ms  {2:8d} bytes".format(
+            name, seconds * 1e3, len(source_string)
+        ))
+
+
+if __name__ == "__main__":
+    main()
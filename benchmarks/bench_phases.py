@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+
+"""
+Measure the wall time and peak memory of each phase of compiling synthetic
+sources of increasing size, and print how each grows with the size of the
+source, so regressions in scaling show up.
+
+The phases are parsing the source, Source._validate(), Source._get_rules(),
+Mapping._number_rules() and Mapping.to_json(). Each phase is timed without
+tracing, then run again under tracemalloc to measure the peak memory it
+allocates.
+
+Run with ``make benchmark``, or directly to choose the scales and the shape
+of the source:
+
+    $ PYTHONPATH=. python benchmarks/bench_phases.py --scales 1 10 100 1000 \\
+        --tables 20 --filters 1
+
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from ptolemy.loader import load_source
+from ptolemy.mapping import Mapping
+from ptolemy.schema import get_validator
+from ptolemy.source import Source
+
+import synthetic
+
+
+PHASES = ["load", "validate", "get_rules", "number_rules", "to_json"]
+
+
+def measure(function):
+    """
+    Return the result of function, the seconds it took, and the peak bytes
+    it allocated.
+
+    """
+    gc.collect()
+    start = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - start
+
+    del result
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+def run_phases(source_string):
+    """
+    Compile source_string one phase at a time, returning the number of rules
+    and a dict of phase to (seconds, peak bytes).
+
+    """
+    source = Source("synthetic.yaml")
+    results = {}
+
+    parsed, seconds, peak = measure(
+        lambda: load_source(source_string, source.file_path)
+    )
+    source.source = parsed
+    results["load"] = (seconds, peak)
+
+    _, seconds, peak = measure(source._validate)
+    results["validate"] = (seconds, peak)
+
+    rules, seconds, peak = measure(source._get_rules)
+    results["get_rules"] = (seconds, peak)
+
+    mapping = Mapping()
+    mapping.mapping["rules"] = rules
+    _, seconds, peak = measure(mapping._number_rules)
+    results["number_rules"] = (seconds, peak)
+
+    _, seconds, peak = measure(mapping.to_json)
+    results["to_json"] = (seconds, peak)
+
+    return len(rules), results
+
+
+def print_table(title, scales, rule_counts, results, index, unit, divisor):
+    """
+    Print one metric of every phase at every scale, and its growth: the
+    ratio of the metric at the largest and smallest scales, divided by the
+    ratio of the rule counts. Linear phases grow by about 1.0.
+
+    """
+    print(title)
+    print("  {0:<14}{1}{2:>10}".format(
+        "phase",
+        "".join("{0:>12}".format("{0}x".format(scale)) for scale in scales),
+        "growth"
+    ))
+    for phase in PHASES:
+        values = [result[phase][index] for result in results]
+        growth = "-"
+        if len(values) > 1 and values[0] and rule_counts[0]:
+            growth = "{0:.2f}".format(
+                (values[-1] / float(values[0])) /
+                (rule_counts[-1] / float(rule_counts[0]))
+            )
+        print("  {0:<14}{1}{2:>10}".format(
+            phase,
+            "".join(
+                "{0:>9.1f} {1:<2}".format(value / divisor, unit)
+                for value in values
+            ),
+            growth
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--scales", type=int, nargs="+", default=[1, 10, 100],
+        help="multiples of the number of items to generate"
+    )
+    synthetic.add_arguments(parser)
+    arguments = parser.parse_args()
+    options = synthetic.get_generator_options(arguments)
+
+    # Build the cached validator up front, so it is not counted as part of
+    # validating the smallest source.
+    get_validator()
+
+    rule_counts = []
+    results = []
+    for scale in arguments.scales:
+        scaled_options = dict(options)
+        for key in ("include_items", "exclude_items", "transformation_items"):
+            scaled_options[key] = options[key] * scale
+        source_string = synthetic.dump_source(
+            synthetic.generate_source(**scaled_options),
+            arguments.source_format
+        )
+        rule_count, phase_results = run_phases(source_string)
+        rule_counts.append(rule_count)
+        results.append(phase_results)
+
+    print("Compiling synthetic {0} sources of {1} rules:".format(
+        arguments.source_format.upper(),
+        ", ".join(str(rule_count) for rule_count in rule_counts)
+    ))
+    print_table("Wall time", arguments.scales, rule_counts, results, 0, "ms",
+                1e-3)
+    print_table("Peak memory", arguments.scales, rule_counts, results, 1,
+                "MB", 1e6)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compare the per-source cost of validation when the source schema is loaded
+and checked on every call, as ptolemy originally did, with the cached
+validator in ptolemy.schema.
+
+Run with ``make benchmark``.
+
+"""
+
+import glob
+import json
+import os
+import timeit
+
+import jsonschema
+import yaml
+
+from ptolemy import schema
+
+
+FIXTURES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "integration_tests",
+    "fixtures",
+    "src"
+)
+
+YAML_SCHEMA_FILE_PATH = os.path.join(
+    os.path.dirname(schema.SOURCE_SCHEMA_FILE_PATH), "source-schema.yaml"
+)
+
+
+def load_sources():
+    sources = []
+    for source_path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.yaml"))):
+        with open(source_path) as source_file:
+            sources.append(yaml.safe_load(source_file))
+    return sources
+
+
+def validate_uncached(sources):
+    for source in sources:
+        jsonschema.validate(source, parse_yaml_schema())
+
+
+def validate_cached(sources):
+    for source in sources:
+        schema.validate(source)
+
+
+def parse_yaml_schema():
+    with open(YAML_SCHEMA_FILE_PATH) as source_schema_file:
+        return yaml.safe_load(source_schema_file)
+
+
+def parse_json_schema():
+    with open(schema.SOURCE_SCHEMA_FILE_PATH) as source_schema_file:
+        return json.load(source_schema_file)
+
+
+def main():
+    sources = load_sources()
+    repeat = 20
+    print("Validating {0} sources, best of 5 runs of {1}:".format(
+        len(sources), repeat
+    ))
+    for name, function in [
+            ("uncached", validate_uncached),
+            ("cached", validate_cached)
+    ]:
+        seconds = min(timeit.repeat(
+            lambda: function(sources), number=repeat, repeat=5
+        ))
+        per_source = seconds / (repeat * len(sources))
+        print("  {0:<10} {1:10.1f} us per source".format(
+            name, per_source * 1e6
+        ))
+
+    for name, function in [
+            ("YAML", parse_yaml_schema),
+            ("JSON", parse_json_schema)
+    ]:
+        seconds = min(timeit.repeat(function, number=repeat, repeat=5))
+        print("  parsing the {0} schema: {1:.1f} us".format(
+            name, seconds / repeat * 1e6
+        ))
+
+
+if __name__ == "__main__":
+    main()
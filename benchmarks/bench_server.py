@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compare the latency of compiling a source by running ``ptolemy`` as a
+subprocess, with posting it to a warm ``ptolemy serve``.
+
+Run with ``make benchmark``.
+
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from http.client import HTTPConnection
+
+from ptolemy.server import start_server
+
+import synthetic
+
+
+REQUESTS = 20
+
+
+def time_subprocess(source_path):
+    """
+    Return the mean seconds taken to compile source_path with a new ptolemy
+    process.
+
+    """
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        subprocess.check_call(
+            [sys.executable, "-m", "ptolemy.cli", source_path],
+            stdout=subprocess.DEVNULL
+        )
+    return (time.perf_counter() - start) / REQUESTS
+
+
+def time_server(source_string):
+    """
+    Return the mean seconds taken to compile source_string by posting it to
+    a server.
+
+    """
+    server = start_server(("127.0.0.1", 0))
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    connection = HTTPConnection(*server.server_address)
+    try:
+        start = time.perf_counter()
+        for _ in range(REQUESTS):
+            connection.request("POST", "/compile", source_string)
+            response = connection.getresponse()
+            response.read()
+            assert response.status == 200
+        return (time.perf_counter() - start) / REQUESTS
+    finally:
+        connection.close()
+        server.shutdown()
+        server.server_close()
+
+
+def main():
+    source_string = synthetic.dump_source(synthetic.generate_source())
+    source_path = os.path.join(os.getcwd(), "bench_server.yaml")
+    with open(source_path, "wb") as source_file:
+        source_file.write(source_string)
+    try:
+        print("Compiling a {0} byte source:".format(len(source_string)))
+        print("  {0:<12} {1:8.1f} ms".format(
+            "subprocess", time_subprocess(source_path) * 1e3
+        ))
+        print("  {0:<12} {1:8.1f} ms".format(
+            "server", time_server(source_string) * 1e3
+        ))
+    finally:
+        os.remove(source_path)
+
+
+if __name__ == "__main__":
+    main()
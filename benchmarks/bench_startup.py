@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+"""
+Measure how long ptolemy takes to start, using ``python -X importtime`` to
+time importing ptolemy.cli, and the wall time of ``ptolemy --version``.
+
+Exits with an error if importing ptolemy.cli takes longer than the budget,
+so regressions in startup time are caught as features are added. The budget
+covers ptolemy's own modules and the standard library modules they import,
+measured as the best of several runs to reduce noise.
+
+Run with ``make benchmark``.
+
+"""
+
+import subprocess
+import sys
+import timeit
+
+
+IMPORT_BUDGET_MS = 100
+
+RUNS = 5
+
+
+def measure_import_time():
+    """
+    Return the cumulative time, in ms, taken to import ptolemy.cli, and the
+    slowest modules it imported, as (ms, name) tuples.
+
+    """
+    output = subprocess.check_output(
+        [sys.executable, "-X", "importtime", "-c", "import ptolemy.cli"],
+        stderr=subprocess.STDOUT
+    ).decode("utf-8")
+
+    total = 0
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, self_time, cumulative_time, name = [
+            part.strip() for part in line.replace(":", "|", 1).split("|")
+        ]
+        if not self_time.isdigit():
+            continue
+        modules.append((int(self_time) / 1000.0, name))
+        if name == "ptolemy.cli":
+            total = int(cumulative_time) / 1000.0
+    return total, sorted(modules, reverse=True)[:5]
+
+
+def main():
+    results = [measure_import_time() for _ in range(RUNS)]
+    total, slowest = min(results)
+    print("Importing ptolemy.cli, best of {0} runs: {1:.1f} ms "
+          "(budget {2} ms)".format(RUNS, total, IMPORT_BUDGET_MS))
+    for self_time, name in slowest:
+        print("  {0:8.1f} ms  {1}".format(self_time, name))
+
+    seconds = min(timeit.repeat(
+        lambda: subprocess.check_call(
+            [sys.executable, "-m", "ptolemy.cli", "--version"],
+            stdout=subprocess.PIPE
+        ),
+        number=1, repeat=RUNS
+    ))
+    print("ptolemy --version, best of {0} runs: {1:.1f} ms".format(
+        RUNS, seconds * 1e3
+    ))
+
+    if total > IMPORT_BUDGET_MS:
+        sys.exit("Importing ptolemy.cli took {0:.1f} ms, over the budget of "
+                 "{1} ms.".format(total, IMPORT_BUDGET_MS))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compare the time taken, and the peak memory used, to compile a large source
+loaded whole, and streamed an item at a time, in YAML and in JSON. Each
+compile runs in its own process, and the peak memory is traced by
+tracemalloc in a second run, as --stats reports it.
+
+Run with ``make benchmark``.
+
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import yaml
+
+import synthetic
+
+
+# Compile the source in argv[1], streamed if argv[2] is "1", and print the
+# time taken, or with argv[3] "1", the peak memory traced.
+COMPILE = """
+import os, sys, time
+from ptolemy.source import Source
+from ptolemy.stats import Stats
+stats = Stats()
+source = Source(sys.argv[1], streaming=sys.argv[2] == "1")
+start = time.perf_counter()
+with open(os.devnull, "w") as output:
+    if sys.argv[3] == "1":
+        with stats.trace_memory():
+            source.write(output)
+    else:
+        source.write(output)
+print(stats.peak_memory or time.perf_counter() - start)
+"""
+
+
+def run(path, streaming, trace):
+    """
+    Compile path in a process of its own, and return the time taken, or
+    the peak memory traced.
+
+    """
+    return float(subprocess.check_output([
+        sys.executable, "-c", COMPILE, path, str(int(streaming)),
+        str(int(trace))
+    ]))
+
+
+def main():
+    source = synthetic.generate_source(
+        include_items=20000, exclude_items=0, schemas=1, tables=20,
+        columns=0, transformation_items=0
+    )
+    directory = tempfile.mkdtemp()
+    try:
+        paths = [
+            os.path.join(directory, "source.yaml"),
+            os.path.join(directory, "source.json")
+        ]
+        with open(paths[0], "w") as source_file:
+            yaml.safe_dump(source, source_file)
+        with open(paths[1], "w") as source_file:
+            json.dump(source, source_file, indent=2)
+
+        for path in paths:
+            print("Compiling a {0:.1f} MB {1} source:".format(
+                os.path.getsize(path) / 1e6, os.path.splitext(path)[1][1:]
+            ))
+            for streaming in [False, True]:
+                print("  {0:<10} {1:8.1f} ms {2:8.1f} MB peak".format(
+                    "streamed" if streaming else "loaded",
+                    run(path, streaming, False) * 1e3,
+                    run(path, streaming, True) / 1e6
+                ))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
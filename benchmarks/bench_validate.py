@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compare the time taken to validate a large source with jsonschema, and with
+the validator generated from the source schema.
+
+Run with ``make benchmark``.
+
+"""
+
+import time
+
+from ptolemy import schema, source_validator
+
+import synthetic
+
+
+REPEATS = 5
+
+
+def time_validator(validate, source):
+    """
+    Return the fastest time taken by validate to check source, in seconds.
+
+    """
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        validate(source)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    source = synthetic.generate_source(
+        include_items=500, exclude_items=50, schemas=5, tables=200,
+        columns=2, filters=2, transformation_items=50
+    )
+    jsonschema_seconds = time_validator(
+        schema.get_validator().validate, source
+    )
+    generated_seconds = time_validator(source_validator.validate, source)
+    print("Validating a source:")
+    print("  jsonschema {0:8.1f} ms".format(jsonschema_seconds * 1e3))
+    print("  generated  {0:8.1f} ms ({1:.0f}x faster)".format(
+        generated_seconds * 1e3, jsonschema_seconds / generated_seconds
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+
+"""
+Generate synthetic sources of any size, for benchmarking.
+
+The shape of each item, such as which keys it requires, which rule targets
+and filter operators it may use, and which transformation types exist, is
+read from the source schema, so generated sources stay valid as the schema
+changes. Every generated source is validated before it is returned.
+
+Run as a script to write a source to stdout:
+
+    $ PYTHONPATH=. python benchmarks/synthetic.py --include-items 1000 \\
+        --tables 50 --filters 2 > big.yaml
+
+"""
+
+import argparse
+import json
+import sys
+
+import yaml
+
+from ptolemy.schema import load_source_schema, validate
+
+
+def get_transformation_types():
+    """
+    Return the transformation types in the source schema.
+
+    :returns: list of str
+
+    """
+    properties = load_source_schema()["properties"]["transformation"]
+    return list(properties["properties"])
+
+
+def generate_source(
+        include_items=10, exclude_items=1, schemas=1, tables=10, columns=2,
+        filters=0, transformations=None, transformation_items=1
+):
+    """
+    Return a synthetic source. Item i of each kind names schemas
+    Schema<i>_0..., so the rules of different items do not overlap.
+
+    :param include_items: The number of include items.
+    :type include_items: int
+    :param exclude_items: The number of exclude items.
+    :type exclude_items: int
+    :param schemas: The length of each schema-names list.
+    :type schemas: int
+    :param tables: The length of each table-names list.
+    :type tables: int
+    :param columns: The length of each column-names list.
+    :type columns: int
+    :param filters: The number of filters on each include item.
+    :type filters: int
+    :param transformations: The transformation types to generate items for.
+        Defaults to every type in the schema.
+    :type transformations: list of str
+    :param transformation_items: The number of items of each type.
+    :type transformation_items: int
+    :returns: dict
+
+    """
+    source_schema = load_source_schema()
+    selection_schema = source_schema["properties"]["selection"]["properties"]
+    transformation_schema = \
+        source_schema["properties"]["transformation"]["properties"]
+    if transformations is None:
+        transformations = list(transformation_schema)
+
+    names = _Names(schemas, tables, columns)
+    source = {
+        "selection": {
+            "include": [
+                _generate_item(
+                    selection_schema["include"]["items"], i, names, filters
+                )
+                for i in range(include_items)
+            ]
+        }
+    }
+    if exclude_items:
+        source["selection"]["exclude"] = [
+            _generate_item(selection_schema["exclude"]["items"], i, names)
+            for i in range(exclude_items)
+        ]
+    if transformations and transformation_items:
+        source["transformation"] = {
+            transformation: [
+                _generate_item(
+                    transformation_schema[transformation]["items"], i, names
+                )
+                for i in range(transformation_items)
+            ]
+            for transformation in transformations
+        }
+
+    validate(source)
+    return source
+
+
+class _Names(object):  # pylint: disable=too-few-public-methods
+    """
+    _Names generates the object names for each item.
+
+    """
+
+    def __init__(self, schemas, tables, columns):
+        self.lengths = {
+            "schema-names": schemas,
+            "table-names": tables,
+            "column-names": columns
+        }
+
+    def get(self, locator_key, i):
+        """
+        Return the names for locator_key in item i.
+
+        """
+        prefix = locator_key.split("-")[0].capitalize()
+        return [
+            "{0}{1}_{2}".format(prefix, i, j)
+            for j in range(max(self.lengths[locator_key], 1))
+        ]
+
+
+def _generate_item(item_schema, i, names, filters=0):
+    """
+    Return item i, following item_schema.
+
+    """
+    properties = item_schema["properties"]
+    item = {}
+
+    # Cycle through the rule targets, and name every object the target
+    # needs to be located by.
+    locator_keys = ["schema-names", "table-names"]
+    if "rule-target" in properties:
+        targets = properties["rule-target"]["enum"]
+        target = targets[i % len(targets)]
+        item["rule-target"] = target
+        locator_keys = {
+            "schema": ["schema-names"],
+            "table": ["schema-names", "table-names"],
+            "column": ["schema-names", "table-names", "column-names"]
+        }[target]
+
+    locator_schema = properties["object-locators"]
+    locator_keys = [
+        key for key in locator_schema["properties"]
+        if key in locator_keys or key in locator_schema.get("required", [])
+    ]
+    item["object-locators"] = {key: names.get(key, i) for key in locator_keys}
+
+    for key in item_schema.get("required", []):
+        if key not in item:
+            item[key] = "value_{0}".format(i)
+
+    if filters and "filters" in properties:
+        item["filters"] = [
+            _generate_filter(properties["filters"]["items"], j)
+            for j in range(filters)
+        ]
+    return item
+
+
+def _generate_filter(filter_schema, j):
+    """
+    Return filter j, with a condition for each filter operator.
+
+    """
+    properties = filter_schema["properties"]
+    condition_properties = \
+        properties["filter-conditions"]["items"]["properties"]
+    conditions = []
+    for operator in condition_properties["filter-operator"]["enum"]:
+        condition = {"filter-operator": operator}
+        if operator == "between":
+            condition["start-value"] = "1"
+            condition["end-value"] = "100"
+        else:
+            condition["value"] = "1"
+        conditions.append(condition)
+
+    return {
+        "filter-type": properties["filter-type"]["enum"][0],
+        "column-name": "Column_{0}".format(j),
+        "filter-conditions": conditions
+    }
+
+
+def dump_source(source, source_format="yaml"):
+    """
+    Return source serialised as YAML or JSON bytes.
+
+    :param source: The source.
+    :type source: dict
+    :param source_format: "yaml" or "json".
+    :type source_format: str
+    :returns: bytes
+
+    """
+    if source_format == "json":
+        return json.dumps(source, indent=2).encode("utf-8")
+    return yaml.safe_dump(source, default_flow_style=False).encode("utf-8")
+
+
+def add_arguments(parser):
+    """
+    Add the generator's options to an argparse parser.
+
+    """
+    parser.add_argument("--include-items", type=int, default=10)
+    parser.add_argument("--exclude-items", type=int, default=1)
+    parser.add_argument("--schemas", type=int, default=1,
+                        help="the length of each schema-names list")
+    parser.add_argument("--tables", type=int, default=10,
+                        help="the length of each table-names list")
+    parser.add_argument("--columns", type=int, default=2,
+                        help="the length of each column-names list")
+    parser.add_argument("--filters", type=int, default=0,
+                        help="the number of filters on each include item")
+    parser.add_argument(
+        "--transformation", action="append", dest="transformations",
+        choices=get_transformation_types(),
+        help="a transformation type to generate items for. May be given "
+             "more than once. Defaults to every type"
+    )
+    parser.add_argument("--transformation-items", type=int, default=1,
+                        help="the number of items of each transformation "
+                             "type")
+    parser.add_argument("--format", choices=["yaml", "json"], default="yaml",
+                        dest="source_format")
+
+
+def get_generator_options(arguments):
+    """
+    Return the generate_source() keyword arguments from parsed arguments.
+
+    """
+    return {
+        "include_items": arguments.include_items,
+        "exclude_items": arguments.exclude_items,
+        "schemas": arguments.schemas,
+        "tables": arguments.tables,
+        "columns": arguments.columns,
+        "filters": arguments.filters,
+        "transformations": arguments.transformations,
+        "transformation_items": arguments.transformation_items
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    add_arguments(parser)
+    arguments = parser.parse_args()
+    source = generate_source(**get_generator_options(arguments))
+    output = getattr(sys.stdout, "buffer", sys.stdout)
+    output.write(dump_source(source, arguments.source_format))
+
+
+if __name__ == "__main__":
+    main()
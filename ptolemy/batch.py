@@ -0,0 +1,468 @@
+# -*- coding: utf-8 -*-
+
+"""
+ptolemy.batch
+
+This module implements compiling many source files in one go, either in the
+current process or across a pool of worker processes.
+
+"""
+
+from collections import namedtuple
+from functools import partial
+import glob
+import logging
+import os
+
+from .catalog import write_report
+from .exceptions import PtolemyBaseError
+from .source import Source
+from .stats import Stats
+from .utils import atomic_open, atomic_write, get_file_digest
+
+
+LOGGER = logging.getLogger(__name__)
+
+SOURCE_FILE_EXTENSIONS = (".yaml", ".yml")
+
+Job = namedtuple("Job", ["source_path", "output_path"])
+
+Result = namedtuple(
+    "Result", [
+        "source_path", "output_path", "error", "cache_hit", "stats",
+        "includes"
+    ]
+)
+Result.__new__.__defaults__ = (None, None)
+
+# Files in directories, or matched by globs, whose names start with this are
+# fragments for sources to include, rather than sources.
+FRAGMENT_PREFIX = "_"
+
+
+def find_sources(paths, fragments=False):
+    """
+    Expand files, directories and glob patterns into source files.
+
+    Each source file is returned with the path it should be written to,
+    relative to the output directory. Sources found in a directory, or by a
+    glob, keep their path relative to that directory, or to the fixed part
+    of the glob. Sources given as files are placed at the top level, so
+    more than one source may be placed at the same path, which
+    find_conflicts() reports.
+
+    :param paths: File paths, directory paths or glob patterns.
+    :type paths: list
+    :param fragments: Whether to return the fragments found in directories
+        and by globs too.
+    :type fragments: bool
+    :returns: list of (source_path, relative_path) tuples
+
+    """
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            sources.extend(_find_sources_in_directory(path, fragments))
+        elif glob.has_magic(path):
+            sources.extend(_find_sources_in_glob(path, fragments))
+        else:
+            sources.append((path, os.path.basename(path)))
+    return sources
+
+
+def _is_fragment(source_path):
+    """
+    Return whether a file found in a directory or by a glob is a fragment.
+
+    :param source_path: The path of the file.
+    :type source_path: str
+    :returns: bool
+
+    """
+    return os.path.basename(source_path).startswith(FRAGMENT_PREFIX)
+
+
+def _find_sources_in_directory(directory, fragments=False):
+    """
+    Return the source files beneath directory, in a stable order.
+
+    :param directory: The directory to search.
+    :type directory: str
+    :param fragments: Whether to return fragments too.
+    :type fragments: bool
+    :returns: list of (source_path, relative_path) tuples
+
+    """
+    sources = []
+    for root, directories, file_names in os.walk(directory):
+        directories.sort()
+        for file_name in sorted(file_names):
+            if file_name.endswith(SOURCE_FILE_EXTENSIONS) and (
+                    fragments or not _is_fragment(file_name)
+            ):
+                source_path = os.path.join(root, file_name)
+                sources.append(
+                    (source_path, os.path.relpath(source_path, directory))
+                )
+    return sources
+
+
+def _find_sources_in_glob(pattern, fragments=False):
+    """
+    Return the files matched by pattern, relative to the longest leading
+    part of pattern which contains no wildcards.
+
+    :param pattern: A glob pattern.
+    :type pattern: str
+    :param fragments: Whether to return fragments too.
+    :type fragments: bool
+    :returns: list of (source_path, relative_path) tuples
+
+    """
+    base_directory = pattern
+    while glob.has_magic(base_directory):
+        base_directory = os.path.dirname(base_directory)
+
+    return [
+        (source_path, os.path.relpath(source_path, base_directory or "."))
+        for source_path in sorted(glob.glob(pattern))
+        if os.path.isfile(source_path) and (
+            fragments or not _is_fragment(source_path)
+        )
+    ]
+
+
+def get_output_path(output_dir, relative_path):
+    """
+    Return the path a source's mapping should be written to.
+
+    :param output_dir: The output directory.
+    :type output_dir: str
+    :param relative_path: The source's path relative to the output directory.
+    :type relative_path: str
+    :returns: str
+
+    """
+    root, _ = os.path.splitext(relative_path)
+    return os.path.join(output_dir, root + ".json")
+
+
+def find_conflicts(work):
+    """
+    Return the error of each job whose mapping would be written to the same
+    path as the mapping of another job. Neither is compiled, rather than
+    one silently overwriting the other.
+
+    :param work: The jobs.
+    :type work: list of ptolemy.batch.Job
+    :returns: list of the error of each job, or None if it has no conflict
+
+    """
+    sources = {}
+    for job in work:
+        sources.setdefault(_get_path_key(job.output_path), []).append(
+            job.source_path
+        )
+    errors = []
+    for job in work:
+        other_sources = list(sources[_get_path_key(job.output_path)])
+        other_sources.remove(job.source_path)
+        if not other_sources:
+            errors.append(None)
+            continue
+        errors.append(
+            "The mapping would be written to '{0}', as would the mapping "
+            "of {1}.".format(job.output_path, ", ".join(
+                "'{0}'".format(source_path) for source_path in other_sources
+            ))
+        )
+    return errors
+
+
+def _get_path_key(path):
+    """
+    Return a key which is the same for every spelling of a path.
+
+    :param path: The path.
+    :type path: str
+    :returns: str
+
+    """
+    return os.path.normcase(os.path.abspath(path))
+
+
+def describe_error(error):
+    """
+    Return a user friendly message for an error raised by Source.compile().
+
+    :param error: The error raised.
+    :type error: Exception
+    :returns: str
+
+    """
+    from jsonschema.exceptions import ValidationError
+
+    if isinstance(error, ValidationError):
+        return "The source file could not be validated. {0}".format(
+            error.message
+        )
+    return str(error)
+
+
+def get_shard_output_path(output_path, shard_number):
+    """
+    Return the path a shard of a source's mapping should be written to.
+
+    :param output_path: The path the whole mapping would be written to.
+    :type output_path: str
+    :param shard_number: The number of the shard, from 1.
+    :type shard_number: int
+    :returns: str
+
+    """
+    root, extension = os.path.splitext(output_path)
+    return "{0}.{1}{2}".format(root, shard_number, extension)
+
+
+def get_report_path(output_path):
+    """
+    Return the path to write the catalog report for a mapping to.
+
+    :param output_path: The path of the mapping.
+    :type output_path: str
+    :returns: str
+
+    """
+    return os.path.splitext(output_path)[0] + ".tables.csv"
+
+
+def get_cache_options(options, includes=None):
+    """
+    Return the options identifying a compiled mapping in the cache. The
+    catalog, and the fragments the source includes, are identified by their
+    contents rather than their paths, so that mappings are recompiled when
+    they change.
+
+    :param options: Keyword arguments the Source is created with.
+    :type options: dict
+    :param includes: The paths of the fragments the source includes.
+    :type includes: list
+    :returns: dict
+
+    """
+    if not includes and (not options or (
+            options.get("catalog") is None and "streaming" not in options
+    )):
+        return options
+    cache_options = dict(options or {})
+    # Streaming a source makes no difference to its mapping.
+    cache_options.pop("streaming", None)
+    if cache_options.get("catalog") is not None:
+        cache_options["catalog"] = get_file_digest(options["catalog"])
+    if includes:
+        cache_options["includes"] = [
+            get_file_digest(path) for path in includes
+        ]
+    return cache_options
+
+
+def compile_job(
+        job, cache=None, options=None, shards=None, catalog_report=False,
+        collect_stats=False
+):
+    """
+    Compile a single source and atomically write the mapping. Errors are
+    returned rather than raised, so that one bad source does not stop the
+    rest of the batch.
+
+    :param job: The source to compile and where to write it.
+    :type job: ptolemy.batch.Job
+    :param cache: The cache of compiled mappings, if any.
+    :type cache: ptolemy.cache.Cache
+    :param options: Keyword arguments to create the Source with.
+    :type options: dict
+    :param shards: The number of shards to split the mapping into, and the
+        table weights to balance them by, if the mapping is to be sharded.
+        Sharded mappings are not cached.
+    :type shards: tuple of (int, dict)
+    :param catalog_report: Whether to write the tables each pattern
+        resolved to against the catalog next to the mapping.
+    :type catalog_report: bool
+    :param collect_stats: Whether to collect the statistics of the compile,
+        including its peak memory, in Result.stats.
+    :type collect_stats: bool
+    :returns: ptolemy.batch.Result
+    :raises: ValueError if the options are invalid
+
+    """
+    # jsonschema and PyYAML are slow to import, so they are only imported
+    # once a source is compiled, rather than whenever ptolemy starts.
+    from jsonschema.exceptions import ValidationError
+    import yaml
+
+    cache_hit = None
+    stats = Stats() if collect_stats else None
+    source = Source(job.source_path, stats=stats, **(options or {}))
+    try:
+        with source.stats.trace_memory():
+            if shards is not None:
+                mapping_tables = source.compile_shards(*shards)
+                for i, mapping_table in enumerate(mapping_tables, 1):
+                    atomic_write(
+                        get_shard_output_path(job.output_path, i),
+                        mapping_table + "\n"
+                    )
+            elif cache is None:
+                _write_mapping(source, job.output_path)
+            else:
+                source_string = source.read()
+                key = cache.get_key(source_string, get_cache_options(
+                    options, source.get_includes(source_string)
+                ))
+                cache_hit = cache.copy_to_file(key, job.output_path)
+                if not cache_hit:
+                    _write_mapping(source, job.output_path, source_string)
+                    cache.copy_from_file(key, job.output_path)
+                elif catalog_report:
+                    # Planning resolves the source without expanding it.
+                    source.plan(source_string)
+        if catalog_report:
+            with atomic_open(get_report_path(job.output_path)) as report_file:
+                write_report(source.resolutions, report_file)
+        for removal in source.removals:
+            LOGGER.debug(
+                "%s: %s %s: %s", job.source_path,
+                "removed" if removal.removed else "kept", removal.rule,
+                removal.reason
+            )
+    except (
+            PtolemyBaseError, ValidationError, yaml.YAMLError,
+            EnvironmentError
+    ) as error:
+        return Result(
+            job.source_path, job.output_path, describe_error(error),
+            cache_hit, stats, source.includes
+        )
+    except Exception as error:  # pylint: disable=broad-except
+        # Any other error is a bug, but it is only reported against its
+        # source, rather than aborting the rest of the batch.
+        LOGGER.exception("%s: unexpected error", job.source_path)
+        return Result(
+            job.source_path, job.output_path,
+            "Unexpected error compiling the source. {0}: {1}".format(
+                type(error).__name__, error
+            ),
+            cache_hit, stats, source.includes
+        )
+    return Result(
+        job.source_path, job.output_path, None, cache_hit, stats,
+        source.includes
+    )
+
+
+def _write_mapping(source, output_path, source_string=None):
+    """
+    Compile source, streaming the mapping atomically to output_path.
+
+    :param source: The source to compile.
+    :type source: ptolemy.source.Source
+    :param output_path: The path to write the mapping to.
+    :type output_path: str
+    :param source_string: The YAML or JSON source, if it has already
+        been read.
+    :type source_string: bytes
+
+    """
+    with atomic_open(output_path) as output_file:
+        source.write(output_file, source_string)
+        output_file.write(u"\n")
+
+
+def compile_all(
+        paths, output_dir, jobs=1, cache=None, options=None, shards=None,
+        catalog_report=False, collect_stats=False
+):
+    """
+    Compile every source found in paths into output_dir.
+
+    :param paths: File paths, directory paths or glob patterns.
+    :type paths: list
+    :param output_dir: The directory to write mappings to.
+    :type output_dir: str
+    :param jobs: The number of worker processes to use. 1 compiles in the
+        current process, 0 uses one worker per CPU.
+    :type jobs: int
+    :param cache: The cache of compiled mappings, if any. Once every source
+        has been compiled, the cache is trimmed to its maximum size.
+    :type cache: ptolemy.cache.Cache
+    :param options: Keyword arguments to create each Source with.
+    :type options: dict
+    :param shards: The number of shards to split each mapping into, and the
+        table weights to balance them by, if mappings are to be sharded.
+    :type shards: tuple of (int, dict)
+    :param catalog_report: Whether to write the tables each pattern
+        resolved to against the catalog next to each mapping.
+    :type catalog_report: bool
+    :param collect_stats: Whether to collect the statistics of each
+        compile in its Result.stats.
+    :type collect_stats: bool
+    :returns: iterator of ptolemy.batch.Result, in the order of the sources
+
+    """
+    work = [
+        Job(source_path, get_output_path(output_dir, relative_path))
+        for source_path, relative_path in find_sources(paths)
+    ]
+    conflicts = find_conflicts(work)
+    results = _compile_jobs(
+        [job for job, conflict in zip(work, conflicts) if conflict is None],
+        jobs, partial(
+            compile_job, cache=cache, options=options, shards=shards,
+            catalog_report=catalog_report, collect_stats=collect_stats
+        )
+    )
+    try:
+        for job, conflict in zip(work, conflicts):
+            if conflict is None:
+                yield next(results)
+            else:
+                yield Result(job.source_path, job.output_path, conflict, None)
+    finally:
+        results.close()
+
+    if cache is not None:
+        cache.evict()
+
+
+def _compile_jobs(work, jobs, work_function):
+    """
+    Compile each job, in the current process or across a pool of worker
+    processes.
+
+    :param work: The jobs.
+    :type work: list of ptolemy.batch.Job
+    :param jobs: The number of worker processes to use. 1 compiles in the
+        current process, 0 uses one worker per CPU.
+    :type jobs: int
+    :param work_function: The function to compile a job with.
+    :type work_function: callable
+    :returns: iterator of ptolemy.batch.Result, in the order of the jobs
+
+    """
+    import multiprocessing
+
+    if jobs == 0:
+        jobs = multiprocessing.cpu_count()
+    jobs = min(jobs, len(work))
+
+    if jobs <= 1:
+        for job in work:
+            yield work_function(job)
+    else:
+        pool = multiprocessing.Pool(jobs)
+        try:
+            for result in pool.imap(work_function, work):
+                yield result
+        finally:
+            pool.terminate()
+            pool.join()
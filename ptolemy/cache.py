@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+
+"""
+ptolemy.cache
+
+This module implements an on-disk cache of compiled mappings, keyed by the
+contents of their source.
+
+Entries are written atomically, so several processes can safely share a
+cache directory. Least recently used entries are evicted once the cache
+grows beyond its maximum size.
+
+"""
+
+import errno
+import hashlib
+import io
+import json
+import os
+import shutil
+
+from . import __version__
+from .schema import get_source_schema_digest
+from .utils import atomic_open, atomic_write
+
+
+DEFAULT_MAX_SIZE = 100 * 1024 * 1024
+
+
+class Cache(object):
+    """
+    Cache stores compiled mappings on disk.
+
+    :param directory: The directory to store cache entries in.
+    :type directory: str
+    :param max_size: The size in bytes the cache is trimmed to by evict().
+    :type max_size: int
+
+    """
+
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def get_key(source_string, options=None):
+        """
+        Return the cache key for a source. The key covers the ptolemy
+        version, the source schema and the options the source is compiled
+        with, as well as the source itself, so upgrading ptolemy never
+        serves a stale mapping.
+
+        :param source_string: The raw contents of the source file.
+        :type source_string: bytes
+        :param options: The keyword arguments the Source is created with.
+        :type options: dict
+        :returns: str
+
+        """
+        key = hashlib.sha256()
+        key.update("ptolemy {0}\0{1}\0{2}\0".format(
+            __version__, get_source_schema_digest(),
+            json.dumps(options or {}, sort_keys=True)
+        ).encode("utf-8"))
+        key.update(source_string)
+        return key.hexdigest()
+
+    def get_path(self, key):
+        """
+        Return the path of the cache entry for key.
+
+        :param key: The cache key.
+        :type key: str
+        :returns: str
+
+        """
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):
+        """
+        Return the cached mapping for key, or None if it is not cached.
+
+        :param key: The cache key.
+        :type key: str
+        :returns: str or None
+
+        """
+        entry_file = self._open(key)
+        if entry_file is None:
+            return None
+        with entry_file:
+            return entry_file.read()
+
+    def copy_to_file(self, key, file_path):
+        """
+        Atomically copy the cached mapping for key to file_path.
+
+        :param key: The cache key.
+        :type key: str
+        :param file_path: The path to copy the mapping to.
+        :type file_path: str
+        :returns: bool, whether the mapping was cached
+
+        """
+        entry_file = self._open(key)
+        if entry_file is None:
+            return False
+        with entry_file, atomic_open(file_path) as output_file:
+            shutil.copyfileobj(entry_file, output_file)
+        return True
+
+    def set(self, key, mapping_table):
+        """
+        Store the mapping for key.
+
+        :param key: The cache key.
+        :type key: str
+        :param mapping_table: The compiled mapping.
+        :type mapping_table: str
+
+        """
+        atomic_write(self.get_path(key), mapping_table)
+
+    def copy_from_file(self, key, file_path):
+        """
+        Store the mapping in file_path for key.
+
+        :param key: The cache key.
+        :type key: str
+        :param file_path: The path of the compiled mapping.
+        :type file_path: str
+
+        """
+        with io.open(file_path, "r", encoding="utf-8") as mapping_file:
+            with atomic_open(self.get_path(key)) as entry_file:
+                shutil.copyfileobj(mapping_file, entry_file)
+
+    def _open(self, key):
+        """
+        Open the cache entry for key, and mark it as recently used. Hits and
+        misses are counted here.
+
+        :param key: The cache key.
+        :type key: str
+        :returns: file or None
+
+        """
+        path = self.get_path(key)
+        try:
+            entry_file = io.open(path, "r", encoding="utf-8")
+        except EnvironmentError as error:
+            if error.errno != errno.ENOENT:
+                raise
+            self.misses += 1
+            return None
+        self.hits += 1
+
+        # Entries are evicted by modification time, so touching an entry
+        # marks it as recently used. An open entry can still be read if
+        # another process evicts it first.
+        try:
+            os.utime(path, None)
+        except EnvironmentError as error:
+            if error.errno != errno.ENOENT:
+                entry_file.close()
+                raise
+        return entry_file
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache is no larger
+        than max_size.
+
+        :returns: int, the number of entries removed
+
+        """
+        entries = []
+        size = 0
+        for root, _, file_names in os.walk(self.directory):
+            for file_name in file_names:
+                if file_name.startswith("."):
+                    # Skip entries which are still being written.
+                    continue
+                path = os.path.join(root, file_name)
+                try:
+                    stat = os.stat(path)
+                except EnvironmentError:
+                    # Another process evicted the entry first.
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                size += stat.st_size
+
+        removed = 0
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except EnvironmentError as error:
+                if error.errno != errno.ENOENT:
+                    raise
+            else:
+                removed += 1
+            size -= entry_size
+        return removed
@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+
+"""
+ptolemy.catalog
+
+This module implements resolving the wildcards in selection rules against a
+snapshot of the source database's catalog, so that each rule names a
+single table.
+
+A catalog is either a JSON dump of information_schema.tables, a list of
+objects with table_schema and table_name keys, or a SQLite database with a
+"tables" table holding the same columns.
+
+"""
+
+from bisect import bisect_left
+from collections import defaultdict, namedtuple, OrderedDict
+import csv
+import io
+import json
+import os
+import re
+
+from .exceptions import InvalidFileError
+from .patterns import compile_like_pattern, WILDCARD
+
+
+SQLITE_HEADER = b"SQLite format 3\x00"
+
+LIKE_WILDCARDS = ("%", "_")
+
+_FIXED_PREFIX = re.compile(
+    "[^{0}]*".format(re.escape("".join(LIKE_WILDCARDS)))
+)
+
+Resolution = namedtuple(
+    "Resolution", ["rule_action", "schema_pattern", "table_pattern", "tables"]
+)
+
+_catalogs = {}
+
+
+def load_catalog(catalog_file_path):
+    """
+    Return the catalog in catalog_file_path. Catalogs are cached for the
+    life of the process, until the file changes.
+
+    :param catalog_file_path: The path of the catalog.
+    :type catalog_file_path: str
+    :returns: ptolemy.catalog.Catalog
+    :raises: ptolemy.exceptions.InvalidFileError
+
+    """
+    try:
+        stat = os.stat(catalog_file_path)
+    except EnvironmentError:
+        raise InvalidFileError(
+            "The catalog '{0}' does not exist.".format(catalog_file_path)
+        )
+
+    key = (os.path.abspath(catalog_file_path), stat.st_mtime, stat.st_size)
+    if key not in _catalogs:
+        _catalogs.clear()
+        _catalogs[key] = Catalog(_read_tables(catalog_file_path))
+    return _catalogs[key]
+
+
+def _read_tables(catalog_file_path):
+    """
+    Return the (schema, table) of each table in a catalog file.
+
+    :param catalog_file_path: The path of the catalog.
+    :type catalog_file_path: str
+    :returns: list of tuples
+    :raises: ptolemy.exceptions.InvalidFileError
+
+    """
+    import sqlite3
+
+    with open(catalog_file_path, "rb") as catalog_file:
+        is_sqlite = catalog_file.read(len(SQLITE_HEADER)) == SQLITE_HEADER
+
+    try:
+        if is_sqlite:
+            connection = sqlite3.connect(catalog_file_path)
+            try:
+                return connection.execute(
+                    "SELECT table_schema, table_name FROM tables"
+                ).fetchall()
+            finally:
+                connection.close()
+
+        with io.open(catalog_file_path, "r", encoding="utf-8") as catalog_file:
+            rows = json.load(catalog_file)
+        tables = []
+        for row in rows:
+            row = {key.lower(): value for key, value in row.items()}
+            tables.append((row["table_schema"], row["table_name"]))
+        return tables
+    except (sqlite3.Error, ValueError, KeyError, AttributeError) as error:
+        raise InvalidFileError(
+            "The catalog '{0}' could not be read. It must hold table_schema "
+            "and table_name for each table. {1!r}".format(
+                catalog_file_path, error
+            )
+        )
+
+
+def _is_like_pattern(name):
+    """
+    Return whether name is a LIKE pattern. Only names containing % are
+    patterns: table names often contain _, so a name such as order_items is
+    taken literally, and _ only matches any single character alongside %.
+
+    :param name: A name or pattern.
+    :type name: str
+    :returns: bool
+
+    """
+    return WILDCARD in name
+
+
+class NameIndex(object):
+    """
+    NameIndex finds the names matching a LIKE pattern without testing every
+    name. The names are held sorted, and sorted by their reverse, so the
+    names starting with the fixed prefix of a pattern, or ending with its
+    fixed suffix, are found by binary search. Only those names are tested
+    against the whole pattern.
+
+    :param names: The names to index.
+    :type names: iterable of str
+
+    """
+
+    def __init__(self, names):
+        self.names = sorted(set(names))
+        self.reversed_names = sorted(name[::-1] for name in self.names)
+        self._name_set = frozenset(self.names)
+
+    def match(self, pattern):
+        """
+        Return the names matching pattern, in sorted order.
+
+        :param pattern: A name or LIKE pattern.
+        :type pattern: str
+        :returns: list of str
+
+        """
+        if not _is_like_pattern(pattern):
+            return [pattern] if pattern in self._name_set else []
+
+        prefix = _get_fixed_prefix(pattern)
+        suffix = _get_fixed_prefix(pattern[::-1])
+        if len(prefix) >= len(suffix):
+            candidates = _get_prefix_range(self.names, prefix)
+        else:
+            candidates = sorted(
+                name[::-1] for name in
+                _get_prefix_range(self.reversed_names, suffix)
+            )
+
+        expression = compile_like_pattern(pattern)
+        return [name for name in candidates if expression.match(name)]
+
+
+def _get_fixed_prefix(pattern):
+    """
+    Return the part of pattern before its first wildcard.
+
+    :param pattern: A LIKE pattern.
+    :type pattern: str
+    :returns: str
+
+    """
+    return _FIXED_PREFIX.match(pattern).group()
+
+
+def _get_prefix_range(names, prefix):
+    """
+    Return the names in the sorted list names which start with prefix.
+
+    :param names: Sorted names.
+    :type names: list of str
+    :param prefix: A prefix.
+    :type prefix: str
+    :returns: list of str
+
+    """
+    start = bisect_left(names, prefix)
+    end = start
+    while end < len(names) and names[end].startswith(prefix):
+        end += 1
+    return names[start:end]
+
+
+class Catalog(object):
+    """
+    Catalog holds the tables in a database, indexed for matching patterns.
+
+    :param tables: The (schema, table) of each table.
+    :type tables: iterable of tuples
+
+    """
+
+    def __init__(self, tables):
+        tables_by_schema = defaultdict(list)
+        for schema, table in tables:
+            tables_by_schema[schema].append(table)
+
+        self.schemas = NameIndex(tables_by_schema)
+        self.tables = {
+            schema: NameIndex(schema_tables)
+            for schema, schema_tables in tables_by_schema.items()
+        }
+
+    def match(self, schema_pattern, table_pattern):
+        """
+        Return the (schema, table) of each table matching the patterns.
+
+        :param schema_pattern: A schema name or LIKE pattern.
+        :type schema_pattern: str
+        :param table_pattern: A table name or LIKE pattern.
+        :type table_pattern: str
+        :returns: list of tuples
+
+        """
+        return [
+            (schema, table)
+            for schema in self.schemas.match(schema_pattern)
+            for table in self.tables[schema].match(table_pattern)
+        ]
+
+    def resolve(self, source, keep_wildcards=False):
+        """
+        Return source with each selection item split into one item per
+        schema, naming every matching table rather than patterns, and the
+        tables each pattern resolved to.
+
+        Names without % are kept as they are, even if they are missing from
+        the catalog. A table matched by several patterns in an
+        item is only named once.
+
+        :param source: A loaded, validated source.
+        :type source: dict
+        :param keep_wildcards: Whether to return source unchanged, only
+            reporting the tables each pattern resolves to.
+        :type keep_wildcards: bool
+        :returns: tuple of (dict, list of ptolemy.catalog.Resolution)
+
+        """
+        resolutions = []
+        resolved_selection = {}
+        for rule_action, data_items in source["selection"].items():
+            resolved_data_items = resolved_selection[rule_action] = []
+            for data_item in data_items:
+                resolved_data_items.extend(self._resolve_item(
+                    rule_action, data_item, resolutions
+                ))
+
+        if keep_wildcards:
+            return source, resolutions
+
+        resolved_source = dict(source)
+        resolved_source["selection"] = resolved_selection
+        return resolved_source, resolutions
+
+    def _resolve_item(self, rule_action, data_item, resolutions):
+        """
+        Return a source item for each schema the item's locators resolve to.
+
+        :param rule_action: The item's rule action.
+        :type rule_action: str
+        :param data_item: The source item.
+        :type data_item: dict
+        :param resolutions: A list to record the tables each pattern
+            resolved to in.
+        :type resolutions: list
+        :returns: list of dict
+
+        """
+        object_locators = data_item["object-locators"]
+        matched_tables = []
+        for schema_pattern in object_locators["schema-names"]:
+            for table_pattern in object_locators["table-names"]:
+                if _is_like_pattern(schema_pattern) or \
+                        _is_like_pattern(table_pattern):
+                    tables = self.match(schema_pattern, table_pattern)
+                    resolutions.append(Resolution(
+                        rule_action, schema_pattern, table_pattern, tables
+                    ))
+                else:
+                    tables = [(schema_pattern, table_pattern)]
+                matched_tables.extend(tables)
+
+        # Group the tables by schema, keeping the order they were found in.
+        schema_tables = OrderedDict()
+        for schema, table in matched_tables:
+            schema_tables.setdefault(schema, OrderedDict())[table] = None
+
+        resolved_items = []
+        for schema, tables in schema_tables.items():
+            resolved_object_locators = dict(object_locators)
+            resolved_object_locators["schema-names"] = [schema]
+            resolved_object_locators["table-names"] = list(tables)
+            resolved_item = dict(data_item)
+            resolved_item["object-locators"] = resolved_object_locators
+            resolved_items.append(resolved_item)
+        return resolved_items
+
+
+def write_report(resolutions, stream):
+    """
+    Write the tables each pattern resolved to as CSV, with a row for each
+    table, and an empty row for each pattern which matched no tables.
+
+    :param resolutions: The resolutions from Catalog.resolve().
+    :type resolutions: list of ptolemy.catalog.Resolution
+    :param stream: A file-like object to write to.
+    :type stream: file
+
+    """
+    writer = csv.writer(stream, lineterminator="\n")
+    writer.writerow(
+        ["rule-action", "schema-pattern", "table-pattern", "schema", "table"]
+    )
+    for resolution in resolutions:
+        for schema, table in resolution.tables or [("", "")]:
+            writer.writerow([
+                resolution.rule_action, resolution.schema_pattern,
+                resolution.table_pattern, schema, table
+            ])
@@ -9,13 +9,19 @@ This module implements the CLI for ptolemy.
 
 import argparse
 import logging
+import os
 import sys
 
-from jsonschema.exceptions import ValidationError
-
 from . import __version__
-from .source import Source
+from .batch import compile_all, describe_error, find_sources
+from .cache import Cache, DEFAULT_MAX_SIZE
+from .catalog import write_report
+from .mapping import ENCODERS, JSONFormat, KEY_ORDERS
+from .source import OPTIMISATIONS, Source
 from .exceptions import PtolemyBaseError
+from .ids import RULE_ID_SCHEMES
+from .shard import load_weights
+from .stats import NULL_STATS, Stats
 
 
 def parse_arguments(args):
@@ -25,7 +31,20 @@ def parse_arguments(args):
     :returns: argparse.Namespace
 
     """
-    parser = argparse.ArgumentParser()
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="commands:\n"
+               "  diff                  compare the rules of two mappings "
+               "(see ptolemy diff -h)\n"
+               "  explain               list the rules which apply to a "
+               "schema, table or column (see ptolemy explain -h)\n"
+               "  merge                 merge mappings into one, renumbering "
+               "their rules (see ptolemy merge -h)\n"
+               "  serve                 compile sources posted over HTTP "
+               "(see ptolemy serve -h)\n"
+               "  watch                 recompile sources as they change "
+               "(see ptolemy watch -h)"
+    )
 
     parser.add_argument(
         "-d", "--debug", action="store_true",
@@ -35,11 +54,178 @@ def parse_arguments(args):
         "-v", "--version", action="version",
         version="ptolemy version {0}".format(__version__)
     )
-    parser.add_argument("source", help="path to the source file")
+    parser.add_argument(
+        "-o", "--output-dir",
+        help="write each mapping to this directory, mirroring the source "
+             "paths, rather than to stdout"
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1,
+        help="number of worker processes used with --output-dir, or to "
+             "expand a single source compiled to stdout (0 uses one per CPU)"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="reuse mappings compiled from identical sources, stored in this "
+             "directory, with --output-dir (default: $PTOLEMY_CACHE_DIR)"
+    )
+    parser.add_argument(
+        "--cache-size", type=positive_int,
+        help="the size in MiB the cache is trimmed to after compiling "
+             "(default: {0})".format(DEFAULT_MAX_SIZE // 1024 // 1024)
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", default=False,
+        help="do not read or write the cache"
+    )
+    add_source_arguments(parser)
+    parser.add_argument(
+        "--shards", type=positive_int,
+        help="split each mapping into this many self-contained mappings, "
+             "written with --output-dir as <name>.<shard>.json"
+    )
+    parser.add_argument(
+        "--shard-stats",
+        help="a CSV or JSON file of schema, table and weight columns, used "
+             "to balance the shards by weight rather than by table count"
+    )
+    parser.add_argument(
+        "--shard-weight", default="rows",
+        help="the weight column in --shard-stats (default: rows)"
+    )
+    parser.add_argument(
+        "--catalog-report", action="store_true", default=False,
+        help="report the tables each pattern resolves to against --catalog "
+             "as CSV, to stderr or with --output-dir as <name>.tables.csv"
+    )
+    parser.add_argument(
+        "--stats", choices=["text", "json"],
+        help="report the time of each phase, the rules of each type, the "
+             "size of the output and the peak memory to stderr, as a table "
+             "or as JSON. With --output-dir, the totals for every source "
+             "are reported"
+    )
+    parser.add_argument(
+        "--timings", action="store_const", const="text", dest="stats",
+        help="the same as --stats=text"
+    )
+    parser.add_argument(
+        "--previous-mapping",
+        help="a mapping previously compiled from the source. Its rules "
+             "which are unchanged keep their rule-ids, and other rules are "
+             "given rule-ids it does not use. Only used compiling a single "
+             "source to stdout"
+    )
+    parser.add_argument(
+        "--stream", action="store_true", default=False,
+        help="read each source an item at a time as its mapping is written, "
+             "so that sources too large to load whole can be compiled. "
+             "Cannot be used with --max-rules or --max-bytes"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", default=False,
+        help="report how many rules, and how many bytes, each source "
+             "compiles to without compiling it"
+    )
+    parser.add_argument(
+        "sources", nargs="+", metavar="source",
+        help="path to a source file, or with --output-dir, a directory or "
+             "glob of source files"
+    )
 
     return parser.parse_args(args)
 
 
+def positive_int(value):
+    """
+    Parse an argument which must be a whole number of at least 1.
+
+    :param value: The argument.
+    :type value: str
+    :returns: int
+    :raises: argparse.ArgumentTypeError if the argument is not a whole
+        number of at least 1
+
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        number = None
+    if number is None or number < 1:
+        raise argparse.ArgumentTypeError(
+            "must be a whole number of at least 1, not {0!r}".format(value)
+        )
+    return number
+
+
+def add_rule_arguments(parser):
+    """
+    Add the arguments which set the options changing the rules each Source
+    produces. See get_rule_options().
+
+    :param parser: The parser.
+    :type parser: argparse.ArgumentParser
+
+    """
+    parser.add_argument(
+        "-O", "--optimise", action="append", default=[],
+        choices=list(OPTIMISATIONS), metavar="OPTIMISATION",
+        help="remove or rewrite redundant rules. May be given more than "
+             "once. Choices: {0}".format(", ".join(OPTIMISATIONS))
+    )
+    parser.add_argument(
+        "--max-rules", type=int,
+        help="fail any source which expands to more than this many rules"
+    )
+    parser.add_argument(
+        "--max-bytes", type=int,
+        help="fail any source whose mapping is larger than this many bytes"
+    )
+    parser.add_argument(
+        "--catalog",
+        help="a JSON or SQLite snapshot of information_schema.tables to "
+             "resolve the wildcards in selection rules against"
+    )
+    parser.add_argument(
+        "--keep-wildcards", action="store_true", default=False,
+        help="keep the wildcards in selection rules, only reporting the "
+             "tables they resolve to against --catalog"
+    )
+    parser.add_argument(
+        "--rule-ids", choices=RULE_ID_SCHEMES, default="position",
+        help="number rules by their position, or derive each rule-id from "
+             "the rule's content, so that it does not change as other rules "
+             "are added or removed (default: position)"
+    )
+
+
+def add_source_arguments(parser):
+    """
+    Add the arguments which set the options each Source is created with,
+    including how mappings are written. See get_source_options().
+
+    :param parser: The parser.
+    :type parser: argparse.ArgumentParser
+
+    """
+    add_rule_arguments(parser)
+    parser.add_argument(
+        "--minify", action="store_true", default=False,
+        help="write mappings without whitespace, rather than indented"
+    )
+    parser.add_argument(
+        "--key-order", choices=KEY_ORDERS, default="sorted",
+        help="sort the keys of each rule, or write them in a fixed "
+             "canonical order, which is faster (default: sorted)"
+    )
+    parser.add_argument(
+        "--encoder", choices=ENCODERS, default="auto",
+        help="the JSON encoder. orjson is much faster, and writes the same "
+             "bytes, but must be installed. auto uses it if it is "
+             "(default: auto)"
+    )
+
+
 def setup_logger(debug):
     """
     Setup logging.
@@ -61,15 +247,110 @@ def setup_logger(debug):
 
 def main():
     """
-    Run ptolemy.
+    Run ptolemy, or the command named by the first argument.
 
     """
-    arguments = parse_arguments(sys.argv[1:])
+    args = sys.argv[1:]
+    if args and args[0] in COMMANDS:
+        COMMANDS[args[0]](args[1:])
+        return
+
+    arguments = parse_arguments(args)
     logger = setup_logger(arguments.debug)
 
+    if arguments.stream and (
+            arguments.max_rules is not None or arguments.max_bytes is not None
+    ):
+        sys.exit("--stream cannot be used with --max-rules or --max-bytes.")
+
+    if arguments.dry_run or arguments.output_dir is None:
+        if arguments.cache_dir is not None or \
+                arguments.cache_size is not None:
+            sys.exit("--output-dir is required to use --cache-dir or "
+                     "--cache-size.")
+        if os.environ.get("PTOLEMY_CACHE_DIR") and not arguments.no_cache:
+            sys.stderr.write(
+                "$PTOLEMY_CACHE_DIR is only used with --output-dir.\n"
+            )
+
+    if arguments.dry_run:
+        plan(arguments, logger)
+    elif arguments.output_dir is not None:
+        if arguments.previous_mapping is not None:
+            sys.exit("--previous-mapping can only be used to compile a "
+                     "single source to stdout.")
+        compile_to_directory(arguments, logger)
+    elif len(arguments.sources) > 1:
+        sys.exit("--output-dir is required to compile more than one source.")
+    elif arguments.shards is not None:
+        sys.exit("--output-dir is required to shard mappings.")
+    else:
+        compile_to_stdout(arguments.sources[0], arguments, logger)
+
+
+def get_rule_options(arguments):
+    """
+    Return the keyword arguments to create each Source with, from the
+    arguments added by add_rule_arguments().
+
+    :param arguments: The parsed arguments.
+    :type arguments: argparse.Namespace
+    :returns: dict
+
+    """
+    return {
+        "max_rules": arguments.max_rules,
+        "max_bytes": arguments.max_bytes,
+        "optimisations": arguments.optimise,
+        "catalog": arguments.catalog,
+        "keep_wildcards": arguments.keep_wildcards,
+        "rule_ids": arguments.rule_ids
+    }
+
+
+def get_source_options(arguments):
+    """
+    Return the keyword arguments to create each Source with, from the
+    arguments added by add_source_arguments().
+
+    :param arguments: The parsed arguments.
+    :type arguments: argparse.Namespace
+    :returns: dict
+
+    """
+    options = get_rule_options(arguments)
+    options["json_format"] = JSONFormat(
+        arguments.minify, arguments.key_order, arguments.encoder
+    )
+    return options
+
+
+def compile_to_stdout(source_path, arguments, logger):
+    """
+    Compile a single source, streaming the mapping to stdout.
+
+    :param source_path: The path to the source file.
+    :type source_path: str
+    :param arguments: The parsed arguments.
+    :type arguments: argparse.Namespace
+    :param logger: The logger.
+    :type logger: logging.Logger
+
+    """
+    # jsonschema is slow to import, so it is only imported by the commands
+    # which validate sources.
+    from jsonschema.exceptions import ValidationError
+
+    stats = Stats() if arguments.stats is not None else None
     try:
-        source = Source(arguments.source)
-        mapping_table = source.compile()
+        source = Source(
+            source_path, stats=stats,
+            previous_mapping=arguments.previous_mapping,
+            streaming=arguments.stream, jobs=arguments.jobs,
+            **get_source_options(arguments)
+        )
+        with source.stats.trace_memory():
+            source.write(sys.stdout)
     except PtolemyBaseError as error:
         logger.exception(error)
         sys.exit(error)
@@ -79,7 +360,575 @@ def main():
             "The source file could not be validated. {0}".format(error.message)
         )
     else:
-        sys.stdout.write(mapping_table + "\n")
+        sys.stdout.write("\n")
+        for removal in source.removals:
+            sys.stderr.write("{0} {1}: {2}.\n".format(
+                "Removed" if removal.removed else "Kept", removal.rule,
+                removal.reason
+            ))
+        if arguments.catalog_report:
+            write_report(source.resolutions, sys.stderr)
+        if stats is not None:
+            write_stats(stats, arguments.stats)
+
+
+def compile_to_directory(arguments, logger):
+    """
+    Compile every source, writing each mapping beneath the output directory.
+    Failures are reported once all sources have been attempted.
+
+    :param arguments: The parsed arguments.
+    :type arguments: argparse.Namespace
+    :param logger: The logger.
+    :type logger: logging.Logger
+
+    """
+    cache = None
+    cache_dir = arguments.cache_dir
+    if cache_dir is None:
+        cache_dir = os.environ.get("PTOLEMY_CACHE_DIR")
+    if cache_dir and not arguments.no_cache:
+        cache = Cache(cache_dir, (
+            DEFAULT_MAX_SIZE if arguments.cache_size is None
+            else arguments.cache_size * 1024 * 1024
+        ))
+
+    shards = None
+    if arguments.shards is not None:
+        weights = None
+        if arguments.shard_stats is not None:
+            try:
+                weights = load_weights(
+                    arguments.shard_stats, arguments.shard_weight
+                )
+            except PtolemyBaseError as error:
+                logger.exception(error)
+                sys.exit(error)
+        shards = (arguments.shards, weights)
+
+    options = get_source_options(arguments)
+    if arguments.stream:
+        options["streaming"] = True
+    results = compile_all(
+        arguments.sources, arguments.output_dir, arguments.jobs, cache,
+        options, shards, arguments.catalog_report,
+        arguments.stats is not None
+    )
+    stats = Stats()
+    failures = total = hits = misses = 0
+    for result in results:
+        total += 1
+        if result.stats is not None:
+            stats.update(result.stats)
+        hits += result.cache_hit is True
+        misses += result.cache_hit is False
+        if result.error is None:
+            logger.debug(
+                "Compiled '%s' to '%s'", result.source_path, result.output_path
+            )
+        else:
+            failures += 1
+            sys.stderr.write("{0}: {1}\n".format(
+                result.source_path, result.error
+            ))
+
+    if not total:
+        sys.exit("No source files were found.")
+    if cache is not None:
+        sys.stderr.write("Cache: {0} hits, {1} misses.\n".format(
+            hits, misses
+        ))
+    if arguments.stats is not None:
+        write_stats(stats, arguments.stats)
+    if failures:
+        sys.exit("{0} of {1} source files could not be compiled.".format(
+            failures, total
+        ))
+
+
+def write_stats(stats, stats_format):
+    """
+    Write the statistics of a compile to stderr.
+
+    :param stats: The statistics.
+    :type stats: ptolemy.stats.Stats
+    :param stats_format: "text" or "json".
+    :type stats_format: str
+
+    """
+    if stats_format == "json":
+        sys.stderr.write(stats.to_json() + "\n")
+    else:
+        sys.stderr.write(stats.report() + "\n")
+
+
+def plan(arguments, logger):
+    """
+    Report the rules and bytes each source expands to, without expanding
+    them. Sources which exceed the limits are reported as failures.
+
+    :param arguments: The parsed arguments.
+    :type arguments: argparse.Namespace
+    :param logger: The logger.
+    :type logger: logging.Logger
+
+    """
+    from jsonschema.exceptions import ValidationError
+
+    sources = find_sources(arguments.sources)
+    failures = 0
+    for i, (source_path, _) in enumerate(sources):
+        if len(sources) > 1:
+            sys.stdout.write("{0}{1}\n".format("\n" if i else "", source_path))
+        try:
+            source_options = get_source_options(arguments)
+            source_plan = Source(
+                source_path, catalog=arguments.catalog,
+                json_format=source_options["json_format"],
+                rule_ids=source_options["rule_ids"]
+            ).plan()
+            sys.stdout.write(source_plan.report() + "\n")
+            source_plan.check(arguments.max_rules, arguments.max_bytes)
+        except (PtolemyBaseError, ValidationError) as error:
+            logger.exception(error)
+            failures += 1
+            sys.stderr.write("{0}: {1}\n".format(
+                source_path, describe_error(error)
+            ))
+
+    if failures:
+        sys.exit("{0} of {1} source files exceed the limits or could not be "
+                 "planned.".format(failures, len(sources)))
+
+
+def parse_serve_arguments(args):
+    """
+    Parse the arguments supplied to ptolemy serve.
+
+    :returns: argparse.Namespace
+
+    """
+    parser = argparse.ArgumentParser(
+        prog="ptolemy serve",
+        description="Compile the YAML or JSON sources POSTed to /compile, "
+                    "responding with their mappings. GET /stats reports "
+                    "the requests served and their latency."
+    )
+
+    parser.add_argument(
+        "-d", "--debug", action="store_true",
+        default=False, help="enable debug logs"
+    )
+    parser.add_argument(
+        "--host", default="127.0.0.1",
+        help="the address to listen on (default: 127.0.0.1)"
+    )
+    parser.add_argument(
+        "-p", "--port", type=int, default=8080,
+        help="the port to listen on (default: 8080)"
+    )
+    parser.add_argument(
+        "--socket",
+        help="listen on this unix socket rather than on a port"
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, default=1,
+        help="number of worker processes to compile in (1 compiles in the "
+             "server process, 0 uses one per CPU)"
+    )
+    add_source_arguments(parser)
+
+    return parser.parse_args(args)
+
+
+def serve(args):
+    """
+    Run ptolemy serve, until it is interrupted.
+
+    :param args: The arguments following "serve".
+    :type args: list
+
+    """
+    arguments = parse_serve_arguments(args)
+    logger = setup_logger(arguments.debug)
+
+    # The HTTP server is only imported when serving.
+    from .server import start_server
+
+    address = (arguments.host, arguments.port)
+    if arguments.socket is not None:
+        address = arguments.socket
+    try:
+        server = start_server(
+            address, get_source_options(arguments), arguments.workers
+        )
+    except (PtolemyBaseError, EnvironmentError) as error:
+        logger.exception(error)
+        sys.exit(error)
+
+    sys.stderr.write("Listening on {0}\n".format(server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def parse_watch_arguments(args):
+    """
+    Parse the arguments supplied to ptolemy watch.
+
+    :returns: argparse.Namespace
+
+    """
+    parser = argparse.ArgumentParser(
+        prog="ptolemy watch",
+        description="Compile sources into the output directory, then "
+                    "recompile each source as it changes, until "
+                    "interrupted."
+    )
+
+    parser.add_argument(
+        "-d", "--debug", action="store_true",
+        default=False, help="enable debug logs"
+    )
+    parser.add_argument(
+        "-o", "--output-dir", required=True,
+        help="write each mapping to this directory, mirroring the source "
+             "paths"
+    )
+    parser.add_argument(
+        "--poll", action="store_true", default=False,
+        help="poll for changes rather than using inotify"
+    )
+    parser.add_argument(
+        "--interval", type=float, default=1.0,
+        help="the seconds between polls (default: 1)"
+    )
+    parser.add_argument(
+        "--debounce", type=float, default=0.1,
+        help="the seconds without changes which end a burst of changes, "
+             "before rebuilding (default: 0.1)"
+    )
+    add_source_arguments(parser)
+    parser.add_argument(
+        "sources", nargs="+", metavar="source",
+        help="path to a source file, a directory or glob of source files"
+    )
+
+    return parser.parse_args(args)
+
+
+def watch(args):
+    """
+    Run ptolemy watch, until it is interrupted.
+
+    :param args: The arguments following "watch".
+    :type args: list
+
+    """
+    arguments = parse_watch_arguments(args)
+    setup_logger(arguments.debug)
+
+    from .watch import Builder, get_watcher, wait_for_changes
+
+    builder = Builder(
+        arguments.sources, arguments.output_dir,
+        get_source_options(arguments)
+    )
+    watcher = get_watcher(
+        arguments.sources, arguments.poll, arguments.interval
+    )
+    try:
+        write_build(builder.build())
+        while True:
+            changes = wait_for_changes(watcher, arguments.debounce)
+            write_build(builder.build(changes))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+def write_build(build):
+    """
+    Report the sources a build compiled, the mappings it removed, and how
+    long it took, to stderr.
+
+    :param build: The build.
+    :type build: ptolemy.watch.Build
+
+    """
+    for output_path in build.removed:
+        sys.stderr.write(
+            "Removed '{0}', as its source was removed.\n".format(output_path)
+        )
+    if not build.results:
+        return
+    failures = 0
+    for result in build.results:
+        if result.error is not None:
+            failures += 1
+            sys.stderr.write("{0}: {1}\n".format(
+                result.source_path, result.error
+            ))
+    sys.stderr.write(
+        "Built in {0:.1f} ms: {1} compiled, {2} failed, {3} of {4} items "
+        "reused.\n".format(
+            build.seconds * 1e3, len(build.results), failures,
+            build.items_reused, build.items
+        )
+    )
+
+
+def parse_diff_arguments(args):
+    """
+    Parse the arguments supplied to ptolemy diff.
+
+    :returns: argparse.Namespace
+
+    """
+    parser = argparse.ArgumentParser(
+        prog="ptolemy diff",
+        description="Report the rules added, removed and changed between "
+                    "two mappings, matching rules by their rule-id."
+    )
+
+    parser.add_argument(
+        "-d", "--debug", action="store_true",
+        default=False, help="enable debug logs"
+    )
+    parser.add_argument(
+        "--format", choices=["text", "json"], default="text",
+        help="report each rule on a line, or the rule-ids of each kind of "
+             "change as JSON (default: text)"
+    )
+    parser.add_argument(
+        "--exit-code", action="store_true", default=False,
+        help="exit with 1 if the mappings differ"
+    )
+    parser.add_argument("old", help="path to the old mapping")
+    parser.add_argument("new", help="path to the new mapping")
+
+    return parser.parse_args(args)
+
+
+def diff(args):
+    """
+    Run ptolemy diff.
+
+    :param args: The arguments following "diff".
+    :type args: list
+
+    """
+    arguments = parse_diff_arguments(args)
+    logger = setup_logger(arguments.debug)
+
+    from .diff import diff_mappings, format_diff
+
+    try:
+        mapping_diff = diff_mappings(arguments.old, arguments.new)
+    except PtolemyBaseError as error:
+        logger.exception(error)
+        sys.exit(error)
+
+    sys.stdout.write(format_diff(mapping_diff, arguments.format) + "\n")
+    if arguments.exit_code and (
+            mapping_diff.added or mapping_diff.removed or mapping_diff.changed
+    ):
+        sys.exit(1)
+
+
+def parse_merge_arguments(args):
+    """
+    Parse the arguments supplied to ptolemy merge.
+
+    :returns: argparse.Namespace
+
+    """
+    parser = argparse.ArgumentParser(
+        prog="ptolemy merge",
+        description="Merge mappings into one, written to stdout. The rules "
+                    "of each mapping are read and written one at a time, "
+                    "renumbered across the merged mapping, and rules which "
+                    "are the same as a rule already written are left out."
+    )
+
+    parser.add_argument(
+        "-d", "--debug", action="store_true",
+        default=False, help="enable debug logs"
+    )
+    parser.add_argument(
+        "--minify", action="store_true", default=False,
+        help="write the mapping without whitespace, rather than indented"
+    )
+    parser.add_argument(
+        "--key-order", choices=KEY_ORDERS, default="sorted",
+        help="sort the keys of each rule, or write them in a fixed "
+             "canonical order (default: sorted)"
+    )
+    parser.add_argument(
+        "--encoder", choices=ENCODERS, default="auto",
+        help="the JSON encoder (default: auto)"
+    )
+    parser.add_argument(
+        "--rule-ids", choices=RULE_ID_SCHEMES, default="position",
+        help="number rules by their position in the merged mapping, or "
+             "derive each rule-id from the rule's content (default: "
+             "position)"
+    )
+    parser.add_argument(
+        "--stats", choices=["text", "json"],
+        help="report the time of each phase, the size of the output and "
+             "the peak memory to stderr, as a table or as JSON"
+    )
+    parser.add_argument(
+        "mappings", nargs="+", metavar="mapping",
+        help="path to a mapping, merged in the order given"
+    )
+
+    return parser.parse_args(args)
+
+
+def merge(args):
+    """
+    Run ptolemy merge.
+
+    :param args: The arguments following "merge".
+    :type args: list
+
+    """
+    arguments = parse_merge_arguments(args)
+    logger = setup_logger(arguments.debug)
+
+    from .merge import merge_mappings
+
+    stats = Stats() if arguments.stats is not None else None
+    try:
+        with (stats or NULL_STATS).trace_memory():
+            result = merge_mappings(
+                arguments.mappings, sys.stdout,
+                json_format=JSONFormat(
+                    arguments.minify, arguments.key_order, arguments.encoder
+                ),
+                rule_ids=arguments.rule_ids, stats=stats
+            )
+    except PtolemyBaseError as error:
+        logger.exception(error)
+        sys.exit(error)
+
+    sys.stdout.write("\n")
+    sys.stderr.write(
+        "Merged {0} rules from {1} mappings, leaving out {2} "
+        "duplicates.\n".format(
+            result.rules, result.mappings, result.duplicates
+        )
+    )
+    if stats is not None:
+        write_stats(stats, arguments.stats)
+
+
+def parse_explain_arguments(args):
+    """
+    Parse the arguments supplied to ptolemy explain.
+
+    :returns: argparse.Namespace
+
+    """
+    parser = argparse.ArgumentParser(
+        prog="ptolemy explain",
+        description="List the rules of a mapping which apply to each schema, "
+                    "table or column queried, in the order they are "
+                    "evaluated. The rules are indexed once, so any number "
+                    "of queries can be answered, one per line from stdin "
+                    "if none are given."
+    )
+
+    parser.add_argument(
+        "-d", "--debug", action="store_true",
+        default=False, help="enable debug logs"
+    )
+    parser.add_argument(
+        "--format", choices=["text", "json"], default="text",
+        help="report each rule on a line, or each query as a line of JSON "
+             "holding the rules which apply (default: text)"
+    )
+    add_rule_arguments(parser)
+    parser.add_argument(
+        "mapping",
+        help="path to a mapping, or to a source to compile to one"
+    )
+    parser.add_argument(
+        "queries", nargs="*", metavar="query",
+        help="SCHEMA, SCHEMA.TABLE or SCHEMA.TABLE.COLUMN. Names may be "
+             "given in any case"
+    )
+
+    return parser.parse_args(args)
+
+
+def explain(args):
+    """
+    Run ptolemy explain.
+
+    :param args: The arguments following "explain".
+    :type args: list
+
+    """
+    arguments = parse_explain_arguments(args)
+    logger = setup_logger(arguments.debug)
+
+    from jsonschema.exceptions import ValidationError
+
+    from .explain import (
+        format_explanation, load_rules, parse_query, RuleIndex
+    )
+
+    try:
+        index = RuleIndex(
+            load_rules(arguments.mapping, **get_rule_options(arguments))
+        )
+    except PtolemyBaseError as error:
+        logger.exception(error)
+        sys.exit(error)
+    except ValidationError as error:
+        logger.exception(error)
+        sys.exit(
+            "The source file could not be validated. {0}".format(error.message)
+        )
+
+    queries = arguments.queries or sys.stdin
+    invalid = False
+    for query in queries:
+        query = query.strip()
+        if not query:
+            continue
+        try:
+            names = parse_query(query)
+        except PtolemyBaseError as error:
+            sys.stderr.write("{0}\n".format(error))
+            invalid = True
+            continue
+        sys.stdout.write(format_explanation(
+            query, index.explain(names), arguments.format
+        ) + "\n")
+        # Each answer is written as soon as it is found, for tools querying
+        # through a pipe.
+        sys.stdout.flush()
+    if invalid:
+        sys.exit(1)
+
+
+# The commands which can be run as "ptolemy <command>", rather than compiling
+# the sources given.
+COMMANDS = {
+    "diff": diff,
+    "explain": explain,
+    "merge": merge,
+    "serve": serve,
+    "watch": watch
+}
 
 
 if __name__ == "__main__":
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+"""
+ptolemy.diff
+
+This module implements ``ptolemy diff``, which compares two mappings rule by
+rule. DMS identifies rules by their rule-id, so rules are matched by it: a
+rule whose ID is only in the new mapping was added, one whose ID is only in
+the old mapping was removed, and one whose content differs under the same ID
+was changed. The old rules are indexed by their rule-id, so the comparison
+takes time linear in the size of the mappings. Rules with the same rule-id
+are compared as parsed, so the order of their keys makes no difference, and
+nothing is encoded again.
+
+"""
+
+from collections import namedtuple
+import json
+
+from .ids import load_mapping
+from .rule import LOCATOR_KEYS
+
+
+MappingDiff = namedtuple(
+    "MappingDiff", ["added", "removed", "changed", "unchanged"]
+)
+MappingDiff.__doc__ = """
+MappingDiff holds the rules added to, removed from and changed between two
+mappings. added and changed hold the rules of the new mapping, in its order,
+and removed holds the rules of the old mapping, in its order. unchanged is
+the number of rules which are the same in both.
+
+"""
+
+
+def diff_rules(old_rules, new_rules):
+    """
+    Compare the rules of two mappings.
+
+    :param old_rules: The rules of the old mapping.
+    :type old_rules: list of dict
+    :param new_rules: The rules of the new mapping.
+    :type new_rules: list of dict
+    :returns: ptolemy.diff.MappingDiff
+
+    """
+    old_rules_by_id = {}
+    for rule in old_rules:
+        old_rules_by_id[rule["rule-id"]] = rule
+
+    added = []
+    changed = []
+    unchanged = 0
+    new_rule_ids = set()
+    for rule in new_rules:
+        rule_id = rule["rule-id"]
+        new_rule_ids.add(rule_id)
+        old_rule = old_rules_by_id.get(rule_id)
+        if old_rule is None:
+            added.append(rule)
+        elif old_rule != rule:
+            changed.append(rule)
+        else:
+            unchanged += 1
+    removed = [
+        rule for rule in old_rules if rule["rule-id"] not in new_rule_ids
+    ]
+    return MappingDiff(added, removed, changed, unchanged)
+
+
+def diff_mappings(old_mapping_path, new_mapping_path):
+    """
+    Compare two mapping files.
+
+    :param old_mapping_path: The path of the old mapping.
+    :type old_mapping_path: str
+    :param new_mapping_path: The path of the new mapping.
+    :type new_mapping_path: str
+    :returns: ptolemy.diff.MappingDiff
+    :raises: ptolemy.exceptions.InvalidFileError
+
+    """
+    return diff_rules(
+        load_mapping(old_mapping_path), load_mapping(new_mapping_path)
+    )
+
+
+def describe_rule(rule):
+    """
+    Return a one line description of a rule, such as
+    "12 selection include Test.Employee".
+
+    :param rule: The rule.
+    :type rule: dict
+    :returns: str
+
+    """
+    locator = rule["object-locator"]
+    return "{0} {1} {2} {3}".format(
+        rule["rule-id"], rule["rule-type"], rule["rule-action"], ".".join(
+            locator[key] for _, key in LOCATOR_KEYS if key in locator
+        )
+    )
+
+
+def format_diff(mapping_diff, diff_format="text"):
+    """
+    Return a report of a diff. The text report has a line for each rule
+    which was removed (-), changed (~) or added (+), and a summary. The JSON
+    report lists the rule-ids of each.
+
+    :param mapping_diff: The diff.
+    :type mapping_diff: ptolemy.diff.MappingDiff
+    :param diff_format: "text" or "json".
+    :type diff_format: str
+    :returns: str
+
+    """
+    if diff_format == "json":
+        return json.dumps({
+            "added": [rule["rule-id"] for rule in mapping_diff.added],
+            "removed": [rule["rule-id"] for rule in mapping_diff.removed],
+            "changed": [rule["rule-id"] for rule in mapping_diff.changed],
+            "unchanged": mapping_diff.unchanged
+        }, indent=4, sort_keys=True)
+
+    lines = []
+    for symbol, rules in [
+            ("-", mapping_diff.removed), ("~", mapping_diff.changed),
+            ("+", mapping_diff.added)
+    ]:
+        lines.extend(symbol + " " + describe_rule(rule) for rule in rules)
+    lines.append("{0} added, {1} removed, {2} changed, {3} unchanged.".format(
+        len(mapping_diff.added), len(mapping_diff.removed),
+        len(mapping_diff.changed), mapping_diff.unchanged
+    ))
+    return "\n".join(lines)
@@ -21,3 +21,24 @@ class InvalidFileError(PtolemyBaseError):
     The file supplied does not exist.
 
     """
+
+
+class MappingTooLargeError(PtolemyBaseError):
+    """
+    The mapping the source compiles to exceeds the configured limits.
+
+    """
+
+
+class InvalidQueryError(PtolemyBaseError):
+    """
+    The query does not name a schema, table or column.
+
+    """
+
+
+class ShardingError(PtolemyBaseError):
+    """
+    The rules cannot be split into shards.
+
+    """
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+
+"""
+ptolemy.explain
+
+This module implements ``ptolemy explain``, which finds the rules of a
+mapping which apply to a schema, table or column, such as
+``Test.Employee.id``.
+
+A rule applies to an object if each name in its object locator matches the
+object's name at the same level, down to whichever is less specific, so the
+rules for a table include its schema's rules and its columns' rules. Names
+are compared without regard to case, and only the % wildcard is considered,
+as in ptolemy.transformation. Matching rules are returned in the order of
+the mapping, which is the order they are evaluated in.
+
+The rules are indexed once, so that each query takes time proportional to
+the length of its names and the number of rules which match it, rather than
+to the number of rules. Locators without wildcards are kept in hash
+buckets by their names. Locators with wildcards are kept in a trie, by the
+names they start with up to their first wildcard, and only the patterns
+found along the query's path through the trie are matched against it.
+
+"""
+
+import json
+
+from .diff import describe_rule
+from .exceptions import InvalidQueryError
+from .ids import get_mapping_rules
+from .loader import load_source
+from .patterns import compile_pattern, is_pattern, WILDCARD
+from .rule import LOCATOR_KEYS
+from .source import Source
+
+
+# Separates the names of each level within the keys of the trie. Names do
+# not contain it.
+_LEVEL_SEPARATOR = u"\x00"
+
+# The key of the positions held at a node of the trie, which can never be a
+# character of a name.
+_POSITIONS = u""
+
+
+class RuleIndex(object):
+    """
+    RuleIndex indexes the rules of a mapping by their object locators, to
+    find the rules which apply to any number of objects.
+
+    :param rules: The rules, in the order of the mapping.
+    :type rules: list of dict
+
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+        # The positions of the rules without wildcards, by their names, and
+        # by the names of each level above their own.
+        self._exact = {}
+        self._exact_below = {}
+        # The positions of the rules with wildcards, and their names.
+        self._trie = {}
+        self._levels = {}
+        self._patterns = {}
+        for position, rule in enumerate(rules):
+            self._add(position, _get_levels(rule))
+
+    def explain(self, names):
+        """
+        Return the rules which apply to an object, in the order of the
+        mapping.
+
+        :param names: The object's schema name, and its table and column
+            names, if any.
+        :type names: tuple of str
+        :returns: list of dict
+
+        """
+        names = tuple(name.lower() for name in names)
+        positions = []
+        for depth in range(1, len(names) + 1):
+            positions.extend(self._exact.get(names[:depth], ()))
+        positions.extend(self._exact_below.get(names, ()))
+        positions.extend(
+            position for position in self._find_candidates(names)
+            if self._matches(self._levels[position], names)
+        )
+        return [self.rules[position] for position in sorted(positions)]
+
+    def _add(self, position, levels):
+        """
+        Index a rule.
+
+        :param position: The rule's position in the mapping.
+        :type position: int
+        :param levels: The rule's names, from _get_levels().
+        :type levels: tuple of str
+
+        """
+        if not levels:
+            return
+        if not any(is_pattern(name) for name in levels):
+            self._exact.setdefault(levels, []).append(position)
+            for depth in range(1, len(levels)):
+                self._exact_below.setdefault(levels[:depth], []).append(
+                    position
+                )
+            return
+
+        self._levels[position] = levels
+        prefix = _LEVEL_SEPARATOR.join(levels).split(WILDCARD, 1)[0]
+        node = self._trie
+        for character in prefix:
+            node = node.setdefault(character, {})
+        node.setdefault(_POSITIONS, []).append(position)
+
+    def _find_candidates(self, names):
+        """
+        Yield the positions of the rules with wildcards whose names start
+        the way the object's do, up to their first wildcard.
+
+        :param names: The object's names, in lowercase.
+        :type names: tuple of str
+        :returns: iterator of int
+
+        """
+        node = self._trie
+        for character in _LEVEL_SEPARATOR.join(names):
+            for position in node.get(_POSITIONS, ()):
+                yield position
+            node = node.get(character)
+            if node is None:
+                return
+        for position in node.get(_POSITIONS, ()):
+            yield position
+        # The rules for the objects within the object, which name it
+        # exactly.
+        node = node.get(_LEVEL_SEPARATOR)
+        if node is not None:
+            for position in _iter_trie(node):
+                yield position
+
+    def _matches(self, levels, names):
+        """
+        Return whether each of a rule's names matches the object's name at
+        the same level.
+
+        :param levels: The rule's names, from _get_levels().
+        :type levels: tuple of str
+        :param names: The object's names, in lowercase.
+        :type names: tuple of str
+        :returns: bool
+
+        """
+        for level, name in zip(levels, names):
+            if not is_pattern(level):
+                if level != name:
+                    return False
+                continue
+            pattern = self._patterns.get(level)
+            if pattern is None:
+                pattern = self._patterns[level] = compile_pattern(level)
+            if not pattern.match(name):
+                return False
+        return True
+
+
+def _get_levels(rule):
+    """
+    Return the names in a rule's object locator, from its schema name down,
+    in lowercase.
+
+    :param rule: The rule.
+    :type rule: dict
+    :returns: tuple of str
+
+    """
+    locator = rule["object-locator"]
+    levels = []
+    for _, key in LOCATOR_KEYS:
+        if key not in locator:
+            break
+        levels.append(locator[key].lower())
+    return tuple(levels)
+
+
+def _iter_trie(node):
+    """
+    Yield every position held in a trie.
+
+    :param node: The root of the trie.
+    :type node: dict
+    :returns: iterator of int
+
+    """
+    nodes = [node]
+    while nodes:
+        node = nodes.pop()
+        for key, child in node.items():
+            if key == _POSITIONS:
+                for position in child:
+                    yield position
+            else:
+                nodes.append(child)
+
+
+def parse_query(query):
+    """
+    Return the names of the object a query names, such as
+    "Test.Employee.id".
+
+    :param query: The query.
+    :type query: str
+    :returns: tuple of str
+    :raises: ptolemy.exceptions.InvalidQueryError
+
+    """
+    names = tuple(query.strip().split("."))
+    if len(names) > len(LOCATOR_KEYS) or not all(names):
+        raise InvalidQueryError(
+            "The query '{0}' must be SCHEMA, SCHEMA.TABLE or "
+            "SCHEMA.TABLE.COLUMN.".format(query.strip())
+        )
+    return names
+
+
+def load_rules(path, **options):
+    """
+    Return the rules of a mapping, or of the mapping a source compiles to.
+    A file with a "rules" key is read as a mapping, as no source has one,
+    and any other as a source.
+
+    :param path: The path of the mapping or source.
+    :type path: str
+    :param options: Keyword arguments to create the Source with, such as
+        optimisations.
+    :returns: list of dict
+    :raises: jsonschema.exceptions.ValidationError
+    :raises: ptolemy.exceptions.PtolemyBaseError
+    :raises: yaml.YAMLError
+
+    """
+    source = Source(path, **options)
+    parsed = load_source(source.read(), path)
+    if isinstance(parsed, dict) and "rules" in parsed:
+        return get_mapping_rules(parsed, path)
+    return json.loads(source.compile_string(parsed))["rules"]
+
+
+def format_explanation(query, rules, explain_format="text"):
+    """
+    Return a report of the rules which apply to the object a query names.
+    The text report is the query, followed by a line for each rule. The
+    JSON report is a single line, so a report can be written for each of
+    many queries.
+
+    :param query: The query.
+    :type query: str
+    :param rules: The rules which apply, from RuleIndex.explain().
+    :type rules: list of dict
+    :param explain_format: "text" or "json".
+    :type explain_format: str
+    :returns: str
+
+    """
+    if explain_format == "json":
+        return json.dumps({"query": query, "rules": rules}, sort_keys=True)
+    lines = [query]
+    lines.extend("  " + describe_rule(rule) for rule in rules)
+    if not rules:
+        lines.append("  no rules apply")
+    return "\n".join(lines)
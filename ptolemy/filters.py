@@ -0,0 +1,408 @@
+# -*- coding: utf-8 -*-
+
+"""
+ptolemy.filters
+
+This module implements simplifying the filters of selection rules, which
+DMS evaluates against every row of the tables they select.
+
+The conditions of a filter are combined with OR, and the filters on the
+same column with AND. Every operator is inclusive, and a null never
+matches. The rewrites which hold however the column's values are ordered
+are always made: repeated conditions are removed, ``between`` a value and
+itself becomes ``eq``, ``eq`` a value is removed alongside ``gte`` or
+``ste`` the same value, and a filter is removed if another filter on the
+same column already implies it.
+
+Whether one value is less than another depends on the column: the strings
+"10" and "9" are ordered one way as numbers and the other as text, and
+text is ordered by the column's collation. The filters on a column are only
+merged into ranges if every value in them has the same shape, from
+ORDERED_SHAPES: fixed width numbers, or ISO 8601 dates and times. Values of
+the same shape are ordered the same way as numbers or dates and as text, in
+any collation, as their characters are compared position by position.
+Then, the conditions of each filter become a union of ranges, the filters
+on a column are intersected, and the ranges which remain are written as the
+fewest conditions. A column's filters are only rewritten if that leaves
+fewer filters or conditions.
+
+Filters which can never match are left as they are, and the rules they
+belong to are recorded as kept, but flagged.
+
+"""
+
+from collections import OrderedDict
+import re
+
+from .optimise import record_flag
+from .rule import Rule
+
+
+# Patterns of the values whose order does not depend on the column's type
+# or collation, as long as every value compared has the same shape.
+ORDERED_SHAPES = [
+    re.compile(r"\A[0-9]+(\.[0-9]+)?\Z"),
+    re.compile(
+        r"\A[0-9]{4}-[0-9]{2}-[0-9]{2}"
+        r"([ T][0-9]{2}:[0-9]{2}(:[0-9]{2}(\.[0-9]+)?)?)?\Z"
+    ),
+    re.compile(r"\A[0-9]{2}:[0-9]{2}(:[0-9]{2}(\.[0-9]+)?)?\Z")
+]
+
+# The values each filter operator takes.
+OPERATOR_VALUES = {
+    "eq": ("value",),
+    "gte": ("value",),
+    "ste": ("value",),
+    "between": ("start-value", "end-value")
+}
+
+
+def optimise_filters(get_rules, removals):
+    """
+    Yield the rules returned by get_rules, with the filters of each
+    selection rule simplified.
+
+    The rules expanded from an item share its filters, so the filters are
+    simplified once for each item, and the rules expanded from it share the
+    result.
+
+    :param get_rules: A function returning a fresh iterator of rules, which
+        records removals in the list it is given, if any.
+    :type get_rules: function
+    :param removals: A list to record removed rules in, if any.
+    :type removals: list
+    :returns: iterator of ptolemy.rule.Rule
+
+    """
+    data = optimised_data = None
+    never_matching = []
+    for rule in get_rules(removals):
+        if rule.rule_type != "selection" or not rule.data.get("filters"):
+            yield rule
+            continue
+
+        if rule.data is not data:
+            data = optimised_data = rule.data
+            filters, never_matching = simplify_filters(data["filters"])
+            if filters is not data["filters"]:
+                optimised_data = dict(data, filters=filters)
+        for column_name in never_matching:
+            record_flag(
+                removals, rule,
+                "its filters on {0} can never match".format(column_name)
+            )
+        if optimised_data is not rule.data:
+            rule = Rule(
+                rule.rule_type, rule.rule_action, rule.location_keys,
+                rule.names, optimised_data
+            )
+        yield rule
+
+
+def simplify_filters(filters):
+    """
+    Return the simplest filters equivalent to filters, and the names of the
+    columns whose filters can never match. filters itself is returned if it
+    cannot be simplified.
+
+    :param filters: The filters of a selection rule.
+    :type filters: list of dict
+    :returns: tuple of (list of dict, list of str)
+
+    """
+    columns = OrderedDict()
+    for filter_ in filters:
+        if not _is_simple_filter(filter_):
+            # Filters ptolemy does not understand are left to DMS.
+            return filters, []
+        columns.setdefault(filter_["column-name"], []).append(
+            filter_["filter-conditions"]
+        )
+
+    simplified = []
+    never_matching = []
+    changed = False
+    for column_name, column_filters in columns.items():
+        conditions = _simplify_column(column_filters)
+        if conditions is None:
+            never_matching.append(column_name)
+            conditions = column_filters
+        elif _count(conditions) < _count(column_filters):
+            changed = True
+        else:
+            conditions = column_filters
+        simplified.extend(
+            OrderedDict([
+                ("filter-type", "source"),
+                ("column-name", column_name),
+                ("filter-conditions", filter_conditions)
+            ])
+            for filter_conditions in conditions
+        )
+    if not changed:
+        return filters, never_matching
+    return simplified, never_matching
+
+
+def _is_simple_filter(filter_):
+    """
+    Return whether filter_ is a source filter whose conditions each have
+    exactly the values their operator takes.
+
+    :param filter_: The filter.
+    :type filter_: dict
+    :returns: bool
+
+    """
+    if filter_.get("filter-type") != "source" or \
+            "column-name" not in filter_:
+        return False
+    for condition in filter_.get("filter-conditions") or [None]:
+        if not isinstance(condition, dict):
+            return False
+        names = OPERATOR_VALUES.get(condition.get("filter-operator"))
+        if names is None or len(condition) != len(names) + 1:
+            return False
+        if any(name not in condition for name in names):
+            return False
+    return True
+
+
+def _count(column_filters):
+    """
+    Return the number of filters and conditions on a column.
+
+    :param column_filters: The conditions of each filter on the column.
+    :type column_filters: list of list of dict
+    :returns: int
+
+    """
+    return len(column_filters) + sum(
+        len(conditions) for conditions in column_filters
+    )
+
+
+def _simplify_column(column_filters):
+    """
+    Return the conditions of each filter equivalent to the filters on a
+    column, or None if they can never match.
+
+    :param column_filters: The conditions of each filter on the column.
+    :type column_filters: list of list of dict
+    :returns: list of list of dict
+
+    """
+    values = [
+        condition[name]
+        for conditions in column_filters
+        for condition in conditions
+        for name in OPERATOR_VALUES[condition["filter-operator"]]
+    ]
+    if _is_ordered(values):
+        ranges = None
+        for conditions in column_filters:
+            filter_ranges = _union([
+                _get_range(condition) for condition in conditions
+            ])
+            ranges = filter_ranges if ranges is None else \
+                _intersect(ranges, filter_ranges)
+        if not ranges:
+            return None
+        return [_get_conditions(ranges, min(values))]
+
+    # Otherwise, only the rewrites which hold however the values are
+    # ordered are made.
+    simplified = []
+    for conditions in column_filters:
+        keys = _simplify_conditions(conditions)
+        if any(set(other) <= set(keys) for other in simplified):
+            # A filter whose conditions include all of another's is implied
+            # by it.
+            continue
+        simplified = [
+            other for other in simplified if not set(keys) <= set(other)
+        ]
+        simplified.append(keys)
+    return [[_get_condition(key) for key in keys] for keys in simplified]
+
+
+def _is_ordered(values):
+    """
+    Return whether the values have one of ORDERED_SHAPES, and the same
+    shape, so that they are ordered the same way whatever the column's type
+    and collation.
+
+    :param values: The values.
+    :type values: list of str
+    :returns: bool
+
+    """
+    shapes = set(re.sub("[0-9]", "0", value) for value in values)
+    if len(shapes) != 1:
+        return False
+    shape = shapes.pop()
+    return any(pattern.match(shape) for pattern in ORDERED_SHAPES)
+
+
+def _simplify_conditions(conditions):
+    """
+    Return the conditions of a filter, in order, as (operator, values),
+    without the conditions which are redundant however the values are
+    ordered.
+
+    :param conditions: The conditions.
+    :type conditions: list of dict
+    :returns: list of tuple
+
+    """
+    keys = []
+    for condition in conditions:
+        operator = condition["filter-operator"]
+        values = tuple(
+            condition[name] for name in OPERATOR_VALUES[operator]
+        )
+        if operator == "between" and values[0] == values[1]:
+            operator, values = "eq", values[:1]
+        if (operator, values) not in keys:
+            keys.append((operator, values))
+    return [
+        key for key in keys
+        if key[0] != "eq" or not (
+            ("gte", key[1]) in keys or ("ste", key[1]) in keys
+        )
+    ]
+
+
+def _get_condition(key):
+    """
+    Return the condition for (operator, values).
+
+    :param key: The operator and its values.
+    :type key: tuple
+    :returns: dict
+
+    """
+    operator, values = key
+    condition = OrderedDict([("filter-operator", operator)])
+    condition.update(zip(OPERATOR_VALUES[operator], values))
+    return condition
+
+
+def _get_range(condition):
+    """
+    Return the range of values a condition matches, as (start, end), where
+    None is unbounded.
+
+    :param condition: The condition.
+    :type condition: dict
+    :returns: tuple
+
+    """
+    operator = condition["filter-operator"]
+    if operator == "eq":
+        return condition["value"], condition["value"]
+    if operator == "gte":
+        return condition["value"], None
+    if operator == "ste":
+        return None, condition["value"]
+    return condition["start-value"], condition["end-value"]
+
+
+def _union(ranges):
+    """
+    Return the ranges which match the values any of ranges match, in order,
+    without ranges which are empty or overlap. Ranges are only joined if
+    they share a value, as other values may lie between the ends of ranges
+    which are next to each other.
+
+    :param ranges: The ranges.
+    :type ranges: list of tuple
+    :returns: list of tuple
+
+    """
+    ranges = sorted(
+        (
+            (start, end) for start, end in ranges
+            if start is None or end is None or start <= end
+        ),
+        key=lambda range_: (range_[0] is not None, range_[0] or "")
+    )
+    union = []
+    for start, end in ranges:
+        if union:
+            last_start, last_end = union[-1]
+            if last_end is None or start is None or start <= last_end:
+                if last_end is not None and (end is None or end > last_end):
+                    union[-1] = last_start, end
+                continue
+        union.append((start, end))
+    return union
+
+
+def _intersect(ranges, other_ranges):
+    """
+    Return the ranges which match the values both ranges and other_ranges
+    match.
+
+    :param ranges: Ranges, from _union().
+    :type ranges: list of tuple
+    :param other_ranges: Other ranges, from _union().
+    :type other_ranges: list of tuple
+    :returns: list of tuple
+
+    """
+    intersection = []
+    for start, end in ranges:
+        for other_start, other_end in other_ranges:
+            intersection.append((
+                _bound(max, start, other_start),
+                _bound(min, end, other_end)
+            ))
+    return _union(intersection)
+
+
+def _bound(choose, value, other_value):
+    """
+    Return the tighter of two bounds, either of which may be None.
+
+    :param choose: max for the start of a range, min for its end.
+    :type choose: function
+    :returns: str
+
+    """
+    if value is None:
+        return other_value
+    if other_value is None:
+        return value
+    return choose(value, other_value)
+
+
+def _get_conditions(ranges, any_value):
+    """
+    Return the conditions which match the values ranges match.
+
+    :param ranges: Ranges, from _union().
+    :type ranges: list of tuple
+    :param any_value: Any of the values, to write the unbounded range as
+        ``ste`` and ``gte`` it.
+    :type any_value: str
+    :returns: list of dict
+
+    """
+    conditions = []
+    for start, end in ranges:
+        if start is None and end is None:
+            conditions.extend([
+                _get_condition(("ste", (any_value,))),
+                _get_condition(("gte", (any_value,)))
+            ])
+        elif start is None:
+            conditions.append(_get_condition(("ste", (end,))))
+        elif end is None:
+            conditions.append(_get_condition(("gte", (start,))))
+        elif start == end:
+            conditions.append(_get_condition(("eq", (start,))))
+        else:
+            conditions.append(_get_condition(("between", (start, end))))
+    return conditions
@@ -0,0 +1,395 @@
+# -*- coding: utf-8 -*-
+
+"""
+ptolemy.ids
+
+This module implements assigning rule IDs.
+
+By default rules are numbered by their position in the mapping, so adding a
+rule renumbers every rule after it, and DMS sees each of them as changed.
+Content IDs are derived from a digest of the rule itself, so a rule keeps its
+ID however the rules around it change. IDs can also be carried over from a
+previous mapping, so that the rules it shares with the new mapping keep their
+IDs, and only new rules are given new ones.
+
+"""
+
+import bisect
+import hashlib
+import json
+
+from .exceptions import InvalidFileError
+from .rule import Rule
+from .stream import END, JSONReader
+
+
+RULE_ID_SCHEMES = ("position", "content")
+
+# Content IDs are nine digit numbers, so that every ID is the same length,
+# and fits in a 32 bit integer. There are 900 million of them, so a mapping
+# of 35,000 rules has even odds of two rules' digests giving the same ID,
+# and a mapping of a million rules has around 550 such pairs. See
+# RuleIds.prepare() for how they are told apart.
+CONTENT_ID_FIRST = 100000000
+CONTENT_ID_COUNT = 900000000
+CONTENT_ID_LENGTH = 9
+
+# The bits of a content key which tell apart the digests giving the same ID.
+_TIE_BITS = 32
+
+# The keys of a rule which are not part of its data.
+_RULE_KEYS = ("rule-type", "rule-action", "object-locator", "rule-id")
+
+
+# json.dumps() creates an encoder for each call given options, so one is
+# shared.
+_encode = json.JSONEncoder(sort_keys=True, separators=(",", ":")).encode
+
+
+def _get_digest(rule_type, rule_action, object_locator, data_json):
+    """
+    Return the digest of a rule's content.
+
+    :param rule_type: The rule type.
+    :type rule_type: str
+    :param rule_action: The rule action.
+    :type rule_action: str
+    :param object_locator: The object locator.
+    :type object_locator: dict
+    :param data_json: The rest of the rule, as compact JSON with sorted
+        keys.
+    :type data_json: str
+    :returns: str, in hex
+
+    """
+    content = _encode([rule_type, rule_action, object_locator]) + "\n" + \
+        data_json
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+def _get_content_key(digest):
+    """
+    Return the key of a rule's content ID: the number of the ID its digest
+    gives, followed by more of the digest, to tell apart the rules whose
+    digests give the same ID.
+
+    :param digest: The digest of the rule, in hex.
+    :type digest: str
+    :returns: int
+
+    """
+    number = int(digest[:15], 16) % CONTENT_ID_COUNT
+    return number << _TIE_BITS | int(digest[15:15 + _TIE_BITS // 4], 16)
+
+
+def get_rule_digest(rule):
+    """
+    Return the digest of a rule's content, which is the same for rules which
+    differ only in their rule-id. Rule names which are the same as the
+    rule-id were given by numbering the rule, and are left out too, so a
+    rule read back from a mapping has the same digest as the rule it was
+    compiled from.
+
+    :param rule: The rule, as expanded or as read from a mapping.
+    :type rule: ptolemy.rule.Rule or dict
+    :returns: str, in hex
+
+    """
+    if isinstance(rule, Rule):
+        return _get_digest(
+            rule.rule_type, rule.rule_action, rule.object_locator,
+            _encode(rule.data)
+        )
+    rule_id = rule.get("rule-id")
+    data = {
+        key: value for key, value in rule.items()
+        if key not in _RULE_KEYS and not (
+            key == "rule-name" and value == rule_id
+        )
+    }
+    return _get_digest(
+        rule["rule-type"], rule["rule-action"], rule["object-locator"],
+        _encode(data)
+    )
+
+
+def load_mapping(mapping_file_path):
+    """
+    Return the rules of a mapping file, checking each has the keys needed
+    to identify it.
+
+    :param mapping_file_path: The path to the mapping.
+    :type mapping_file_path: str
+    :returns: list of dict
+    :raises: ptolemy.exceptions.InvalidFileError
+
+    """
+    try:
+        with open(mapping_file_path, "rb") as mapping_file:
+            mapping = json.loads(mapping_file.read().decode("utf-8"))
+    except EnvironmentError:
+        raise InvalidFileError(
+            "The mapping '{0}' does not exist.".format(mapping_file_path)
+        )
+    except ValueError as error:
+        raise InvalidFileError(
+            "The mapping '{0}' is not valid JSON. {1}".format(
+                mapping_file_path, error
+            )
+        )
+
+    return get_mapping_rules(mapping, mapping_file_path)
+
+
+def get_mapping_rules(mapping, mapping_file_path):
+    """
+    Return the rules of a parsed mapping, checking each has the keys needed
+    to identify it.
+
+    :param mapping: The parsed mapping.
+    :type mapping: dict
+    :param mapping_file_path: The path the mapping was read from, to
+        report.
+    :type mapping_file_path: str
+    :returns: list of dict
+    :raises: ptolemy.exceptions.InvalidFileError
+
+    """
+    rules = mapping.get("rules") if isinstance(mapping, dict) else None
+    if not isinstance(rules, list) or not all(
+            _is_mapping_rule(rule) for rule in rules
+    ):
+        raise _invalid_mapping_error(mapping_file_path)
+    for rule in rules:
+        rule["rule-id"] = str(rule["rule-id"])
+    return rules
+
+
+def iter_mapping(mapping_file_path):
+    """
+    Yield the rules of a mapping file, as load_mapping() returns them, but
+    reading the mapping a chunk at a time, so that only one rule is held in
+    memory at once. An invalid rule is only found once every rule before it
+    has been yielded.
+
+    :param mapping_file_path: The path to the mapping.
+    :type mapping_file_path: str
+    :returns: iterator of dict
+    :raises: ptolemy.exceptions.InvalidFileError
+
+    """
+    try:
+        mapping_file = open(mapping_file_path, "rb")
+    except EnvironmentError:
+        raise InvalidFileError(
+            "The mapping '{0}' does not exist.".format(mapping_file_path)
+        )
+    with mapping_file:
+        reader = JSONReader(mapping_file, mapping_file_path, "mapping")
+        if not reader.start_mapping():
+            raise _invalid_mapping_error(mapping_file_path)
+        found_rules = False
+        key = reader.next_key()
+        while key is not END:
+            if key != "rules":
+                # Any other keys are read over, as load_mapping() ignores
+                # them.
+                reader.load_value()
+            elif not reader.start_sequence():
+                raise _invalid_mapping_error(mapping_file_path)
+            else:
+                found_rules = True
+                while reader.next_item():
+                    rule = reader.load_value()
+                    if not _is_mapping_rule(rule):
+                        raise _invalid_mapping_error(mapping_file_path)
+                    rule["rule-id"] = str(rule["rule-id"])
+                    yield rule
+            key = reader.next_key()
+        reader.finish()
+    if not found_rules:
+        raise _invalid_mapping_error(mapping_file_path)
+
+
+def _is_mapping_rule(rule):
+    """
+    Return whether a rule read from a mapping has the keys needed to
+    identify it.
+
+    :param rule: The rule.
+    :returns: bool
+
+    """
+    return isinstance(rule, dict) and all(key in rule for key in _RULE_KEYS)
+
+
+def _invalid_mapping_error(mapping_file_path):
+    """
+    Return the error for a mapping which is valid JSON, but not a mapping.
+
+    :param mapping_file_path: The path to the mapping.
+    :type mapping_file_path: str
+    :returns: ptolemy.exceptions.InvalidFileError
+
+    """
+    return InvalidFileError(
+        "The mapping '{0}' must be an object with a list of rules, each "
+        "with a {1}.".format(mapping_file_path, ", ".join(_RULE_KEYS))
+    )
+
+
+def load_rule_ids(mapping_file_path):
+    """
+    Return the rule-ids of the rules in a previous mapping, by the digest of
+    each rule, to carry them over with RuleIds.
+
+    :param mapping_file_path: The path to the mapping.
+    :type mapping_file_path: str
+    :returns: dict
+    :raises: ptolemy.exceptions.InvalidFileError
+
+    """
+    rule_ids = {}
+    for rule in load_mapping(mapping_file_path):
+        rule_ids.setdefault(get_rule_digest(rule), rule["rule-id"])
+    return rule_ids
+
+
+class RuleIds(object):
+    """
+    RuleIds assigns an ID to each rule of a mapping, in turn. Each mapping
+    needs its own RuleIds, as every ID given is remembered, so no two rules
+    are given the same one.
+
+    With the "position" scheme, rules are numbered from 1, or from one more
+    than the highest numeric ID in the previous mapping. With the "content"
+    scheme, a rule's ID is derived from its digest. Rules whose digests give
+    the same ID are told apart by prepare(), or without it, the next free
+    ID is given.
+
+    :param scheme: The scheme, from RULE_ID_SCHEMES.
+    :type scheme: str
+    :param previous: The IDs of a previous mapping, from load_rule_ids().
+        Rules which are in the previous mapping keep their IDs, and their
+        IDs are not given to any other rule.
+    :type previous: dict
+
+    """
+
+    def __init__(self, scheme="position", previous=None):
+        self.scheme = scheme
+        self.previous = dict(previous or {})
+        self._used = set(self.previous.values())
+        self._next = 1 + max([0] + [
+            int(rule_id) for rule_id in self._used if rule_id.isdigit()
+        ])
+        # The content IDs worked out by prepare(), by content key.
+        self._displaced = {}
+        # The JSON of the data of the last rule, which is shared by the
+        # rules expanded from the same item.
+        self._data = self._data_json = None
+
+    def prepare(self, rules):
+        """
+        Work out the content IDs of the rules whose digests give the same
+        ID, so that the IDs they are given depend only on the rules, and
+        not on their order. The rule with the lowest digest keeps the ID,
+        and the others are given, in order of their digests, the next IDs
+        which neither a rule's digest nor the previous mapping gives.
+
+        Adding or removing a rule can still change the ID of a rule whose
+        digest gives the same ID, but no other rule's. Only the digest of
+        each rule is kept, so every rule of a mapping can be prepared
+        without holding them all. Rules are only read with the "content"
+        scheme.
+
+        :param rules: The rules which will be assigned IDs, in any order.
+        :type rules: iterable of ptolemy.rule.Rule or dict
+
+        """
+        if self.scheme != "content":
+            return
+        previous = dict(self.previous)
+        keys = []
+        for rule in rules:
+            digest = self._get_digest(rule)
+            if previous.get(digest) is not None:
+                previous[digest] = None
+                continue
+            keys.append(_get_content_key(digest))
+        keys.sort()
+
+        def is_taken(number):
+            position = bisect.bisect_left(keys, number << _TIE_BITS)
+            return str(CONTENT_ID_FIRST + number) in self._used or (
+                position < len(keys) and
+                keys[position] >> _TIE_BITS == number
+            )
+
+        given = set()
+        for i, key in enumerate(keys):
+            number = key >> _TIE_BITS
+            if (i == 0 or keys[i - 1] >> _TIE_BITS != number) and \
+                    str(CONTENT_ID_FIRST + number) not in self._used:
+                continue
+            while number in given or is_taken(number):
+                number = (number + 1) % CONTENT_ID_COUNT
+            given.add(number)
+            self._displaced.setdefault(key, []).append(
+                str(CONTENT_ID_FIRST + number)
+            )
+
+    def assign(self, rule):
+        """
+        Return the ID for the next rule in the mapping.
+
+        :param rule: The rule.
+        :type rule: ptolemy.rule.Rule or dict
+        :returns: str
+
+        """
+        digest = None
+        if self.previous or self.scheme == "content":
+            digest = self._get_digest(rule)
+            rule_id = self.previous.get(digest)
+            if rule_id is not None:
+                # A rule which appears twice only keeps its ID once.
+                self.previous[digest] = None
+                return rule_id
+
+        if self.scheme == "content":
+            key = _get_content_key(digest)
+            if self._displaced.get(key):
+                rule_id = self._displaced[key].pop()
+            else:
+                number = key >> _TIE_BITS
+                rule_id = str(CONTENT_ID_FIRST + number)
+                while rule_id in self._used:
+                    number = (number + 1) % CONTENT_ID_COUNT
+                    rule_id = str(CONTENT_ID_FIRST + number)
+            self._used.add(rule_id)
+            return rule_id
+
+        rule_id = str(self._next)
+        self._next += 1
+        return rule_id
+
+    def _get_digest(self, rule):
+        """
+        Return the digest of a rule, as get_rule_digest() does, encoding the
+        data shared by the rules expanded from an item once.
+
+        :param rule: The rule.
+        :type rule: ptolemy.rule.Rule or dict
+        :returns: str
+
+        """
+        if not isinstance(rule, Rule):
+            return get_rule_digest(rule)
+        if rule.data is not self._data:
+            self._data = rule.data
+            self._data_json = _encode(rule.data)
+        return _get_digest(
+            rule.rule_type, rule.rule_action, rule.object_locator,
+            self._data_json
+        )
@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+
+"""
+ptolemy.include
+
+This module implements source fragments, which let sources share long lists
+of names, whole items and blocks of items, rather than repeating them.
+
+Anywhere in a source, an object whose only key is "$ref" is replaced by the
+fragment it refers to: a YAML or JSON file, relative to the file which
+refers to it, optionally followed by a JSON pointer to part of the file,
+such as "common.yaml#/tables/payroll". A reference within a list to a
+fragment which is itself a list is spliced into the list. Fragments may
+refer to other fragments, but not, directly or through others, to
+themselves.
+
+Each fragment is parsed, and its own references resolved, once per process,
+and shared by every source which refers to it until the file changes.
+Fragments are shared as they are, so they must not be modified.
+
+"""
+
+from collections import namedtuple, OrderedDict
+import os
+import re
+
+from .exceptions import InvalidFileError
+from .loader import load_source
+
+
+REF_KEY = "$ref"
+
+# The number of bytes of a source read at a time to look for references.
+READ_SIZE = 1024 * 1024
+
+Fragment = namedtuple("Fragment", ["file_key", "value", "includes"])
+
+# The tokens of a JSON pointer which refer to an item of a list, as
+# RFC 6901 defines them.
+_ARRAY_INDEX = re.compile(r"(0|[1-9][0-9]*)\Z")
+
+_fragments = {}
+
+
+def has_references(source_string):
+    """
+    Return whether a source may refer to fragments, without parsing it.
+
+    :param source_string: The YAML or JSON source.
+    :type source_string: str or bytes
+    :returns: bool
+
+    """
+    if isinstance(source_string, bytes):
+        return REF_KEY.encode("ascii") in source_string
+    return REF_KEY in source_string
+
+
+def file_has_references(source_file):
+    """
+    Return whether a source file may refer to fragments, reading it a chunk
+    at a time rather than whole. The file is left where it was.
+
+    :param source_file: The source file, opened in binary mode.
+    :type source_file: file
+    :returns: bool
+
+    """
+    ref_key = REF_KEY.encode("ascii")
+    start = source_file.tell()
+    # The end of the last chunk, which may hold the start of a reference.
+    tail = b""
+    try:
+        while True:
+            chunk = source_file.read(READ_SIZE)
+            if not chunk:
+                return False
+            if ref_key in tail + chunk[:len(ref_key) - 1] or \
+                    ref_key in chunk:
+                return True
+            tail = chunk[-(len(ref_key) - 1):]
+    finally:
+        source_file.seek(start)
+
+
+def resolve_references(source, source_file_path=None, allowed=True):
+    """
+    Return source with each reference replaced by the fragment it refers
+    to, and the paths of the fragments it includes, directly or through
+    other fragments.
+
+    :param source: The parsed source.
+    :type source: dict
+    :param source_file_path: The absolute path of the source, which
+        references are relative to. Sources without one refer to fragments
+        relative to the current directory.
+    :type source_file_path: str
+    :param allowed: Whether the source may refer to fragments. Sources
+        compiled on behalf of others should not read files.
+    :type allowed: bool
+    :returns: tuple of (dict, list of str)
+    :raises: ptolemy.exceptions.InvalidFileError
+    :raises: yaml.YAMLError
+
+    """
+    resolver = _Resolver(allowed)
+    if source_file_path is None:
+        resolved = resolver.resolve(source, os.getcwd(), ())
+    else:
+        resolved = resolver.resolve(
+            source, os.path.dirname(source_file_path), (source_file_path,)
+        )
+    return resolved, list(resolver.includes)
+
+
+class _Resolver(object):  # pylint: disable=too-few-public-methods
+    """
+    _Resolver replaces the references within a source, recording the
+    fragments it includes.
+
+    :param allowed: Whether references are allowed.
+    :type allowed: bool
+
+    """
+
+    def __init__(self, allowed=True):
+        self.allowed = allowed
+        self.includes = OrderedDict()
+
+    def resolve(self, value, directory, stack):
+        """
+        Return value with each reference within it replaced. Objects and
+        lists which hold no references are returned as they are.
+
+        :param value: A JSON value.
+        :param directory: The directory references are relative to.
+        :type directory: str
+        :param stack: The paths of the files being resolved, outermost
+            first, to detect cycles.
+        :type stack: tuple of str
+        :returns: The resolved value.
+
+        """
+        if isinstance(value, dict):
+            if _is_reference(value):
+                return self._load(value[REF_KEY], directory, stack)
+            resolved = OrderedDict(
+                (key, self.resolve(item, directory, stack))
+                for key, item in value.items()
+            )
+            if all(resolved[key] is value[key] for key in value):
+                return value
+            return dict(resolved)
+
+        if isinstance(value, list):
+            resolved = []
+            for item in value:
+                if isinstance(item, dict) and _is_reference(item):
+                    fragment = self._load(item[REF_KEY], directory, stack)
+                    if isinstance(fragment, list):
+                        resolved.extend(fragment)
+                        continue
+                    resolved.append(fragment)
+                else:
+                    resolved.append(self.resolve(item, directory, stack))
+            if len(resolved) == len(value) and all(
+                    a is b for a, b in zip(resolved, value)
+            ):
+                return value
+            return resolved
+
+        return value
+
+    def _load(self, reference, directory, stack):
+        """
+        Return the value a reference refers to.
+
+        :param reference: The reference, such as "common.yaml#/tables".
+        :type reference: str
+        :param directory: The directory the reference is relative to.
+        :type directory: str
+        :param stack: The paths of the files being resolved.
+        :type stack: tuple of str
+        :returns: The fragment, or the part of it the pointer refers to.
+        :raises: ptolemy.exceptions.InvalidFileError
+
+        """
+        if not self.allowed:
+            raise InvalidFileError(
+                "The source refers to the fragment {0!r}, but fragments "
+                "cannot be included here.".format(reference)
+            )
+        try:
+            file_path, _, pointer = reference.partition("#")
+        except AttributeError:
+            file_path = None
+        if not file_path:
+            raise InvalidFileError(
+                "The reference {0!r} must name a file.".format(reference)
+            )
+
+        file_path = os.path.normpath(os.path.join(directory, file_path))
+        fragment = _load_fragment(file_path, stack)
+        self.includes[file_path] = None
+        self.includes.update((path, None) for path in fragment.includes)
+        return _follow_pointer(fragment.value, pointer, reference)
+
+
+def _load_fragment(file_path, stack):
+    """
+    Return the resolved fragment in file_path, from the cache if it and
+    the fragments it includes are unchanged.
+
+    :param file_path: The absolute path of the fragment.
+    :type file_path: str
+    :param stack: The paths of the files being resolved.
+    :type stack: tuple of str
+    :returns: ptolemy.include.Fragment
+    :raises: ptolemy.exceptions.InvalidFileError
+
+    """
+    file_key = _get_file_key(file_path)
+    if file_key is None:
+        raise InvalidFileError(
+            "The source fragment '{0}' does not exist.".format(file_path)
+        )
+
+    if file_path in stack:
+        _raise_cycle(stack[stack.index(file_path):] + (file_path,))
+
+    fragment = _fragments.get(file_path)
+    if fragment is not None and fragment.file_key == file_key and all(
+            _get_file_key(path) == key
+            for path, key in fragment.includes.items()
+    ):
+        # The fragment was resolved without the files being resolved
+        # now, so it only forms a cycle with them if it includes one.
+        for i, path in enumerate(stack):
+            if path in fragment.includes:
+                _raise_cycle(stack[i:] + (file_path, "...", path))
+        return fragment
+
+    with open(file_path, "rb") as fragment_file:
+        value = load_source(fragment_file.read(), file_path)
+    resolver = _Resolver()
+    value = resolver.resolve(
+        value, os.path.dirname(file_path), stack + (file_path,)
+    )
+    fragment = _fragments[file_path] = Fragment(
+        file_key, value, OrderedDict(
+            (path, _get_file_key(path)) for path in resolver.includes
+        )
+    )
+    return fragment
+
+
+def _raise_cycle(chain):
+    """
+    Raise an error for a fragment which includes itself.
+
+    :param chain: The paths of the files which include each other, from
+        the fragment back to itself.
+    :type chain: tuple of str
+    :raises: ptolemy.exceptions.InvalidFileError
+
+    """
+    raise InvalidFileError(
+        "The source fragment '{0}' includes itself: {1}.".format(
+            chain[0], " -> ".join(chain)
+        )
+    )
+
+
+def _is_reference(value):
+    """
+    Return whether an object is a reference to a fragment.
+
+    :param value: An object.
+    :type value: dict
+    :returns: bool
+
+    """
+    return len(value) == 1 and REF_KEY in value
+
+
+def _get_file_key(file_path):
+    """
+    Return the modification time and size of a file, which change when it
+    does, or None if it does not exist.
+
+    :param file_path: The path of the file.
+    :type file_path: str
+    :returns: tuple
+
+    """
+    try:
+        stat = os.stat(file_path)
+    except EnvironmentError:
+        return None
+    return (stat.st_mtime, stat.st_size)
+
+
+def _follow_pointer(value, pointer, reference):
+    """
+    Return the part of value a JSON pointer refers to.
+
+    :param value: The fragment.
+    :param pointer: The JSON pointer, such as "/tables/0", or "" for the
+        whole fragment.
+    :type pointer: str
+    :param reference: The reference the pointer is from, to report.
+    :type reference: str
+    :returns: The part of the fragment.
+    :raises: ptolemy.exceptions.InvalidFileError
+
+    """
+    if not pointer:
+        return value
+    for token in pointer.lstrip("/").split("/"):
+        token = token.replace("~1", "/").replace("~0", "~")
+        try:
+            if isinstance(value, list):
+                # Only non-negative decimal indexes without leading zeros
+                # refer to an item, so "-1" or "-" is not the last item.
+                if not _ARRAY_INDEX.match(token):
+                    raise IndexError(token)
+                value = value[int(token)]
+            else:
+                value = value[token]
+        except (KeyError, IndexError, TypeError, ValueError):
+            raise InvalidFileError(
+                "The reference {0!r} does not refer to anything.".format(
+                    reference
+                )
+            )
+    return value
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+"""
+ptolemy.loader
+
+This module implements parsing source files, which may be written in YAML
+or, as machine-generated sources often are, in JSON.
+
+YAML is parsed with the libyaml-backed loader when PyYAML was built with
+it, falling back to the pure-Python loader. JSON sources are parsed with
+the json module, which is much faster than either.
+
+"""
+
+import json
+import os
+
+from .exceptions import InvalidFileError
+
+
+JSON_SOURCE_FILE_EXTENSIONS = (".json",)
+
+
+def load_source(source_string, source_file_path=None):
+    """
+    Parse a source. Sources whose path ends in .json are parsed as JSON.
+    Other sources are parsed as JSON if they look like a JSON object, and
+    as YAML if they are not, or if they are not valid JSON.
+
+    :param source_string: The source.
+    :type source_string: str or bytes
+    :param source_file_path: The path the source was read from, if any.
+    :type source_file_path: str
+    :returns: The parsed source.
+    :raises: ptolemy.exceptions.InvalidFileError
+    :raises: yaml.YAMLError
+
+    """
+    if _has_json_extension(source_file_path):
+        try:
+            return _load_json(source_string)
+        except ValueError as error:
+            raise InvalidFileError(
+                "The source file '{0}' is not valid JSON. {1}".format(
+                    source_file_path, error
+                )
+            )
+
+    if _looks_like_json(source_string):
+        try:
+            return _load_json(source_string)
+        except ValueError:
+            pass
+
+    # PyYAML is only imported once a YAML source is parsed.
+    import yaml
+
+    return yaml.load(source_string, Loader=get_yaml_loader())
+
+
+def is_json_source(source_string, source_file_path=None):
+    """
+    Return whether a source is read as JSON rather than YAML: if its path
+    ends in .json, or if it starts like a JSON object. Only the start of the
+    source is needed.
+
+    :param source_string: The source, or the start of it.
+    :type source_string: str or bytes
+    :param source_file_path: The path the source was read from, if any.
+    :type source_file_path: str
+    :returns: bool
+
+    """
+    return _has_json_extension(source_file_path) or \
+        _looks_like_json(source_string)
+
+
+def get_yaml_loader():
+    """
+    Return the fastest safe YAML loader available.
+
+    :returns: yaml.SafeLoader or yaml.CSafeLoader
+
+    """
+    import yaml
+
+    return getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def _has_json_extension(source_file_path):
+    """
+    Return whether source_file_path has a JSON file extension.
+
+    :param source_file_path: The path of the source, if any.
+    :type source_file_path: str
+    :returns: bool
+
+    """
+    if source_file_path is None:
+        return False
+    extension = os.path.splitext(source_file_path)[1].lower()
+    return extension in JSON_SOURCE_FILE_EXTENSIONS
+
+
+def _looks_like_json(source_string):
+    """
+    Return whether source_string starts like a JSON object.
+
+    :param source_string: The source.
+    :type source_string: str or bytes
+    :returns: bool
+
+    """
+    start = source_string.lstrip()[:1]
+    return start in (b"{", u"{")
+
+
+def _load_json(source_string):
+    """
+    Parse a JSON source.
+
+    :param source_string: The source.
+    :type source_string: str or bytes
+    :returns: The parsed source.
+    :raises: ValueError
+
+    """
+    if isinstance(source_string, bytes):
+        source_string = source_string.decode("utf-8-sig")
+    return json.loads(source_string)
@@ -7,17 +7,249 @@ This module implements the mapping functionality.
 
 """
 
+from collections import namedtuple, OrderedDict
 import json
+import sys
+
+from .exceptions import PtolemyBaseError
+from .rule import Rule
+from .stats import NULL_STATS
+
+# The mapping's only key is "rules", so the document around the rules can
+# be written by hand when rules are written one at a time.
+MAPPING_START = '{\n    "rules": ['
+MAPPING_END = "\n    ]\n}"
+EMPTY_MAPPING_END = "]\n}"
+RULE_SEPARATOR = "\n" + " " * 8
+
+MINIFIED_MAPPING_START = '{"rules":['
+MINIFIED_MAPPING_END = "]}"
+
+# The keys of a rule, and of the objects within it, in the order they are
+# written with the canonical key order. Other keys follow, sorted.
+CANONICAL_KEY_ORDER = (
+    "rule-type", "rule-id", "rule-name", "object-locator", "schema-name",
+    "table-name", "column-name", "rule-action", "rule-target", "value",
+    "old-value", "filters", "filter-type", "filter-conditions",
+    "filter-operator", "start-value", "end-value"
+)
+_CANONICAL_KEY_RANKS = {key: i for i, key in enumerate(CANONICAL_KEY_ORDER)}
+
+# Dicts keep their keys in the order they were added from Python 3.7, and
+# are much faster to build than OrderedDicts.
+_ordered_dict = dict if sys.version_info >= (3, 7) else OrderedDict
+
+KEY_ORDERS = ("sorted", "canonical")
+
+ENCODERS = ("auto", "json", "orjson")
+
+JSONFormat = namedtuple("JSONFormat", ["minified", "key_order", "encoder"])
+JSONFormat.__doc__ = """
+JSONFormat describes how a mapping is written. Every format is
+deterministic, so a source always compiles to the same bytes.
+
+minified leaves out all whitespace, rather than indenting by four spaces.
+key_order is "sorted", to sort the keys of every object, or "canonical", to
+write them in CANONICAL_KEY_ORDER without sorting each rule. encoder is
+"json", "orjson" to encode with orjson, which is much faster but must be
+installed, or "auto" to use orjson if it is installed. Both encoders write
+the same bytes.
+
+"""
+
+DEFAULT_FORMAT = JSONFormat(False, "sorted", "auto")
+
+
+class JSONWriter(object):
+    """
+    JSONWriter numbers and encodes rules, and the document around them, in
+    a JSONFormat.
+
+    :param json_format: The format to write.
+    :type json_format: ptolemy.mapping.JSONFormat
+    :raises: ptolemy.exceptions.PtolemyBaseError if the encoder is not
+        installed
+
+    """
+
+    def __init__(self, json_format=None):
+        json_format = json_format or DEFAULT_FORMAT
+        self.minified = json_format.minified
+        self.sort_keys = json_format.key_order != "canonical"
+        if self.minified:
+            self.start = MINIFIED_MAPPING_START
+            self.end = self.empty_end = MINIFIED_MAPPING_END
+            self.separator = ""
+            self._encoder = json.JSONEncoder(
+                sort_keys=self.sort_keys, separators=(',', ':')
+            )
+        else:
+            self.start = MAPPING_START
+            self.end = MAPPING_END
+            self.empty_end = EMPTY_MAPPING_END
+            self.separator = RULE_SEPARATOR
+            self._encoder = json.JSONEncoder(
+                indent=4, sort_keys=self.sort_keys, separators=(',', ': ')
+            )
+        self._orjson, self._orjson_option = _get_orjson(
+            json_format.encoder, self.minified, self.sort_keys
+        )
+        # The canonical form of the data of the last rule numbered, which
+        # is shared by the rules expanded from the same item.
+        self._data = self._canonical_data = None
+
+    def number_rule(self, rule, rule_number):
+        """
+        Return rule as a dict, with its rule-id, and its rule-name if it has
+        none. Rules which are dicts are numbered in place.
+
+        :param rule: The rule.
+        :type rule: ptolemy.rule.Rule or dict
+        :param rule_number: The rule's number.
+        :type rule_number: str
+        :returns: dict
+
+        """
+        if self.sort_keys or not isinstance(rule, Rule):
+            if isinstance(rule, Rule):
+                rule = rule.to_dict()
+            rule["rule-id"] = rule_number
+            rule.setdefault("rule-name", rule_number)
+            if not self.sort_keys:
+                rule = _canonicalise(rule)
+            return rule
+
+        if rule.data is not self._data:
+            self._data = rule.data
+            self._canonical_data = _canonicalise({
+                key: value for key, value in rule.data.items()
+                if key != "rule-name"
+            })
+        numbered_rule = _ordered_dict()
+        numbered_rule["rule-type"] = rule.rule_type
+        numbered_rule["rule-id"] = rule_number
+        numbered_rule["rule-name"] = rule.data.get("rule-name", rule_number)
+        numbered_rule["object-locator"] = _ordered_dict(
+            zip(rule.location_keys, rule.names)
+        )
+        numbered_rule["rule-action"] = rule.rule_action
+        numbered_rule.update(self._canonical_data)
+        return numbered_rule
+
+    def encode_rule(self, rule):
+        """
+        Return the JSON for a single numbered rule, formatted and indented
+        as it is within the mapping.
+
+        :param rule: The rule.
+        :type rule: dict
+        :returns: str
+
+        """
+        if self._orjson is not None:
+            encoded = self._orjson.dumps(rule, option=self._orjson_option)
+            # json escapes non-ASCII characters and DEL, which orjson does
+            # not, so the rare rules which hold them are left to json.
+            if encoded.isascii() and b"\x7f" not in encoded:
+                encoded = encoded.decode("ascii")
+                if self.minified:
+                    return encoded
+                # orjson only indents by two spaces, so the indent of each
+                # line is doubled. JSON strings never contain a raw newline.
+                return RULE_SEPARATOR.join([
+                    line[:len(line) - len(line.lstrip(" "))] + line
+                    for line in encoded.split("\n")
+                ])
+
+        encoded = self._encoder.encode(rule)
+        if self.minified:
+            return encoded
+        # The rule is indented by prefixing each of its lines.
+        return encoded.replace("\n", RULE_SEPARATOR)
+
+
+def _get_orjson(encoder, minified, sort_keys):
+    """
+    Return the orjson module and the options to encode rules with, or None
+    if rules are to be encoded with json.
+
+    :param encoder: "auto", "json" or "orjson".
+    :type encoder: str
+    :param minified: Whether rules are minified.
+    :type minified: bool
+    :param sort_keys: Whether to sort the keys of each rule.
+    :type sort_keys: bool
+    :returns: tuple of (module, int)
+    :raises: ptolemy.exceptions.PtolemyBaseError
+
+    """
+    if encoder == "json":
+        return None, None
+    try:
+        import orjson
+    except ImportError:
+        if encoder == "orjson":
+            raise PtolemyBaseError(
+                "The orjson encoder was requested, but orjson is not "
+                "installed."
+            )
+        return None, None
+
+    option = 0
+    if not minified:
+        option |= orjson.OPT_INDENT_2
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    return orjson, option
+
+
+def _canonicalise(value):
+    """
+    Return value with the keys of each object within it in the canonical
+    order.
+
+    :param value: A JSON value.
+    :returns: The value, with OrderedDicts for dicts.
+
+    """
+    if isinstance(value, dict):
+        return _ordered_dict(
+            (key, _canonicalise(value[key])) for key in sorted(
+                value,
+                key=lambda key: (
+                    _CANONICAL_KEY_RANKS.get(key, len(CANONICAL_KEY_ORDER)),
+                    key
+                )
+            )
+        )
+    if isinstance(value, list):
+        return [_canonicalise(item) for item in value]
+    return value
 
 
 class Mapping(object):  # pylint: disable=too-few-public-methods
     """
     Mapping stores information about the DMS Mapping Table.
 
+    :param stats: Statistics to record the time taken to number and
+        serialise the rules, and the size of the mapping in, if any.
+    :type stats: ptolemy.stats.Stats
+    :param json_format: The format to write the mapping in. Defaults to
+        DEFAULT_FORMAT.
+    :type json_format: ptolemy.mapping.JSONFormat
+    :param rule_ids: Assigns each rule its rule-id. Rules are numbered by
+        their position, from 1, by default.
+    :type rule_ids: ptolemy.ids.RuleIds
+    :raises: ptolemy.exceptions.PtolemyBaseError if the format's encoder
+        is not installed
+
     """
 
-    def __init__(self):
+    def __init__(self, stats=None, json_format=None, rule_ids=None):
         self.mapping = {"rules": []}
+        self.stats = NULL_STATS if stats is None else stats
+        self.writer = JSONWriter(json_format)
+        self.rule_ids = rule_ids
 
     def to_json(self):
         """
@@ -26,18 +258,81 @@ class Mapping(object):  # pylint: disable=too-few-public-methods
         :returns: str
 
         """
-        self._number_rules()
-        return json.dumps(
-            self.mapping, indent=4, sort_keys=True, separators=(',', ': ')
-        )
+        with self.stats.phase("serialise"):
+            return "".join(self._iter_json())
+
+    def write(self, stream):
+        """
+        Write the JSON mapping to stream. The output is identical to
+        to_json(), but is written as each rule is numbered and encoded, so
+        the rules may be any iterable, such as a generator, and are never
+        held in memory together.
+
+        :param stream: A file-like object to write to.
+        :type stream: file
+
+        """
+        with self.stats.phase("serialise"):
+            for output in self._iter_json():
+                stream.write(output)
+
+    def _iter_json(self):
+        """
+        Yield the JSON mapping in pieces, numbering and encoding one rule at
+        a time. In the default format, the pieces join to the same document
+        json.dumps() writes for the mapping, with sorted keys and an indent
+        of four.
+
+        :returns: iterator of str
+
+        """
+        writer = self.writer
+        output = writer.start
+        empty = True
+        for rule in self._iter_numbered_rules():
+            output += writer.separator if empty else "," + writer.separator
+            output += writer.encode_rule(rule)
+            empty = False
+            self.stats.add_output(output)
+            yield output
+            output = ""
+        output += writer.empty_end if empty else writer.end
+        self.stats.add_output(output)
+        yield output
 
     def _number_rules(self):
         """
         Add rule-id and rule-names to each rule. Rules are numbered from 1,
-        as per AWS examples.
+        as per AWS examples, unless the mapping has rule_ids. Rules which
+        are ptolemy.rule.Rule objects are left unchanged, as they are only
+        turned into dicts as they are encoded.
+
+        """
+        for _ in self._iter_numbered_rules():
+            pass
+
+    def _iter_numbered_rules(self):
+        """
+        Add rule-id and rule-names to each rule as it is iterated over,
+        turning rule objects into dicts.
+
+        :returns: iterator of dict
 
         """
+        return self.stats.iterate("number", self._number_each_rule())
+
+    def _number_each_rule(self):
+        """
+        Yield each rule, having added rule-id and rule-names to it.
+
+        :returns: iterator of dict
+
+        """
+        number_rule = self.writer.number_rule
+        if self.rule_ids is not None:
+            assign = self.rule_ids.assign
+            for rule in self.mapping["rules"]:
+                yield number_rule(rule, assign(rule))
+            return
         for i, rule in enumerate(self.mapping["rules"]):
-            rule_number = str(i + 1)
-            rule["rule-id"] = rule_number
-            rule.setdefault("rule-name", rule_number)
+            yield number_rule(rule, str(i + 1))
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+"""
+ptolemy.merge
+
+This module implements ``ptolemy merge``, which merges compiled mappings
+into one. The mappings are read a rule at a time, in turn, and each rule is
+numbered and written as soon as it is read, with ptolemy.mapping.Mapping,
+so merging many large mappings never holds more than one rule of them in
+memory.
+
+Rules which are the same in more than one mapping, or more than once in
+one, are only written the first time they are read. Rules are compared by
+their digest, from ptolemy.ids.get_rule_digest(), without their rule-ids,
+so only the digests of the rules written are kept. Every rule is given a
+new rule-id, as the rule-ids of different mappings clash, and a rule-name
+which is the same as its old rule-id is dropped, as it was given by
+numbering the rule, so the rule is named by its new rule-id.
+
+"""
+
+import binascii
+from collections import namedtuple
+
+from .ids import get_rule_digest, iter_mapping, RuleIds
+from .mapping import Mapping
+from .stats import NULL_STATS
+
+
+MergeResult = namedtuple("MergeResult", ["mappings", "rules", "duplicates"])
+MergeResult.__doc__ = """
+MergeResult holds the number of mappings merged, the number of rules
+written, and the number of duplicate rules left out.
+
+"""
+
+
+def merge_mappings(mapping_paths, stream, json_format=None,
+                   rule_ids="position", stats=None):
+    """
+    Merge mapping files, writing the merged mapping to stream as each rule
+    is read. If a mapping is invalid, what has been written so far is left
+    incomplete.
+
+    :param mapping_paths: The paths of the mappings, in order.
+    :type mapping_paths: list of str
+    :param stream: A file-like object to write to.
+    :type stream: file
+    :param json_format: The format to write the mapping in.
+    :type json_format: ptolemy.mapping.JSONFormat
+    :param rule_ids: The scheme to give rules their new rule-ids by, from
+        ptolemy.ids.RULE_ID_SCHEMES.
+    :type rule_ids: str
+    :param stats: Statistics to record the time taken in, if any.
+    :type stats: ptolemy.stats.Stats
+    :returns: ptolemy.merge.MergeResult
+    :raises: ptolemy.exceptions.InvalidFileError
+
+    """
+    stats = NULL_STATS if stats is None else stats
+    counts = {"rules": 0, "duplicates": 0}
+    if rule_ids == "position":
+        rule_ids = None
+    else:
+        # Content IDs are prepared from every rule, so the mappings are
+        # read twice.
+        rule_ids = RuleIds(rule_ids)
+        rule_ids.prepare(stats.iterate("read", _iter_unique_rules(
+            mapping_paths, {"rules": 0, "duplicates": 0}
+        )))
+    mapping = Mapping(
+        stats=stats, json_format=json_format, rule_ids=rule_ids
+    )
+    mapping.mapping["rules"] = stats.count_rules(
+        stats.iterate("read", _iter_unique_rules(mapping_paths, counts))
+    )
+    mapping.write(stream)
+    return MergeResult(
+        len(mapping_paths), counts["rules"], counts["duplicates"]
+    )
+
+
+def _iter_unique_rules(mapping_paths, counts):
+    """
+    Yield the rules of each mapping, without their rule-ids, leaving out
+    the rules which have been yielded already.
+
+    :param mapping_paths: The paths of the mappings.
+    :type mapping_paths: list of str
+    :param counts: A dict counting the rules yielded and left out.
+    :type counts: dict
+    :returns: iterator of dict
+
+    """
+    # The digests are kept as bytes, which take half the memory of hex.
+    seen = set()
+    for mapping_path in mapping_paths:
+        for rule in iter_mapping(mapping_path):
+            digest = binascii.unhexlify(get_rule_digest(rule))
+            if digest in seen:
+                counts["duplicates"] += 1
+                continue
+            seen.add(digest)
+            rule_id = rule.pop("rule-id")
+            if rule.get("rule-name") == rule_id:
+                del rule["rule-name"]
+            counts["rules"] += 1
+            yield rule
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+"""
+ptolemy.optimise
+
+This module implements the helpers shared by optimisations, which remove or
+rewrite rules between their expansion from a source and their numbering in
+a mapping.
+
+Each optimisation is a function taking get_rules and removals, and returning
+an iterator of rules. get_rules(removals) returns a fresh iterator of the
+rules the optimisation is applied to, so an optimisation can make several
+passes over them, and removals is a list to record removed rules in, or
+None if they are not being recorded. Rules which are kept, but which an
+optimisation has found a problem with, are recorded there too, flagged as
+not removed. Passes made only to gather information should call
+get_rules(None), so each removal is recorded once.
+
+"""
+
+from collections import namedtuple
+from functools import partial
+
+
+Removal = namedtuple("Removal", ["rule", "reason", "removed"])
+Removal.__new__.__defaults__ = (True,)
+
+
+def apply_optimisations(expand_rules, optimisations, removals=None):
+    """
+    Return an iterator of the rules returned by expand_rules, after each of
+    optimisations has been applied in turn.
+
+    :param expand_rules: A function returning a fresh iterator of rules.
+    :type expand_rules: function
+    :param optimisations: The optimisations to apply.
+    :type optimisations: list of function
+    :param removals: A list to record removed rules in, if any.
+    :type removals: list
+    :returns: iterator of dict
+
+    """
+    def get_rules(_):
+        return expand_rules()
+
+    for optimisation in optimisations:
+        get_rules = partial(optimisation, get_rules)
+    return get_rules(removals)
+
+
+def record_removal(removals, rule, reason):
+    """
+    Record a removed rule, if removals are being recorded.
+
+    :param removals: A list to record removed rules in, if any.
+    :type removals: list
+    :param rule: The removed rule.
+    :type rule: ptolemy.rule.Rule
+    :param reason: Why the rule was removed.
+    :type reason: str
+
+    """
+    if removals is not None:
+        removals.append(Removal(describe_rule(rule), reason))
+
+
+def record_flag(removals, rule, reason):
+    """
+    Record a rule which is kept, but which has a problem, if removals are
+    being recorded.
+
+    :param removals: A list to record removed rules in, if any.
+    :type removals: list
+    :param rule: The flagged rule.
+    :type rule: ptolemy.rule.Rule
+    :param reason: The problem with the rule.
+    :type reason: str
+
+    """
+    if removals is not None:
+        removals.append(Removal(describe_rule(rule), reason, False))
+
+
+def describe_rule(rule):
+    """
+    Return a short description of a rule, such as
+    "selection include rule for Test.%".
+
+    :param rule: The rule.
+    :type rule: ptolemy.rule.Rule
+    :returns: str
+
+    """
+    return "{0} {1} rule for {2}".format(
+        rule.rule_type, rule.rule_action, ".".join(rule.names)
+    )
+
+
+def get_covering_patterns(name):
+    """
+    Return the patterns which cover name: name itself, and % appended to
+    each prefix of name up to its first wildcard. A pattern covers a name
+    if every object the name matches, the pattern also matches.
+
+    :param name: A name or pattern.
+    :type name: str
+    :returns: list of str
+
+    """
+    literal = name.split("%", 1)[0]
+    patterns = [literal[:i] + "%" for i in range(len(literal) + 1)]
+    patterns.append(name)
+    return patterns
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+
+"""
+ptolemy.parallel
+
+This module implements expanding and serialising the rules of a single
+source across a pool of worker processes.
+
+The items of the source are split into chunks of about CHUNK_RULES rules,
+splitting the items which expand to more than that by ranges of their
+names. The number of rules each chunk expands to is known before it is
+expanded, so each chunk is numbered from its position in the mapping, and
+the JSON of the chunks, joined in their original order, is identical to the
+mapping compiled by a single process.
+
+"""
+
+from collections import deque
+from itertools import product
+
+from .mapping import DEFAULT_FORMAT, JSONWriter
+from .rule import LOCATOR_KEYS, expand_item
+from .stats import NULL_STATS, Stats
+
+
+# The number of rules in each chunk of work given to a worker.
+CHUNK_RULES = 20000
+
+# The writers in each worker process, by JSONFormat, so that a worker does
+# not create a writer for every chunk.
+_writers = {}
+
+
+def split_items(items, chunk_rules=CHUNK_RULES):
+    """
+    Yield the items in chunks which expand to about chunk_rules rules, and
+    the number of rules each chunk expands to. Items which expand to more
+    than chunk_rules rules are split into several items, each with a range
+    of the names of one of its object locators, which expand to the same
+    rules, in the same order, between them.
+
+    :param items: The rule type, rule action and data of each item of the
+        source.
+    :type items: iterable of tuple of (str, str, dict)
+    :param chunk_rules: The number of rules in each chunk.
+    :type chunk_rules: int
+    :returns: iterator of tuple of (list of tuple of (str, str, dict), int)
+
+    """
+    chunk = []
+    chunk_size = 0
+    for rule_type, rule_action, data_item in items:
+        for piece, size in _split_item(data_item, chunk_rules):
+            chunk.append((rule_type, rule_action, piece))
+            chunk_size += size
+            if chunk_size >= chunk_rules:
+                yield chunk, chunk_size
+                chunk = []
+                chunk_size = 0
+    if chunk:
+        yield chunk, chunk_size
+
+
+def _split_item(data_item, chunk_rules):
+    """
+    Yield the parts of a source item, each expanding to no more than
+    chunk_rules rules, and the number of rules each part expands to.
+
+    :param data_item: The source item.
+    :type data_item: dict
+    :param chunk_rules: The most rules a part may expand to.
+    :type chunk_rules: int
+    :returns: iterator of tuple of (dict, int)
+
+    """
+    object_locators = data_item["object-locators"]
+    locator_keys = [
+        locator_key for locator_key, _ in LOCATOR_KEYS
+        if locator_key in object_locators
+    ]
+    sizes = [len(object_locators[key]) for key in locator_keys]
+    size = _product(sizes)
+    if size <= chunk_rules:
+        yield data_item, size
+        return
+
+    # The names of the first locators are fixed one combination at a time,
+    # and the names of the first locator each name of which expands to no
+    # more than chunk_rules rules are split into ranges. Locations are
+    # expanded with the first locator outermost, so the parts expand to the
+    # item's rules in order.
+    index = 0
+    while _product(sizes[index + 1:]) > chunk_rules:
+        index += 1
+    rules_per_name = _product(sizes[index + 1:])
+    step = max(1, chunk_rules // rules_per_name)
+    split_key = locator_keys[index]
+    split_names = object_locators[split_key]
+
+    for fixed_names in product(*[
+            object_locators[key] for key in locator_keys[:index]
+    ]):
+        for start in range(0, len(split_names), step):
+            part_locators = dict(object_locators)
+            for key, name in zip(locator_keys, fixed_names):
+                part_locators[key] = [name]
+            part_locators[split_key] = split_names[start:start + step]
+            part = dict(data_item)
+            part["object-locators"] = part_locators
+            yield part, len(part_locators[split_key]) * rules_per_name
+
+
+def _product(sizes):
+    """
+    Return the product of sizes, which is 1 if there are none.
+
+    :param sizes: The sizes.
+    :type sizes: list of int
+    :returns: int
+
+    """
+    result = 1
+    for size in sizes:
+        result *= size
+    return result
+
+
+def encode_chunk(chunk, first_number, json_format, collect_stats=False):
+    """
+    Expand, number and encode the rules of a chunk of items. Each rule is
+    preceded by the comma and separator which come before it in the
+    mapping.
+
+    :param chunk: The rule type, rule action and data of each item.
+    :type chunk: list of tuple of (str, str, dict)
+    :param first_number: The rule-id of the chunk's first rule.
+    :type first_number: int
+    :param json_format: The format to write the rules in.
+    :type json_format: ptolemy.mapping.JSONFormat
+    :param collect_stats: Whether to collect the statistics of the chunk.
+    :type collect_stats: bool
+    :returns: tuple of (str, ptolemy.stats.Stats or None)
+
+    """
+    writer = _writers.get(json_format)
+    if writer is None:
+        writer = _writers[json_format] = JSONWriter(json_format)
+    stats = Stats() if collect_stats else NULL_STATS
+    prefix = "," + writer.separator
+
+    def expand_rules():
+        for rule_type, rule_action, data_item in chunk:
+            for rule in expand_item(rule_type, rule_action, data_item):
+                yield rule
+
+    rules = stats.count_rules(stats.iterate("expand", expand_rules()))
+    numbered_rules = stats.iterate("number", (
+        writer.number_rule(rule, str(number))
+        for number, rule in enumerate(rules, first_number)
+    ))
+    with stats.phase("serialise"):
+        output = "".join([
+            prefix + writer.encode_rule(rule) for rule in numbered_rules
+        ])
+    return output, stats if collect_stats else None
+
+
+def write_mapping(stream, items, jobs, json_format=None, stats=None):
+    """
+    Write the mapping of the items to stream, numbering the rules by their
+    position, expanding and encoding them across a pool of jobs worker
+    processes. Sources which expand to a single chunk, and mappings written
+    with a single worker, are written by the current process alone. The
+    mapping is identical to the mapping ptolemy.mapping.Mapping writes.
+
+    Only CHUNK_RULES rules for each worker are held in memory together, so
+    items may be streamed. The time the workers spend expanding, numbering
+    and serialising rules is added together in stats.
+
+    :param stream: A file-like object to write to.
+    :type stream: file
+    :param items: The rule type, rule action and data of each item of the
+        source.
+    :type items: iterable of tuple of (str, str, dict)
+    :param jobs: The number of worker processes. 0 uses one per CPU.
+    :type jobs: int
+    :param json_format: The format to write the mapping in. Defaults to
+        ptolemy.mapping.DEFAULT_FORMAT.
+    :type json_format: ptolemy.mapping.JSONFormat
+    :param stats: Statistics to record the rules and the size of the
+        mapping in, if any.
+    :type stats: ptolemy.stats.Stats
+
+    """
+    import multiprocessing
+
+    if jobs == 0:
+        jobs = multiprocessing.cpu_count()
+    stats = NULL_STATS if stats is None else stats
+    collect_stats = stats is not NULL_STATS
+    json_format = json_format or DEFAULT_FORMAT
+    writer = JSONWriter(json_format)
+    empty = [True]
+
+    def write_output(output):
+        stream.write(output)
+        stats.add_output(output)
+
+    def write(output, chunk_stats=None):
+        if empty[0] and output:
+            # The first rule has no comma before it.
+            output = output[1:]
+            empty[0] = False
+        write_output(output)
+        if chunk_stats is not None:
+            stats.update(chunk_stats)
+
+    write_output(writer.start)
+    chunks = split_items(items, CHUNK_RULES)
+    first_chunk = next(chunks, None)
+    second_chunk = next(chunks, None)
+    chunks = _chain(first_chunk, second_chunk, chunks)
+    if jobs <= 1 or second_chunk is None:
+        number = 1
+        for chunk, size in chunks:
+            write(*encode_chunk(chunk, number, json_format, collect_stats))
+            number += size
+    else:
+        pool = multiprocessing.Pool(jobs)
+        try:
+            _write_chunks(
+                pool, jobs, chunks, json_format, collect_stats, write
+            )
+        finally:
+            pool.terminate()
+            pool.join()
+    write_output(writer.empty_end if empty[0] else writer.end)
+
+
+def _chain(first_chunk, second_chunk, chunks):
+    """
+    Yield the first and second chunks, if there are any, then the rest.
+
+    :returns: iterator of tuple of (list, int)
+
+    """
+    for chunk in (first_chunk, second_chunk):
+        if chunk is not None:
+            yield chunk
+    for chunk in chunks:
+        yield chunk
+
+
+def _write_chunks(pool, jobs, chunks, json_format, collect_stats, write):
+    """
+    Encode the chunks across pool, passing the output of each to write in
+    the order of the chunks. Two chunks for each worker are queued at most,
+    so that the chunks, and their output, are not all held in memory.
+
+    :param pool: The worker processes.
+    :type pool: multiprocessing.pool.Pool
+    :param jobs: The number of worker processes.
+    :type jobs: int
+    :param chunks: The chunks, and the number of rules in each.
+    :type chunks: iterable of tuple of (list, int)
+    :param json_format: The format to write the rules in.
+    :type json_format: ptolemy.mapping.JSONFormat
+    :param collect_stats: Whether to collect the statistics of each chunk.
+    :type collect_stats: bool
+    :param write: Called with the output of each chunk, and its statistics.
+    :type write: callable
+
+    """
+    pending = deque()
+    number = 1
+    for chunk, size in chunks:
+        pending.append(pool.apply_async(
+            encode_chunk, (chunk, number, json_format, collect_stats)
+        ))
+        number += size
+        if len(pending) >= 2 * jobs:
+            write(*pending.popleft().get())
+    while pending:
+        write(*pending.popleft().get())
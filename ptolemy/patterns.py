@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+"""
+ptolemy.patterns
+
+This module implements matching the names in object locators, which may
+contain the % wildcard, matching any sequence of characters.
+
+Patterns matched against a database catalog follow SQL LIKE, where _ also
+matches any single character.
+
+"""
+
+import re
+
+
+WILDCARD = "%"
+
+
+def is_pattern(name):
+    """
+    Return whether name contains a wildcard.
+
+    :param name: A name or pattern.
+    :type name: str
+    :returns: bool
+
+    """
+    return WILDCARD in name
+
+
+def compile_pattern(pattern):
+    """
+    Return a regular expression matching the names pattern matches.
+
+    :param pattern: A name or pattern.
+    :type pattern: str
+    :returns: re.RegexObject
+
+    """
+    return re.compile(
+        ".*".join(re.escape(part) for part in pattern.split(WILDCARD)) + r"\Z",
+        re.DOTALL
+    )
+
+
+def compile_like_pattern(pattern):
+    """
+    Return a regular expression matching the names the SQL LIKE pattern
+    matches.
+
+    :param pattern: A name or LIKE pattern.
+    :type pattern: str
+    :returns: re.RegexObject
+
+    """
+    expression = "".join(
+        ".*" if character == "%" else "." if character == "_"
+        else re.escape(character)
+        for character in pattern
+    )
+    return re.compile(expression + r"\Z", re.DOTALL)
+
+
+def patterns_overlap(pattern, other_pattern):
+    """
+    Return whether some name could match both patterns. When both contain
+    wildcards this is conservative: they are only said not to overlap if
+    their fixed prefixes or suffixes differ.
+
+    :param pattern: A name or pattern.
+    :type pattern: str
+    :param other_pattern: A name or pattern.
+    :type other_pattern: str
+    :returns: bool
+
+    """
+    if not is_pattern(pattern):
+        return compile_pattern(other_pattern).match(pattern) is not None
+    if not is_pattern(other_pattern):
+        return compile_pattern(pattern).match(other_pattern) is not None
+
+    prefix = pattern.split(WILDCARD, 1)[0]
+    other_prefix = other_pattern.split(WILDCARD, 1)[0]
+    suffix = pattern.rsplit(WILDCARD, 1)[1]
+    other_suffix = other_pattern.rsplit(WILDCARD, 1)[1]
+    return (
+        (prefix.startswith(other_prefix) or other_prefix.startswith(prefix))
+        and
+        (suffix.endswith(other_suffix) or other_suffix.endswith(suffix))
+    )
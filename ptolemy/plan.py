@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+
+"""
+ptolemy.plan
+
+This module implements planning a compile: working out how many rules a
+source expands to, and how large its mapping will be, from the lengths of
+its object locator lists alone.
+
+"""
+
+from collections import namedtuple
+import json
+
+from .exceptions import MappingTooLargeError
+from .ids import CONTENT_ID_LENGTH
+from .mapping import JSONWriter
+from .rule import LOCATOR_KEYS, Rule
+
+
+ItemPlan = namedtuple(
+    "ItemPlan", ["rule_type", "rule_action", "index", "rules", "size"]
+)
+
+
+class Plan(object):
+    """
+    Plan describes the mapping a source compiles to, without expanding it.
+
+    The sizes are exact: each rule is the same JSON document with different
+    names and numbers substituted in, so the size of every rule an item
+    expands to can be summed from the lengths of its names. Rule IDs carried
+    over from a previous mapping are the exception, and are counted as if
+    they were not.
+
+    :param source: A loaded, validated source.
+    :type source: dict
+    :param json_format: The format the mapping is written in. Defaults to
+        ptolemy.mapping.DEFAULT_FORMAT.
+    :type json_format: ptolemy.mapping.JSONFormat
+    :param rule_ids: The scheme rule IDs are assigned by, from
+        ptolemy.ids.RULE_ID_SCHEMES.
+    :type rule_ids: str
+
+    """
+
+    def __init__(self, source, json_format=None, rule_ids="position"):
+        self.writer = JSONWriter(json_format)
+        self.items = []
+        rule_count = 0
+        for rule_type, rule_type_data in source.items():
+            for rule_action, rule_action_data in rule_type_data.items():
+                for index, data_item in enumerate(rule_action_data):
+                    rules, size = _plan_item(
+                        rule_type, rule_action, data_item, rule_count,
+                        self.writer, rule_ids
+                    )
+                    self.items.append(ItemPlan(
+                        rule_type, rule_action, index, rules, size
+                    ))
+                    rule_count += rules
+
+    @property
+    def rules(self):
+        """
+        The number of rules in the mapping.
+
+        """
+        return sum(item.rules for item in self.items)
+
+    @property
+    def size(self):
+        """
+        The size of the mapping in bytes.
+
+        """
+        writer = self.writer
+        if not self.rules:
+            return len(writer.start) + len(writer.empty_end)
+        separators = (self.rules - 1) * len("," + writer.separator)
+        return (
+            len(writer.start) + len(writer.separator) + separators +
+            sum(item.size for item in self.items) + len(writer.end)
+        )
+
+    def check(self, max_rules=None, max_bytes=None):
+        """
+        Check the mapping is within the given limits.
+
+        :param max_rules: The maximum number of rules, if any.
+        :type max_rules: int
+        :param max_bytes: The maximum size of the mapping in bytes, if any.
+        :type max_bytes: int
+        :raises: ptolemy.exceptions.MappingTooLargeError
+
+        """
+        if max_rules is not None and self.rules > max_rules:
+            raise MappingTooLargeError(
+                "The source expands to {0} rules, more than the limit of "
+                "{1}.".format(self.rules, max_rules)
+            )
+        if max_bytes is not None and self.size > max_bytes:
+            raise MappingTooLargeError(
+                "The source compiles to {0} bytes, more than the limit of "
+                "{1}.".format(self.size, max_bytes)
+            )
+
+    def report(self):
+        """
+        Return a table of the rules and bytes each source item expands to.
+
+        :returns: str
+
+        """
+        row = "{0:<16} {1:<18} {2:>6} {3:>12} {4:>14}"
+        lines = [row.format("rule-type", "rule-action", "item", "rules",
+                            "bytes")]
+        for item in self.items:
+            lines.append(row.format(
+                item.rule_type, item.rule_action, item.index + 1, item.rules,
+                item.size
+            ))
+        lines.append(row.format("total", "", "", self.rules, self.size))
+        return "\n".join(lines)
+
+
+def _plan_item(
+        rule_type, rule_action, data_item, first_rule, writer,
+        rule_ids="position"
+):
+    """
+    Return the number of rules a source item expands to, and their total
+    size in bytes, excluding the separators between them.
+
+    :param rule_type: The item's rule type.
+    :type rule_type: str
+    :param rule_action: The item's rule action.
+    :type rule_action: str
+    :param data_item: The source item.
+    :type data_item: dict
+    :param first_rule: The number of rules before the item in the mapping.
+    :type first_rule: int
+    :param writer: The writer the rules are encoded with.
+    :type writer: ptolemy.mapping.JSONWriter
+    :param rule_ids: The scheme rule IDs are assigned by.
+    :type rule_ids: str
+    :returns: tuple of (int, int)
+
+    """
+    object_locators = data_item["object-locators"]
+
+    # Each rule expanded from the item is this template, with names and
+    # numbers substituted for the empty strings.
+    location_keys = []
+    rules = 1
+    for locator_key, location_key in LOCATOR_KEYS:
+        if locator_key in object_locators:
+            location_keys.append(location_key)
+            rules *= len(object_locators[locator_key])
+    if not rules:
+        return 0, 0
+
+    template = Rule(
+        rule_type, rule_action, tuple(location_keys),
+        ("",) * len(location_keys),
+        {k: v for k, v in data_item.items() if k != "object-locators"}
+    )
+    size = rules * len(writer.encode_rule(writer.number_rule(template, "")))
+
+    # Each name appears in an equal share of the rules.
+    for locator_key, _ in LOCATOR_KEYS:
+        names = object_locators.get(locator_key)
+        if names:
+            share = rules // len(names)
+            size += share * sum(_get_encoded_length(name) for name in names)
+
+    if rule_ids == "content":
+        number_length = rules * CONTENT_ID_LENGTH
+    else:
+        number_length = _sum_number_lengths(
+            first_rule + 1, first_rule + rules
+        )
+    size += number_length
+    if "rule-name" not in data_item:
+        size += number_length
+    return rules, size
+
+
+def _get_encoded_length(string):
+    """
+    Return the length of string once encoded as JSON, without its quotes.
+
+    :param string: A string.
+    :type string: str
+    :returns: int
+
+    """
+    return len(json.dumps(string)) - 2
+
+
+def _sum_number_lengths(first, last):
+    """
+    Return the total number of digits in the numbers first to last.
+
+    :param first: The first number.
+    :type first: int
+    :param last: The last number.
+    :type last: int
+    :returns: int
+
+    """
+    total = 0
+    digits = 1
+    start = 1
+    while start <= last:
+        end = start * 10 - 1
+        low = max(first, start)
+        high = min(last, end)
+        if low <= high:
+            total += (high - low + 1) * digits
+        start *= 10
+        digits += 1
+    return total
@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+
+"""
+ptolemy.rule
+
+This module implements the compact form rules take between their expansion
+from a source and their serialisation in a mapping.
+
+A source item can expand into millions of rules, which differ only in their
+object locator. So rather than a dict for each rule, and another for its
+object locator, each rule is a Rule holding a tuple of its interned object
+names, and references to the locator keys and the rest of the item's data,
+which are shared by every rule expanded from the item. Rules are only
+turned into dicts as they are serialised.
+
+"""
+
+from itertools import product
+import json
+
+try:
+    from sys import intern
+except ImportError:  # pragma: no cover
+    from __builtin__ import intern  # pylint: disable=import-error
+
+
+# The object locator keys in a source, and the object location keys they
+# expand to in a rule, in the order they are combined.
+LOCATOR_KEYS = (
+    ("schema-names", "schema-name"),
+    ("table-names", "table-name"),
+    ("column-names", "column-name")
+)
+
+# Each distinct tuple of object location keys, so rules share them.
+_location_keys = {}
+
+
+class Rule(object):
+    """
+    Rule is an expanded, un-numbered DMS rule. Rules are treated as
+    immutable, so they may be shared, and are turned into a new dict by
+    to_dict().
+
+    Rules can be read like the dict they stand for, so rule["rule-type"]
+    and rule.get("filters") work, but the attributes are cheaper.
+
+    :param rule_type: The rule type, such as "selection".
+    :type rule_type: str
+    :param rule_action: The rule action, such as "include".
+    :type rule_action: str
+    :param location_keys: The object location keys, such as
+        ("schema-name", "table-name").
+    :type location_keys: tuple of str
+    :param names: The object names, in the order of location_keys.
+    :type names: tuple of str
+    :param data: The rest of the rule, such as its filters and rule-name.
+        It is shared with the other rules expanded from the same item, and
+        must not be modified.
+    :type data: dict
+
+    """
+
+    __slots__ = ("rule_type", "rule_action", "location_keys", "names", "data")
+
+    def __init__(self, rule_type, rule_action, location_keys, names, data):
+        self.rule_type = rule_type
+        self.rule_action = rule_action
+        self.location_keys = location_keys
+        self.names = names
+        self.data = data
+
+    @classmethod
+    def from_dict(cls, rule):
+        """
+        Return the Rule for an un-numbered rule dict.
+
+        :param rule: The rule.
+        :type rule: dict
+        :returns: ptolemy.rule.Rule
+
+        """
+        locator = rule["object-locator"]
+        location_keys = _share_location_keys(tuple(
+            key for _, key in LOCATOR_KEYS if key in locator
+        ))
+        data = {
+            key: value for key, value in rule.items()
+            if key not in ("object-locator", "rule-action", "rule-type")
+        }
+        return cls(
+            rule["rule-type"], rule["rule-action"], location_keys,
+            tuple(intern(locator[key]) for key in location_keys), data
+        )
+
+    @property
+    def object_locator(self):
+        """
+        The object locator, as a new dict.
+
+        :returns: dict
+
+        """
+        return dict(zip(self.location_keys, self.names))
+
+    def locate(self, location_key, default=None):
+        """
+        Return the name of an object in the rule's locator, such as its
+        "table-name", or default if it has none.
+
+        :param location_key: The object location key.
+        :type location_key: str
+        :param default: The value to return if the key is missing.
+        :returns: str
+
+        """
+        for key, name in zip(self.location_keys, self.names):
+            if key == location_key:
+                return name
+        return default
+
+    def to_dict(self):
+        """
+        Return the rule as a new dict.
+
+        :returns: dict
+
+        """
+        rule = {
+            "object-locator": self.object_locator,
+            "rule-action": self.rule_action,
+            "rule-type": self.rule_type
+        }
+        rule.update(self.data)
+        return rule
+
+    def __getitem__(self, key):
+        if key == "rule-type":
+            return self.rule_type
+        if key == "rule-action":
+            return self.rule_action
+        if key == "object-locator":
+            return self.object_locator
+        return self.data[key]
+
+    def get(self, key, default=None):
+        """
+        Return the value of key, as dict.get() does.
+
+        """
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __eq__(self, other):
+        if not isinstance(other, Rule):
+            return NotImplemented
+        return (
+            self.rule_type == other.rule_type and
+            self.rule_action == other.rule_action and
+            self.location_keys == other.location_keys and
+            self.names == other.names and
+            self.data == other.data
+        )
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "Rule({0!r})".format(self.to_dict())
+
+
+def get_location_names(object_locators):
+    """
+    Return the object location keys present in a source item's object
+    locators, and the interned names for each.
+
+    :param object_locators: A source item's object locators.
+    :type object_locators: dict
+    :returns: tuple of (tuple of str, list of lists of str)
+
+    """
+    # Only the names which are present are combined, so locators which
+    # omit table or column names produce locations without them.
+    keys = []
+    names = []
+    for locator_key, location_key in LOCATOR_KEYS:
+        if locator_key in object_locators:
+            keys.append(location_key)
+            names.append([
+                intern(name) for name in object_locators[locator_key]
+            ])
+    return _share_location_keys(tuple(keys)), names
+
+
+def expand_item(rule_type, rule_action, data_item):
+    """
+    Yield a Rule for each combination of names in a source item's object
+    locators.
+
+    :param rule_type: The item's rule type.
+    :type rule_type: str
+    :param rule_action: The item's rule action.
+    :type rule_action: str
+    :param data_item: The source item.
+    :type data_item: dict
+    :returns: iterator of ptolemy.rule.Rule
+
+    """
+    # Everything but the object locators is shared between the rules.
+    data = {
+        key: value for key, value in data_item.items()
+        if key != "object-locators"
+    }
+    location_keys, names = get_location_names(data_item["object-locators"])
+    rule_type = intern(rule_type)
+    rule_action = intern(rule_action)
+
+    for combination in product(*names):
+        yield Rule(rule_type, rule_action, location_keys, combination, data)
+
+
+class ExpansionCache(object):
+    """
+    ExpansionCache keeps the rules each item of a source expanded to, so
+    that when the source is compiled again, the rules of the items which
+    have not changed are reused rather than expanded again. Items are
+    identified by their content, so items which move within the source are
+    reused too.
+
+    Every item expanded since the last call to prune() is kept. hits and
+    misses count the items reused and expanded.
+
+    """
+
+    def __init__(self):
+        self._rules = {}
+        self._used = set()
+        self.hits = 0
+        self.misses = 0
+
+    def expand(self, rule_type, rule_action, data_item):
+        """
+        Return the rules for a source item, as expand_item() would.
+
+        :param rule_type: The item's rule type.
+        :type rule_type: str
+        :param rule_action: The item's rule action.
+        :type rule_action: str
+        :param data_item: The source item.
+        :type data_item: dict
+        :returns: list of ptolemy.rule.Rule
+
+        """
+        key = (
+            rule_type, rule_action,
+            json.dumps(data_item, sort_keys=True, default=repr)
+        )
+        self._used.add(key)
+        rules = self._rules.get(key)
+        if rules is None:
+            self.misses += 1
+            rules = self._rules[key] = list(
+                expand_item(rule_type, rule_action, data_item)
+            )
+        else:
+            self.hits += 1
+        return rules
+
+    def prune(self):
+        """
+        Forget the items which have not been expanded since the last call.
+
+        """
+        self._rules = {
+            key: rules for key, rules in self._rules.items()
+            if key in self._used
+        }
+        self._used = set()
+
+
+def _share_location_keys(location_keys):
+    """
+    Return the shared copy of a tuple of object location keys.
+
+    :param location_keys: The keys.
+    :type location_keys: tuple of str
+    :returns: tuple of str
+
+    """
+    return _location_keys.setdefault(location_keys, location_keys)
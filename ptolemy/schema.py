@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+"""
+ptolemy.schema
+
+This module implements loading the source schema, and validating sources
+against it.
+
+The schema is maintained in data/source-schema.yaml, and shipped
+pre-serialised as data/source-schema.json, which is much faster to load.
+Sources are validated by source_validator.py, which ptolemy.schema_compiler
+generates from the schema, and which checks sources many times faster than
+jsonschema, raising the same errors. Run ``make schema`` after editing the
+YAML schema to regenerate both.
+
+"""
+
+import hashlib
+import json
+import os
+
+
+SOURCE_SCHEMA_FILE_PATH = os.path.join(
+    os.path.dirname(__file__), "data", "source-schema.json"
+)
+
+_source_schema = None
+
+_validator = None
+
+_source_schema_digest = None
+
+_source_validator = None
+
+# The depth of the lists of items in a source, beneath a rule type and a
+# rule action.
+ITEMS_DEPTH = 2
+
+
+def load_source_schema():
+    """
+    Return the source schema. The schema is read from disk the first time
+    it is requested, and cached for the life of the process.
+
+    :returns: dict
+
+    """
+    global _source_schema  # pylint: disable=global-statement
+    if _source_schema is None:
+        with open(SOURCE_SCHEMA_FILE_PATH, "r") as source_schema_file:
+            _source_schema = json.load(source_schema_file)
+    return _source_schema
+
+
+def get_source_schema_digest():
+    """
+    Return a digest of the source schema, which identifies the version of
+    the schema sources are validated against.
+
+    :returns: str
+
+    """
+    global _source_schema_digest  # pylint: disable=global-statement
+    if _source_schema_digest is None:
+        with open(SOURCE_SCHEMA_FILE_PATH, "rb") as source_schema_file:
+            _source_schema_digest = hashlib.sha256(
+                source_schema_file.read()
+            ).hexdigest()
+    return _source_schema_digest
+
+
+def get_validator():
+    """
+    Return a validator for the source schema. The schema is checked against
+    its metaschema, and the validator built, the first time it is requested.
+    The validator is then cached for the life of the process, so validating
+    many sources only pays for it once.
+
+    :returns: jsonschema.IValidator
+
+    """
+    global _validator  # pylint: disable=global-statement
+    if _validator is None:
+        # jsonschema is slow to import, so it is only imported once a
+        # source is validated.
+        from jsonschema.validators import validator_for
+
+        source_schema = load_source_schema()
+        validator_class = validator_for(source_schema)
+        validator_class.check_schema(source_schema)
+        _validator = validator_class(source_schema)
+    return _validator
+
+
+def validate(source):
+    """
+    Checks a source is correctly formatted.
+
+    :param source: The loaded source.
+    :type source: dict
+    :raises: jsonschema.exceptions.ValidationError
+
+    """
+    get_source_validator()(source)
+
+
+def get_source_validator():
+    """
+    Return the function which validates sources. This is the validator
+    generated from the schema, unless the schema has changed since it was
+    generated, when sources are validated by jsonschema instead.
+
+    :returns: function
+
+    """
+    global _source_validator  # pylint: disable=global-statement
+    if _source_validator is None:
+        from . import source_validator
+
+        if source_validator.SCHEMA_DIGEST == get_source_schema_digest():
+            _source_validator = source_validator.validate
+        else:
+            _source_validator = get_validator().validate
+    return _source_validator
+
+
+def validate_item(rule_type, rule_action, index, data_item):
+    """
+    Checks one item of a source is correctly formatted, for sources which
+    are validated an item at a time. The item is validated within a source
+    holding only it, and any error reports the item's own index.
+
+    :param rule_type: The item's rule type.
+    :type rule_type: str
+    :param rule_action: The item's rule action.
+    :type rule_action: str
+    :param index: The item's index in the list of items of its rule action.
+    :type index: int
+    :param data_item: The item.
+    :type data_item: dict
+    :raises: jsonschema.exceptions.ValidationError
+
+    """
+    from jsonschema.exceptions import ValidationError
+
+    source = {rule_type: {rule_action: [data_item]}}
+    # Every source must have a selection.
+    source.setdefault("selection", {})
+    try:
+        validate(source)
+    except ValidationError as error:
+        if len(error.path) > ITEMS_DEPTH:
+            error.path[ITEMS_DEPTH] = index
+        raise
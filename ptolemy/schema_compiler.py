@@ -0,0 +1,546 @@
+# -*- coding: utf-8 -*-
+
+"""
+ptolemy.schema_compiler
+
+This module implements compiling the source schema into Python code which
+validates sources against it, shipped as source_validator.py. Run ``make
+schema`` after editing the YAML schema to regenerate it.
+
+jsonschema interprets the schema afresh at every node of a source. The
+generated code checks each node directly instead, with the names, enums
+and required properties it expects inlined. It finds the same first error
+jsonschema's Draft 4 validator does, and raises the same ValidationError:
+the keywords of each schema are checked in the order they appear in it, and
+properties and array items in the order jsonschema visits them.
+
+Only the keywords the source schema uses are supported, so compiling a
+schema which uses any other raises a ValueError, rather than generating a
+validator which would silently disagree with jsonschema.
+
+"""
+
+from collections import OrderedDict
+import itertools
+import pprint
+import sys
+
+from .schema import get_source_schema_digest, load_source_schema
+
+
+# Keywords which do not affect validation.
+IGNORED_KEYWORDS = (
+    "$schema", "id", "title", "description", "default", "definitions"
+)
+
+# The Python types each JSON type is checked against.
+TYPES = {
+    "object": "dict",
+    "array": "list",
+    "string": "string_types"
+}
+
+# The keywords which only apply to values of a type.
+GUARDED_KEYWORDS = {
+    "additionalProperties": "object",
+    "properties": "object",
+    "required": "object",
+    "items": "array"
+}
+
+SUPPORTED_KEYWORDS = ("type", "enum") + tuple(GUARDED_KEYWORDS)
+
+MAX_LINE_LENGTH = 79
+
+HEADER = '''# -*- coding: utf-8 -*-
+
+"""
+ptolemy.source_validator
+
+This module validates sources against the source schema. It is generated
+from data/source-schema.json by ptolemy.schema_compiler, and must not be
+edited by hand: run ``make schema`` to regenerate it.
+
+"""
+# flake8: noqa
+# pylint: skip-file
+
+try:
+    string_types = basestring
+except NameError:
+    string_types = str
+
+
+# The digest of the schema this module was generated from.
+SCHEMA_DIGEST = {digest!r}
+'''
+
+FOOTER = '''
+
+def validate(source):
+    """
+    Checks a source is correctly formatted, raising the first error
+    jsonschema would.
+
+    :param source: The loaded source.
+    :type source: dict
+    :raises: jsonschema.exceptions.ValidationError
+
+    """
+    _check_0(source, ())
+
+
+def _error(spec, instance, path, extras=None):
+    """
+    Return the jsonschema ValidationError for a failed check.
+
+    :param spec: The message of the check, and the JSON pointer to its
+        keyword in the schema.
+    :type spec: tuple
+    :param instance: The value which failed the check.
+    :param path: The path to the value.
+    :type path: tuple
+    :param extras: The unexpected properties, for additionalProperties.
+    :type extras: list
+    :returns: jsonschema.exceptions.ValidationError
+
+    """
+    # jsonschema is only imported once a source is found to be invalid.
+    from jsonschema.exceptions import ValidationError
+    from .schema import load_source_schema
+
+    message, pointer = spec
+    schema_path = [
+        key.replace("~1", "/").replace("~0", "~")
+        for key in pointer.split("/")
+    ]
+    keyword = schema_path[-1]
+    schema = load_source_schema()
+    for key in schema_path[:-1]:
+        schema = schema[key]
+    if extras is None:
+        message = message.format(instance)
+    else:
+        extras = sorted(extras, key=str)
+        message = (
+            "Additional properties are not allowed ({0} {1} "
+            "unexpected)".format(
+                ", ".join(repr(extra) for extra in extras),
+                "was" if len(extras) == 1 else "were"
+            )
+        )
+    return ValidationError(
+        message, validator=keyword, path=path,
+        validator_value=schema[keyword], instance=instance, schema=schema,
+        schema_path=schema_path
+    )
+'''
+
+
+def compile_schema(schema, schema_digest):
+    """
+    Return the Python source of a module which validates instances against
+    schema.
+
+    :param schema: The schema.
+    :type schema: dict
+    :param schema_digest: The digest identifying the schema.
+    :type schema_digest: str
+    :returns: str
+    :raises: ValueError if the schema uses an unsupported keyword
+
+    """
+    compiler = _Compiler()
+    compiler.compile_function(schema, ())
+
+    parts = [HEADER.format(digest=schema_digest)]
+    for name, value in compiler.constants.items():
+        parts.append("{0} = {1}\n".format(name, _format_constant(
+            value, MAX_LINE_LENGTH - len(name) - 3
+        )))
+    for function in compiler.functions:
+        parts.append("\n\n" + "\n".join(function) + "\n")
+    parts.append(FOOTER)
+    return "\n".join([parts[0]] + ["".join(parts[1:])])
+
+
+class _Compiler(object):
+    """
+    _Compiler generates a function for each object schema, which checks a
+    value against it, and the checks of its properties which are not
+    objects themselves.
+
+    """
+
+    def __init__(self):
+        self.functions = []
+        self.constants = OrderedDict()
+        self._names = itertools.count()
+
+    def compile_function(self, schema, schema_path):
+        """
+        Generate a function which checks a value against schema, and return
+        its name. The function is passed the value, and the path to it.
+
+        :param schema: The schema.
+        :type schema: dict
+        :param schema_path: The path to the schema from the root schema.
+        :type schema_path: tuple
+        :returns: str
+
+        """
+        name = "_check_{0}".format(len(self.functions))
+        lines = ["def {0}(value, path):".format(name)]
+        self.functions.append(lines)
+        self._compile(schema, "value", (), schema_path, 1, lines)
+        if len(lines) == 1:
+            lines.append("    pass")
+        return name
+
+    def _compile(self, schema, value, path, schema_path, indent, lines):
+        """
+        Generate the checks of a value against schema.
+
+        :param schema: The schema.
+        :type schema: dict
+        :param value: The variable holding the value.
+        :type value: str
+        :param path: The Python expressions of the keys and indexes from
+            the function's value to this value.
+        :type path: tuple of str
+        :param schema_path: The path to the schema from the root schema.
+        :type schema_path: tuple
+        :param indent: The level of indentation.
+        :type indent: int
+        :param lines: The lines of the function.
+        :type lines: list of str
+
+        """
+        keywords = [
+            (keyword, keyword_value)
+            for keyword, keyword_value in schema.items()
+            if keyword not in IGNORED_KEYWORDS
+        ]
+        for keyword, _ in keywords:
+            if keyword not in SUPPORTED_KEYWORDS:
+                raise ValueError(
+                    "The {0!r} keyword, at {1}, is not supported.".format(
+                        keyword, "/".join(str(key) for key in schema_path)
+                    )
+                )
+
+        i = 0
+        while i < len(keywords):
+            keyword, _ = keywords[i]
+            guard = GUARDED_KEYWORDS.get(keyword)
+            if keyword == "type" and \
+                    _get_types(schema["type"]) == ["string"] and \
+                    "enum" in [previous for previous, _ in keywords[:i]]:
+                # Only enums of strings are supported, so a value which
+                # passed the enum check is a string, and the type check
+                # which follows it cannot fail.
+                i += 1
+                continue
+            if guard is None:
+                self._compile_keyword(
+                    schema, keyword, value, path, schema_path, indent, lines
+                )
+                i += 1
+                continue
+
+            end = i
+            while end < len(keywords) and \
+                    GUARDED_KEYWORDS.get(keywords[end][0]) == guard:
+                end += 1
+            if end < len(keywords) and keywords[end][0] == "type" and \
+                    _get_types(keywords[end][1]) == [guard]:
+                # The guarded keywords have nothing to check in values of
+                # other types, so the type check which follows them fails
+                # first, and can be made before them.
+                self._compile_keyword(
+                    schema, "type", value, path, schema_path, indent, lines
+                )
+                for keyword, _ in keywords[i:end]:
+                    self._compile_keyword(
+                        schema, keyword, value, path, schema_path, indent,
+                        lines
+                    )
+                i = end + 1
+            else:
+                lines.append(_indent(indent, "if isinstance({0}, {1}):".format(
+                    value, TYPES[guard]
+                )))
+                start = len(lines)
+                for keyword, _ in keywords[i:end]:
+                    self._compile_keyword(
+                        schema, keyword, value, path, schema_path,
+                        indent + 1, lines
+                    )
+                if len(lines) == start:
+                    lines.pop()
+                i = end
+
+    def _compile_keyword(
+            self, schema, keyword, value, path, schema_path, indent, lines
+    ):
+        """
+        Generate the check of a value against one keyword of schema. Checks
+        of keywords which only apply to a type assume the value has it.
+
+        """
+        keyword_value = schema[keyword]
+        keyword_path = schema_path + (keyword,)
+
+        if keyword == "type":
+            types = _get_types(keyword_value)
+            for json_type in types:
+                if json_type not in TYPES:
+                    raise ValueError(
+                        "The {0!r} type is not supported.".format(json_type)
+                    )
+            python_types = [TYPES[json_type] for json_type in types]
+            if len(python_types) > 1:
+                python_types = "({0})".format(", ".join(python_types))
+            else:
+                python_types = python_types[0]
+            lines.append(_indent(indent, "if not isinstance({0}, {1}):".format(
+                value, python_types
+            )))
+            self._raise(
+                "{{0!r}} is not of type {0}".format(
+                    _escape(", ".join(repr(json_type) for json_type in types))
+                ),
+                keyword_path, value, path, indent + 1, lines
+            )
+
+        elif keyword == "enum":
+            if not all(isinstance(item, str) for item in keyword_value):
+                raise ValueError("Only enums of strings are supported.")
+            lines.append(_indent(indent, "if {0} not in {1}:".format(
+                value, self._constant("ENUM", tuple(keyword_value))
+            )))
+            self._raise(
+                "{{0!r}} is not one of {0}".format(
+                    _escape(repr(keyword_value))
+                ),
+                keyword_path, value, path, indent + 1, lines
+            )
+
+        elif keyword == "required":
+            for name in keyword_value:
+                lines.append(_indent(indent, "if {0!r} not in {1}:".format(
+                    name, value
+                )))
+                self._raise(
+                    _escape("{0!r} is a required property".format(name)),
+                    keyword_path, value, path, indent + 1, lines
+                )
+
+        elif keyword == "additionalProperties":
+            if isinstance(keyword_value, dict):
+                raise ValueError(
+                    "Only boolean additionalProperties are supported."
+                )
+            if keyword_value is False:
+                names = self._constant(
+                    "PROPERTIES", frozenset(schema.get("properties", {}))
+                )
+                lines.append(_indent(
+                    indent, "if not {0}.issuperset({1}):".format(names, value)
+                ))
+                self._raise(
+                    None, keyword_path, value, path, indent + 1, lines,
+                    "[key for key in {0} if key not in {1}]".format(
+                        value, names
+                    )
+                )
+
+        elif keyword == "properties":
+            for name, subschema in keyword_value.items():
+                lines.append(_indent(indent, "if {0!r} in {1}:".format(
+                    name, value
+                )))
+                start = len(lines)
+                self._compile_child(
+                    subschema, "{0}[{1!r}]".format(value, name),
+                    path + (repr(name),), keyword_path + (name,),
+                    indent + 1, lines
+                )
+                if len(lines) == start:
+                    lines.pop()
+
+        elif keyword == "items":
+            if not isinstance(keyword_value, dict):
+                raise ValueError("Only a single items schema is supported.")
+            index = "i{0}".format(next(self._names))
+            item = "item{0}".format(next(self._names))
+            lines.append(_indent(indent, "for {0}, {1} in enumerate({2}):".format(
+                index, item, value
+            )))
+            start = len(lines)
+            self._compile_child(
+                keyword_value, item, path + (index,), keyword_path,
+                indent + 1, lines
+            )
+            if len(lines) == start:
+                lines.pop()
+
+    def _compile_child(self, schema, value, path, schema_path, indent, lines):
+        """
+        Generate the checks of a property or item. Objects are checked by a
+        function of their own, and other values are checked inline.
+
+        :param value: The Python expression of the value.
+        :type value: str
+
+        """
+        if "properties" in schema:
+            name = self.compile_function(schema, schema_path)
+            lines.append(_indent(indent, "{0}({1}, {2})".format(
+                name, value, _join_path(path)
+            )))
+            return
+
+        if "[" in value:
+            variable = "value{0}".format(next(self._names))
+            lines.append(_indent(indent, "{0} = {1}".format(variable, value)))
+            start = len(lines)
+            self._compile(schema, variable, path, schema_path, indent, lines)
+            if len(lines) == start:
+                lines.pop()
+            return
+        self._compile(schema, value, path, schema_path, indent, lines)
+
+    def _raise(
+            self, message, schema_path, value, path, indent, lines,
+            extras=None
+    ):
+        """
+        Generate the statement raising the error of a failed check.
+
+        :param message: The error message, formatted with the value, or
+            None for the additionalProperties message.
+        :type message: str
+        :param schema_path: The path to the keyword from the root schema.
+        :type schema_path: tuple
+        :param extras: The Python expression of the unexpected properties.
+        :type extras: str
+
+        """
+        spec = self._constant("ERROR", (message, "/".join(
+            key.replace("~", "~0").replace("/", "~1") for key in schema_path
+        )))
+        arguments = [spec, value, _join_path(path)]
+        if extras is not None:
+            arguments.append(extras)
+        statement = "raise _error({0})".format(", ".join(arguments))
+        if len(_indent(indent, statement)) <= MAX_LINE_LENGTH:
+            lines.append(_indent(indent, statement))
+            return
+        lines.append(_indent(indent, "raise _error("))
+        for i, argument in enumerate(arguments):
+            lines.append(_indent(indent + 1, argument + (
+                "," if i < len(arguments) - 1 else ""
+            )))
+        lines.append(_indent(indent, ")"))
+
+    def _constant(self, prefix, value):
+        """
+        Return the name of a module level constant holding value.
+
+        :param prefix: The prefix of the name, such as "ENUM".
+        :type prefix: str
+        :param value: The value.
+        :returns: str
+
+        """
+        for name, constant in self.constants.items():
+            if name.startswith("_" + prefix) and constant == value:
+                return name
+        name = "_{0}_{1}".format(prefix, len(self.constants))
+        self.constants[name] = value
+        return name
+
+
+def _format_constant(value, width):
+    """
+    Return the Python expression of a constant. The names in a frozenset
+    are sorted, so the module generated does not depend on the order sets
+    happen to iterate in.
+
+    :param value: The constant.
+    :param width: The width to wrap the expression at.
+    :type width: int
+    :returns: str
+
+    """
+    if isinstance(value, frozenset):
+        return "frozenset({0})".format(
+            pprint.pformat(sorted(value), width=width - 11)
+        )
+    return pprint.pformat(value, width=width)
+
+
+def _get_types(types):
+    """
+    Return the types of a type keyword as a list.
+
+    :param types: A type, or a list of types.
+    :type types: str or list
+    :returns: list
+
+    """
+    return [types] if isinstance(types, str) else list(types)
+
+
+def _escape(string):
+    """
+    Escape the braces in string, for str.format().
+
+    :param string: The string.
+    :type string: str
+    :returns: str
+
+    """
+    return string.replace("{", "{{").replace("}", "}}")
+
+
+def _indent(indent, line):
+    """
+    Return line indented by indent levels.
+
+    :returns: str
+
+    """
+    return "    " * indent + line
+
+
+def _join_path(path):
+    """
+    Return the Python expression of a path within a function.
+
+    :param path: The expressions of the keys and indexes from the
+        function's value.
+    :type path: tuple of str
+    :returns: str
+
+    """
+    if not path:
+        return "path"
+    if len(path) == 1:
+        return "path + ({0},)".format(path[0])
+    return "path + ({0})".format(", ".join(path))
+
+
+def main():
+    """
+    Write the validator for the source schema to stdout.
+
+    """
+    sys.stdout.write(compile_schema(
+        load_source_schema(), get_source_schema_digest()
+    ))
+
+
+if __name__ == "__main__":
+    main()  # pragma: no cover
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+"""
+ptolemy.selection
+
+This module implements removing redundant rules: exact duplicates of an
+earlier rule, and selection rules which a broader, unfiltered selection
+rule with the same action already covers.
+
+A pattern covers a name if every object the name matches, the pattern also
+matches. Only the % wildcard is considered, so a pattern of the form
+``<prefix>%`` covers every name which starts with <prefix>, including
+other patterns.
+
+"""
+
+from collections import defaultdict
+import hashlib
+import json
+
+from .optimise import get_covering_patterns, record_removal
+
+
+def remove_redundant_rules(get_rules, removals):
+    """
+    Yield the rules returned by get_rules, without redundant rules.
+
+    The unfiltered selection rules are indexed by action, schema and table
+    on a first pass over the rules, so each rule can be checked against the
+    patterns which could cover it in time proportional to the length of its
+    names, rather than against every other rule.
+
+    :param get_rules: A function returning a fresh iterator of rules, which
+        records removals in the list it is given, if any.
+    :type get_rules: function
+    :param removals: A list to record removed rules in, if any.
+    :type removals: list
+    :returns: iterator of dict
+
+    """
+    index = _index_covering_rules(get_rules(None))
+    seen = set()
+
+    for position, rule in enumerate(get_rules(removals)):
+        digest = hashlib.sha1(
+            json.dumps(rule.to_dict(), sort_keys=True).encode("utf-8")
+        ).digest()
+        if digest in seen:
+            record_removal(removals, rule, "duplicate of an earlier rule")
+            continue
+        seen.add(digest)
+
+        covering_locator = _find_covering_locator(index, position, rule)
+        if covering_locator is not None:
+            record_removal(
+                removals, rule,
+                "covered by the rule for {0}.{1}".format(*covering_locator)
+            )
+            continue
+
+        yield rule
+
+
+def _is_unfiltered_selection_rule(rule):
+    """
+    Return whether rule is a selection rule without filters, which selects
+    every row of the tables it matches.
+
+    :param rule: The rule.
+    :type rule: ptolemy.rule.Rule
+    :returns: bool
+
+    """
+    return rule.rule_type == "selection" and not rule.data.get("filters")
+
+
+def _index_covering_rules(rules):
+    """
+    Return an index of the unfiltered selection rules, mapping
+    (rule-action, schema) to a dict of table to the position of the first
+    rule with that locator.
+
+    :param rules: The rules.
+    :type rules: iterator of ptolemy.rule.Rule
+    :returns: dict
+
+    """
+    index = defaultdict(dict)
+    for position, rule in enumerate(rules):
+        if _is_unfiltered_selection_rule(rule):
+            schema, table = rule.names
+            tables = index[(rule.rule_action, schema)]
+            tables.setdefault(table, position)
+    return index
+
+
+def _find_covering_locator(index, position, rule):
+    """
+    Return the (schema, table) of a rule which covers rule, if there is one.
+
+    A rule with an identical locator only covers rule if it comes first, so
+    that of a set of identical rules, the first is kept.
+
+    :param index: The index of covering rules.
+    :type index: dict
+    :param position: The position of rule in the rules.
+    :type position: int
+    :param rule: The rule.
+    :type rule: ptolemy.rule.Rule
+    :returns: tuple or None
+
+    """
+    if not _is_unfiltered_selection_rule(rule):
+        return None
+
+    schema, table = rule.names
+    for schema_pattern in get_covering_patterns(schema):
+        tables = index.get((rule.rule_action, schema_pattern))
+        if not tables:
+            continue
+        for table_pattern in get_covering_patterns(table):
+            covering_position = tables.get(table_pattern)
+            if covering_position is None:
+                continue
+            if (schema_pattern, table_pattern) != (schema, table) or \
+                    covering_position < position:
+                return schema_pattern, table_pattern
+    return None
@@ -0,0 +1,499 @@
+# -*- coding: utf-8 -*-
+
+"""
+ptolemy.server
+
+This module implements ``ptolemy serve``, a long-running HTTP server which
+compiles the sources posted to it. Importing ptolemy's dependencies and
+building the source schema validator are paid for once, when the server
+starts, rather than on every compile.
+
+The server listens on a TCP port, or on a unix socket. Each request is
+handled in its own thread, and compiled either in that thread or, with more
+than one worker, in a pool of worker processes, each of which is warmed up
+as it starts. The endpoints are:
+
+POST /compile
+    Compile the YAML or JSON source in the request body, responding with
+    the mapping, or with a 400 and a JSON object holding the error.
+    Sources larger than MAX_SOURCE_BYTES are refused with a 413. The
+    ``optimise`` (which may be repeated), ``max_rules`` and ``max_bytes``
+    query parameters override the server's options. Posted sources cannot
+    include fragments, as the server does not read files on their behalf.
+
+GET /stats
+    Respond with the number of requests served, failed and in flight, the
+    throughput, and the latency of recent compiles, as JSON.
+
+"""
+
+from collections import deque
+import json
+import logging
+import os
+import socket
+import stat
+import threading
+from timeit import default_timer
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import TCPServer, ThreadingMixIn
+    from urllib.parse import parse_qs, urlparse
+except ImportError:  # pragma: no cover
+    # pylint: disable=import-error
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import TCPServer, ThreadingMixIn
+    from urlparse import parse_qs, urlparse
+
+from . import __version__
+from .batch import describe_error
+from .catalog import load_catalog
+from .exceptions import PtolemyBaseError
+from .schema import get_source_validator
+from .source import OPTIMISATIONS, compile_source
+
+
+LOGGER = logging.getLogger(__name__)
+
+# The number of recent compiles the latency percentiles are taken from.
+RECENT_LATENCIES = 1000
+
+# The largest source, in bytes, which may be posted.
+MAX_SOURCE_BYTES = 64 * 1024 * 1024
+
+# The query parameters which override the server's options, and how each is
+# parsed from its values.
+REQUEST_OPTIONS = {
+    "optimise": ("optimisations", lambda values: [
+        _parse_optimisation(value) for value in values
+    ]),
+    "max_rules": ("max_rules", lambda values: int(values[-1])),
+    "max_bytes": ("max_bytes", lambda values: int(values[-1]))
+}
+
+
+def warm_up(catalog=None):
+    """
+    Import the modules compiling needs, build the source schema validator,
+    and load the catalog, so that the first compile is as fast as the rest.
+
+    :param catalog: The path of the catalog sources are resolved against,
+        if any.
+    :type catalog: str
+    :raises: ptolemy.exceptions.InvalidFileError
+
+    """
+    # pylint: disable=unused-import,unused-variable
+    import jsonschema  # noqa: F401
+    import yaml  # noqa: F401
+
+    get_source_validator()
+    if catalog is not None:
+        load_catalog(catalog)
+
+
+def compile_request(source_string, options):
+    """
+    Compile a source posted to the server. Errors in the source are returned
+    rather than raised, so that they can be passed back from a worker
+    process.
+
+    :param source_string: The YAML or JSON source.
+    :type source_string: bytes
+    :param options: Keyword arguments to create the Source with.
+    :type options: dict
+    :returns: tuple of (mapping, error), one of which is None
+
+    """
+    from jsonschema.exceptions import ValidationError
+    import yaml
+
+    try:
+        return compile_source(source_string, **options), None
+    except (PtolemyBaseError, ValidationError, yaml.YAMLError) as error:
+        return None, describe_error(error)
+
+
+def get_request_options(options, query):
+    """
+    Return the options to compile a request with: the server's options,
+    overridden by the request's query parameters.
+
+    :param options: The server's options.
+    :type options: dict
+    :param query: The query parameters, from urlparse.parse_qs().
+    :type query: dict
+    :returns: dict
+    :raises: ValueError
+
+    """
+    request_options = dict(options)
+    for name, values in query.items():
+        if name not in REQUEST_OPTIONS:
+            raise ValueError(
+                "Unknown query parameter '{0}'.".format(name)
+            )
+        key, parse = REQUEST_OPTIONS[name]
+        request_options[key] = parse(values)
+    return request_options
+
+
+def _parse_optimisation(name):
+    """
+    Return name if it is an optimisation.
+
+    :param name: The name of the optimisation.
+    :type name: str
+    :returns: str
+    :raises: ValueError
+
+    """
+    if name not in OPTIMISATIONS:
+        raise ValueError("Unknown optimisation '{0}'.".format(name))
+    return name
+
+
+class Counters(object):
+    """
+    Counters records the requests a server has compiled, and how long they
+    took. It is shared by the threads handling requests.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = default_timer()
+        self.requests = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.output_bytes = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.latencies = deque(maxlen=RECENT_LATENCIES)
+
+    def start(self):
+        """
+        Record that a compile has started.
+
+        """
+        with self._lock:
+            self.in_flight += 1
+
+    def finish(self, seconds, failed, output_bytes=0):
+        """
+        Record that a compile has finished.
+
+        :param seconds: How long the compile took.
+        :type seconds: float
+        :param failed: Whether the source could not be compiled.
+        :type failed: bool
+        :param output_bytes: The size of the mapping.
+        :type output_bytes: int
+
+        """
+        with self._lock:
+            self.in_flight -= 1
+            self.requests += 1
+            self.failures += failed
+            self.output_bytes += output_bytes
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            self.latencies.append(seconds)
+
+    def to_dict(self):
+        """
+        Return the counters as a dict which can be serialised to JSON.
+        Latencies are in milliseconds, and the percentiles are of the most
+        recent compiles.
+
+        :returns: dict
+
+        """
+        with self._lock:
+            uptime = default_timer() - self.started
+            latencies = sorted(self.latencies)
+            mean = self.total_seconds / self.requests if self.requests else 0
+            return {
+                "requests": self.requests,
+                "failures": self.failures,
+                "in_flight": self.in_flight,
+                "output_bytes": self.output_bytes,
+                "uptime_seconds": uptime,
+                "requests_per_second": self.requests / uptime,
+                "latency_ms": {
+                    "mean": mean * 1e3,
+                    "p50": _percentile(latencies, 0.5) * 1e3,
+                    "p95": _percentile(latencies, 0.95) * 1e3,
+                    "max": self.max_seconds * 1e3
+                }
+            }
+
+
+def _percentile(values, fraction):
+    """
+    Return the value at fraction of the way through sorted values, or 0 if
+    there are none.
+
+    :param values: The sorted values.
+    :type values: list
+    :param fraction: The percentile, from 0 to 1.
+    :type fraction: float
+    :returns: float
+
+    """
+    if not values:
+        return 0
+    return values[int(round(fraction * (len(values) - 1)))]
+
+
+class CompileRequestHandler(BaseHTTPRequestHandler):
+    """
+    CompileRequestHandler handles a request to a CompileServer.
+
+    """
+
+    server_version = "ptolemy/{0}".format(__version__)
+    protocol_version = "HTTP/1.1"
+    # The headers and body are written separately, so Nagle's algorithm
+    # would hold the body back until the client acknowledged the headers.
+    disable_nagle_algorithm = True
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """
+        Respond with the server's counters.
+
+        """
+        if urlparse(self.path).path != "/stats":
+            self._send_error(404, "Not found.")
+            return
+        self._send(200, json.dumps(self.server.counters.to_dict()))
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """
+        Compile the source in the request body.
+
+        """
+        url = urlparse(self.path)
+        if url.path != "/compile":
+            self._send_error(404, "Not found.")
+            return
+        # The body is not read when the request is refused, so the
+        # connection is closed rather than reading the body as the next
+        # request.
+        if "Content-Length" not in self.headers:
+            self.close_connection = True
+            self._send_error(411, "A Content-Length is required.")
+            return
+        try:
+            length = int(self.headers["Content-Length"])
+            if length < 0:
+                raise ValueError(
+                    "The Content-Length must not be negative, not {0}.".format(
+                        length
+                    )
+                )
+            options = get_request_options(
+                self.server.options, parse_qs(url.query)
+            )
+        except ValueError as error:
+            self.close_connection = True
+            self._send_error(400, str(error))
+            return
+        if length > MAX_SOURCE_BYTES:
+            self.close_connection = True
+            self._send_error(
+                413, "The source is larger than the limit of {0} "
+                "bytes.".format(MAX_SOURCE_BYTES)
+            )
+            return
+        source_string = self.rfile.read(length)
+
+        counters = self.server.counters
+        counters.start()
+        start = default_timer()
+        status = 400
+        try:
+            mapping, error = self.server.compile(source_string, options)
+        except Exception as exception:  # pylint: disable=broad-except
+            LOGGER.exception(exception)
+            mapping, error, status = None, "Internal server error.", 500
+        counters.finish(
+            default_timer() - start, mapping is None,
+            0 if mapping is None else len(mapping)
+        )
+
+        if error is not None:
+            self._send_error(status, error)
+        else:
+            self._send(200, mapping + "\n")
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        # Unix socket clients have no address, so only the message is
+        # logged.
+        LOGGER.debug(format, *args)
+
+    def _send_error(self, status, message):
+        """
+        Respond with status and a JSON object holding message.
+
+        """
+        self._send(status, json.dumps({"error": message}))
+
+    def _send(self, status, body):
+        """
+        Respond with status and a JSON body.
+
+        """
+        body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class UnixCompileRequestHandler(CompileRequestHandler):
+    """
+    UnixCompileRequestHandler handles a request to a UnixCompileServer.
+    Unix sockets do not use Nagle's algorithm.
+
+    """
+
+    disable_nagle_algorithm = False
+
+
+class CompileServer(ThreadingMixIn, HTTPServer):
+    """
+    CompileServer compiles the sources posted to it over TCP.
+
+    :param address: The host and port to listen on.
+    :type address: tuple of (str, int)
+    :param options: Keyword arguments to create each Source with.
+    :type options: dict
+    :param pool: The pool of worker processes to compile in, if any.
+    :type pool: multiprocessing.Pool
+
+    """
+
+    daemon_threads = True
+    request_handler_class = CompileRequestHandler
+
+    def __init__(self, address, options=None, pool=None):
+        HTTPServer.__init__(self, address, self.request_handler_class)
+        self.options = options or {}
+        self.pool = pool
+        self.counters = Counters()
+
+    @property
+    def url(self):
+        """
+        The URL the server is listening on.
+
+        :returns: str
+
+        """
+        host, port = self.server_address[:2]
+        return "http://{0}:{1}".format(host, port)
+
+    def compile(self, source_string, options):
+        """
+        Compile a source, in the pool if there is one. See
+        compile_request().
+
+        """
+        if self.pool is None:
+            return compile_request(source_string, options)
+        return self.pool.apply(compile_request, (source_string, options))
+
+    def server_close(self):
+        HTTPServer.server_close(self)
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+
+
+class UnixCompileServer(CompileServer):
+    """
+    UnixCompileServer compiles the sources posted to it over a unix socket.
+    A socket left behind at the path by an earlier server is replaced.
+
+    :param address: The path of the socket.
+    :type address: str
+
+    """
+
+    address_family = getattr(socket, "AF_UNIX", None)
+    request_handler_class = UnixCompileRequestHandler
+
+    def server_bind(self):
+        # HTTPServer.server_bind() looks up the host and port, which a unix
+        # socket has neither of.
+        if _is_socket(self.server_address):
+            os.unlink(self.server_address)
+        TCPServer.server_bind(self)
+        self.server_name = "localhost"
+        self.server_port = 0
+
+    @property
+    def url(self):
+        return "unix:{0}".format(self.server_address)
+
+    def server_close(self):
+        CompileServer.server_close(self)
+        if _is_socket(self.server_address):
+            os.unlink(self.server_address)
+
+
+def _is_socket(path):
+    """
+    Return whether path is a unix socket.
+
+    """
+    try:
+        return stat.S_ISSOCK(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+
+def start_server(address, options=None, workers=1):
+    """
+    Warm up, and return a server listening on address. Call serve_forever()
+    to handle requests, and server_close() to stop.
+
+    :param address: The host and port to listen on, or the path of a unix
+        socket.
+    :type address: tuple of (str, int), or str
+    :param options: Keyword arguments to create each Source with.
+    :type options: dict
+    :param workers: The number of worker processes to compile in. 1
+        compiles in the server process, 0 uses one worker per CPU.
+    :type workers: int
+    :returns: ptolemy.server.CompileServer
+    :raises: ptolemy.exceptions.InvalidFileError
+    :raises: socket.error
+
+    """
+    import multiprocessing
+
+    options = dict(options or {}, allow_includes=False)
+    catalog = options.get("catalog")
+    warm_up(catalog)
+
+    if workers == 0:
+        workers = multiprocessing.cpu_count()
+    pool = None
+    if workers > 1:
+        pool = multiprocessing.Pool(workers, warm_up, (catalog,))
+
+    server_class = CompileServer
+    if not isinstance(address, tuple):
+        server_class = UnixCompileServer
+    try:
+        return server_class(address, options, pool)
+    except Exception:
+        if pool is not None:
+            pool.terminate()
+        raise
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+
+"""
+ptolemy.shard
+
+This module implements splitting the rules of a mapping into several
+self-contained mappings, so a migration can be run as several DMS tasks in
+parallel.
+
+The include selection rules are split between the shards, keeping the rules
+for the same schema and table together, along with the rules for any tables
+a pattern could also match, so that no table is migrated by two tasks. The
+shards are balanced by the number of tables or by weights, such as row
+counts, read from a stats file. Every other rule is copied into each shard
+containing a table it could apply to.
+
+"""
+
+from collections import defaultdict, OrderedDict
+import csv
+import heapq
+import io
+import json
+import os
+
+from .exceptions import InvalidFileError, ShardingError
+from .patterns import compile_pattern, is_pattern, patterns_overlap
+
+
+def load_weights(stats_file_path, column):
+    """
+    Load table weights from a CSV or JSON stats file. A CSV file has a
+    header row, and a JSON file holds a list of objects. Either has a
+    "schema", a "table" and a weight column for each table.
+
+    :param stats_file_path: The path of the stats file.
+    :type stats_file_path: str
+    :param column: The name of the weight column, such as "rows".
+    :type column: str
+    :returns: dict mapping (schema, table) to a weight
+    :raises: ptolemy.exceptions.InvalidFileError
+
+    """
+    try:
+        with io.open(stats_file_path, "r", encoding="utf-8") as stats_file:
+            if os.path.splitext(stats_file_path)[1].lower() == ".json":
+                rows = json.load(stats_file)
+            else:
+                rows = list(csv.DictReader(stats_file))
+        return {
+            (row["schema"], row["table"]): float(row[column])
+            for row in rows
+        }
+    except EnvironmentError as error:
+        raise InvalidFileError(
+            "The stats file '{0}' could not be read. {1}".format(
+                stats_file_path, error
+            )
+        )
+    except (KeyError, TypeError, ValueError) as error:
+        raise InvalidFileError(
+            "The stats file '{0}' must have schema, table and {1} values for "
+            "each table. {2!r}".format(stats_file_path, column, error)
+        )
+
+
+def shard_rules(rules, shard_count, weights=None):
+    """
+    Split rules into at most shard_count lists of rules. There are fewer
+    shards if there are fewer groups of overlapping tables than
+    shard_count. The rules in each shard are in their original order.
+    Rules copied into several shards are shared between them, which is safe
+    as rules are only turned into dicts, and numbered, as each shard is
+    serialised.
+
+    :param rules: The un-numbered rules.
+    :type rules: iterable of ptolemy.rule.Rule
+    :param shard_count: The number of shards, at least 1.
+    :type shard_count: int
+    :param weights: Table weights from load_weights(). Without weights,
+        each table weighs 1.
+    :type weights: dict
+    :returns: list of lists of ptolemy.rule.Rule
+    :raises: ptolemy.exceptions.ShardingError if there are no include
+        selection rules to split between the shards
+    :raises: ValueError if shard_count is less than 1
+
+    """
+    if shard_count < 1:
+        raise ValueError(
+            "The number of shards must be at least 1, not {0}.".format(
+                shard_count
+            )
+        )
+    rules = list(rules)
+
+    # The include rules for each schema and table, which must stay together.
+    tables = OrderedDict()
+    other_positions = []
+    for position, rule in enumerate(rules):
+        if rule.rule_type == "selection" and rule.rule_action == "include":
+            tables.setdefault(rule.names, []).append(position)
+        else:
+            other_positions.append(position)
+    if not tables:
+        raise ShardingError(
+            "The source has no include selection rules to split into shards."
+        )
+
+    shard_tables = _balance(
+        _group_overlapping_tables(tables), shard_count, weights
+    )
+
+    shards = []
+    for keys in shard_tables:
+        positions = [
+            position for key in keys for position in tables[key]
+        ]
+        index = _index_tables(keys)
+        positions.extend(
+            position for position in other_positions
+            if _applies_to_any(rules[position], index)
+        )
+        shards.append([rules[position] for position in sorted(positions)])
+    return shards
+
+
+def _get_weight(key, weights):
+    """
+    Return the weight of a table. A pattern weighs the sum of the tables it
+    matches. Tables missing from the weights weigh 1.
+
+    :param key: The (schema, table) of the table or pattern.
+    :type key: tuple
+    :param weights: Table weights, if any.
+    :type weights: dict
+    :returns: float
+
+    """
+    if weights is None:
+        return 1
+    if not is_pattern(key[0]) and not is_pattern(key[1]):
+        return weights.get(key, 1)
+
+    schema_pattern = compile_pattern(key[0])
+    table_pattern = compile_pattern(key[1])
+    return sum(
+        weight for (schema, table), weight in weights.items()
+        if schema_pattern.match(schema) and table_pattern.match(table)
+    ) or 1
+
+
+def _group_overlapping_tables(tables):
+    """
+    Return the tables in groups which must be in the same shard, as a
+    pattern in one could match a table in another, in the order of their
+    first tables. Only patterns are compared with other tables, as distinct
+    names never match the same table.
+
+    :param tables: The (schema, table) of each table, in their original
+        order.
+    :type tables: iterable of tuple
+    :returns: list of lists of (schema, table)
+
+    """
+    keys = list(tables)
+    parents = {key: key for key in keys}
+
+    def find(key):
+        while parents[key] != key:
+            parents[key] = parents[parents[key]]
+            key = parents[key]
+        return key
+
+    index = _index_tables(keys)
+    for key in keys:
+        if not is_pattern(key[0]) and not is_pattern(key[1]):
+            continue
+        if is_pattern(key[0]):
+            candidates = [other for others in index.values()
+                          for other in others]
+        else:
+            candidates = index.get(key[0], []) + index.get(None, [])
+        for other in candidates:
+            if other != key and patterns_overlap(key[0], other[0]) and \
+                    patterns_overlap(key[1], other[1]):
+                parents[find(other)] = find(key)
+
+    groups = OrderedDict()
+    for key in keys:
+        groups.setdefault(find(key), []).append(key)
+    return list(groups.values())
+
+
+def _balance(groups, shard_count, weights):
+    """
+    Split the groups of tables into shards of similar total weight, by
+    assigning the heaviest remaining group to the lightest shard. A group
+    weighs the sum of its tables.
+
+    :param groups: The groups of tables, from _group_overlapping_tables().
+    :type groups: list of lists of (schema, table)
+    :param shard_count: The number of shards.
+    :type shard_count: int
+    :param weights: Table weights, if any.
+    :type weights: dict
+    :returns: list of lists of (schema, table)
+
+    """
+    group_weights = [
+        sum(_get_weight(key, weights) for key in group) for group in groups
+    ]
+    by_weight = sorted(
+        range(len(groups)), key=lambda i: (-group_weights[i], i)
+    )
+
+    shard_count = min(shard_count, len(groups))
+    shards = [[] for _ in range(shard_count)]
+    heap = [(0, i) for i in range(shard_count)]
+    for group in by_weight:
+        total, i = heapq.heappop(heap)
+        shards[i].extend(groups[group])
+        heapq.heappush(heap, (total + group_weights[group], i))
+    return shards
+
+
+def _index_tables(keys):
+    """
+    Return the tables of a shard, indexed by schema. Tables whose schema is
+    a pattern are indexed under None.
+
+    :param keys: The (schema, table) of each table in the shard.
+    :type keys: list
+    :returns: dict
+
+    """
+    index = defaultdict(list)
+    for schema, table in keys:
+        index[None if is_pattern(schema) else schema].append((schema, table))
+    return index
+
+
+def _applies_to_any(rule, index):
+    """
+    Return whether rule could apply to any of the tables in index.
+
+    :param rule: An exclude selection rule, or a transformation rule.
+    :type rule: ptolemy.rule.Rule
+    :param index: The shard's tables, from _index_tables().
+    :type index: dict
+    :returns: bool
+
+    """
+    schema_pattern = rule.locate("schema-name")
+    table_pattern = rule.locate("table-name", "%")
+
+    if is_pattern(schema_pattern):
+        candidates = [key for keys in index.values() for key in keys]
+    else:
+        candidates = index.get(schema_pattern, []) + index.get(None, [])
+
+    return any(
+        patterns_overlap(schema_pattern, schema) and
+        patterns_overlap(table_pattern, table)
+        for schema, table in candidates
+    )
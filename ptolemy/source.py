@@ -7,14 +7,40 @@ This module implements the source functionality.
 
 """
 
+from collections import OrderedDict
+from itertools import product
+import io
 import logging
 import os
 
-from jsonschema import validate
-import yaml
-
+from .catalog import load_catalog
 from .exceptions import InvalidFileError
+from .filters import optimise_filters
+from .ids import RuleIds, load_rule_ids
+from .include import (
+    file_has_references, has_references, resolve_references
+)
+from .loader import load_source
 from .mapping import Mapping
+from .optimise import apply_optimisations
+from .parallel import write_mapping
+from .plan import Plan
+from .rule import expand_item, get_location_names
+from .schema import validate, validate_item
+from .selection import remove_redundant_rules
+from .shard import shard_rules
+from .stats import NULL_STATS
+from .stream import SourceStream
+from .transformation import remove_redundant_transformations
+
+
+# The optimisations which can be applied to the rules, in the order they are
+# applied.
+OPTIMISATIONS = OrderedDict([
+    ("filters", optimise_filters),
+    ("selection", remove_redundant_rules),
+    ("transformations", remove_redundant_transformations)
+])
 
 
 class Source(object):  # pylint: disable=too-few-public-methods
@@ -22,40 +48,331 @@ class Source(object):  # pylint: disable=too-few-public-methods
     Source reads in the source file, and implements the functionality to
     compile it to a DMS Mapping Table.
 
-    :param source_file_path: Path to the source file.
+    :param source_file_path: Path to the source file, relative to the
+        current directory. Sources compiled from memory, with
+        compile_string(), need no path.
     :type source_file_path: str
+    :param max_rules: The most rules the source may expand to, if limited.
+    :type max_rules: int
+    :param max_bytes: The largest mapping, in bytes, the source may compile
+        to, if limited.
+    :type max_bytes: int
+    :param optimisations: The names of the optimisations to apply, from
+        OPTIMISATIONS. Rules they remove are recorded in Source.removals,
+        as are rules they keep but flag.
+    :type optimisations: list
+    :param catalog: The path of a catalog to resolve the wildcards in
+        selection rules against, if any. The tables each pattern resolves to
+        are recorded in Source.resolutions.
+    :type catalog: str
+    :param keep_wildcards: Whether to keep the wildcards in selection rules,
+        only recording the tables they resolve to against the catalog.
+    :type keep_wildcards: bool
+    :param stats: Statistics to record the time of each phase, the rules
+        and the size of the mapping in, if any.
+    :type stats: ptolemy.stats.Stats
+    :param json_format: The format to write the mapping in. Defaults to
+        ptolemy.mapping.DEFAULT_FORMAT.
+    :type json_format: ptolemy.mapping.JSONFormat
+    :param expansion_cache: A cache of the rules each item expanded to
+        when the source was last compiled, to reuse for the items which
+        have not changed, if any.
+    :type expansion_cache: ptolemy.rule.ExpansionCache
+    :param rule_ids: The scheme to assign rule IDs by, from
+        ptolemy.ids.RULE_ID_SCHEMES: "position" numbers the rules from 1,
+        and "content" derives each rule's ID from its content, so it does
+        not change as other rules are added or removed.
+    :type rule_ids: str
+    :param previous_mapping: The path of a mapping previously compiled
+        from the source, if any. Rules which are unchanged from it keep
+        their IDs, and other rules are given IDs it does not use.
+    :type previous_mapping: str
+    :param allow_includes: Whether the source may include fragments with
+        $ref. The fragments a source includes are recorded in
+        Source.includes.
+    :type allow_includes: bool
+    :param streaming: Whether to read the source file as a stream when
+        writing its mapping, validating and expanding each item as soon as
+        it has been read, so that the whole source is never held in memory.
+        Streamed sources cannot be checked against max_rules or max_bytes,
+        which need the whole source, and errors in the source may only be
+        found once part of the mapping has been written.
+    :type streaming: bool
+    :param jobs: The number of worker processes to expand and serialise
+        the rules across when writing the mapping, with write(). 0 uses one
+        per CPU. The mapping is identical to the mapping a single process
+        writes. Rules which are optimised, or numbered other than by their
+        position, depend on the rules before them, so they are always
+        expanded by a single process, as are rules reused from an expansion
+        cache.
+    :type jobs: int
+    :raises: ValueError if a streamed source has limits
 
     """
 
-    def __init__(self, source_file_path):
+    def __init__(
+            self, source_file_path=None, max_rules=None, max_bytes=None,
+            optimisations=None, catalog=None, keep_wildcards=False,
+            stats=None, json_format=None, expansion_cache=None,
+            rule_ids="position", previous_mapping=None, allow_includes=True,
+            streaming=False, jobs=1
+    ):
         self.logger = logging.getLogger(__name__)
-        self.file_path = os.path.join(os.getcwd(), source_file_path)
+        self.file_path = None
+        if source_file_path is not None:
+            self.file_path = os.path.join(os.getcwd(), source_file_path)
+        self.max_rules = max_rules
+        self.max_bytes = max_bytes
+        self.optimisations = optimisations or []
+        self.catalog = catalog
+        self.keep_wildcards = keep_wildcards
+        self.stats = NULL_STATS if stats is None else stats
+        self.json_format = json_format
+        self.expansion_cache = expansion_cache
+        self.rule_ids = rule_ids
+        self.previous_mapping = previous_mapping
+        self._previous_rule_ids = None
+        self.allow_includes = allow_includes
+        self.streaming = streaming
+        self.jobs = jobs
+        if streaming and (max_rules is not None or max_bytes is not None):
+            raise ValueError(
+                "Streamed sources cannot be checked against max_rules or "
+                "max_bytes."
+            )
+        self._streamed_string = None
+        self.includes = []
+        self.removals = []
+        self.resolutions = []
         self.source = None
 
     def compile(self):
         """
         Compiles the source file to a valid DMS Mapping Table document.
 
-        :param source_file_path: The path to the YAML source.
-        :type source_file_path: str
         :returns: str
         :raises: ptolemy.exceptions.InvalidFileError
 
         """
+        return self.compile_string(self.read())
+
+    def read(self):
+        """
+        Return the raw contents of the source file.
+
+        :returns: bytes
+        :raises: ptolemy.exceptions.InvalidFileError
+
+        """
+        with self.stats.phase("read"):
+            with self._open() as source_file:
+                return source_file.read()
+
+    def _open(self):
+        """
+        Open the source file.
+
+        :returns: file
+        :raises: ptolemy.exceptions.InvalidFileError
+
+        """
+        if self.file_path is None:
+            raise InvalidFileError("No source file was supplied.")
         if not os.path.isfile(self.file_path):
             raise InvalidFileError(
                 "The supplied source file '{0}' does not exist.".format(
                     self.file_path
                 )
             )
+        return open(self.file_path, "rb")
+
+    def compile_string(self, source_string):
+        """
+        Compiles the contents of a source file, or an already parsed source,
+        to a valid DMS Mapping Table document.
 
-        with open(self.file_path, "r") as source_file:
-            self.source = yaml.safe_load(source_file)
+        :param source_string: The YAML or JSON source, or the parsed source.
+        :type source_string: str, bytes or dict
+        :returns: str
 
-        self._validate()
+        """
+        self._load(source_string)
 
         return self._generate_mapping().to_json()
 
+    def write(self, stream, source_string=None):
+        """
+        Compiles the source file, writing the DMS Mapping Table document to
+        stream. Rules are expanded, numbered and written one at a time, so
+        memory use does not grow with the number of rules. Streamed sources
+        are read an item at a time too, so memory use does not grow with the
+        size of the source either.
+
+        :param stream: A file-like object to write to.
+        :type stream: file
+        :param source_string: The YAML or JSON source, if it has already
+            been read.
+        :type source_string: str or bytes
+        :raises: ptolemy.exceptions.InvalidFileError
+
+        """
+        self._prepare(source_string)
+
+        if self._expands_in_parallel():
+            write_mapping(
+                stream, self._iter_items(), self.jobs, self.json_format,
+                self.stats
+            )
+            return
+
+        mapping = Mapping(
+            self.stats, self.json_format,
+            self._get_rule_ids(self._iter_rules_again())
+        )
+        mapping.mapping["rules"] = self._iter_rules()
+        mapping.write(stream)
+
+    def compile_shards(self, shard_count, weights=None, source_string=None):
+        """
+        Compiles the source file to several self-contained DMS Mapping Table
+        documents, each numbered from 1. See ptolemy.shard.shard_rules().
+
+        :param shard_count: The number of mappings to split the rules into.
+        :type shard_count: int
+        :param weights: Table weights, from ptolemy.shard.load_weights().
+        :type weights: dict
+        :param source_string: The YAML or JSON source, if it has already
+            been read.
+        :type source_string: str or bytes
+        :returns: list of str
+        :raises: ptolemy.exceptions.InvalidFileError
+        :raises: ptolemy.exceptions.ShardingError
+
+        """
+        self._prepare(source_string)
+
+        mapping_tables = []
+        for rules in shard_rules(self._iter_rules(), shard_count, weights):
+            mapping = Mapping(
+                self.stats, self.json_format, self._get_rule_ids(rules)
+            )
+            mapping.mapping["rules"] = rules
+            mapping_tables.append(mapping.to_json())
+        return mapping_tables
+
+    def plan(self, source_string=None):
+        """
+        Works out how many rules the source file expands to, and how large
+        its mapping is, without expanding it.
+
+        :param source_string: The YAML or JSON source, if it has already
+            been read.
+        :type source_string: str or bytes
+        :returns: ptolemy.plan.Plan
+        :raises: ptolemy.exceptions.InvalidFileError
+
+        """
+        if source_string is None:
+            source_string = self.read()
+        self._parse(source_string)
+
+        return Plan(self.source, self.json_format, self.rule_ids)
+
+    def get_includes(self, source_string=None):
+        """
+        Return the paths of the fragments the source includes, parsing it
+        only if it may include any.
+
+        :param source_string: The YAML or JSON source, if it has already
+            been read.
+        :type source_string: str or bytes
+        :returns: list of str
+        :raises: ptolemy.exceptions.InvalidFileError
+
+        """
+        if source_string is None:
+            source_string = self.read()
+        if not has_references(source_string):
+            return []
+
+        with self.stats.phase("parse"):
+            source = load_source(source_string, self.file_path)
+        with self.stats.phase("include"):
+            _, self.includes = resolve_references(
+                source, self.file_path, self.allow_includes
+            )
+        return self.includes
+
+    def _prepare(self, source_string=None):
+        """
+        Loads the source, ready to expand it, unless it is streamed, when it
+        is left to be read as it is expanded.
+
+        :param source_string: The YAML or JSON source, if it has already
+            been read.
+        :type source_string: str or bytes
+        :raises: jsonschema.exceptions.ValidationError
+        :raises: ptolemy.exceptions.InvalidFileError
+        :raises: ptolemy.exceptions.MappingTooLargeError
+
+        """
+        if self.streaming:
+            self._streamed_string = source_string
+            return
+        if source_string is None:
+            source_string = self.read()
+        self._load(source_string)
+
+    def _load(self, source_string):
+        """
+        Loads and validates the source, and checks it is within the limits
+        before it is expanded.
+
+        :param source_string: The YAML or JSON source.
+        :type source_string: str or bytes
+        :raises: jsonschema.exceptions.ValidationError
+        :raises: ptolemy.exceptions.InvalidFileError
+        :raises: ptolemy.exceptions.MappingTooLargeError
+
+        """
+        self._parse(source_string)
+
+        if self.max_rules is not None or self.max_bytes is not None:
+            with self.stats.phase("check"):
+                Plan(self.source, self.json_format, self.rule_ids).check(
+                    self.max_rules, self.max_bytes
+                )
+
+    def _parse(self, source_string):
+        """
+        Parses the source, replacing the references to fragments within it,
+        validates it, and resolves it against the catalog. A source which
+        has already been parsed is not parsed again.
+
+        :param source_string: The YAML or JSON source, or the parsed source.
+        :type source_string: str, bytes or dict
+        :raises: jsonschema.exceptions.ValidationError
+        :raises: ptolemy.exceptions.InvalidFileError
+
+        """
+        if isinstance(source_string, dict):
+            self.source = source_string
+        else:
+            with self.stats.phase("parse"):
+                self.source = load_source(source_string, self.file_path)
+
+        # Sources are only searched for references if they may hold one.
+        if isinstance(source_string, dict) or has_references(source_string):
+            with self.stats.phase("include"):
+                self.source, self.includes = resolve_references(
+                    self.source, self.file_path, self.allow_includes
+                )
+
+        with self.stats.phase("validate"):
+            self._validate()
+
+        self._resolve()
+
     def _validate(self):
         """
         Checks the user-defined source is correctly formatted.
@@ -63,13 +380,24 @@ class Source(object):  # pylint: disable=too-few-public-methods
         :raises: jsonschema.exceptions.ValidationError
 
         """
-        source_schema_file_path = os.path.join(
-            os.path.dirname(__file__), "data", "source-schema.yaml"
-        )
-        with open(source_schema_file_path, "r") as source_schema_file:
-            source_schema = yaml.safe_load(source_schema_file)
+        validate(self.source)
+
+    def _resolve(self):
+        """
+        Resolves the wildcards in the selection rules against the catalog,
+        if there is one.
+
+        :raises: ptolemy.exceptions.InvalidFileError
 
-        validate(self.source, source_schema)
+        """
+        if self.catalog is None:
+            return
+
+        with self.stats.phase("resolve"):
+            catalog = load_catalog(self.catalog)
+            self.source, self.resolutions = catalog.resolve(
+                self.source, self.keep_wildcards
+            )
 
     def _generate_mapping(self):
         """
@@ -80,40 +408,215 @@ class Source(object):  # pylint: disable=too-few-public-methods
         :returns: list
 
         """
-        mapping = Mapping()
         rules = self._get_rules()
+        mapping = Mapping(
+            self.stats, self.json_format, self._get_rule_ids(rules)
+        )
         mapping.mapping["rules"] = rules
         return mapping
 
+    def _expands_in_parallel(self):
+        """
+        Return whether the rules are to be expanded across worker processes.
+
+        :returns: bool
+
+        """
+        return (
+            self.jobs != 1 and not self.optimisations and
+            self.rule_ids == "position" and self.previous_mapping is None and
+            self.expansion_cache is None
+        )
+
+    def _get_rule_ids(self, rules):
+        """
+        Return the RuleIds to assign the IDs of a mapping's rules, or None
+        if they are numbered by their position alone.
+
+        :param rules: The rules of the mapping, read to prepare their
+            content IDs. See ptolemy.ids.RuleIds.prepare().
+        :type rules: iterable of ptolemy.rule.Rule
+        :returns: ptolemy.ids.RuleIds
+        :raises: ptolemy.exceptions.InvalidFileError
+
+        """
+        if self.previous_mapping is None:
+            if self.rule_ids == "position":
+                return None
+        elif self._previous_rule_ids is None:
+            self._previous_rule_ids = load_rule_ids(self.previous_mapping)
+        rule_ids = RuleIds(self.rule_ids, self._previous_rule_ids)
+        rule_ids.prepare(rules)
+        return rule_ids
+
     def _get_rules(self):
         """
         Return a list of un-numbered, unnamed DMS rules.
 
-        :returns: list
+        :returns: list of ptolemy.rule.Rule
+
+        """
+        return list(self._iter_rules())
+
+    def _iter_rules(self):
+        """
+        Return an iterator of un-numbered, unnamed DMS rules, with any
+        optimisations applied.
+
+        :returns: iterator of ptolemy.rule.Rule
+
+        """
+        def expand_rules():
+            return self.stats.iterate("expand", self._expand_rules())
+
+        if not self.optimisations:
+            return self.stats.count_rules(expand_rules())
+
+        self.removals = []
+        rules = apply_optimisations(
+            expand_rules, self._get_optimisations(), self.removals
+        )
+        return self.stats.count_rules(self.stats.iterate("optimise", rules))
+
+    def _iter_rules_again(self):
+        """
+        Yield the rules _iter_rules() returns, expanding the source again
+        without counting the rules, recording the removals or using the
+        expansion cache. Nothing is expanded until the first rule is read.
+
+        :returns: iterator of ptolemy.rule.Rule
+
+        """
+        def expand_rules():
+            return self._expand_rules(use_cache=False)
+
+        if self.optimisations:
+            rules = apply_optimisations(
+                expand_rules, self._get_optimisations(), []
+            )
+        else:
+            rules = expand_rules()
+        for rule in rules:
+            yield rule
+
+    def _get_optimisations(self):
+        """
+        Return the optimisations to apply, in the order they are applied.
+
+        :returns: list of callable
+
+        """
+        return [
+            optimisation for name, optimisation in OPTIMISATIONS.items()
+            if name in self.optimisations
+        ]
+
+    def _expand_rules(self, use_cache=True):
+        """
+        Yield un-numbered, unnamed DMS rules, expanding each item of the
+        source as it is reached, or reusing its rules from the expansion
+        cache.
+
+        :param use_cache: Whether to use the expansion cache, if any.
+        :type use_cache: bool
+        :returns: iterator of ptolemy.rule.Rule
+
+        """
+        expand = expand_item
+        if use_cache and self.expansion_cache is not None:
+            expand = self.expansion_cache.expand
+
+        for rule_type, rule_action, data_item in self._iter_items():
+            for rule in expand(rule_type, rule_action, data_item):
+                yield rule
+
+    def _iter_items(self):
+        """
+        Yield the rule type, rule action and data of each item of the
+        source, from the loaded source, or if it has not been loaded, by
+        streaming it.
+
+        :returns: iterator of tuple of (str, str, dict)
 
         """
-        rules = []
+        if self.source is None:
+            for item in self._stream_items():
+                yield item
+            return
+
         for rule_type, rule_type_data in self.source.items():
             for rule_action, rule_action_data in rule_type_data.items():
                 for data_item in rule_action_data:
-                    object_locators = data_item["object-locators"]
+                    yield rule_type, rule_action, data_item
 
-                    object_locations = \
-                        self._get_object_locations(object_locators)
+    def _stream_items(self):
+        """
+        Yield the rule type, rule action and data of each item of the
+        source, reading it as a stream. Each item has the references to
+        fragments within it replaced, and is validated and resolved against
+        the catalog, as soon as it has been read. The rest of the source is
+        validated once every item has been read.
 
-                    for object_location in object_locations:
-                        rule = {
-                            "object-locator": object_location,
-                            "rule-action": rule_action,
-                            "rule-type": rule_type
-                        }
+        :returns: iterator of tuple of (str, str, dict)
+        :raises: jsonschema.exceptions.ValidationError
+        :raises: ptolemy.exceptions.InvalidFileError
 
-                        rule.update({
-                            k: v for k, v in data_item.items()
-                            if k != "object-locators"
-                        })
-                        rules.append(rule)
-        return rules
+        """
+        self.includes = []
+        self.resolutions = []
+        catalog = None
+        if self.catalog is not None:
+            with self.stats.phase("resolve"):
+                catalog = load_catalog(self.catalog)
+
+        def resolve(value):
+            with self.stats.phase("include"):
+                value, includes = resolve_references(
+                    value, self.file_path, self.allow_includes
+                )
+            self.includes.extend(
+                path for path in includes if path not in self.includes
+            )
+            return value
+
+        if self._streamed_string is None:
+            source_file = self._open()
+        else:
+            source_file = io.BytesIO(self._streamed_string)
+        with source_file:
+            # Sources are only searched for references if they may hold one.
+            source_stream = SourceStream(
+                source_file, self.file_path,
+                resolve if file_has_references(source_file) else None
+            )
+            items = iter(source_stream)
+            indexes = {}
+            while True:
+                with self.stats.phase("parse"):
+                    try:
+                        rule_type, rule_action, data_item = next(items)
+                    except StopIteration:
+                        break
+
+                index = indexes.get((rule_type, rule_action), 0)
+                indexes[rule_type, rule_action] = index + 1
+                with self.stats.phase("validate"):
+                    validate_item(rule_type, rule_action, index, data_item)
+
+                data_items = [data_item]
+                if catalog is not None and rule_type == "selection":
+                    with self.stats.phase("resolve"):
+                        resolved, resolutions = catalog.resolve(
+                            {rule_type: {rule_action: data_items}},
+                            self.keep_wildcards
+                        )
+                    data_items = resolved[rule_type][rule_action]
+                    self.resolutions.extend(resolutions)
+                for data_item in data_items:
+                    yield rule_type, rule_action, data_item
+
+        with self.stats.phase("validate"):
+            validate(source_stream.skeleton)
 
     @staticmethod
     def _get_object_locations(object_locators):
@@ -129,34 +632,40 @@ class Source(object):  # pylint: disable=too-few-public-methods
 
         :param object_locators: A dictionary of SQL object locators.
         :type object_locators: dict
-        :returns: dict
-
-        """
-        # Get all combinations of schema, table and column names. If any key
-        # isn't present, add None to the object_locations. This is to get the
-        # list comp working. None values are then removed.
-        object_locations = [
-            {
-                "schema-name": schema_name,
-                "table-name": table_name,
-                "column-name": column_name
-            }
-            for schema_name in object_locators.get(
-                "schema-names", [None]
-            )
-            for table_name in object_locators.get(
-                "table-names", [None]
-            )
-            for column_name in object_locators.get(
-                "column-names", [None]
-            )
-        ]
-        object_locations = [
-            {
-                k: v
-                for k, v in object_location.items()
-                if v is not None
-            }
-            for object_location in object_locations
-        ]
-        return object_locations
+        :returns: list
+
+        """
+        return list(Source._iter_object_locations(object_locators))
+
+    @staticmethod
+    def _iter_object_locations(object_locators):
+        """
+        Yield all combinations of schema, table and column names, one at a
+        time. See _get_object_locations().
+
+        :param object_locators: A dictionary of SQL object locators.
+        :type object_locators: dict
+        :returns: iterator of dict
+
+        """
+        keys, names = get_location_names(object_locators)
+        for combination in product(*names):
+            yield dict(zip(keys, combination))
+
+
+def compile_source(source, **options):
+    """
+    Compile a source held in memory to a valid DMS Mapping Table document,
+    without reading or writing any files.
+
+    :param source: The YAML or JSON source, or the parsed source.
+    :type source: str, bytes or dict
+    :param options: Keyword arguments to create the Source with, such as
+        optimisations or stats.
+    :returns: str
+    :raises: jsonschema.exceptions.ValidationError
+    :raises: ptolemy.exceptions.PtolemyBaseError
+    :raises: yaml.YAMLError
+
+    """
+    return Source(**options).compile_string(source)
@@ -0,0 +1,1557 @@
+# -*- coding: utf-8 -*-
+
+"""
+ptolemy.source_validator
+
+This module validates sources against the source schema. It is generated
+from data/source-schema.json by ptolemy.schema_compiler, and must not be
+edited by hand: run ``make schema`` to regenerate it.
+
+"""
+# flake8: noqa
+# pylint: skip-file
+
+try:
+    string_types = basestring
+except NameError:
+    string_types = str
+
+
+# The digest of the schema this module was generated from.
+SCHEMA_DIGEST = '7c7b77c407e16204ee93dc138dc4cae190ecdc18f3f5dbdce66ebb7a0a36606d'
+
+_ERROR_0 = ("{0!r} is not of type 'object'", 'type')
+_PROPERTIES_1 = frozenset(['selection', 'transformation'])
+_ERROR_2 = (None, 'additionalProperties')
+_ERROR_3 = ("{0!r} is not of type 'object'", 'properties/selection/type')
+_PROPERTIES_4 = frozenset(['exclude', 'include'])
+_ERROR_5 = (None, 'properties/selection/additionalProperties')
+_ERROR_6 = ("{0!r} is not of type 'array'",
+ 'properties/selection/properties/exclude/type')
+_ERROR_7 = ("{0!r} is not of type 'object'",
+ 'properties/selection/properties/exclude/items/type')
+_PROPERTIES_8 = frozenset(['object-locators', 'rule-name'])
+_ERROR_9 = (None,
+ 'properties/selection/properties/exclude/items/additionalProperties')
+_ERROR_10 = ("{0!r} is not of type 'object'",
+ 'properties/selection/properties/exclude/items/properties/object-locators/type')
+_PROPERTIES_11 = frozenset(['schema-names', 'table-names'])
+_ERROR_12 = (None,
+ 'properties/selection/properties/exclude/items/properties/object-locators/additionalProperties')
+_ERROR_13 = ("{0!r} is not of type 'array'",
+ 'properties/selection/properties/exclude/items/properties/object-locators/properties/schema-names/type')
+_ERROR_14 = ("{0!r} is not of type 'string'",
+ 'properties/selection/properties/exclude/items/properties/object-locators/properties/schema-names/items/type')
+_ERROR_15 = ("{0!r} is not of type 'array'",
+ 'properties/selection/properties/exclude/items/properties/object-locators/properties/table-names/type')
+_ERROR_16 = ("{0!r} is not of type 'string'",
+ 'properties/selection/properties/exclude/items/properties/object-locators/properties/table-names/items/type')
+_ERROR_17 = ("'schema-names' is a required property",
+ 'properties/selection/properties/exclude/items/properties/object-locators/required')
+_ERROR_18 = ("'table-names' is a required property",
+ 'properties/selection/properties/exclude/items/properties/object-locators/required')
+_ERROR_19 = ("{0!r} is not of type 'string'",
+ 'properties/selection/properties/exclude/items/properties/rule-name/type')
+_ERROR_20 = ("'object-locators' is a required property",
+ 'properties/selection/properties/exclude/items/required')
+_ERROR_21 = ("{0!r} is not of type 'array'",
+ 'properties/selection/properties/include/type')
+_ERROR_22 = ("{0!r} is not of type 'object'",
+ 'properties/selection/properties/include/items/type')
+_PROPERTIES_23 = frozenset(['filters', 'object-locators', 'rule-name'])
+_ERROR_24 = (None,
+ 'properties/selection/properties/include/items/additionalProperties')
+_ERROR_25 = ("{0!r} is not of type 'array'",
+ 'properties/selection/properties/include/items/properties/filters/type')
+_ERROR_26 = ("{0!r} is not of type 'object'",
+ 'properties/selection/properties/include/items/properties/filters/items/type')
+_PROPERTIES_27 = frozenset(['column-name', 'filter-conditions', 'filter-type'])
+_ERROR_28 = (None,
+ 'properties/selection/properties/include/items/properties/filters/items/additionalProperties')
+_ERROR_29 = ("{0!r} is not of type 'string'",
+ 'properties/selection/properties/include/items/properties/filters/items/properties/column-name/type')
+_ERROR_30 = ("{0!r} is not of type 'array'",
+ 'properties/selection/properties/include/items/properties/filters/items/properties/filter-conditions/type')
+_ERROR_31 = ("{0!r} is not of type 'object'",
+ 'properties/selection/properties/include/items/properties/filters/items/properties/filter-conditions/items/type')
+_PROPERTIES_32 = frozenset(['end-value',
+ 'filter-operator',
+ 'start-value',
+ 'value'])
+_ERROR_33 = (None,
+ 'properties/selection/properties/include/items/properties/filters/items/properties/filter-conditions/items/additionalProperties')
+_ERROR_34 = ("{0!r} is not of type 'string'",
+ 'properties/selection/properties/include/items/properties/filters/items/properties/filter-conditions/items/properties/end-value/type')
+_ENUM_35 = ('ste', 'gte', 'eq', 'between')
+_ERROR_36 = ("{0!r} is not one of ['ste', 'gte', 'eq', 'between']",
+ 'properties/selection/properties/include/items/properties/filters/items/properties/filter-conditions/items/properties/filter-operator/enum')
+_ERROR_37 = ("{0!r} is not of type 'string'",
+ 'properties/selection/properties/include/items/properties/filters/items/properties/filter-conditions/items/properties/start-value/type')
+_ERROR_38 = ("{0!r} is not of type 'string'",
+ 'properties/selection/properties/include/items/properties/filters/items/properties/filter-conditions/items/properties/value/type')
+_ERROR_39 = ("'filter-operator' is a required property",
+ 'properties/selection/properties/include/items/properties/filters/items/properties/filter-conditions/items/required')
+_ENUM_40 = ('source',)
+_ERROR_41 = ("{0!r} is not one of ['source']",
+ 'properties/selection/properties/include/items/properties/filters/items/properties/filter-type/enum')
+_ERROR_42 = ("'filter-type' is a required property",
+ 'properties/selection/properties/include/items/properties/filters/items/required')
+_ERROR_43 = ("'column-name' is a required property",
+ 'properties/selection/properties/include/items/properties/filters/items/required')
+_ERROR_44 = ("'filter-conditions' is a required property",
+ 'properties/selection/properties/include/items/properties/filters/items/required')
+_ERROR_45 = ("{0!r} is not of type 'object'",
+ 'properties/selection/properties/include/items/properties/object-locators/type')
+_ERROR_46 = (None,
+ 'properties/selection/properties/include/items/properties/object-locators/additionalProperties')
+_ERROR_47 = ("{0!r} is not of type 'array'",
+ 'properties/selection/properties/include/items/properties/object-locators/properties/schema-names/type')
+_ERROR_48 = ("{0!r} is not of type 'string'",
+ 'properties/selection/properties/include/items/properties/object-locators/properties/schema-names/items/type')
+_ERROR_49 = ("{0!r} is not of type 'array'",
+ 'properties/selection/properties/include/items/properties/object-locators/properties/table-names/type')
+_ERROR_50 = ("{0!r} is not of type 'string'",
+ 'properties/selection/properties/include/items/properties/object-locators/properties/table-names/items/type')
+_ERROR_51 = ("'schema-names' is a required property",
+ 'properties/selection/properties/include/items/properties/object-locators/required')
+_ERROR_52 = ("'table-names' is a required property",
+ 'properties/selection/properties/include/items/properties/object-locators/required')
+_ERROR_53 = ("{0!r} is not of type 'string'",
+ 'properties/selection/properties/include/items/properties/rule-name/type')
+_ERROR_54 = ("'object-locators' is a required property",
+ 'properties/selection/properties/include/items/required')
+_ERROR_55 = ("{0!r} is not of type 'object'", 'properties/transformation/type')
+_PROPERTIES_56 = frozenset(['add-prefix',
+ 'add-suffix',
+ 'convert-lowercase',
+ 'convert-uppercase',
+ 'remove-column',
+ 'remove-prefix',
+ 'remove-suffix',
+ 'rename',
+ 'replace-prefix',
+ 'replace-suffix'])
+_ERROR_57 = (None, 'properties/transformation/additionalProperties')
+_ERROR_58 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/add-prefix/type')
+_ERROR_59 = ("{0!r} is not of type 'object'",
+ 'properties/transformation/properties/add-prefix/items/type')
+_PROPERTIES_60 = frozenset(['object-locators',
+ 'rule-name',
+ 'rule-target',
+ 'value'])
+_ERROR_61 = (None,
+ 'properties/transformation/properties/add-prefix/items/additionalProperties')
+_ERROR_62 = ("{0!r} is not of type 'object'",
+ 'properties/transformation/properties/add-prefix/items/properties/object-locators/type')
+_PROPERTIES_63 = frozenset(['column-names', 'schema-names', 'table-names'])
+_ERROR_64 = (None,
+ 'properties/transformation/properties/add-prefix/items/properties/object-locators/additionalProperties')
+_ERROR_65 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/add-prefix/items/properties/object-locators/properties/column-names/type')
+_ERROR_66 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/add-prefix/items/properties/object-locators/properties/column-names/items/type')
+_ERROR_67 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/add-prefix/items/properties/object-locators/properties/schema-names/type')
+_ERROR_68 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/add-prefix/items/properties/object-locators/properties/schema-names/items/type')
+_ERROR_69 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/add-prefix/items/properties/object-locators/properties/table-names/type')
+_ERROR_70 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/add-prefix/items/properties/object-locators/properties/table-names/items/type')
+_ERROR_71 = ("'schema-names' is a required property",
+ 'properties/transformation/properties/add-prefix/items/properties/object-locators/required')
+_ERROR_72 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/add-prefix/items/properties/rule-name/type')
+_ENUM_73 = ('schema', 'table', 'column')
+_ERROR_74 = ("{0!r} is not one of ['schema', 'table', 'column']",
+ 'properties/transformation/properties/add-prefix/items/properties/rule-target/enum')
+_ERROR_75 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/add-prefix/items/properties/value/type')
+_ERROR_76 = ("'object-locators' is a required property",
+ 'properties/transformation/properties/add-prefix/items/required')
+_ERROR_77 = ("'rule-target' is a required property",
+ 'properties/transformation/properties/add-prefix/items/required')
+_ERROR_78 = ("'value' is a required property",
+ 'properties/transformation/properties/add-prefix/items/required')
+_ERROR_79 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/add-suffix/type')
+_ERROR_80 = ("{0!r} is not of type 'object'",
+ 'properties/transformation/properties/add-suffix/items/type')
+_ERROR_81 = (None,
+ 'properties/transformation/properties/add-suffix/items/additionalProperties')
+_ERROR_82 = ("{0!r} is not of type 'object'",
+ 'properties/transformation/properties/add-suffix/items/properties/object-locators/type')
+_ERROR_83 = (None,
+ 'properties/transformation/properties/add-suffix/items/properties/object-locators/additionalProperties')
+_ERROR_84 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/add-suffix/items/properties/object-locators/properties/column-names/type')
+_ERROR_85 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/add-suffix/items/properties/object-locators/properties/column-names/items/type')
+_ERROR_86 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/add-suffix/items/properties/object-locators/properties/schema-names/type')
+_ERROR_87 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/add-suffix/items/properties/object-locators/properties/schema-names/items/type')
+_ERROR_88 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/add-suffix/items/properties/object-locators/properties/table-names/type')
+_ERROR_89 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/add-suffix/items/properties/object-locators/properties/table-names/items/type')
+_ERROR_90 = ("'schema-names' is a required property",
+ 'properties/transformation/properties/add-suffix/items/properties/object-locators/required')
+_ERROR_91 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/add-suffix/items/properties/rule-name/type')
+_ERROR_92 = ("{0!r} is not one of ['schema', 'table', 'column']",
+ 'properties/transformation/properties/add-suffix/items/properties/rule-target/enum')
+_ERROR_93 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/add-suffix/items/properties/value/type')
+_ERROR_94 = ("'object-locators' is a required property",
+ 'properties/transformation/properties/add-suffix/items/required')
+_ERROR_95 = ("'rule-target' is a required property",
+ 'properties/transformation/properties/add-suffix/items/required')
+_ERROR_96 = ("'value' is a required property",
+ 'properties/transformation/properties/add-suffix/items/required')
+_ERROR_97 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/convert-lowercase/type')
+_ERROR_98 = ("{0!r} is not of type 'object'",
+ 'properties/transformation/properties/convert-lowercase/items/type')
+_PROPERTIES_99 = frozenset(['object-locators', 'rule-name', 'rule-target'])
+_ERROR_100 = (None,
+ 'properties/transformation/properties/convert-lowercase/items/additionalProperties')
+_ERROR_101 = ("{0!r} is not of type 'object'",
+ 'properties/transformation/properties/convert-lowercase/items/properties/object-locators/type')
+_ERROR_102 = (None,
+ 'properties/transformation/properties/convert-lowercase/items/properties/object-locators/additionalProperties')
+_ERROR_103 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/convert-lowercase/items/properties/object-locators/properties/column-names/type')
+_ERROR_104 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/convert-lowercase/items/properties/object-locators/properties/column-names/items/type')
+_ERROR_105 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/convert-lowercase/items/properties/object-locators/properties/schema-names/type')
+_ERROR_106 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/convert-lowercase/items/properties/object-locators/properties/schema-names/items/type')
+_ERROR_107 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/convert-lowercase/items/properties/object-locators/properties/table-names/type')
+_ERROR_108 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/convert-lowercase/items/properties/object-locators/properties/table-names/items/type')
+_ERROR_109 = ("'schema-names' is a required property",
+ 'properties/transformation/properties/convert-lowercase/items/properties/object-locators/required')
+_ERROR_110 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/convert-lowercase/items/properties/rule-name/type')
+_ERROR_111 = ("{0!r} is not one of ['schema', 'table', 'column']",
+ 'properties/transformation/properties/convert-lowercase/items/properties/rule-target/enum')
+_ERROR_112 = ("'object-locators' is a required property",
+ 'properties/transformation/properties/convert-lowercase/items/required')
+_ERROR_113 = ("'rule-target' is a required property",
+ 'properties/transformation/properties/convert-lowercase/items/required')
+_ERROR_114 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/convert-uppercase/type')
+_ERROR_115 = ("{0!r} is not of type 'object'",
+ 'properties/transformation/properties/convert-uppercase/items/type')
+_ERROR_116 = (None,
+ 'properties/transformation/properties/convert-uppercase/items/additionalProperties')
+_ERROR_117 = ("{0!r} is not of type 'object'",
+ 'properties/transformation/properties/convert-uppercase/items/properties/object-locators/type')
+_ERROR_118 = (None,
+ 'properties/transformation/properties/convert-uppercase/items/properties/object-locators/additionalProperties')
+_ERROR_119 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/convert-uppercase/items/properties/object-locators/properties/column-names/type')
+_ERROR_120 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/convert-uppercase/items/properties/object-locators/properties/column-names/items/type')
+_ERROR_121 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/convert-uppercase/items/properties/object-locators/properties/schema-names/type')
+_ERROR_122 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/convert-uppercase/items/properties/object-locators/properties/schema-names/items/type')
+_ERROR_123 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/convert-uppercase/items/properties/object-locators/properties/table-names/type')
+_ERROR_124 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/convert-uppercase/items/properties/object-locators/properties/table-names/items/type')
+_ERROR_125 = ("'schema-names' is a required property",
+ 'properties/transformation/properties/convert-uppercase/items/properties/object-locators/required')
+_ERROR_126 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/convert-uppercase/items/properties/rule-name/type')
+_ERROR_127 = ("{0!r} is not one of ['schema', 'table', 'column']",
+ 'properties/transformation/properties/convert-uppercase/items/properties/rule-target/enum')
+_ERROR_128 = ("'object-locators' is a required property",
+ 'properties/transformation/properties/convert-uppercase/items/required')
+_ERROR_129 = ("'rule-target' is a required property",
+ 'properties/transformation/properties/convert-uppercase/items/required')
+_ERROR_130 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/remove-column/type')
+_ERROR_131 = ("{0!r} is not of type 'object'",
+ 'properties/transformation/properties/remove-column/items/type')
+_ERROR_132 = (None,
+ 'properties/transformation/properties/remove-column/items/additionalProperties')
+_ERROR_133 = ("{0!r} is not of type 'object'",
+ 'properties/transformation/properties/remove-column/items/properties/object-locators/type')
+_ERROR_134 = (None,
+ 'properties/transformation/properties/remove-column/items/properties/object-locators/additionalProperties')
+_ERROR_135 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/remove-column/items/properties/object-locators/properties/column-names/type')
+_ERROR_136 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/remove-column/items/properties/object-locators/properties/column-names/items/type')
+_ERROR_137 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/remove-column/items/properties/object-locators/properties/schema-names/type')
+_ERROR_138 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/remove-column/items/properties/object-locators/properties/schema-names/items/type')
+_ERROR_139 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/remove-column/items/properties/object-locators/properties/table-names/type')
+_ERROR_140 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/remove-column/items/properties/object-locators/properties/table-names/items/type')
+_ERROR_141 = ("'schema-names' is a required property",
+ 'properties/transformation/properties/remove-column/items/properties/object-locators/required')
+_ERROR_142 = ("'table-names' is a required property",
+ 'properties/transformation/properties/remove-column/items/properties/object-locators/required')
+_ERROR_143 = ("'column-names' is a required property",
+ 'properties/transformation/properties/remove-column/items/properties/object-locators/required')
+_ERROR_144 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/remove-column/items/properties/rule-name/type')
+_ENUM_145 = ('column',)
+_ERROR_146 = ("{0!r} is not one of ['column']",
+ 'properties/transformation/properties/remove-column/items/properties/rule-target/enum')
+_ERROR_147 = ("'object-locators' is a required property",
+ 'properties/transformation/properties/remove-column/items/required')
+_ERROR_148 = ("'rule-target' is a required property",
+ 'properties/transformation/properties/remove-column/items/required')
+_ERROR_149 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/remove-prefix/type')
+_ERROR_150 = ("{0!r} is not of type 'object'",
+ 'properties/transformation/properties/remove-prefix/items/type')
+_ERROR_151 = (None,
+ 'properties/transformation/properties/remove-prefix/items/additionalProperties')
+_ERROR_152 = ("{0!r} is not of type 'object'",
+ 'properties/transformation/properties/remove-prefix/items/properties/object-locators/type')
+_ERROR_153 = (None,
+ 'properties/transformation/properties/remove-prefix/items/properties/object-locators/additionalProperties')
+_ERROR_154 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/remove-prefix/items/properties/object-locators/properties/column-names/type')
+_ERROR_155 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/remove-prefix/items/properties/object-locators/properties/column-names/items/type')
+_ERROR_156 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/remove-prefix/items/properties/object-locators/properties/schema-names/type')
+_ERROR_157 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/remove-prefix/items/properties/object-locators/properties/schema-names/items/type')
+_ERROR_158 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/remove-prefix/items/properties/object-locators/properties/table-names/type')
+_ERROR_159 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/remove-prefix/items/properties/object-locators/properties/table-names/items/type')
+_ERROR_160 = ("'schema-names' is a required property",
+ 'properties/transformation/properties/remove-prefix/items/properties/object-locators/required')
+_ERROR_161 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/remove-prefix/items/properties/rule-name/type')
+_ERROR_162 = ("{0!r} is not one of ['schema', 'table', 'column']",
+ 'properties/transformation/properties/remove-prefix/items/properties/rule-target/enum')
+_ERROR_163 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/remove-prefix/items/properties/value/type')
+_ERROR_164 = ("'object-locators' is a required property",
+ 'properties/transformation/properties/remove-prefix/items/required')
+_ERROR_165 = ("'rule-target' is a required property",
+ 'properties/transformation/properties/remove-prefix/items/required')
+_ERROR_166 = ("'value' is a required property",
+ 'properties/transformation/properties/remove-prefix/items/required')
+_ERROR_167 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/remove-suffix/type')
+_ERROR_168 = ("{0!r} is not of type 'object'",
+ 'properties/transformation/properties/remove-suffix/items/type')
+_ERROR_169 = (None,
+ 'properties/transformation/properties/remove-suffix/items/additionalProperties')
+_ERROR_170 = ("{0!r} is not of type 'object'",
+ 'properties/transformation/properties/remove-suffix/items/properties/object-locators/type')
+_ERROR_171 = (None,
+ 'properties/transformation/properties/remove-suffix/items/properties/object-locators/additionalProperties')
+_ERROR_172 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/remove-suffix/items/properties/object-locators/properties/column-names/type')
+_ERROR_173 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/remove-suffix/items/properties/object-locators/properties/column-names/items/type')
+_ERROR_174 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/remove-suffix/items/properties/object-locators/properties/schema-names/type')
+_ERROR_175 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/remove-suffix/items/properties/object-locators/properties/schema-names/items/type')
+_ERROR_176 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/remove-suffix/items/properties/object-locators/properties/table-names/type')
+_ERROR_177 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/remove-suffix/items/properties/object-locators/properties/table-names/items/type')
+_ERROR_178 = ("'schema-names' is a required property",
+ 'properties/transformation/properties/remove-suffix/items/properties/object-locators/required')
+_ERROR_179 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/remove-suffix/items/properties/rule-name/type')
+_ERROR_180 = ("{0!r} is not one of ['schema', 'table', 'column']",
+ 'properties/transformation/properties/remove-suffix/items/properties/rule-target/enum')
+_ERROR_181 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/remove-suffix/items/properties/value/type')
+_ERROR_182 = ("'object-locators' is a required property",
+ 'properties/transformation/properties/remove-suffix/items/required')
+_ERROR_183 = ("'rule-target' is a required property",
+ 'properties/transformation/properties/remove-suffix/items/required')
+_ERROR_184 = ("'value' is a required property",
+ 'properties/transformation/properties/remove-suffix/items/required')
+_ERROR_185 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/rename/type')
+_ERROR_186 = ("{0!r} is not of type 'object'",
+ 'properties/transformation/properties/rename/items/type')
+_ERROR_187 = (None,
+ 'properties/transformation/properties/rename/items/additionalProperties')
+_ERROR_188 = ("{0!r} is not of type 'object'",
+ 'properties/transformation/properties/rename/items/properties/object-locators/type')
+_ERROR_189 = (None,
+ 'properties/transformation/properties/rename/items/properties/object-locators/additionalProperties')
+_ERROR_190 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/rename/items/properties/object-locators/properties/column-names/type')
+_ERROR_191 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/rename/items/properties/object-locators/properties/column-names/items/type')
+_ERROR_192 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/rename/items/properties/object-locators/properties/schema-names/type')
+_ERROR_193 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/rename/items/properties/object-locators/properties/schema-names/items/type')
+_ERROR_194 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/rename/items/properties/object-locators/properties/table-names/type')
+_ERROR_195 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/rename/items/properties/object-locators/properties/table-names/items/type')
+_ERROR_196 = ("'schema-names' is a required property",
+ 'properties/transformation/properties/rename/items/properties/object-locators/required')
+_ERROR_197 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/rename/items/properties/rule-name/type')
+_ERROR_198 = ("{0!r} is not one of ['schema', 'table', 'column']",
+ 'properties/transformation/properties/rename/items/properties/rule-target/enum')
+_ERROR_199 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/rename/items/properties/value/type')
+_ERROR_200 = ("'object-locators' is a required property",
+ 'properties/transformation/properties/rename/items/required')
+_ERROR_201 = ("'rule-target' is a required property",
+ 'properties/transformation/properties/rename/items/required')
+_ERROR_202 = ("'value' is a required property",
+ 'properties/transformation/properties/rename/items/required')
+_ERROR_203 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/replace-prefix/type')
+_ERROR_204 = ("{0!r} is not of type 'object'",
+ 'properties/transformation/properties/replace-prefix/items/type')
+_PROPERTIES_205 = frozenset(['object-locators',
+ 'old-value',
+ 'rule-name',
+ 'rule-target',
+ 'value'])
+_ERROR_206 = (None,
+ 'properties/transformation/properties/replace-prefix/items/additionalProperties')
+_ERROR_207 = ("{0!r} is not of type 'object'",
+ 'properties/transformation/properties/replace-prefix/items/properties/object-locators/type')
+_ERROR_208 = (None,
+ 'properties/transformation/properties/replace-prefix/items/properties/object-locators/additionalProperties')
+_ERROR_209 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/replace-prefix/items/properties/object-locators/properties/column-names/type')
+_ERROR_210 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/replace-prefix/items/properties/object-locators/properties/column-names/items/type')
+_ERROR_211 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/replace-prefix/items/properties/object-locators/properties/schema-names/type')
+_ERROR_212 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/replace-prefix/items/properties/object-locators/properties/schema-names/items/type')
+_ERROR_213 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/replace-prefix/items/properties/object-locators/properties/table-names/type')
+_ERROR_214 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/replace-prefix/items/properties/object-locators/properties/table-names/items/type')
+_ERROR_215 = ("'schema-names' is a required property",
+ 'properties/transformation/properties/replace-prefix/items/properties/object-locators/required')
+_ERROR_216 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/replace-prefix/items/properties/old-value/type')
+_ERROR_217 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/replace-prefix/items/properties/rule-name/type')
+_ERROR_218 = ("{0!r} is not one of ['schema', 'table', 'column']",
+ 'properties/transformation/properties/replace-prefix/items/properties/rule-target/enum')
+_ERROR_219 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/replace-prefix/items/properties/value/type')
+_ERROR_220 = ("'object-locators' is a required property",
+ 'properties/transformation/properties/replace-prefix/items/required')
+_ERROR_221 = ("'rule-target' is a required property",
+ 'properties/transformation/properties/replace-prefix/items/required')
+_ERROR_222 = ("'old-value' is a required property",
+ 'properties/transformation/properties/replace-prefix/items/required')
+_ERROR_223 = ("'value' is a required property",
+ 'properties/transformation/properties/replace-prefix/items/required')
+_ERROR_224 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/replace-suffix/type')
+_ERROR_225 = ("{0!r} is not of type 'object'",
+ 'properties/transformation/properties/replace-suffix/items/type')
+_ERROR_226 = (None,
+ 'properties/transformation/properties/replace-suffix/items/additionalProperties')
+_ERROR_227 = ("{0!r} is not of type 'object'",
+ 'properties/transformation/properties/replace-suffix/items/properties/object-locators/type')
+_ERROR_228 = (None,
+ 'properties/transformation/properties/replace-suffix/items/properties/object-locators/additionalProperties')
+_ERROR_229 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/replace-suffix/items/properties/object-locators/properties/column-names/type')
+_ERROR_230 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/replace-suffix/items/properties/object-locators/properties/column-names/items/type')
+_ERROR_231 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/replace-suffix/items/properties/object-locators/properties/schema-names/type')
+_ERROR_232 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/replace-suffix/items/properties/object-locators/properties/schema-names/items/type')
+_ERROR_233 = ("{0!r} is not of type 'array'",
+ 'properties/transformation/properties/replace-suffix/items/properties/object-locators/properties/table-names/type')
+_ERROR_234 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/replace-suffix/items/properties/object-locators/properties/table-names/items/type')
+_ERROR_235 = ("'schema-names' is a required property",
+ 'properties/transformation/properties/replace-suffix/items/properties/object-locators/required')
+_ERROR_236 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/replace-suffix/items/properties/old-value/type')
+_ERROR_237 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/replace-suffix/items/properties/rule-name/type')
+_ERROR_238 = ("{0!r} is not one of ['schema', 'table', 'column']",
+ 'properties/transformation/properties/replace-suffix/items/properties/rule-target/enum')
+_ERROR_239 = ("{0!r} is not of type 'string'",
+ 'properties/transformation/properties/replace-suffix/items/properties/value/type')
+_ERROR_240 = ("'object-locators' is a required property",
+ 'properties/transformation/properties/replace-suffix/items/required')
+_ERROR_241 = ("'rule-target' is a required property",
+ 'properties/transformation/properties/replace-suffix/items/required')
+_ERROR_242 = ("'old-value' is a required property",
+ 'properties/transformation/properties/replace-suffix/items/required')
+_ERROR_243 = ("'value' is a required property",
+ 'properties/transformation/properties/replace-suffix/items/required')
+_ERROR_244 = ("'selection' is a required property", 'required')
+
+
+def _check_0(value, path):
+    if not isinstance(value, dict):
+        raise _error(_ERROR_0, value, path)
+    if not _PROPERTIES_1.issuperset(value):
+        raise _error(
+            _ERROR_2,
+            value,
+            path,
+            [key for key in value if key not in _PROPERTIES_1]
+        )
+    if 'selection' in value:
+        _check_1(value['selection'], path + ('selection',))
+    if 'transformation' in value:
+        _check_8(value['transformation'], path + ('transformation',))
+    if 'selection' not in value:
+        raise _error(_ERROR_244, value, path)
+
+
+def _check_1(value, path):
+    if not isinstance(value, dict):
+        raise _error(_ERROR_3, value, path)
+    if not _PROPERTIES_4.issuperset(value):
+        raise _error(
+            _ERROR_5,
+            value,
+            path,
+            [key for key in value if key not in _PROPERTIES_4]
+        )
+    if 'exclude' in value:
+        value0 = value['exclude']
+        if not isinstance(value0, list):
+            raise _error(_ERROR_6, value0, path + ('exclude',))
+        for i1, item2 in enumerate(value0):
+            _check_2(item2, path + ('exclude', i1))
+    if 'include' in value:
+        value10 = value['include']
+        if not isinstance(value10, list):
+            raise _error(_ERROR_21, value10, path + ('include',))
+        for i11, item12 in enumerate(value10):
+            _check_4(item12, path + ('include', i11))
+
+
+def _check_2(value, path):
+    if not isinstance(value, dict):
+        raise _error(_ERROR_7, value, path)
+    if not _PROPERTIES_8.issuperset(value):
+        raise _error(
+            _ERROR_9,
+            value,
+            path,
+            [key for key in value if key not in _PROPERTIES_8]
+        )
+    if 'object-locators' in value:
+        _check_3(value['object-locators'], path + ('object-locators',))
+    if 'rule-name' in value:
+        value9 = value['rule-name']
+        if not isinstance(value9, string_types):
+            raise _error(_ERROR_19, value9, path + ('rule-name',))
+    if 'object-locators' not in value:
+        raise _error(_ERROR_20, value, path)
+
+
+def _check_3(value, path):
+    if not isinstance(value, dict):
+        raise _error(_ERROR_10, value, path)
+    if not _PROPERTIES_11.issuperset(value):
+        raise _error(
+            _ERROR_12,
+            value,
+            path,
+            [key for key in value if key not in _PROPERTIES_11]
+        )
+    if 'schema-names' in value:
+        value3 = value['schema-names']
+        if not isinstance(value3, list):
+            raise _error(_ERROR_13, value3, path + ('schema-names',))
+        for i4, item5 in enumerate(value3):
+            if not isinstance(item5, string_types):
+                raise _error(_ERROR_14, item5, path + ('schema-names', i4))
+    if 'table-names' in value:
+        value6 = value['table-names']
+        if not isinstance(value6, list):
+            raise _error(_ERROR_15, value6, path + ('table-names',))
+        for i7, item8 in enumerate(value6):
+            if not isinstance(item8, string_types):
+                raise _error(_ERROR_16, item8, path + ('table-names', i7))
+    if 'schema-names' not in value:
+        raise _error(_ERROR_17, value, path)
+    if 'table-names' not in value:
+        raise _error(_ERROR_18, value, path)
+
+
+def _check_4(value, path):
+    if not isinstance(value, dict):
+        raise _error(_ERROR_22, value, path)
+    if not _PROPERTIES_23.issuperset(value):
+        raise _error(
+            _ERROR_24,
+            value,
+            path,
+            [key for key in value if key not in _PROPERTIES_23]
+        )
+    if 'filters' in value:
+        value13 = value['filters']
+        if not isinstance(value13, list):
+            raise _error(_ERROR_25, value13, path + ('filters',))
+        for i14, item15 in enumerate(value13):
+            _check_5(item15, path + ('filters', i14))
+    if 'object-locators' in value:
+        _check_7(value['object-locators'], path + ('object-locators',))
+    if 'rule-name' in value:
+        value31 = value['rule-name']
+        if not isinstance(value31, string_types):
+            raise _error(_ERROR_53, value31, path + ('rule-name',))
+    if 'object-locators' not in value:
+        raise _error(_ERROR_54, value, path)
+
+
+def _check_5(value, path):
+    if not isinstance(value, dict):
+        raise _error(_ERROR_26, value, path)
+    if not _PROPERTIES_27.issuperset(value):
+        raise _error(
+            _ERROR_28,
+            value,
+            path,
+            [key for key in value if key not in _PROPERTIES_27]
+        )
+    if 'column-name' in value:
+        value16 = value['column-name']
+        if not isinstance(value16, string_types):
+            raise _error(_ERROR_29, value16, path + ('column-name',))
+    if 'filter-conditions' in value:
+        value17 = value['filter-conditions']
+        if not isinstance(value17, list):
+            raise _error(_ERROR_30, value17, path + ('filter-conditions',))
+        for i18, item19 in enumerate(value17):
+            _check_6(item19, path + ('filter-conditions', i18))
+    if 'filter-type' in value:
+        value24 = value['filter-type']
+        if value24 not in _ENUM_40:
+            raise _error(_ERROR_41, value24, path + ('filter-type',))
+    if 'filter-type' not in value:
+        raise _error(_ERROR_42, value, path)
+    if 'column-name' not in value:
+        raise _error(_ERROR_43, value, path)
+    if 'filter-conditions' not in value:
+        raise _error(_ERROR_44, value, path)
+
+
+def _check_6(value, path):
+    if not isinstance(value, dict):
+        raise _error(_ERROR_31, value, path)
+    if not _PROPERTIES_32.issuperset(value):
+        raise _error(
+            _ERROR_33,
+            value,
+            path,
+            [key for key in value if key not in _PROPERTIES_32]
+        )
+    if 'end-value' in value:
+        value20 = value['end-value']
+        if not isinstance(value20, string_types):
+            raise _error(_ERROR_34, value20, path + ('end-value',))
+    if 'filter-operator' in value:
+        value21 = value['filter-operator']
+        if value21 not in _ENUM_35:
+            raise _error(_ERROR_36, value21, path + ('filter-operator',))
+    if 'start-value' in value:
+        value22 = value['start-value']
+        if not isinstance(value22, string_types):
+            raise _error(_ERROR_37, value22, path + ('start-value',))
+    if 'value' in value:
+        value23 = value['value']
+        if not isinstance(value23, string_types):
+            raise _error(_ERROR_38, value23, path + ('value',))
+    if 'filter-operator' not in value:
+        raise _error(_ERROR_39, value, path)
+
+
+def _check_7(value, path):
+    if not isinstance(value, dict):
+        raise _error(_ERROR_45, value, path)
+    if not _PROPERTIES_11.issuperset(value):
+        raise _error(
+            _ERROR_46,
+            value,
+            path,
+            [key for key in value if key not in _PROPERTIES_11]
+        )
+    if 'schema-names' in value:
+        value25 = value['schema-names']
+        if not isinstance(value25, list):
+            raise _error(_ERROR_47, value25, path + ('schema-names',))
+        for i26, item27 in enumerate(value25):
+            if not isinstance(item27, string_types):
+                raise _error(_ERROR_48, item27, path + ('schema-names', i26))
+    if 'table-names' in value:
+        value28 = value['table-names']
+        if not isinstance(value28, list):
+            raise _error(_ERROR_49, value28, path + ('table-names',))
+        for i29, item30 in enumerate(value28):
+            if not isinstance(item30, string_types):
+                raise _error(_ERROR_50, item30, path + ('table-names', i29))
+    if 'schema-names' not in value:
+        raise _error(_ERROR_51, value, path)
+    if 'table-names' not in value:
+        raise _error(_ERROR_52, value, path)
+
+
+def _check_8(value, path):
+    if not isinstance(value, dict):
+        raise _error(_ERROR_55, value, path)
+    if not _PROPERTIES_56.issuperset(value):
+        raise _error(
+            _ERROR_57,
+            value,
+            path,
+            [key for key in value if key not in _PROPERTIES_56]
+        )
+    if 'add-prefix' in value:
+        value32 = value['add-prefix']
+        if not isinstance(value32, list):
+            raise _error(_ERROR_58, value32, path + ('add-prefix',))
+        for i33, item34 in enumerate(value32):
+            _check_9(item34, path + ('add-prefix', i33))
+    if 'add-suffix' in value:
+        value47 = value['add-suffix']
+        if not isinstance(value47, list):
+            raise _error(_ERROR_79, value47, path + ('add-suffix',))
+        for i48, item49 in enumerate(value47):
+            _check_11(item49, path + ('add-suffix', i48))
+    if 'convert-lowercase' in value:
+        value62 = value['convert-lowercase']
+        if not isinstance(value62, list):
+            raise _error(_ERROR_97, value62, path + ('convert-lowercase',))
+        for i63, item64 in enumerate(value62):
+            _check_13(item64, path + ('convert-lowercase', i63))
+    if 'convert-uppercase' in value:
+        value76 = value['convert-uppercase']
+        if not isinstance(value76, list):
+            raise _error(_ERROR_114, value76, path + ('convert-uppercase',))
+        for i77, item78 in enumerate(value76):
+            _check_15(item78, path + ('convert-uppercase', i77))
+    if 'remove-column' in value:
+        value90 = value['remove-column']
+        if not isinstance(value90, list):
+            raise _error(_ERROR_130, value90, path + ('remove-column',))
+        for i91, item92 in enumerate(value90):
+            _check_17(item92, path + ('remove-column', i91))
+    if 'remove-prefix' in value:
+        value104 = value['remove-prefix']
+        if not isinstance(value104, list):
+            raise _error(_ERROR_149, value104, path + ('remove-prefix',))
+        for i105, item106 in enumerate(value104):
+            _check_19(item106, path + ('remove-prefix', i105))
+    if 'remove-suffix' in value:
+        value119 = value['remove-suffix']
+        if not isinstance(value119, list):
+            raise _error(_ERROR_167, value119, path + ('remove-suffix',))
+        for i120, item121 in enumerate(value119):
+            _check_21(item121, path + ('remove-suffix', i120))
+    if 'rename' in value:
+        value134 = value['rename']
+        if not isinstance(value134, list):
+            raise _error(_ERROR_185, value134, path + ('rename',))
+        for i135, item136 in enumerate(value134):
+            _check_23(item136, path + ('rename', i135))
+    if 'replace-prefix' in value:
+        value149 = value['replace-prefix']
+        if not isinstance(value149, list):
+            raise _error(_ERROR_203, value149, path + ('replace-prefix',))
+        for i150, item151 in enumerate(value149):
+            _check_25(item151, path + ('replace-prefix', i150))
+    if 'replace-suffix' in value:
+        value165 = value['replace-suffix']
+        if not isinstance(value165, list):
+            raise _error(_ERROR_224, value165, path + ('replace-suffix',))
+        for i166, item167 in enumerate(value165):
+            _check_27(item167, path + ('replace-suffix', i166))
+
+
+def _check_9(value, path):
+    if not isinstance(value, dict):
+        raise _error(_ERROR_59, value, path)
+    if not _PROPERTIES_60.issuperset(value):
+        raise _error(
+            _ERROR_61,
+            value,
+            path,
+            [key for key in value if key not in _PROPERTIES_60]
+        )
+    if 'object-locators' in value:
+        _check_10(value['object-locators'], path + ('object-locators',))
+    if 'rule-name' in value:
+        value44 = value['rule-name']
+        if not isinstance(value44, string_types):
+            raise _error(_ERROR_72, value44, path + ('rule-name',))
+    if 'rule-target' in value:
+        value45 = value['rule-target']
+        if value45 not in _ENUM_73:
+            raise _error(_ERROR_74, value45, path + ('rule-target',))
+    if 'value' in value:
+        value46 = value['value']
+        if not isinstance(value46, string_types):
+            raise _error(_ERROR_75, value46, path + ('value',))
+    if 'object-locators' not in value:
+        raise _error(_ERROR_76, value, path)
+    if 'rule-target' not in value:
+        raise _error(_ERROR_77, value, path)
+    if 'value' not in value:
+        raise _error(_ERROR_78, value, path)
+
+
+def _check_10(value, path):
+    if not isinstance(value, dict):
+        raise _error(_ERROR_62, value, path)
+    if not _PROPERTIES_63.issuperset(value):
+        raise _error(
+            _ERROR_64,
+            value,
+            path,
+            [key for key in value if key not in _PROPERTIES_63]
+        )
+    if 'column-names' in value:
+        value35 = value['column-names']
+        if not isinstance(value35, list):
+            raise _error(_ERROR_65, value35, path + ('column-names',))
+        for i36, item37 in enumerate(value35):
+            if not isinstance(item37, string_types):
+                raise _error(_ERROR_66, item37, path + ('column-names', i36))
+    if 'schema-names' in value:
+        value38 = value['schema-names']
+        if not isinstance(value38, list):
+            raise _error(_ERROR_67, value38, path + ('schema-names',))
+        for i39, item40 in enumerate(value38):
+            if not isinstance(item40, string_types):
+                raise _error(_ERROR_68, item40, path + ('schema-names', i39))
+    if 'table-names' in value:
+        value41 = value['table-names']
+        if not isinstance(value41, list):
+            raise _error(_ERROR_69, value41, path + ('table-names',))
+        for i42, item43 in enumerate(value41):
+            if not isinstance(item43, string_types):
+                raise _error(_ERROR_70, item43, path + ('table-names', i42))
+    if 'schema-names' not in value:
+        raise _error(_ERROR_71, value, path)
+
+
+def _check_11(value, path):
+    if not isinstance(value, dict):
+        raise _error(_ERROR_80, value, path)
+    if not _PROPERTIES_60.issuperset(value):
+        raise _error(
+            _ERROR_81,
+            value,
+            path,
+            [key for key in value if key not in _PROPERTIES_60]
+        )
+    if 'object-locators' in value:
+        _check_12(value['object-locators'], path + ('object-locators',))
+    if 'rule-name' in value:
+        value59 = value['rule-name']
+        if not isinstance(value59, string_types):
+            raise _error(_ERROR_91, value59, path + ('rule-name',))
+    if 'rule-target' in value:
+        value60 = value['rule-target']
+        if value60 not in _ENUM_73:
+            raise _error(_ERROR_92, value60, path + ('rule-target',))
+    if 'value' in value:
+        value61 = value['value']
+        if not isinstance(value61, string_types):
+            raise _error(_ERROR_93, value61, path + ('value',))
+    if 'object-locators' not in value:
+        raise _error(_ERROR_94, value, path)
+    if 'rule-target' not in value:
+        raise _error(_ERROR_95, value, path)
+    if 'value' not in value:
+        raise _error(_ERROR_96, value, path)
+
+
+def _check_12(value, path):
+    if not isinstance(value, dict):
+        raise _error(_ERROR_82, value, path)
+    if not _PROPERTIES_63.issuperset(value):
+        raise _error(
+            _ERROR_83,
+            value,
+            path,
+            [key for key in value if key not in _PROPERTIES_63]
+        )
+    if 'column-names' in value:
+        value50 = value['column-names']
+        if not isinstance(value50, list):
+            raise _error(_ERROR_84, value50, path + ('column-names',))
+        for i51, item52 in enumerate(value50):
+            if not isinstance(item52, string_types):
+                raise _error(_ERROR_85, item52, path + ('column-names', i51))
+    if 'schema-names' in value:
+        value53 = value['schema-names']
+        if not isinstance(value53, list):
+            raise _error(_ERROR_86, value53, path + ('schema-names',))
+        for i54, item55 in enumerate(value53):
+            if not isinstance(item55, string_types):
+                raise _error(_ERROR_87, item55, path + ('schema-names', i54))
+    if 'table-names' in value:
+        value56 = value['table-names']
+        if not isinstance(value56, list):
+            raise _error(_ERROR_88, value56, path + ('table-names',))
+        for i57, item58 in enumerate(value56):
+            if not isinstance(item58, string_types):
+                raise _error(_ERROR_89, item58, path + ('table-names', i57))
+    if 'schema-names' not in value:
+        raise _error(_ERROR_90, value, path)
+
+
+def _check_13(value, path):
+    if not isinstance(value, dict):
+        raise _error(_ERROR_98, value, path)
+    if not _PROPERTIES_99.issuperset(value):
+        raise _error(
+            _ERROR_100,
+            value,
+            path,
+            [key for key in value if key not in _PROPERTIES_99]
+        )
+    if 'object-locators' in value:
+        _check_14(value['object-locators'], path + ('object-locators',))
+    if 'rule-name' in value:
+        value74 = value['rule-name']
+        if not isinstance(value74, string_types):
+            raise _error(_ERROR_110, value74, path + ('rule-name',))
+    if 'rule-target' in value:
+        value75 = value['rule-target']
+        if value75 not in _ENUM_73:
+            raise _error(_ERROR_111, value75, path + ('rule-target',))
+    if 'object-locators' not in value:
+        raise _error(_ERROR_112, value, path)
+    if 'rule-target' not in value:
+        raise _error(_ERROR_113, value, path)
+
+
+def _check_14(value, path):
+    if not isinstance(value, dict):
+        raise _error(_ERROR_101, value, path)
+    if not _PROPERTIES_63.issuperset(value):
+        raise _error(
+            _ERROR_102,
+            value,
+            path,
+            [key for key in value if key not in _PROPERTIES_63]
+        )
+    if 'column-names' in value:
+        value65 = value['column-names']
+        if not isinstance(value65, list):
+            raise _error(_ERROR_103, value65, path + ('column-names',))
+        for i66, item67 in enumerate(value65):
+            if not isinstance(item67, string_types):
+                raise _error(_ERROR_104, item67, path + ('column-names', i66))
+    if 'schema-names' in value:
+        value68 = value['schema-names']
+        if not isinstance(value68, list):
+            raise _error(_ERROR_105, value68, path + ('schema-names',))
+        for i69, item70 in enumerate(value68):
+            if not isinstance(item70, string_types):
+                raise _error(_ERROR_106, item70, path + ('schema-names', i69))
+    if 'table-names' in value:
+        value71 = value['table-names']
+        if not isinstance(value71, list):
+            raise _error(_ERROR_107, value71, path + ('table-names',))
+        for i72, item73 in enumerate(value71):
+            if not isinstance(item73, string_types):
+                raise _error(_ERROR_108, item73, path + ('table-names', i72))
+    if 'schema-names' not in value:
+        raise _error(_ERROR_109, value, path)
+
+
+def _check_15(value, path):
+    if not isinstance(value, dict):
+        raise _error(_ERROR_115, value, path)
+    if not _PROPERTIES_99.issuperset(value):
+        raise _error(
+            _ERROR_116,
+            value,
+            path,
+            [key for key in value if key not in _PROPERTIES_99]
+        )
+    if 'object-locators' in value:
+        _check_16(value['object-locators'], path + ('object-locators',))
+    if 'rule-name' in value:
+        value88 = value['rule-name']
+        if not isinstance(value88, string_types):
+            raise _error(_ERROR_126, value88, path + ('rule-name',))
+    if 'rule-target' in value:
+        value89 = value['rule-target']
+        if value89 not in _ENUM_73:
+            raise _error(_ERROR_127, value89, path + ('rule-target',))
+    if 'object-locators' not in value:
+        raise _error(_ERROR_128, value, path)
+    if 'rule-target' not in value:
+        raise _error(_ERROR_129, value, path)
+
+
+def _check_16(value, path):
+    if not isinstance(value, dict):
+        raise _error(_ERROR_117, value, path)
+    if not _PROPERTIES_63.issuperset(value):
+        raise _error(
+            _ERROR_118,
+            value,
+            path,
+            [key for key in value if key not in _PROPERTIES_63]
+        )
+    if 'column-names' in value:
+        value79 = value['column-names']
+        if not isinstance(value79, list):
+            raise _error(_ERROR_119, value79, path + ('column-names',))
+        for i80, item81 in enumerate(value79):
+            if not isinstance(item81, string_types):
+                raise _error(_ERROR_120, item81, path + ('column-names', i80))
+    if 'schema-names' in value:
+        value82 = value['schema-names']
+        if not isinstance(value82, list):
+            raise _error(_ERROR_121, value82, path + ('schema-names',))
+        for i83, item84 in enumerate(value82):
+            if not isinstance(item84, string_types):
+                raise _error(_ERROR_122, item84, path + ('schema-names', i83))
+    if 'table-names' in value:
+        value85 = value['table-names']
+        if not isinstance(value85, list):
+            raise _error(_ERROR_123, value85, path + ('table-names',))
+        for i86, item87 in enumerate(value85):
+            if not isinstance(item87, string_types):
+                raise _error(_ERROR_124, item87, path + ('table-names', i86))
+    if 'schema-names' not in value:
+        raise _error(_ERROR_125, value, path)
+
+
+def _check_17(value, path):
+    if not isinstance(value, dict):
+        raise _error(_ERROR_131, value, path)
+    if not _PROPERTIES_99.issuperset(value):
+        raise _error(
+            _ERROR_132,
+            value,
+            path,
+            [key for key in value if key not in _PROPERTIES_99]
+        )
+    if 'object-locators' in value:
+        _check_18(value['object-locators'], path + ('object-locators',))
+    if 'rule-name' in value:
+        value102 = value['rule-name']
+        if not isinstance(value102, string_types):
+            raise _error(_ERROR_144, value102, path + ('rule-name',))
+    if 'rule-target' in value:
+        value103 = value['rule-target']
+        if value103 not in _ENUM_145:
+            raise _error(_ERROR_146, value103, path + ('rule-target',))
+    if 'object-locators' not in value:
+        raise _error(_ERROR_147, value, path)
+    if 'rule-target' not in value:
+        raise _error(_ERROR_148, value, path)
+
+
+def _check_18(value, path):
+    if not isinstance(value, dict):
+        raise _error(_ERROR_133, value, path)
+    if not _PROPERTIES_63.issuperset(value):
+        raise _error(
+            _ERROR_134,
+            value,
+            path,
+            [key for key in value if key not in _PROPERTIES_63]
+        )
+    if 'column-names' in value:
+        value93 = value['column-names']
+        if not isinstance(value93, list):
+            raise _error(_ERROR_135, value93, path + ('column-names',))
+        for i94, item95 in enumerate(value93):
+            if not isinstance(item95, string_types):
+                raise _error(_ERROR_136, item95, path + ('column-names', i94))
+    if 'schema-names' in value:
+        value96 = value['schema-names']
+        if not isinstance(value96, list):
+            raise _error(_ERROR_137, value96, path + ('schema-names',))
+        for i97, item98 in enumerate(value96):
+            if not isinstance(item98, string_types):
+                raise _error(_ERROR_138, item98, path + ('schema-names', i97))
+    if 'table-names' in value:
+        value99 = value['table-names']
+        if not isinstance(value99, list):
+            raise _error(_ERROR_139, value99, path + ('table-names',))
+        for i100, item101 in enumerate(value99):
+            if not isinstance(item101, string_types):
+                raise _error(_ERROR_140, item101, path + ('table-names', i100))
+    if 'schema-names' not in value:
+        raise _error(_ERROR_141, value, path)
+    if 'table-names' not in value:
+        raise _error(_ERROR_142, value, path)
+    if 'column-names' not in value:
+        raise _error(_ERROR_143, value, path)
+
+
+def _check_19(value, path):
+    if not isinstance(value, dict):
+        raise _error(_ERROR_150, value, path)
+    if not _PROPERTIES_60.issuperset(value):
+        raise _error(
+            _ERROR_151,
+            value,
+            path,
+            [key for key in value if key not in _PROPERTIES_60]
+        )
+    if 'object-locators' in value:
+        _check_20(value['object-locators'], path + ('object-locators',))
+    if 'rule-name' in value:
+        value116 = value['rule-name']
+        if not isinstance(value116, string_types):
+            raise _error(_ERROR_161, value116, path + ('rule-name',))
+    if 'rule-target' in value:
+        value117 = value['rule-target']
+        if value117 not in _ENUM_73:
+            raise _error(_ERROR_162, value117, path + ('rule-target',))
+    if 'value' in value:
+        value118 = value['value']
+        if not isinstance(value118, string_types):
+            raise _error(_ERROR_163, value118, path + ('value',))
+    if 'object-locators' not in value:
+        raise _error(_ERROR_164, value, path)
+    if 'rule-target' not in value:
+        raise _error(_ERROR_165, value, path)
+    if 'value' not in value:
+        raise _error(_ERROR_166, value, path)
+
+
+def _check_20(value, path):
+    if not isinstance(value, dict):
+        raise _error(_ERROR_152, value, path)
+    if not _PROPERTIES_63.issuperset(value):
+        raise _error(
+            _ERROR_153,
+            value,
+            path,
+            [key for key in value if key not in _PROPERTIES_63]
+        )
+    if 'column-names' in value:
+        value107 = value['column-names']
+        if not isinstance(value107, list):
+            raise _error(_ERROR_154, value107, path + ('column-names',))
+        for i108, item109 in enumerate(value107):
+            if not isinstance(item109, string_types):
+                raise _error(
+                    _ERROR_155,
+                    item109,
+                    path + ('column-names', i108)
+                )
+    if 'schema-names' in value:
+        value110 = value['schema-names']
+        if not isinstance(value110, list):
+            raise _error(_ERROR_156, value110, path + ('schema-names',))
+        for i111, item112 in enumerate(value110):
+            if not isinstance(item112, string_types):
+                raise _error(
+                    _ERROR_157,
+                    item112,
+                    path + ('schema-names', i111)
+                )
+    if 'table-names' in value:
+        value113 = value['table-names']
+        if not isinstance(value113, list):
+            raise _error(_ERROR_158, value113, path + ('table-names',))
+        for i114, item115 in enumerate(value113):
+            if not isinstance(item115, string_types):
+                raise _error(_ERROR_159, item115, path + ('table-names', i114))
+    if 'schema-names' not in value:
+        raise _error(_ERROR_160, value, path)
+
+
+def _check_21(value, path):
+    if not isinstance(value, dict):
+        raise _error(_ERROR_168, value, path)
+    if not _PROPERTIES_60.issuperset(value):
+        raise _error(
+            _ERROR_169,
+            value,
+            path,
+            [key for key in value if key not in _PROPERTIES_60]
+        )
+    if 'object-locators' in value:
+        _check_22(value['object-locators'], path + ('object-locators',))
+    if 'rule-name' in value:
+        value131 = value['rule-name']
+        if not isinstance(value131, string_types):
+            raise _error(_ERROR_179, value131, path + ('rule-name',))
+    if 'rule-target' in value:
+        value132 = value['rule-target']
+        if value132 not in _ENUM_73:
+            raise _error(_ERROR_180, value132, path + ('rule-target',))
+    if 'value' in value:
+        value133 = value['value']
+        if not isinstance(value133, string_types):
+            raise _error(_ERROR_181, value133, path + ('value',))
+    if 'object-locators' not in value:
+        raise _error(_ERROR_182, value, path)
+    if 'rule-target' not in value:
+        raise _error(_ERROR_183, value, path)
+    if 'value' not in value:
+        raise _error(_ERROR_184, value, path)
+
+
+def _check_22(value, path):
+    if not isinstance(value, dict):
+        raise _error(_ERROR_170, value, path)
+    if not _PROPERTIES_63.issuperset(value):
+        raise _error(
+            _ERROR_171,
+            value,
+            path,
+            [key for key in value if key not in _PROPERTIES_63]
+        )
+    if 'column-names' in value:
+        value122 = value['column-names']
+        if not isinstance(value122, list):
+            raise _error(_ERROR_172, value122, path + ('column-names',))
+        for i123, item124 in enumerate(value122):
+            if not isinstance(item124, string_types):
+                raise _error(
+                    _ERROR_173,
+                    item124,
+                    path + ('column-names', i123)
+                )
+    if 'schema-names' in value:
+        value125 = value['schema-names']
+        if not isinstance(value125, list):
+            raise _error(_ERROR_174, value125, path + ('schema-names',))
+        for i126, item127 in enumerate(value125):
+            if not isinstance(item127, string_types):
+                raise _error(
+                    _ERROR_175,
+                    item127,
+                    path + ('schema-names', i126)
+                )
+    if 'table-names' in value:
+        value128 = value['table-names']
+        if not isinstance(value128, list):
+            raise _error(_ERROR_176, value128, path + ('table-names',))
+        for i129, item130 in enumerate(value128):
+            if not isinstance(item130, string_types):
+                raise _error(_ERROR_177, item130, path + ('table-names', i129))
+    if 'schema-names' not in value:
+        raise _error(_ERROR_178, value, path)
+
+
+def _check_23(value, path):
+    if not isinstance(value, dict):
+        raise _error(_ERROR_186, value, path)
+    if not _PROPERTIES_60.issuperset(value):
+        raise _error(
+            _ERROR_187,
+            value,
+            path,
+            [key for key in value if key not in _PROPERTIES_60]
+        )
+    if 'object-locators' in value:
+        _check_24(value['object-locators'], path + ('object-locators',))
+    if 'rule-name' in value:
+        value146 = value['rule-name']
+        if not isinstance(value146, string_types):
+            raise _error(_ERROR_197, value146, path + ('rule-name',))
+    if 'rule-target' in value:
+        value147 = value['rule-target']
+        if value147 not in _ENUM_73:
+            raise _error(_ERROR_198, value147, path + ('rule-target',))
+    if 'value' in value:
+        value148 = value['value']
+        if not isinstance(value148, string_types):
+            raise _error(_ERROR_199, value148, path + ('value',))
+    if 'object-locators' not in value:
+        raise _error(_ERROR_200, value, path)
+    if 'rule-target' not in value:
+        raise _error(_ERROR_201, value, path)
+    if 'value' not in value:
+        raise _error(_ERROR_202, value, path)
+
+
+def _check_24(value, path):
+    if not isinstance(value, dict):
+        raise _error(_ERROR_188, value, path)
+    if not _PROPERTIES_63.issuperset(value):
+        raise _error(
+            _ERROR_189,
+            value,
+            path,
+            [key for key in value if key not in _PROPERTIES_63]
+        )
+    if 'column-names' in value:
+        value137 = value['column-names']
+        if not isinstance(value137, list):
+            raise _error(_ERROR_190, value137, path + ('column-names',))
+        for i138, item139 in enumerate(value137):
+            if not isinstance(item139, string_types):
+                raise _error(
+                    _ERROR_191,
+                    item139,
+                    path + ('column-names', i138)
+                )
+    if 'schema-names' in value:
+        value140 = value['schema-names']
+        if not isinstance(value140, list):
+            raise _error(_ERROR_192, value140, path + ('schema-names',))
+        for i141, item142 in enumerate(value140):
+            if not isinstance(item142, string_types):
+                raise _error(
+                    _ERROR_193,
+                    item142,
+                    path + ('schema-names', i141)
+                )
+    if 'table-names' in value:
+        value143 = value['table-names']
+        if not isinstance(value143, list):
+            raise _error(_ERROR_194, value143, path + ('table-names',))
+        for i144, item145 in enumerate(value143):
+            if not isinstance(item145, string_types):
+                raise _error(_ERROR_195, item145, path + ('table-names', i144))
+    if 'schema-names' not in value:
+        raise _error(_ERROR_196, value, path)
+
+
+def _check_25(value, path):
+    if not isinstance(value, dict):
+        raise _error(_ERROR_204, value, path)
+    if not _PROPERTIES_205.issuperset(value):
+        raise _error(
+            _ERROR_206,
+            value,
+            path,
+            [key for key in value if key not in _PROPERTIES_205]
+        )
+    if 'object-locators' in value:
+        _check_26(value['object-locators'], path + ('object-locators',))
+    if 'old-value' in value:
+        value161 = value['old-value']
+        if not isinstance(value161, string_types):
+            raise _error(_ERROR_216, value161, path + ('old-value',))
+    if 'rule-name' in value:
+        value162 = value['rule-name']
+        if not isinstance(value162, string_types):
+            raise _error(_ERROR_217, value162, path + ('rule-name',))
+    if 'rule-target' in value:
+        value163 = value['rule-target']
+        if value163 not in _ENUM_73:
+            raise _error(_ERROR_218, value163, path + ('rule-target',))
+    if 'value' in value:
+        value164 = value['value']
+        if not isinstance(value164, string_types):
+            raise _error(_ERROR_219, value164, path + ('value',))
+    if 'object-locators' not in value:
+        raise _error(_ERROR_220, value, path)
+    if 'rule-target' not in value:
+        raise _error(_ERROR_221, value, path)
+    if 'old-value' not in value:
+        raise _error(_ERROR_222, value, path)
+    if 'value' not in value:
+        raise _error(_ERROR_223, value, path)
+
+
+def _check_26(value, path):
+    if not isinstance(value, dict):
+        raise _error(_ERROR_207, value, path)
+    if not _PROPERTIES_63.issuperset(value):
+        raise _error(
+            _ERROR_208,
+            value,
+            path,
+            [key for key in value if key not in _PROPERTIES_63]
+        )
+    if 'column-names' in value:
+        value152 = value['column-names']
+        if not isinstance(value152, list):
+            raise _error(_ERROR_209, value152, path + ('column-names',))
+        for i153, item154 in enumerate(value152):
+            if not isinstance(item154, string_types):
+                raise _error(
+                    _ERROR_210,
+                    item154,
+                    path + ('column-names', i153)
+                )
+    if 'schema-names' in value:
+        value155 = value['schema-names']
+        if not isinstance(value155, list):
+            raise _error(_ERROR_211, value155, path + ('schema-names',))
+        for i156, item157 in enumerate(value155):
+            if not isinstance(item157, string_types):
+                raise _error(
+                    _ERROR_212,
+                    item157,
+                    path + ('schema-names', i156)
+                )
+    if 'table-names' in value:
+        value158 = value['table-names']
+        if not isinstance(value158, list):
+            raise _error(_ERROR_213, value158, path + ('table-names',))
+        for i159, item160 in enumerate(value158):
+            if not isinstance(item160, string_types):
+                raise _error(_ERROR_214, item160, path + ('table-names', i159))
+    if 'schema-names' not in value:
+        raise _error(_ERROR_215, value, path)
+
+
+def _check_27(value, path):
+    if not isinstance(value, dict):
+        raise _error(_ERROR_225, value, path)
+    if not _PROPERTIES_205.issuperset(value):
+        raise _error(
+            _ERROR_226,
+            value,
+            path,
+            [key for key in value if key not in _PROPERTIES_205]
+        )
+    if 'object-locators' in value:
+        _check_28(value['object-locators'], path + ('object-locators',))
+    if 'old-value' in value:
+        value177 = value['old-value']
+        if not isinstance(value177, string_types):
+            raise _error(_ERROR_236, value177, path + ('old-value',))
+    if 'rule-name' in value:
+        value178 = value['rule-name']
+        if not isinstance(value178, string_types):
+            raise _error(_ERROR_237, value178, path + ('rule-name',))
+    if 'rule-target' in value:
+        value179 = value['rule-target']
+        if value179 not in _ENUM_73:
+            raise _error(_ERROR_238, value179, path + ('rule-target',))
+    if 'value' in value:
+        value180 = value['value']
+        if not isinstance(value180, string_types):
+            raise _error(_ERROR_239, value180, path + ('value',))
+    if 'object-locators' not in value:
+        raise _error(_ERROR_240, value, path)
+    if 'rule-target' not in value:
+        raise _error(_ERROR_241, value, path)
+    if 'old-value' not in value:
+        raise _error(_ERROR_242, value, path)
+    if 'value' not in value:
+        raise _error(_ERROR_243, value, path)
+
+
+def _check_28(value, path):
+    if not isinstance(value, dict):
+        raise _error(_ERROR_227, value, path)
+    if not _PROPERTIES_63.issuperset(value):
+        raise _error(
+            _ERROR_228,
+            value,
+            path,
+            [key for key in value if key not in _PROPERTIES_63]
+        )
+    if 'column-names' in value:
+        value168 = value['column-names']
+        if not isinstance(value168, list):
+            raise _error(_ERROR_229, value168, path + ('column-names',))
+        for i169, item170 in enumerate(value168):
+            if not isinstance(item170, string_types):
+                raise _error(
+                    _ERROR_230,
+                    item170,
+                    path + ('column-names', i169)
+                )
+    if 'schema-names' in value:
+        value171 = value['schema-names']
+        if not isinstance(value171, list):
+            raise _error(_ERROR_231, value171, path + ('schema-names',))
+        for i172, item173 in enumerate(value171):
+            if not isinstance(item173, string_types):
+                raise _error(
+                    _ERROR_232,
+                    item173,
+                    path + ('schema-names', i172)
+                )
+    if 'table-names' in value:
+        value174 = value['table-names']
+        if not isinstance(value174, list):
+            raise _error(_ERROR_233, value174, path + ('table-names',))
+        for i175, item176 in enumerate(value174):
+            if not isinstance(item176, string_types):
+                raise _error(_ERROR_234, item176, path + ('table-names', i175))
+    if 'schema-names' not in value:
+        raise _error(_ERROR_235, value, path)
+
+
+def validate(source):
+    """
+    Checks a source is correctly formatted, raising the first error
+    jsonschema would.
+
+    :param source: The loaded source.
+    :type source: dict
+    :raises: jsonschema.exceptions.ValidationError
+
+    """
+    _check_0(source, ())
+
+
+def _error(spec, instance, path, extras=None):
+    """
+    Return the jsonschema ValidationError for a failed check.
+
+    :param spec: The message of the check, and the JSON pointer to its
+        keyword in the schema.
+    :type spec: tuple
+    :param instance: The value which failed the check.
+    :param path: The path to the value.
+    :type path: tuple
+    :param extras: The unexpected properties, for additionalProperties.
+    :type extras: list
+    :returns: jsonschema.exceptions.ValidationError
+
+    """
+    # jsonschema is only imported once a source is found to be invalid.
+    from jsonschema.exceptions import ValidationError
+    from .schema import load_source_schema
+
+    message, pointer = spec
+    schema_path = [
+        key.replace("~1", "/").replace("~0", "~")
+        for key in pointer.split("/")
+    ]
+    keyword = schema_path[-1]
+    schema = load_source_schema()
+    for key in schema_path[:-1]:
+        schema = schema[key]
+    if extras is None:
+        message = message.format(instance)
+    else:
+        extras = sorted(extras, key=str)
+        message = (
+            "Additional properties are not allowed ({0} {1} "
+            "unexpected)".format(
+                ", ".join(repr(extra) for extra in extras),
+                "was" if len(extras) == 1 else "were"
+            )
+        )
+    return ValidationError(
+        message, validator=keyword, path=path,
+        validator_value=schema[keyword], instance=instance, schema=schema,
+        schema_path=schema_path
+    )
@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+
+"""
+ptolemy.stats
+
+This module implements collecting statistics about a compile: the wall time
+of each phase, the number of rules of each type and action, the size of the
+output and, optionally, the peak memory allocated.
+
+Phases are timed exclusively. Rules are expanded, numbered and serialised
+one at a time, so the phases interleave. Time spent in a phase entered from
+within another, such as expanding a rule when the serialiser asks for the
+next one, is counted only against the inner phase.
+
+"""
+
+from collections import OrderedDict
+from contextlib import contextmanager
+import json
+from timeit import default_timer
+
+
+# The phases of a compile, in the order they are reported.
+PHASES = (
+    "read", "parse", "include", "validate", "resolve", "check", "expand",
+    "optimise", "number", "serialise"
+)
+
+
+class Stats(object):
+    """
+    Stats collects the statistics of one or more compiles. Pass it to
+    ptolemy.source.Source as stats, and read it once the source has been
+    compiled. Stats from many compiles can be added together with update().
+
+    """
+
+    def __init__(self):
+        self.phases = OrderedDict()
+        self.rule_counts = OrderedDict()
+        self.output_bytes = 0
+        self.peak_memory = None
+        self._phase = None
+        self._phase_start = None
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Time the block as the phase name.
+
+        :param name: The name of the phase, such as "parse".
+        :type name: str
+
+        """
+        outer_phase = self._switch(name)
+        try:
+            yield
+        finally:
+            self._switch(outer_phase)
+
+    def iterate(self, name, iterable):
+        """
+        Yield the items of iterable, timing the work of producing each item
+        as the phase name.
+
+        :param name: The name of the phase, such as "expand".
+        :type name: str
+        :param iterable: The items.
+        :type iterable: iterable
+        :returns: iterator
+
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def count_rules(self, rules):
+        """
+        Yield rules, counting them by rule type and rule action.
+
+        :param rules: The rules, as expanded or as read from a mapping.
+        :type rules: iterable of ptolemy.rule.Rule or dict
+        :returns: iterator of ptolemy.rule.Rule or dict
+
+        """
+        for rule in rules:
+            if isinstance(rule, dict):
+                key = (rule["rule-type"], rule["rule-action"])
+            else:
+                key = (rule.rule_type, rule.rule_action)
+            self.rule_counts[key] = self.rule_counts.get(key, 0) + 1
+            yield rule
+
+    def add_output(self, output):
+        """
+        Count the size of output written.
+
+        :param output: The output.
+        :type output: str
+
+        """
+        # The JSON is ASCII, so its length in characters is its size in
+        # bytes.
+        self.output_bytes += len(output)
+
+    @contextmanager
+    def trace_memory(self):
+        """
+        Record the peak memory allocated by Python within the block, using
+        tracemalloc. Tracing memory slows compiling down considerably.
+
+        """
+        import tracemalloc
+
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        try:
+            yield
+        finally:
+            peak = tracemalloc.get_traced_memory()[1]
+            if not tracing:
+                tracemalloc.stop()
+            self.peak_memory = max(self.peak_memory or 0, peak)
+
+    @property
+    def rules(self):
+        """
+        The total number of rules.
+
+        :returns: int
+
+        """
+        return sum(self.rule_counts.values())
+
+    def update(self, other):
+        """
+        Add the statistics in other to these. Peak memory is the greatest of
+        the two.
+
+        :param other: The statistics to add.
+        :type other: ptolemy.stats.Stats
+
+        """
+        for name, seconds in other.phases.items():
+            self.phases[name] = self.phases.get(name, 0) + seconds
+        for key, count in other.rule_counts.items():
+            self.rule_counts[key] = self.rule_counts.get(key, 0) + count
+        self.output_bytes += other.output_bytes
+        if other.peak_memory is not None:
+            self.peak_memory = max(self.peak_memory or 0, other.peak_memory)
+
+    def to_dict(self):
+        """
+        Return the statistics as a dict which can be serialised to JSON.
+
+        :returns: dict
+
+        """
+        rules = OrderedDict()
+        for (rule_type, rule_action), count in self.rule_counts.items():
+            rules.setdefault(rule_type, OrderedDict())[rule_action] = count
+        return OrderedDict([
+            ("phases", self._get_phases()),
+            ("rules", rules),
+            ("total_rules", self.rules),
+            ("output_bytes", self.output_bytes),
+            ("peak_memory", self.peak_memory)
+        ])
+
+    def to_json(self):
+        """
+        Return the statistics as JSON.
+
+        :returns: str
+
+        """
+        return json.dumps(self.to_dict(), indent=4, separators=(',', ': '))
+
+    def report(self):
+        """
+        Return a table of the statistics.
+
+        :returns: str
+
+        """
+        row = "{0:<16} {1:<18} {2:>14}"
+        lines = [row.format("phase", "", "ms")]
+        for name, seconds in self._get_phases().items():
+            lines.append(row.format(
+                name, "", "{0:.1f}".format(seconds * 1e3)
+            ))
+        lines.append(row.format(
+            "total", "", "{0:.1f}".format(sum(self.phases.values()) * 1e3)
+        ))
+        lines.append("")
+        lines.append(row.format("rule-type", "rule-action", "rules"))
+        for (rule_type, rule_action), count in self.rule_counts.items():
+            lines.append(row.format(rule_type, rule_action, count))
+        lines.append(row.format("total", "", self.rules))
+        lines.append("")
+        lines.append(row.format("output bytes", "", self.output_bytes))
+        if self.peak_memory is not None:
+            lines.append(row.format("peak memory", "", self.peak_memory))
+        return "\n".join(lines)
+
+    def _get_phases(self):
+        """
+        Return the time of each phase, in the order the phases run.
+
+        :returns: OrderedDict
+
+        """
+        order = {name: i for i, name in enumerate(PHASES)}
+        return OrderedDict(sorted(
+            self.phases.items(),
+            key=lambda item: order.get(item[0], len(PHASES))
+        ))
+
+    def _switch(self, name):
+        """
+        Charge the time since the last switch to the current phase, and make
+        name the current phase.
+
+        :param name: The phase to switch to, or None.
+        :type name: str
+        :returns: The phase switched from.
+
+        """
+        now = default_timer()
+        if self._phase is not None:
+            self.phases[self._phase] = \
+                self.phases.get(self._phase, 0) + now - self._phase_start
+        outer_phase, self._phase, self._phase_start = self._phase, name, now
+        return outer_phase
+
+
+class NullStats(object):
+    """
+    NullStats has the interface of Stats, but collects nothing, so compiling
+    without statistics costs nothing.
+
+    """
+
+    @contextmanager
+    def phase(self, name):  # pylint: disable=unused-argument
+        """
+        Run the block.
+
+        """
+        yield
+
+    @staticmethod
+    def iterate(name, iterable):  # pylint: disable=unused-argument
+        """
+        Return iterable.
+
+        """
+        return iterable
+
+    @staticmethod
+    def count_rules(rules):
+        """
+        Return rules.
+
+        """
+        return rules
+
+    def add_output(self, output):
+        """
+        Do nothing.
+
+        """
+
+    @contextmanager
+    def trace_memory(self):
+        """
+        Run the block.
+
+        """
+        yield
+
+
+NULL_STATS = NullStats()
@@ -0,0 +1,569 @@
+# -*- coding: utf-8 -*-
+
+"""
+ptolemy.stream
+
+This module implements streaming sources, which are too large to load whole.
+The source is read as a stream of YAML or JSON events, and each include,
+exclude and transformation item is yielded as soon as it has been read, so
+that it can be validated and expanded, and then dropped, before the next is
+read. Memory use then grows with the largest item, rather than with the
+whole source.
+
+Only the mappings of rule types and rule actions, and the lists of items
+within them, are streamed. Anything else found in their place, such as a
+string where a mapping is expected, or a reference to a fragment, is loaded
+whole, so that it is resolved and validated as it would be if the source
+were loaded whole.
+
+JSONReader is public, as it also streams mappings a rule at a time, in
+ptolemy.ids.
+
+"""
+
+import codecs
+import json
+import re
+
+from .exceptions import InvalidFileError
+from .loader import get_yaml_loader, is_json_source
+from .schema import ITEMS_DEPTH
+
+
+# The number of bytes of the source read at a time.
+CHUNK_SIZE = 64 * 1024
+
+# Returned by JSONReader.next_key() at the end of a mapping.
+END = object()
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+_yaml_loader_class = None
+
+
+class SourceStream(object):  # pylint: disable=too-few-public-methods
+    """
+    SourceStream reads a source file as a stream, yielding the rule type,
+    rule action and data of each of its items in turn. Once every item has
+    been read, skeleton holds the rest of the source, with each list of
+    items emptied, to be validated.
+
+    :param source_file: The source file, opened in binary mode.
+    :type source_file: file
+    :param source_file_path: The path of the source file, if any. Sources
+        whose path ends in .json, or which start like a JSON object, are
+        read as JSON, and others as YAML.
+    :type source_file_path: str
+    :param resolve: A function returning a value loaded from the source
+        with the references to fragments within it resolved, if any. Items
+        are passed to it in a list, so that a fragment which is a list of
+        items is spliced into it.
+    :type resolve: function
+
+    """
+
+    def __init__(self, source_file, source_file_path=None, resolve=None):
+        self.source_file = source_file
+        self.source_file_path = source_file_path
+        self.resolve = resolve
+        self.skeleton = None
+
+    def __iter__(self):
+        reader = self._get_reader()
+        skeleton = [None]
+        for item in self._iter_value(reader, (), skeleton, 0):
+            yield item
+        reader.finish()
+        self.skeleton = skeleton[0]
+
+    def _get_reader(self):
+        """
+        Return the reader for the source, from the start of it.
+
+        :returns: ptolemy.stream.JSONReader or ptolemy.stream._YAMLReader
+
+        """
+        start = self.source_file.tell()
+        source_start = self.source_file.read(CHUNK_SIZE)
+        self.source_file.seek(start)
+        if is_json_source(source_start, self.source_file_path):
+            return JSONReader(self.source_file, self.source_file_path)
+        return _YAMLReader(self.source_file, self.source_file_path)
+
+    def _iter_value(self, reader, path, parent, key):
+        """
+        Yield the items within the next value in the source, recording its
+        skeleton as parent[key].
+
+        :param reader: The reader.
+        :type reader: ptolemy.stream.JSONReader or ptolemy.stream._YAMLReader
+        :param path: The keys of the value, such as ("selection",).
+        :type path: tuple
+        :param parent: The skeleton of the value's parent.
+        :type parent: dict or list
+        :param key: The value's key in its parent.
+        :returns: iterator of tuple of (str, str, dict)
+
+        """
+        if len(path) == ITEMS_DEPTH:
+            if not reader.start_sequence():
+                parent[key], items = _split(self._resolve(
+                    reader.load_value()
+                ), path)
+                for item in items:
+                    yield item
+                return
+            parent[key] = []
+            while reader.next_item():
+                for data_item in self._resolve([reader.load_value()]):
+                    yield path + (data_item,)
+            return
+
+        if not reader.start_mapping():
+            parent[key], items = _split(
+                self._resolve(reader.load_value()), path
+            )
+            for item in items:
+                yield item
+            return
+        skeleton = parent[key] = {}
+        while True:
+            child_key = reader.next_key()
+            if child_key is END:
+                return
+            if child_key in skeleton:
+                raise InvalidFileError(
+                    "The source file '{0}' has more than one {1!r} key in "
+                    "the same mapping, so cannot be streamed.".format(
+                        self.source_file_path, child_key
+                    )
+                )
+            for item in self._iter_value(
+                    reader, path + (child_key,), skeleton, child_key
+            ):
+                yield item
+
+    def _resolve(self, value):
+        """
+        Return value with the references to fragments within it resolved.
+
+        :param value: A value loaded from the source.
+        :returns: The resolved value.
+
+        """
+        if self.resolve is None:
+            return value
+        return self.resolve(value)
+
+
+def _split(value, path):
+    """
+    Return the skeleton of a value loaded whole, and the items within it.
+
+    :param value: The value.
+    :param path: The keys of the value.
+    :type path: tuple
+    :returns: tuple of (skeleton, list of tuple of (str, str, dict))
+
+    """
+    if len(path) == ITEMS_DEPTH:
+        if isinstance(value, list):
+            return [], [path + (data_item,) for data_item in value]
+        return value, []
+    if not isinstance(value, dict):
+        return value, []
+    skeleton = {}
+    items = []
+    for key, child in value.items():
+        skeleton[key], child_items = _split(child, path + (key,))
+        items.extend(child_items)
+    return skeleton, items
+
+
+class JSONReader(object):
+    """
+    JSONReader reads a JSON file a chunk at a time. Mappings and lists
+    are stepped into, and every other value is decoded whole by the json
+    module, so values are decoded exactly as json.loads() decodes them.
+
+    :param source_file: The source file, opened in binary mode.
+    :type source_file: file
+    :param source_file_path: The path of the source file, to report.
+    :type source_file_path: str
+    :param description: What the file is, to report.
+    :type description: str
+
+    """
+
+    def __init__(self, source_file, source_file_path=None,
+                 description="source file"):
+        self._file = source_file
+        self._file_path = source_file_path
+        self._description = description
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._decode = json.JSONDecoder().raw_decode
+        self._buffer = u""
+        self._position = 0
+        # The number of characters before the buffer, to report positions.
+        self._offset = 0
+        self._eof = False
+        # Whether the next member of each mapping or list stepped into is
+        # its first, and so not preceded by a comma.
+        self._firsts = []
+
+    def start_mapping(self):
+        """
+        Step into the next value if it is a mapping.
+
+        :returns: bool
+
+        """
+        return self._start("{")
+
+    def start_sequence(self):
+        """
+        Step into the next value if it is a list.
+
+        :returns: bool
+
+        """
+        return self._start("[")
+
+    def next_key(self):
+        """
+        Return the next key of the mapping stepped into, leaving its value
+        to be read next, or END at the end of the mapping.
+
+        :raises: ptolemy.exceptions.InvalidFileError
+
+        """
+        if not self._next("}"):
+            return END
+        if self._peek() != u'"':
+            raise self._error(
+                "Expecting property name enclosed in double quotes"
+            )
+        key = self.load_value()
+        self._consume(u":")
+        return key
+
+    def next_item(self):
+        """
+        Return whether there is another item in the list stepped into.
+
+        :returns: bool
+        :raises: ptolemy.exceptions.InvalidFileError
+
+        """
+        return self._next("]")
+
+    def load_value(self):
+        """
+        Return the next value, decoded whole. More of the source is read
+        until the value is complete, doubling what is read each time.
+
+        :raises: ptolemy.exceptions.InvalidFileError
+
+        """
+        self._peek()
+        while True:
+            try:
+                value, end = self._decode(self._buffer, self._position)
+            except ValueError as error:
+                if self._eof:
+                    raise self._error(
+                        getattr(error, "msg", str(error)),
+                        getattr(error, "pos", self._position)
+                    )
+            else:
+                # A number at the end of the buffer may continue beyond it.
+                if end < len(self._buffer) or self._eof:
+                    self._position = end
+                    return value
+            self._read(max(CHUNK_SIZE, len(self._buffer)))
+
+    def finish(self):
+        """
+        Check nothing follows the source.
+
+        :raises: ptolemy.exceptions.InvalidFileError
+
+        """
+        if self._peek():
+            raise self._error("Extra data")
+
+    def _start(self, character):
+        """
+        Step into the next value if it starts with character.
+
+        :type character: str
+        :returns: bool
+
+        """
+        if self._peek() != character:
+            return False
+        self._position += 1
+        self._firsts.append(True)
+        return True
+
+    def _next(self, end_character):
+        """
+        Return whether there is another member in the mapping or list
+        stepped into, stepping out of it if not.
+
+        :param end_character: The character which ends it.
+        :type end_character: str
+        :returns: bool
+        :raises: ptolemy.exceptions.InvalidFileError
+
+        """
+        if self._peek() == end_character:
+            self._position += 1
+            self._firsts.pop()
+            return False
+        if self._firsts[-1]:
+            self._firsts[-1] = False
+        else:
+            self._consume(u",")
+        return True
+
+    def _consume(self, character):
+        """
+        Step over the delimiter character.
+
+        :type character: str
+        :raises: ptolemy.exceptions.InvalidFileError
+
+        """
+        if self._peek() != character:
+            raise self._error("Expecting {0!r} delimiter".format(
+                str(character)
+            ))
+        self._position += 1
+
+    def _peek(self):
+        """
+        Skip whitespace, and return the next character, or "" at the end of
+        the source.
+
+        :returns: str
+
+        """
+        while True:
+            self._position = _WHITESPACE.match(
+                self._buffer, self._position
+            ).end()
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if self._eof:
+                return u""
+            self._read(CHUNK_SIZE)
+
+    def _read(self, size):
+        """
+        Read more of the source into the buffer, dropping what has been
+        read from it.
+
+        :param size: The number of bytes to read.
+        :type size: int
+
+        """
+        chunk = self._file.read(size)
+        self._eof = not chunk
+        self._offset += self._position
+        self._buffer = self._buffer[self._position:] + self._decoder.decode(
+            chunk, final=self._eof
+        )
+        self._position = 0
+
+    def _error(self, message, position=None):
+        """
+        Return the error for invalid JSON.
+
+        :param message: What is wrong.
+        :type message: str
+        :param position: The position of the error in the buffer, if not
+            the current position.
+        :type position: int
+        :returns: ptolemy.exceptions.InvalidFileError
+
+        """
+        if position is None:
+            position = self._position
+        return InvalidFileError(
+            "The {0} '{1}' is not valid JSON. {2} (char {3})".format(
+                self._description, self._file_path, message,
+                self._offset + position
+            )
+        )
+
+
+class _YAMLReader(object):
+    """
+    _YAMLReader reads a YAML source as events from the fastest parser
+    available. Mappings and sequences are stepped into, and every other
+    value is composed and constructed by the safe loader, so values are
+    loaded exactly as the loader loads them.
+
+    :param source_file: The source file, opened in binary mode.
+    :type source_file: file
+    :param source_file_path: The path of the source file, to report.
+    :type source_file_path: str
+
+    """
+
+    def __init__(self, source_file, source_file_path=None):
+        # PyYAML is only imported once a YAML source is streamed.
+        import yaml
+
+        self._yaml = yaml
+        self._file_path = source_file_path
+        self._loader = _get_yaml_loader_class()(source_file)
+        self._loader.get_event()
+        self._document = None
+        if not self._loader.check_event(yaml.StreamEndEvent):
+            self._document = self._loader.get_event()
+
+    def start_mapping(self):
+        """
+        Step into the next value if it is a mapping, which is neither
+        anchored nor explicitly tagged as something else.
+
+        :returns: bool
+
+        """
+        return self._start(self._yaml.MappingStartEvent, u"map")
+
+    def start_sequence(self):
+        """
+        Step into the next value if it is a sequence, which is neither
+        anchored nor explicitly tagged as something else.
+
+        :returns: bool
+
+        """
+        return self._start(self._yaml.SequenceStartEvent, u"seq")
+
+    def next_key(self):
+        """
+        Return the next key of the mapping stepped into, leaving its value
+        to be read next, or END at the end of the mapping.
+
+        :raises: ptolemy.exceptions.InvalidFileError
+        :raises: yaml.YAMLError
+
+        """
+        if self._loader.check_event(self._yaml.MappingEndEvent):
+            self._loader.get_event()
+            return END
+        node = self._loader.compose_node(None, None)
+        if node.tag == u"tag:yaml.org,2002:merge":
+            raise InvalidFileError(
+                "The source file '{0}' merges a mapping into the rule types "
+                "or rule actions, so cannot be streamed.".format(
+                    self._file_path
+                )
+            )
+        key = self._loader.construct_document(node)
+        try:
+            hash(key)
+        except TypeError:
+            raise self._yaml.constructor.ConstructorError(
+                "while constructing a mapping", None, "found unhashable key",
+                node.start_mark
+            )
+        return key
+
+    def next_item(self):
+        """
+        Return whether there is another item in the sequence stepped into.
+
+        :returns: bool
+
+        """
+        if self._loader.check_event(self._yaml.SequenceEndEvent):
+            self._loader.get_event()
+            return False
+        return True
+
+    def load_value(self):
+        """
+        Return the next value, loaded whole, or None for an empty source.
+
+        :raises: yaml.YAMLError
+
+        """
+        if self._document is None:
+            return None
+        return self._loader.construct_document(
+            self._loader.compose_node(None, None)
+        )
+
+    def finish(self):
+        """
+        Check the source holds a single document.
+
+        :raises: yaml.YAMLError
+
+        """
+        if self._document is None:
+            return
+        self._loader.get_event()
+        if not self._loader.check_event(self._yaml.StreamEndEvent):
+            raise self._yaml.composer.ComposerError(
+                "expected a single document in the stream",
+                self._document.start_mark, "but found another document",
+                self._loader.get_event().start_mark
+            )
+
+    def _start(self, event_class, kind):
+        """
+        Step into the next value if it is an unanchored collection of a
+        kind.
+
+        :param event_class: The event starting the collection.
+        :type event_class: type
+        :param kind: "map" or "seq".
+        :type kind: str
+        :returns: bool
+
+        """
+        if self._document is None or \
+                not self._loader.check_event(event_class):
+            return False
+        event = self._loader.peek_event()
+        if event.anchor is not None or event.tag not in (
+                None, u"tag:yaml.org,2002:" + kind
+        ):
+            return False
+        self._loader.get_event()
+        return True
+
+
+def _get_yaml_loader_class():
+    """
+    Return the fastest safe YAML loader, able to compose one node at a
+    time. The libyaml loader composes whole documents in C, so it is
+    combined with the pure-Python composer, which composes the events its
+    parser yields.
+
+    :returns: type
+
+    """
+    global _yaml_loader_class  # pylint: disable=global-statement
+    if _yaml_loader_class is None:
+        from yaml.composer import Composer
+
+        loader_class = get_yaml_loader()
+        if issubclass(loader_class, Composer):
+            _yaml_loader_class = loader_class
+        else:
+            class StreamingLoader(Composer, loader_class):
+                # pylint: disable=missing-docstring,too-many-ancestors
+
+                def __init__(self, stream):
+                    loader_class.__init__(self, stream)
+                    Composer.__init__(self)
+
+            _yaml_loader_class = StreamingLoader
+    return _yaml_loader_class
@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+
+"""
+ptolemy.transformation
+
+This module implements removing redundant transformation rules, and
+reporting transformation rules which conflict.
+
+Transformation rules are indexed by their rule-target and the names in
+their object locators, down to the level of the target. Two rules overlap
+if they could both apply to the same object. Locators are compared without
+regard to case, and only the % wildcard is considered, as in
+ptolemy.selection.
+
+Whether DMS applies every transformation rule which matches an object in
+turn, or only one rule of each action, is not assumed, so only the rules
+whose removal makes no difference either way are removed:
+
+* Rules which have no effect, such as adding an empty prefix, or replacing
+  a suffix with itself, unless they conflict with another rule.
+* Rules which rename, convert the case of, or remove objects which a rule
+  with a broader locator already transforms in the same way, unless a rule
+  which transforms them in another way overlaps them. These actions give
+  the same result however many times they are applied.
+
+Overlapping rules with the same action and different values, and rules
+converting the same objects to lowercase and uppercase, conflict, and are
+kept, but flagged, as are rules which repeat a rule whose action gives a
+different result when applied twice, such as adding a prefix.
+
+"""
+
+from collections import defaultdict
+import json
+
+from .optimise import get_covering_patterns, record_flag, record_removal
+from .patterns import patterns_overlap
+
+
+# The location keys each rule-target locates objects by.
+TARGET_LOCATION_KEYS = {
+    "schema": ("schema-name",),
+    "table": ("schema-name", "table-name"),
+    "column": ("schema-name", "table-name", "column-name")
+}
+
+# The actions which give the same result however many times they are
+# applied to an object.
+IDEMPOTENT_ACTIONS = frozenset([
+    "rename", "convert-lowercase", "convert-uppercase", "remove-column"
+])
+
+# Pairs of different actions which conflict when applied to one object.
+CONFLICTING_ACTIONS = frozenset([
+    ("convert-lowercase", "convert-uppercase"),
+    ("convert-uppercase", "convert-lowercase")
+])
+
+
+class _Entry(object):  # pylint: disable=too-few-public-methods
+    """
+    _Entry holds what the index knows of a transformation rule.
+
+    """
+
+    def __init__(self, position, rule, key):
+        self.position = position
+        self.rule = rule
+        self.key = key
+        target_keys = TARGET_LOCATION_KEYS.get(
+            rule.data.get("rule-target"), rule.location_keys
+        )
+        # The names the rule locates its targets by, in lowercase, where
+        # a level the locator does not name matches anything.
+        self.levels = tuple(
+            rule.locate(location_key, "%").lower()
+            for location_key in target_keys
+        )
+        self.no_effect = _has_no_effect(rule)
+        self.mixed = False
+        self.in_conflict = False
+        self.conflict = None
+
+
+def remove_redundant_transformations(get_rules, removals):
+    """
+    Yield the rules returned by get_rules, without the transformation rules
+    which have no effect or are shadowed by a broader rule, flagging the
+    transformation rules which conflict.
+
+    The transformation rules are indexed on a first pass over the rules.
+    Each rule with exact names is compared with the rules with the same
+    names, and with the rules with wildcards in the same schema, so the
+    time taken grows with the number of rules with wildcards, rather than
+    with the square of the number of rules.
+
+    :param get_rules: A function returning a fresh iterator of rules, which
+        records removals in the list it is given, if any.
+    :type get_rules: function
+    :param removals: A list to record removed rules in, if any.
+    :type removals: list
+    :returns: iterator of ptolemy.rule.Rule
+
+    """
+    entries = _index_transformation_rules(get_rules(None))
+    _find_overlaps(entries)
+    covering_index = _index_covering_rules(entries.values())
+
+    for position, rule in enumerate(get_rules(removals)):
+        entry = entries.get(position)
+        if entry is None:
+            yield rule
+            continue
+
+        if entry.conflict is not None:
+            record_flag(
+                removals, rule, "conflicts with the {0}".format(
+                    _describe_entry(entry.conflict)
+                )
+            )
+        elif entry.no_effect and not entry.in_conflict:
+            record_removal(removals, rule, "has no effect")
+            continue
+        else:
+            covering = _find_covering_entry(covering_index, entry)
+            if covering is not None:
+                if rule.rule_action in IDEMPOTENT_ACTIONS:
+                    if not entry.mixed:
+                        record_removal(
+                            removals, rule, "shadowed by the {0}".format(
+                                _describe_entry(covering)
+                            )
+                        )
+                        continue
+                else:
+                    record_flag(
+                        removals, rule,
+                        "repeats the {0}, so may be applied twice".format(
+                            _describe_entry(covering)
+                        )
+                    )
+        yield rule
+
+
+def _index_transformation_rules(rules):
+    """
+    Return an entry for each transformation rule, by its position in the
+    rules.
+
+    :param rules: The rules.
+    :type rules: iterator of ptolemy.rule.Rule
+    :returns: dict
+
+    """
+    entries = {}
+    data = key = None
+    for position, rule in enumerate(rules):
+        if rule.rule_type != "transformation":
+            continue
+        # The rules expanded from an item share its data, so each item's
+        # transformation is only encoded once.
+        if rule.data is not data:
+            data = rule.data
+            key = (rule.rule_action, json.dumps(
+                {
+                    name: value for name, value in data.items()
+                    if name != "rule-name"
+                },
+                sort_keys=True
+            ))
+        entries[position] = _Entry(position, rule, key)
+    return entries
+
+
+def _find_overlaps(entries):
+    """
+    Mark each entry which overlaps an entry with a different
+    transformation, and record the first entry it conflicts with, if any.
+
+    :param entries: The entries, by position.
+    :type entries: dict
+
+    """
+    exact = defaultdict(list)
+    wildcards = defaultdict(list)
+    for position in sorted(entries):
+        entry = entries[position]
+        target = entry.rule.data.get("rule-target")
+        if any("%" in level for level in entry.levels):
+            # Rules with wildcards are grouped by their schema, or by None if
+            # it has a wildcard too.
+            schema = entry.levels[0] if "%" not in entry.levels[0] else None
+            wildcards[(target, schema)].append(entry)
+        else:
+            exact[(target, entry.levels)].append(entry)
+
+    for (target, levels), group in exact.items():
+        others = wildcards.get((target, levels[0]), []) + \
+            wildcards.get((target, None), [])
+        for i, entry in enumerate(group):
+            for other in group[i + 1:]:
+                _compare(entry, other)
+            for other in others:
+                if _may_overlap(entry.levels, other.levels):
+                    _compare(entry, other)
+
+    for (target, schema), group in wildcards.items():
+        others = [] if schema is None else wildcards.get((target, None), [])
+        for i, entry in enumerate(group):
+            for other in group[i + 1:] + others:
+                if _may_overlap(entry.levels, other.levels):
+                    _compare(entry, other)
+
+
+def _compare(entry, other):
+    """
+    Record that two overlapping entries overlap.
+
+    :param entry: An entry.
+    :type entry: ptolemy.transformation._Entry
+    :param other: An entry overlapping it.
+    :type other: ptolemy.transformation._Entry
+
+    """
+    if entry.key == other.key:
+        return
+    first, second = sorted([entry, other], key=lambda item: item.position)
+    first_action = first.rule.rule_action
+    second_action = second.rule.rule_action
+    no_effect = first.no_effect or second.no_effect
+    if first_action != second_action and no_effect:
+        # A rule which has no effect makes no difference to the rules of
+        # other actions, whatever the order.
+        return
+    entry.mixed = other.mixed = True
+    if first_action == second_action or \
+            (first_action, second_action) in CONFLICTING_ACTIONS:
+        # Both are kept, but the conflict is reported against the second.
+        first.in_conflict = second.in_conflict = True
+        if second.conflict is None or \
+                first.position < second.conflict.position:
+            second.conflict = first
+
+
+def _may_overlap(levels, other_levels):
+    """
+    Return whether two locators could match the same object, erring on the
+    side of overlapping.
+
+    :param levels: The names of a locator, from _Entry.levels.
+    :type levels: tuple of str
+    :param other_levels: The names of another locator.
+    :type other_levels: tuple of str
+    :returns: bool
+
+    """
+    return all(
+        patterns_overlap(name, other_name)
+        for name, other_name in zip(levels, other_levels)
+    )
+
+
+def _index_covering_rules(entries):
+    """
+    Return an index of the entries, mapping their transformation and
+    location keys to a tree of their names, level by level, leading to the
+    first entry with those names.
+
+    :param entries: The entries.
+    :type entries: iterable of ptolemy.transformation._Entry
+    :returns: dict
+
+    """
+    index = {}
+    for entry in sorted(entries, key=lambda item: item.position):
+        node = index.setdefault((entry.key, entry.rule.location_keys), {})
+        for name in entry.rule.names[:-1]:
+            node = node.setdefault(name, {})
+        node.setdefault(entry.rule.names[-1], entry)
+    return index
+
+
+def _find_covering_entry(index, entry):
+    """
+    Return an entry with the same transformation as entry, and a locator
+    which covers it, if there is one. An entry with an identical locator
+    only covers entry if it comes first.
+
+    :param index: The index of covering entries.
+    :type index: dict
+    :param entry: The entry.
+    :type entry: ptolemy.transformation._Entry
+    :returns: ptolemy.transformation._Entry or None
+
+    """
+    nodes = [index.get((entry.key, entry.rule.location_keys), {})]
+    for name in entry.rule.names:
+        nodes = [
+            node[pattern] for node in nodes
+            for pattern in get_covering_patterns(name) if pattern in node
+        ]
+    for covering in nodes:
+        if covering is not entry and (
+                covering.rule.names != entry.rule.names or
+                covering.position < entry.position
+        ):
+            return covering
+    return None
+
+
+def _has_no_effect(rule):
+    """
+    Return whether a transformation rule leaves every name it applies to
+    unchanged.
+
+    :param rule: The rule.
+    :type rule: ptolemy.rule.Rule
+    :returns: bool
+
+    """
+    action = rule.rule_action
+    if action in (
+            "add-prefix", "remove-prefix", "add-suffix", "remove-suffix"
+    ):
+        return rule.data.get("value") == ""
+    if action in ("replace-prefix", "replace-suffix"):
+        return rule.data.get("old-value") == rule.data.get("value")
+    return False
+
+
+def _describe_entry(entry):
+    """
+    Return a short description of an entry's rule, such as
+    "rename rule for Test.%".
+
+    :param entry: The entry.
+    :type entry: ptolemy.transformation._Entry
+    :returns: str
+
+    """
+    return "{0} rule for {1}".format(
+        entry.rule.rule_action, ".".join(entry.rule.names)
+    )
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+"""
+ptolemy.utils
+
+This module implements helpers shared between ptolemy modules.
+
+"""
+
+from contextlib import contextmanager
+import errno
+import hashlib
+import io
+import os
+import tempfile
+
+
+def _get_file_mode():
+    """
+    Return the permissions a newly created file would be given under the
+    current umask.
+
+    """
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+# The umask can only be read by setting it, so it is read once at import
+# time rather than racing other threads on every write.
+FILE_MODE = _get_file_mode()
+
+
+def atomic_write(file_path, data):
+    """
+    Write data to file_path atomically.
+
+    :param file_path: The path to write to.
+    :type file_path: str
+    :param data: The text to write.
+    :type data: str
+
+    """
+    with atomic_open(file_path) as output_file:
+        output_file.write(data)
+
+
+@contextmanager
+def atomic_open(file_path):
+    """
+    Open file_path for writing text atomically. The text is written to a
+    temporary file in the destination directory, which is renamed over
+    file_path once the block exits without error, so readers never see a
+    partially written file.
+
+    :param file_path: The path to write to.
+    :type file_path: str
+    :returns: A context manager yielding a text file.
+
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    try:
+        os.makedirs(directory)
+    except EnvironmentError as error:
+        if error.errno != errno.EEXIST:
+            raise
+
+    file_descriptor, temporary_path = tempfile.mkstemp(
+        dir=directory, prefix=".", suffix=".tmp"
+    )
+    try:
+        with io.open(file_descriptor, "w", encoding="utf-8") as output_file:
+            yield output_file
+        os.chmod(temporary_path, FILE_MODE)
+        replace(temporary_path, file_path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+
+
+def replace(source_path, destination_path):
+    """
+    Rename source_path to destination_path, overwriting destination_path if
+    it exists.
+
+    :param source_path: The file to rename.
+    :type source_path: str
+    :param destination_path: The new name.
+    :type destination_path: str
+
+    """
+    try:
+        os.replace(source_path, destination_path)
+    except AttributeError:  # pragma: no cover
+        # Python 2 has no os.replace, but os.rename overwrites on POSIX.
+        os.rename(source_path, destination_path)
+
+
+def get_file_digest(file_path):
+    """
+    Return the sha256 digest of a file's contents.
+
+    :param file_path: The path of the file.
+    :type file_path: str
+    :returns: str
+
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as digest_file:
+        for block in iter(lambda: digest_file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
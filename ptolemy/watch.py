@@ -0,0 +1,450 @@
+# -*- coding: utf-8 -*-
+
+"""
+ptolemy.watch
+
+This module implements ``ptolemy watch``, which compiles sources into an
+output directory, then recompiles each source as it changes.
+
+Changes are watched for with inotify where it is available, and otherwise
+by polling the sources' modification times. A burst of changes, such as an
+editor saving several files, is collected into a single rebuild. Only the
+sources which changed are recompiled, and within each, only the items which
+changed are expanded again. The rules of the others are reused from an
+ptolemy.rule.ExpansionCache, and only numbered and serialised again. When a
+fragment changes, the sources which include it are recompiled.
+
+"""
+
+from collections import namedtuple, OrderedDict
+import errno
+import glob
+import os
+import select
+import struct
+import time
+from timeit import default_timer
+
+from .batch import (
+    Job, Result, compile_job, find_conflicts, find_sources, get_output_path
+)
+from .rule import ExpansionCache
+
+
+# The inotify events which may mean a source has changed, from
+# <sys/inotify.h>.
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+INOTIFY_MASK = (
+    IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+)
+INOTIFY_EVENT = struct.Struct("iIII")
+
+# Paths are passed to and from inotify as bytes.
+_fsencode = getattr(os, "fsencode", lambda path: path)
+_fsdecode = getattr(os, "fsdecode", lambda path: path)
+
+Build = namedtuple(
+    "Build", ["results", "seconds", "items_reused", "items", "removed"]
+)
+Build.__new__.__defaults__ = ((),)
+
+
+class PollingWatcher(object):
+    """
+    PollingWatcher watches sources for changes by comparing their
+    modification times and sizes every interval seconds.
+
+    :param paths: File paths, directory paths or glob patterns.
+    :type paths: list
+    :param interval: The seconds between polls.
+    :type interval: float
+
+    """
+
+    def __init__(self, paths, interval=1.0):
+        self.paths = paths
+        self.interval = interval
+        self._snapshot = self._take_snapshot()
+
+    def wait(self, timeout=None):
+        """
+        Wait up to timeout seconds, or forever if timeout is None, for
+        sources to change.
+
+        :param timeout: The most seconds to wait.
+        :type timeout: float
+        :returns: set of the absolute paths which changed, which is empty
+            if none did
+
+        """
+        deadline = None if timeout is None else default_timer() + timeout
+        while True:
+            delay = self.interval
+            if deadline is not None:
+                delay = min(delay, max(deadline - default_timer(), 0))
+            time.sleep(delay)
+
+            snapshot = self._take_snapshot()
+            changes = set(
+                path for path in set(snapshot) | set(self._snapshot)
+                if snapshot.get(path) != self._snapshot.get(path)
+            )
+            self._snapshot = snapshot
+            if changes or (
+                    deadline is not None and default_timer() >= deadline
+            ):
+                return changes
+
+    def close(self):
+        """
+        Stop watching.
+
+        """
+
+    def _take_snapshot(self):
+        """
+        Return the modification time and size of each source.
+
+        :returns: dict
+
+        """
+        snapshot = {}
+        for source_path, _ in find_sources(self.paths, fragments=True):
+            try:
+                status = os.stat(source_path)
+            except OSError:
+                continue
+            snapshot[os.path.abspath(source_path)] = \
+                (status.st_mtime, status.st_size)
+        return snapshot
+
+
+class InotifyWatcher(object):
+    """
+    InotifyWatcher watches the directories sources are in for changes with
+    Linux's inotify, so changes are seen as soon as they are made.
+
+    :param paths: File paths, directory paths or glob patterns. Directories
+        and the fixed parts of globs are watched recursively, and the
+        directories of files are watched alone.
+    :type paths: list
+    :raises: OSError if inotify is not available
+
+    """
+
+    def __init__(self, paths):
+        import ctypes
+        import ctypes.util
+
+        self._libc = ctypes.CDLL(
+            ctypes.util.find_library("c"), use_errno=True
+        )
+        try:
+            self._libc.inotify_init1  # pylint: disable=pointless-statement
+        except AttributeError:
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._get_errno = ctypes.get_errno
+        self._directories = {}
+        self._recursive = {}
+
+        for directory, recursive in get_watched_directories(paths):
+            self._add_directory(directory, recursive)
+
+    def wait(self, timeout=None):
+        """
+        Wait up to timeout seconds, or forever if timeout is None, for files
+        to change.
+
+        :param timeout: The most seconds to wait.
+        :type timeout: float
+        :returns: set of the absolute paths which changed, which is empty
+            if none did, or None if events were lost and any file may have
+            changed
+
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changes = set()
+        try:
+            data = os.read(self._fd, 65536)
+        except OSError as error:
+            if error.errno == errno.EAGAIN:
+                return changes
+            raise
+
+        offset = 0
+        while offset < len(data):
+            watch, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                changes = None
+                continue
+            directory = self._directories.get(watch)
+            if mask & IN_IGNORED:
+                self._directories.pop(watch, None)
+                continue
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, _fsdecode(name))
+            if mask & IN_ISDIR:
+                # Files written to a new directory before it is watched
+                # raise no events of their own.
+                if self._recursive[directory] and mask & (
+                        IN_CREATE | IN_MOVED_TO
+                ):
+                    new_files = self._add_directory(path, True)
+                    if changes is not None:
+                        changes.update(new_files)
+            elif changes is not None:
+                changes.add(path)
+        return changes
+
+    def close(self):
+        """
+        Stop watching.
+
+        """
+        os.close(self._fd)
+
+    def _add_directory(self, directory, recursive):
+        """
+        Watch directory and, if recursive, the directories beneath it.
+
+        :param directory: The directory.
+        :type directory: str
+        :param recursive: Whether to watch the directories beneath it.
+        :type recursive: bool
+        :returns: list of the files found in the directories
+
+        """
+        files = []
+        for root, directories, file_names in os.walk(directory):
+            root = os.path.abspath(root)
+            watch = self._libc.inotify_add_watch(
+                self._fd, _fsencode(root), INOTIFY_MASK
+            )
+            if watch < 0:
+                error = self._get_errno()
+                if error == errno.ENOENT:
+                    continue
+                raise OSError(error, "inotify_add_watch failed", root)
+            self._directories[watch] = root
+            self._recursive[root] = recursive
+            files.extend(os.path.join(root, name) for name in file_names)
+            if not recursive:
+                del directories[:]
+        return files
+
+
+def get_watched_directories(paths):
+    """
+    Return the directories to watch for changes to the sources in paths,
+    and whether to watch beneath each.
+
+    :param paths: File paths, directory paths or glob patterns.
+    :type paths: list
+    :returns: list of (directory, recursive) tuples
+
+    """
+    directories = []
+    for path in paths:
+        if os.path.isdir(path):
+            directories.append((path, True))
+        elif glob.has_magic(path):
+            base_directory = path
+            while glob.has_magic(base_directory):
+                base_directory = os.path.dirname(base_directory)
+            directories.append((base_directory or ".", True))
+        else:
+            directories.append((os.path.dirname(path) or ".", False))
+    return directories
+
+
+def get_watcher(paths, poll=False, interval=1.0):
+    """
+    Return an InotifyWatcher for paths, or a PollingWatcher if inotify is
+    not available or poll is set.
+
+    :param paths: File paths, directory paths or glob patterns.
+    :type paths: list
+    :param poll: Whether to poll rather than use inotify.
+    :type poll: bool
+    :param interval: The seconds between polls.
+    :type interval: float
+    :returns: InotifyWatcher or PollingWatcher
+
+    """
+    if not poll:
+        try:
+            return InotifyWatcher(paths)
+        except OSError:
+            pass
+    return PollingWatcher(paths, interval)
+
+
+def wait_for_changes(watcher, debounce=0.1):
+    """
+    Wait for sources to change, then until none have changed for debounce
+    seconds, so that a burst of changes is rebuilt once.
+
+    :param watcher: The watcher.
+    :type watcher: InotifyWatcher or PollingWatcher
+    :param debounce: The seconds without changes which end a burst.
+    :type debounce: float
+    :returns: set of the absolute paths which changed, or None if any may
+        have
+
+    """
+    changes = set()
+    while changes is not None and not changes:
+        changes = watcher.wait()
+    while True:
+        more_changes = watcher.wait(debounce)
+        if more_changes is None:
+            changes = None
+        elif not more_changes:
+            return changes
+        elif changes is not None:
+            changes.update(more_changes)
+
+
+class Builder(object):
+    """
+    Builder compiles sources into an output directory, keeping the rules
+    each item of each source expanded to, so that when sources change, only
+    the sources and items which changed are expanded again.
+
+    :param paths: File paths, directory paths or glob patterns.
+    :type paths: list
+    :param output_dir: The directory to write mappings to.
+    :type output_dir: str
+    :param options: Keyword arguments to create each Source with.
+    :type options: dict
+
+    """
+
+    def __init__(self, paths, output_dir, options=None):
+        self.paths = paths
+        self.output_dir = output_dir
+        self.options = options or {}
+        self.expansion_caches = {}
+        self.includes = {}
+        self.output_paths = {}
+
+    def build(self, changes=None):
+        """
+        Compile the sources which changed.
+
+        :param changes: The absolute paths which changed, or None to compile
+            every source. Sources which include a fragment which changed are
+            compiled too.
+        :type changes: set
+        :returns: ptolemy.watch.Build
+
+        """
+        start = default_timer()
+        sources = OrderedDict()
+        for source_path, relative_path in find_sources(self.paths):
+            sources[os.path.abspath(source_path)] = Job(
+                source_path, get_output_path(self.output_dir, relative_path)
+            )
+
+        # Forget the sources which have been removed, and remove their
+        # mappings. A mapping which another source is now written to is
+        # left, and that source is compiled instead.
+        output_sources = {}
+        for source_path, job in sources.items():
+            output_sources.setdefault(job.output_path, []).append(source_path)
+        removed = []
+        reclaimed = set()
+        for source_path in list(self.output_paths):
+            if source_path in sources:
+                continue
+            output_path = self.output_paths.pop(source_path)
+            self.expansion_caches.pop(source_path, None)
+            self.includes.pop(source_path, None)
+            if output_path in output_sources:
+                reclaimed.update(output_sources[output_path])
+            elif _remove_file(output_path):
+                removed.append(output_path)
+
+        if changes is not None:
+            changes = set(changes)
+            changes.update(reclaimed)
+            changes.update(
+                source_path
+                for source_path, includes in self.includes.items()
+                if changes.intersection(includes)
+            )
+
+        conflicts = dict(zip(
+            sources, find_conflicts(list(sources.values()))
+        ))
+        results = []
+        items_reused = items = 0
+        for source_path, job in sources.items():
+            if changes is not None and source_path not in changes:
+                continue
+            self.output_paths[source_path] = job.output_path
+            if conflicts[source_path] is not None:
+                results.append(Result(
+                    job.source_path, job.output_path, conflicts[source_path],
+                    None
+                ))
+                continue
+            expansion_cache = self.expansion_caches.setdefault(
+                source_path, ExpansionCache()
+            )
+            hits, misses = expansion_cache.hits, expansion_cache.misses
+            result = compile_job(
+                job,
+                options=dict(self.options, expansion_cache=expansion_cache)
+            )
+            results.append(result)
+            self.includes[source_path] = result.includes or []
+            items_reused += expansion_cache.hits - hits
+            items += expansion_cache.hits + expansion_cache.misses - \
+                hits - misses
+            # Sources which failed may not have expanded every item, so
+            # their rules are kept until the source compiles again.
+            if result.error is None:
+                expansion_cache.prune()
+
+        return Build(
+            results, default_timer() - start, items_reused, items, removed
+        )
+
+
+def _remove_file(file_path):
+    """
+    Remove a file, if it exists.
+
+    :param file_path: The path of the file.
+    :type file_path: str
+    :returns: bool, whether the file existed
+    :raises: OSError if the file could not be removed
+
+    """
+    try:
+        os.remove(file_path)
+    except OSError as error:
+        if error.errno != errno.ENOENT:
+            raise
+        return False
+    return True
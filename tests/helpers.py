@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+"""
+Rule factories shared by the tests. Rules are located by dotted names, such
+as "Test.Employee" or "Test.Employee.id".
+
+"""
+
+from ptolemy.rule import Rule
+
+
+LOCATOR_KEYS = ("schema-name", "table-name", "column-name")
+
+
+def rule_dict(rule_type, rule_action, names, **data):
+    """
+    Return a rule as a dict, as it is read from a mapping.
+
+    """
+    rule = {
+        "object-locator": dict(zip(LOCATOR_KEYS, names.split("."))),
+        "rule-action": rule_action,
+        "rule-type": rule_type
+    }
+    rule.update(data)
+    return rule
+
+
+def selection_rule(names, action="include", **data):
+    """
+    Return an un-numbered selection rule.
+
+    """
+    return Rule.from_dict(rule_dict("selection", action, names, **data))
+
+
+def transformation_rule(action, names, target="table", **data):
+    """
+    Return an un-numbered transformation rule.
+
+    """
+    data["rule-target"] = target
+    return Rule.from_dict(rule_dict("transformation", action, names, **data))
+
+
+def get_rule(rule_id, names, rule_type="selection", rule_action="include",
+             **data):
+    """
+    Return a numbered rule as a dict, named after its ID.
+
+    """
+    data.update({"rule-id": str(rule_id), "rule-name": str(rule_id)})
+    return rule_dict(rule_type, rule_action, names, **data)
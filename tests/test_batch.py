@@ -0,0 +1,362 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+
+from ptolemy import batch
+from ptolemy.cache import Cache
+
+
+FIXTURES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "integration_tests",
+    "fixtures"
+)
+
+
+class BatchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.src_dir = os.path.join(self.directory, "src")
+        self.output_dir = os.path.join(self.directory, "mappings")
+        os.makedirs(os.path.join(self.src_dir, "nested"))
+        shutil.copy(
+            os.path.join(FIXTURES_DIR, "src", "single_filter.yaml"),
+            os.path.join(self.src_dir, "single_filter.yaml")
+        )
+        shutil.copy(
+            os.path.join(FIXTURES_DIR, "src", "rename_a_table.yaml"),
+            os.path.join(self.src_dir, "nested", "rename_a_table.yaml")
+        )
+        with open(os.path.join(self.src_dir, "notes.txt"), "w") as f:
+            f.write("not a source")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_find_sources_with_directory(self):
+        sources = batch.find_sources([self.src_dir])
+        self.assertEqual(sources, [
+            (
+                os.path.join(self.src_dir, "single_filter.yaml"),
+                "single_filter.yaml"
+            ),
+            (
+                os.path.join(self.src_dir, "nested", "rename_a_table.yaml"),
+                os.path.join("nested", "rename_a_table.yaml")
+            )
+        ])
+
+    def test_find_sources_with_glob(self):
+        sources = batch.find_sources(
+            [os.path.join(self.src_dir, "*", "*.yaml")]
+        )
+        self.assertEqual(sources, [
+            (
+                os.path.join(self.src_dir, "nested", "rename_a_table.yaml"),
+                os.path.join("nested", "rename_a_table.yaml")
+            )
+        ])
+
+    def test_find_sources_with_file(self):
+        source_path = os.path.join(self.src_dir, "single_filter.yaml")
+        sources = batch.find_sources([source_path])
+        self.assertEqual(sources, [(source_path, "single_filter.yaml")])
+
+    def test_get_output_path(self):
+        output_path = batch.get_output_path("out", "a/b.yaml")
+        self.assertEqual(output_path, os.path.join("out", "a", "b.json"))
+
+    def test_compile_job_with_missing_source(self):
+        job = batch.Job("/this/file/does/not.exist", self.output_dir)
+        result = batch.compile_job(job)
+        self.assertIn("does not exist", result.error)
+        self.assertFalse(os.path.exists(self.output_dir))
+
+    @patch("ptolemy.batch.LOGGER")
+    def test_compile_job_logs_removals(self, mock_LOGGER):
+        source_path = os.path.join(self.src_dir, "duplicate.yaml")
+        with open(source_path, "w") as f:
+            f.write(
+                "selection:\n  include:\n    - object-locators:\n"
+                "        schema-names: [Test]\n"
+                "        table-names: [Employee, Employee]\n"
+            )
+        job = batch.Job(
+            source_path, os.path.join(self.output_dir, "duplicate.json")
+        )
+        result = batch.compile_job(
+            job, options={"optimisations": ["selection"]}
+        )
+        self.assertIsNone(result.error)
+        self.assertEqual(mock_LOGGER.debug.call_count, 1)
+        self.assertEqual(
+            mock_LOGGER.debug.call_args[0][1:3], (source_path, "removed")
+        )
+
+    def test_compile_all(self):
+        with open(os.path.join(self.src_dir, "invalid.yaml"), "w") as f:
+            f.write("selection:\n  incorrect-key: []\n")
+
+        results = list(batch.compile_all([self.src_dir], self.output_dir))
+
+        self.assertEqual(
+            [result.error is None for result in results],
+            [False, True, True]
+        )
+        self.assertIn("could not be validated", results[0].error)
+        self._assert_mapping_matches_fixture(
+            os.path.join(self.output_dir, "single_filter.json"),
+            "single_filter.json"
+        )
+        self._assert_mapping_matches_fixture(
+            os.path.join(self.output_dir, "nested", "rename_a_table.json"),
+            "rename_a_table.json"
+        )
+
+    def test_compile_all_with_conflicting_output_paths(self):
+        source_path = os.path.join(self.src_dir, "single_filter.yaml")
+        other_path = os.path.join(self.src_dir, "nested", "single_filter.yml")
+        shutil.copy(source_path, other_path)
+        output_path = os.path.join(self.output_dir, "single_filter.json")
+        for jobs in [1, 2]:
+            results = list(batch.compile_all(
+                [source_path, other_path, self.src_dir], self.output_dir,
+                jobs=jobs
+            ))
+
+            self.assertEqual(
+                [result.error for result in results[:2]], [
+                    "The mapping would be written to '{0}', as would the "
+                    "mapping of '{1}', '{2}'.".format(
+                        output_path, other_path, source_path
+                    ),
+                    "The mapping would be written to '{0}', as would the "
+                    "mapping of '{1}', '{2}'.".format(
+                        output_path, source_path, source_path
+                    )
+                ]
+            )
+            self.assertEqual(
+                [result.error is None for result in results[2:]],
+                [False, True, True]
+            )
+            self.assertFalse(os.path.exists(output_path))
+
+    def test_find_conflicts(self):
+        self.assertEqual(
+            batch.find_conflicts([
+                batch.Job("a/x.yaml", "out/x.json"),
+                batch.Job("x.yml", "out/x.json"),
+                batch.Job("b/y.yaml", "out/./y.json")
+            ]),
+            [
+                "The mapping would be written to 'out/x.json', as would the "
+                "mapping of 'x.yml'.",
+                "The mapping would be written to 'out/x.json', as would the "
+                "mapping of 'a/x.yaml'.",
+                None
+            ]
+        )
+
+    def test_compile_all_with_unexpected_error(self):
+        write_mapping = batch._write_mapping
+
+        def fail_single_filter(source, output_path, source_string=None):
+            if output_path.endswith("single_filter.json"):
+                raise TypeError("unexpected")
+            write_mapping(source, output_path, source_string)
+
+        with patch("ptolemy.batch._write_mapping", fail_single_filter):
+            results = list(batch.compile_all([self.src_dir], self.output_dir))
+
+        self.assertEqual(
+            results[0].error,
+            "Unexpected error compiling the source. TypeError: unexpected"
+        )
+        self.assertIsNone(results[1].error)
+        self._assert_mapping_matches_fixture(
+            os.path.join(self.output_dir, "nested", "rename_a_table.json"),
+            "rename_a_table.json"
+        )
+
+    def test_compile_all_with_worker_pool(self):
+        results = list(
+            batch.compile_all([self.src_dir], self.output_dir, jobs=2)
+        )
+
+        self.assertEqual([result.error for result in results], [None, None])
+        self._assert_mapping_matches_fixture(
+            os.path.join(self.output_dir, "nested", "rename_a_table.json"),
+            "rename_a_table.json"
+        )
+
+    @patch("multiprocessing.cpu_count", return_value=1)
+    def test_compile_all_with_a_worker_per_cpu(self, mock_cpu_count):
+        results = list(
+            batch.compile_all([self.src_dir], self.output_dir, jobs=0)
+        )
+
+        mock_cpu_count.assert_called_once_with()
+        self.assertEqual([result.error for result in results], [None, None])
+
+    def test_compile_all_with_shards(self):
+        results = list(batch.compile_all(
+            [self.src_dir], self.output_dir, shards=(2, None)
+        ))
+
+        self.assertEqual([result.error for result in results], [None, None])
+        self.assertEqual(
+            sorted(os.listdir(self.output_dir)),
+            ["nested", "single_filter.1.json"]
+        )
+        self.assertEqual(
+            os.listdir(os.path.join(self.output_dir, "nested")),
+            ["rename_a_table.1.json"]
+        )
+
+    def test_compile_all_with_shards_and_no_include_rules(self):
+        source_path = os.path.join(self.src_dir, "exclude_only.yaml")
+        with open(source_path, "w") as f:
+            f.write(
+                "selection:\n  exclude:\n    - object-locators:\n"
+                "        schema-names: [Test]\n"
+                "        table-names: [Employee]\n"
+            )
+        results = list(batch.compile_all(
+            [source_path], self.output_dir, shards=(2, None)
+        ))
+
+        self.assertEqual(
+            results[0].error,
+            "The source has no include selection rules to split into shards."
+        )
+        self.assertFalse(os.path.exists(self.output_dir))
+
+    def test_compile_all_with_cache(self):
+        cache = Cache(os.path.join(self.directory, "cache"))
+        list(batch.compile_all([self.src_dir], self.output_dir, cache=cache))
+        os.remove(os.path.join(self.output_dir, "single_filter.json"))
+
+        results = list(
+            batch.compile_all([self.src_dir], self.output_dir, cache=cache)
+        )
+
+        self.assertEqual(
+            [result.cache_hit for result in results], [True, True]
+        )
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+        self._assert_mapping_matches_fixture(
+            os.path.join(self.output_dir, "single_filter.json"),
+            "single_filter.json"
+        )
+
+    def test_compile_all_with_catalog_report(self):
+        catalog_path = os.path.join(self.directory, "catalog.json")
+        with open(catalog_path, "w") as catalog_file:
+            json.dump([
+                {"table_schema": "Test", "table_name": "Actor"},
+                {"table_schema": "Test", "table_name": "Employee"}
+            ], catalog_file)
+        cache = Cache(os.path.join(self.directory, "cache"))
+        report_path = os.path.join(
+            self.output_dir, "nested", "rename_a_table.tables.csv"
+        )
+
+        for cache_hit in [False, True]:
+            results = list(batch.compile_all(
+                [self.src_dir], self.output_dir, cache=cache,
+                options={"catalog": catalog_path}, catalog_report=True
+            ))
+
+            # The report is written whether or not the mapping was cached.
+            self.assertEqual(
+                [result.cache_hit for result in results],
+                [cache_hit, cache_hit]
+            )
+            with open(report_path) as report_file:
+                self.assertEqual(report_file.read().splitlines(), [
+                    "rule-action,schema-pattern,table-pattern,schema,table",
+                    "include,Test,%,Test,Actor",
+                    "include,Test,%,Test,Employee"
+                ])
+            os.remove(report_path)
+
+    def test_compile_all_streamed_with_cache(self):
+        cache = Cache(os.path.join(self.directory, "cache"))
+        list(batch.compile_all([self.src_dir], self.output_dir, cache=cache))
+
+        results = list(batch.compile_all(
+            [self.src_dir], self.output_dir, cache=cache,
+            options={"streaming": True}
+        ))
+
+        # Streaming makes no difference to the mappings, so they are reused.
+        self.assertEqual(
+            [result.cache_hit for result in results], [True, True]
+        )
+
+    def test_compile_all_streamed(self):
+        results = list(batch.compile_all(
+            [self.src_dir], self.output_dir, options={"streaming": True}
+        ))
+
+        self.assertEqual([result.error for result in results], [None, None])
+        self._assert_mapping_matches_fixture(
+            os.path.join(self.output_dir, "nested", "rename_a_table.json"),
+            "rename_a_table.json"
+        )
+
+    def test_find_sources_skips_fragments(self):
+        fragment_path = os.path.join(self.src_dir, "nested", "_tables.yaml")
+        with open(fragment_path, "w") as f:
+            f.write("[Employee]")
+        self.assertEqual(len(batch.find_sources([self.src_dir])), 2)
+        self.assertIn(
+            (fragment_path, os.path.join("nested", "_tables.yaml")),
+            batch.find_sources([self.src_dir], fragments=True)
+        )
+        self.assertEqual(
+            batch.find_sources([os.path.join(self.src_dir, "*", "*.yaml")]),
+            [(
+                os.path.join(self.src_dir, "nested", "rename_a_table.yaml"),
+                os.path.join("nested", "rename_a_table.yaml")
+            )]
+        )
+
+    def test_compile_all_with_cache_and_fragments(self):
+        fragment_path = os.path.join(self.src_dir, "_tables.yaml")
+        source_path = os.path.join(self.src_dir, "nested", "includes.yaml")
+        with open(source_path, "w") as f:
+            f.write(
+                "selection:\n  include:\n    - object-locators:\n"
+                "        schema-names: [Test]\n"
+                "        table-names: {$ref: ../_tables.yaml}\n"
+            )
+        cache = Cache(os.path.join(self.directory, "cache"))
+        output_path = os.path.join(self.output_dir, "includes.json")
+
+        for table_names in ["[Employee]", "[Employee, Department]"]:
+            with open(fragment_path, "w") as f:
+                f.write(table_names)
+            result = batch.compile_job(
+                batch.Job(source_path, output_path), cache
+            )
+            self.assertEqual(result.includes, [fragment_path])
+            self.assertFalse(result.cache_hit)
+
+        with open(output_path) as f:
+            self.assertEqual(len(json.load(f)["rules"]), 2)
+
+    def _assert_mapping_matches_fixture(self, mapping_path, fixture_name):
+        with open(mapping_path) as f:
+            mapping = json.load(f)
+        with open(os.path.join(FIXTURES_DIR, "mappings", fixture_name)) as f:
+            expected_mapping = json.load(f)
+        self.assertEqual(mapping, expected_mapping)
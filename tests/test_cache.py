@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+import errno
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+
+from ptolemy.cache import Cache
+
+
+class CacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = Cache(self.directory, max_size=10)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_get_key_depends_on_source(self):
+        self.assertEqual(
+            self.cache.get_key(b"selection: {}"),
+            self.cache.get_key(b"selection: {}")
+        )
+        self.assertNotEqual(
+            self.cache.get_key(b"selection: {}"),
+            self.cache.get_key(b"selection:  {}")
+        )
+
+    def test_get_key_depends_on_version(self):
+        key = self.cache.get_key(b"selection: {}")
+        with patch("ptolemy.cache.__version__", "0.0.0"):
+            self.assertNotEqual(self.cache.get_key(b"selection: {}"), key)
+
+    def test_get_with_missing_entry(self):
+        self.assertIsNone(self.cache.get("abcdef"))
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 1))
+
+    def test_set_and_get(self):
+        self.cache.set("abcdef", u"mapping")
+        self.assertEqual(self.cache.get("abcdef"), u"mapping")
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 0))
+        self.assertTrue(
+            os.path.isfile(os.path.join(self.directory, "ab", "abcdef"))
+        )
+
+    def test_get_with_unreadable_entry(self):
+        os.makedirs(self.cache.get_path("abcdef"))
+        with self.assertRaises(EnvironmentError):
+            self.cache.get("abcdef")
+
+    def test_get_with_entry_evicted_while_opened(self):
+        self.cache.set("abcdef", u"mapping")
+        with patch("os.utime", side_effect=OSError(errno.ENOENT, "evicted")):
+            self.assertEqual(self.cache.get("abcdef"), u"mapping")
+        with patch("os.utime", side_effect=OSError(errno.EPERM, "denied")):
+            with self.assertRaises(OSError):
+                self.cache.get("abcdef")
+
+    def test_evict_removes_least_recently_used(self):
+        for key, atime in [("aa01", 1), ("aa02", 3), ("aa03", 2)]:
+            self.cache.set(key, u"12345")
+            os.utime(self.cache.get_path(key), (atime, atime))
+
+        removed = self.cache.evict()
+
+        self.assertEqual(removed, 1)
+        self.assertIsNone(self.cache.get("aa01"))
+        self.assertEqual(self.cache.get("aa02"), u"12345")
+        self.assertEqual(self.cache.get("aa03"), u"12345")
+
+    def test_evict_skips_entries_being_written(self):
+        self.cache.set("aa01", u"12345")
+        with open(os.path.join(self.directory, "aa", ".aa02.tmp"), "w") as f:
+            f.write(u"1234567890")
+
+        self.assertEqual(self.cache.evict(), 0)
+        self.assertEqual(self.cache.get("aa01"), u"12345")
+
+    def test_evict_with_entries_evicted_by_another_process(self):
+        keys = ["aa01", "aa02", "aa03", "aa04"]
+        for key in keys:
+            self.cache.set(key, u"12345")
+        stat = os.stat
+        remove = os.remove
+
+        def evicted_stat(path):
+            if path == self.cache.get_path("aa01"):
+                raise OSError(errno.ENOENT, "evicted")
+            return stat(path)
+
+        def evicted_remove(path):
+            remove(path)
+            raise OSError(errno.ENOENT, "evicted")
+
+        with patch("os.stat", evicted_stat), \
+                patch("os.remove", evicted_remove):
+            self.assertEqual(self.cache.evict(), 0)
+        self.assertEqual(
+            len([key for key in keys
+                 if os.path.exists(self.cache.get_path(key))]),
+            3
+        )
+
+    def test_evict_with_error(self):
+        for key in ["aa01", "aa02", "aa03"]:
+            self.cache.set(key, u"12345")
+
+        with patch("os.remove", side_effect=OSError(errno.EACCES, "denied")):
+            with self.assertRaises(OSError):
+                self.cache.evict()
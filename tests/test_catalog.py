@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+from ptolemy.catalog import (
+    Catalog, NameIndex, Resolution, load_catalog, write_report
+)
+from ptolemy.exceptions import InvalidFileError
+from ptolemy.source import Source
+
+
+TABLES = [
+    ("Test", "Employee"),
+    ("Test", "Employee_History"),
+    ("Test", "Dept"),
+    ("Test", "DMS_Status"),
+    ("Archive", "Employee"),
+    ("Audit", "Log")
+]
+
+
+def make_source(schema_names, table_names):
+    return {
+        "selection": {
+            "include": [
+                {
+                    "object-locators": {
+                        "schema-names": schema_names,
+                        "table-names": table_names
+                    }
+                }
+            ]
+        }
+    }
+
+
+class NameIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.index = NameIndex(
+            ["Employee", "Employee_History", "Dept", "DMS_Status", "Emp"]
+        )
+
+    def test_match_prefix(self):
+        self.assertEqual(
+            self.index.match("Emp%"), ["Emp", "Employee", "Employee_History"]
+        )
+
+    def test_match_suffix(self):
+        self.assertEqual(self.index.match("%ee"), ["Employee"])
+
+    def test_match_single_character_wildcard(self):
+        self.assertEqual(self.index.match("D_p%"), ["Dept"])
+        self.assertEqual(self.index.match("DMS_%"), ["DMS_Status"])
+
+    def test_match_name_containing_underscore(self):
+        self.assertEqual(self.index.match("D_pt"), [])
+        self.assertEqual(self.index.match("DMS_Status"), ["DMS_Status"])
+
+    def test_match_name(self):
+        self.assertEqual(self.index.match("Dept"), ["Dept"])
+        self.assertEqual(self.index.match("Missing"), [])
+
+
+class CatalogTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.catalog = Catalog(TABLES)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_load_catalog_from_json(self):
+        catalog_path = os.path.join(self.directory, "catalog.json")
+        with open(catalog_path, "w") as f:
+            json.dump([
+                {"TABLE_SCHEMA": schema, "TABLE_NAME": table}
+                for schema, table in TABLES
+            ], f)
+
+        catalog = load_catalog(catalog_path)
+        self.assertEqual(
+            catalog.match("%", "Emp%"),
+            [("Archive", "Employee"), ("Test", "Employee"),
+             ("Test", "Employee_History")]
+        )
+        self.assertIs(load_catalog(catalog_path), catalog)
+
+    def test_load_catalog_from_sqlite(self):
+        catalog_path = os.path.join(self.directory, "catalog.db")
+        connection = sqlite3.connect(catalog_path)
+        connection.execute("CREATE TABLE tables (table_schema, table_name)")
+        connection.executemany("INSERT INTO tables VALUES (?, ?)", TABLES)
+        connection.commit()
+        connection.close()
+
+        catalog = load_catalog(catalog_path)
+        self.assertEqual(catalog.match("Audit", "%"), [("Audit", "Log")])
+
+    def test_load_catalog_with_invalid_file(self):
+        catalog_path = os.path.join(self.directory, "catalog.json")
+        with open(catalog_path, "w") as f:
+            json.dump([{"schema": "Test"}], f)
+
+        with self.assertRaises(InvalidFileError):
+            load_catalog(catalog_path)
+        with self.assertRaises(InvalidFileError):
+            load_catalog(os.path.join(self.directory, "missing.json"))
+
+    def test_resolve(self):
+        source, resolutions = self.catalog.resolve(
+            make_source(["Test", "A%"], ["Emp%", "Log"])
+        )
+
+        items = source["selection"]["include"]
+        self.assertEqual(
+            [item["object-locators"] for item in items],
+            [
+                {
+                    "schema-names": ["Test"],
+                    "table-names": ["Employee", "Employee_History", "Log"]
+                },
+                {"schema-names": ["Archive"], "table-names": ["Employee"]},
+                {"schema-names": ["Audit"], "table-names": ["Log"]}
+            ]
+        )
+        self.assertEqual(resolutions, [
+            Resolution(
+                "include", "Test", "Emp%",
+                [("Test", "Employee"), ("Test", "Employee_History")]
+            ),
+            Resolution("include", "A%", "Emp%", [("Archive", "Employee")]),
+            Resolution("include", "A%", "Log", [("Audit", "Log")])
+        ])
+
+    def test_resolve_keeps_names_containing_underscore(self):
+        source, resolutions = self.catalog.resolve(
+            make_source(["Test"], ["Employee_History", "Employe_"])
+        )
+        self.assertEqual(
+            source["selection"]["include"][0]["object-locators"],
+            {
+                "schema-names": ["Test"],
+                "table-names": ["Employee_History", "Employe_"]
+            }
+        )
+        self.assertEqual(resolutions, [])
+
+    def test_resolve_drops_items_matching_no_tables(self):
+        source, resolutions = self.catalog.resolve(
+            make_source(["Missing%"], ["%"])
+        )
+        self.assertEqual(source["selection"]["include"], [])
+        self.assertEqual(
+            resolutions, [Resolution("include", "Missing%", "%", [])]
+        )
+
+    def test_resolve_keeping_wildcards(self):
+        original = make_source(["Test"], ["DMS%"])
+        source, resolutions = self.catalog.resolve(original, True)
+        self.assertIs(source, original)
+        self.assertEqual(resolutions, [
+            Resolution("include", "Test", "DMS%", [("Test", "DMS_Status")])
+        ])
+
+    def test_write_report(self):
+        stream = StringIO()
+        write_report([
+            Resolution("exclude", "Test", "DMS%", [("Test", "DMS_Status")]),
+            Resolution("include", "Missing%", "%", [])
+        ], stream)
+        self.assertEqual(stream.getvalue(), (
+            "rule-action,schema-pattern,table-pattern,schema,table\n"
+            "exclude,Test,DMS%,Test,DMS_Status\n"
+            "include,Missing%,%,,\n"
+        ))
+
+    def test_compile_with_catalog(self):
+        catalog_path = os.path.join(self.directory, "catalog.json")
+        with open(catalog_path, "w") as f:
+            json.dump([
+                {"table_schema": schema, "table_name": table}
+                for schema, table in TABLES
+            ], f)
+
+        source = Source("file/path", catalog=catalog_path)
+        mapping = json.loads(source.compile_string(b"""
+selection:
+  include:
+    - object-locators:
+        schema-names: [Test]
+        table-names: ["D%"]
+"""))
+        self.assertEqual(
+            [rule["object-locator"] for rule in mapping["rules"]],
+            [
+                {"schema-name": "Test", "table-name": "DMS_Status"},
+                {"schema-name": "Test", "table-name": "Dept"}
+            ]
+        )
+        self.assertEqual(len(source.resolutions), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,32 +1,81 @@
 # -*- coding: utf-8 -*-
 
-import argparse
+import json
 import logging
+import os
+import shutil
 try:
     from StringIO import StringIO
 except ImportError:
     from io import StringIO
+import tempfile
 import unittest
 
-from mock import patch, sentinel
+from mock import Mock, patch, sentinel
 from jsonschema import exceptions as jsonschema_exceptions
 
 from ptolemy import cli
+from ptolemy.batch import Result
+from ptolemy.cache import DEFAULT_MAX_SIZE
+from ptolemy.catalog import Resolution
+from ptolemy.mapping import JSONFormat
+from ptolemy.optimise import Removal
+from ptolemy.stats import Stats
+from ptolemy.watch import Build
 from ptolemy import exceptions as ptolemy_exceptions
 
 
+FIXTURE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "integration_tests", "fixtures", "src", "single_filter.yaml"
+)
+
+DEFAULT_OPTIONS = {
+    "max_rules": None, "max_bytes": None, "optimisations": [],
+    "catalog": None, "keep_wildcards": False, "rule_ids": "position",
+    "json_format": JSONFormat(False, "sorted", "auto")
+}
+
+# Keep a reference to parse_arguments, which the tests of main() patch.
+parse_arguments = cli.parse_arguments
+
+
+def get_arguments(**kwargs):
+    """
+    Return the default arguments, overridden by kwargs.
+
+    """
+    arguments = parse_arguments(["source"])
+    vars(arguments).update(kwargs)
+    return arguments
+
+
 class CliTestCase(unittest.TestCase):
 
     def test_parse_arguments_with_source_file(self):
         arguments = cli.parse_arguments(["source_file"])
-        assert arguments.source == "source_file"
+        assert arguments.sources == ["source_file"]
         assert arguments.debug is False
+        assert arguments.output_dir is None
+        assert arguments.jobs == 1
 
     def test_parse_arguments_with_debug_flag(self):
         arguments = cli.parse_arguments(["-d", "source_file"])
-        assert arguments.source == "source_file"
+        assert arguments.sources == ["source_file"]
         assert arguments.debug is True
 
+    def test_parse_arguments_with_output_dir(self):
+        arguments = cli.parse_arguments(
+            ["-o", "out", "-j", "4", "src", "more/*.yaml"]
+        )
+        assert arguments.sources == ["src", "more/*.yaml"]
+        assert arguments.output_dir == "out"
+        assert arguments.jobs == 4
+
+    def test_parse_arguments_with_optimisations(self):
+        arguments = cli.parse_arguments(["-O", "selection", "source_file"])
+        assert arguments.optimise == ["selection"]
+
     def test_setup_logger_without_debug_flag(self):
         logger = cli.setup_logger(False)
         assert isinstance(logger, logging.Logger)
@@ -40,12 +89,91 @@ class CliTestCase(unittest.TestCase):
             mock_Source, mock_stdout
     ):
         mock_parse_arguments.return_value = \
-            argparse.Namespace(debug=False, source=sentinel.source)
-        mock_Source.return_value.compile.return_value = '{"rules": []}'
+            get_arguments(
+                debug=False, sources=[sentinel.source], output_dir=None
+            )
+        mock_Source.return_value.write.side_effect = \
+            lambda stream: stream.write('{"rules": []}')
 
         cli.main()
         self.assertEqual(mock_stdout.getvalue(), '{"rules": []}\n')
 
+    @patch("sys.stderr", new_callable=StringIO)
+    @patch("sys.stdout", new_callable=StringIO)
+    @patch("ptolemy.cli.Source")
+    @patch("ptolemy.cli.setup_logger")
+    @patch("ptolemy.cli.parse_arguments")
+    def test_main_with_catalog_report(
+            self, mock_parse_arguments, mock_setup_logger,
+            mock_Source, mock_stdout, mock_stderr
+    ):
+        mock_parse_arguments.return_value = get_arguments(
+            catalog="catalog.json", catalog_report=True
+        )
+        mock_Source.return_value.removals = []
+        mock_Source.return_value.resolutions = [
+            Resolution("include", "Test", "A%", [("Test", "Abc")])
+        ]
+
+        cli.main()
+        self.assertEqual(
+            mock_Source.call_args[1]["catalog"], "catalog.json"
+        )
+        self.assertEqual(
+            mock_stderr.getvalue(),
+            "rule-action,schema-pattern,table-pattern,schema,table\n"
+            "include,Test,A%,Test,Abc\n"
+        )
+
+    @patch("sys.stderr", new_callable=StringIO)
+    @patch("sys.stdout", new_callable=StringIO)
+    @patch("ptolemy.cli.setup_logger")
+    @patch("ptolemy.cli.parse_arguments")
+    def test_main_with_stats(
+            self, mock_parse_arguments, mock_setup_logger, mock_stdout,
+            mock_stderr
+    ):
+        mock_parse_arguments.return_value = get_arguments(
+            sources=[FIXTURE_PATH], stats="json"
+        )
+
+        cli.main()
+        stats = json.loads(mock_stderr.getvalue())
+        self.assertEqual(stats["rules"], {"selection": {"include": 1}})
+        self.assertEqual(
+            stats["output_bytes"], len(mock_stdout.getvalue()) - 1
+        )
+        self.assertGreater(stats["peak_memory"], 0)
+        self.assertEqual(
+            list(stats["phases"]),
+            ["read", "parse", "validate", "expand", "number", "serialise"]
+        )
+
+    @patch("sys.stderr", new_callable=StringIO)
+    @patch("ptolemy.cli.compile_all")
+    @patch("ptolemy.cli.setup_logger")
+    @patch("ptolemy.cli.parse_arguments")
+    def test_main_with_output_dir_and_stats(
+            self, mock_parse_arguments, mock_setup_logger, mock_compile_all,
+            mock_stderr
+    ):
+        mock_parse_arguments.return_value = get_arguments(
+            sources=["src"], output_dir="out", stats="text"
+        )
+        stats = Stats()
+        stats.rule_counts[("selection", "include")] = 2
+        mock_compile_all.return_value = iter([
+            Result("src/a.yaml", "out/a.json", None, None, stats),
+            Result("src/b.yaml", "out/b.json", None, None, stats)
+        ])
+
+        cli.main()
+        self.assertTrue(mock_compile_all.call_args[0][7])
+        self.assertIn(
+            "selection        include                         4",
+            mock_stderr.getvalue()
+        )
+
     @patch("ptolemy.cli.Source")
     @patch("ptolemy.cli.setup_logger")
     @patch("ptolemy.cli.parse_arguments")
@@ -54,8 +182,10 @@ class CliTestCase(unittest.TestCase):
             mock_Source
     ):
         mock_parse_arguments.return_value = \
-            argparse.Namespace(debug=False, source=sentinel.source)
-        mock_Source.return_value.compile.side_effect = \
+            get_arguments(
+                debug=False, sources=[sentinel.source], output_dir=None
+            )
+        mock_Source.return_value.write.side_effect = \
             ptolemy_exceptions.InvalidFileError()
 
         with self.assertRaises(SystemExit):
@@ -69,13 +199,680 @@ class CliTestCase(unittest.TestCase):
             mock_Source
     ):
         mock_parse_arguments.return_value = \
-            argparse.Namespace(debug=False, source=sentinel.source)
-        mock_Source.return_value.compile.side_effect = \
+            get_arguments(
+                debug=False, sources=[sentinel.source], output_dir=None
+            )
+        mock_Source.return_value.write.side_effect = \
             jsonschema_exceptions.ValidationError(sentinel.message)
 
         with self.assertRaises(SystemExit):
             cli.main()
 
+    @patch("ptolemy.cli.setup_logger")
+    @patch("ptolemy.cli.parse_arguments")
+    def test_main_with_many_sources_and_no_output_dir(
+            self, mock_parse_arguments, mock_setup_logger
+    ):
+        mock_parse_arguments.return_value = get_arguments(
+            debug=False, sources=[sentinel.a, sentinel.b], output_dir=None
+        )
+
+        with self.assertRaises(SystemExit):
+            cli.main()
+
+    @patch("ptolemy.cli.compile_all")
+    @patch("ptolemy.cli.setup_logger")
+    @patch("ptolemy.cli.parse_arguments")
+    def test_main_with_output_dir(
+            self, mock_parse_arguments, mock_setup_logger, mock_compile_all
+    ):
+        mock_parse_arguments.return_value = get_arguments(
+            debug=False, sources=[sentinel.source], output_dir=sentinel.out,
+            jobs=2, cache_dir=None, cache_size=100, no_cache=False
+        )
+        mock_compile_all.return_value = iter([
+            Result(sentinel.source, sentinel.output, None, None)
+        ])
+
+        cli.main()
+        mock_compile_all.assert_called_once_with(
+            [sentinel.source], sentinel.out, 2, None, DEFAULT_OPTIONS, None,
+            False, False
+        )
+
+    @patch("sys.stderr", new_callable=StringIO)
+    @patch("ptolemy.cli.compile_all")
+    @patch("ptolemy.cli.setup_logger")
+    @patch("ptolemy.cli.parse_arguments")
+    def test_main_with_cache(
+            self, mock_parse_arguments, mock_setup_logger, mock_compile_all,
+            mock_stderr
+    ):
+        mock_parse_arguments.return_value = get_arguments(
+            debug=False, sources=["src"], output_dir="out", jobs=1,
+            cache_dir="cache", cache_size=1, no_cache=False
+        )
+        mock_compile_all.return_value = iter([
+            Result("src/a.yaml", "out/a.json", None, True),
+            Result("src/b.yaml", "out/b.json", None, False)
+        ])
+
+        cli.main()
+        cache = mock_compile_all.call_args[0][3]
+        self.assertEqual(cache.directory, "cache")
+        self.assertEqual(cache.max_size, 1024 * 1024)
+        self.assertEqual(mock_stderr.getvalue(), "Cache: 1 hits, 1 misses.\n")
+
+    @patch("ptolemy.cli.compile_all")
+    @patch("ptolemy.cli.setup_logger")
+    @patch("ptolemy.cli.parse_arguments")
+    def test_main_with_no_cache(
+            self, mock_parse_arguments, mock_setup_logger, mock_compile_all
+    ):
+        mock_parse_arguments.return_value = get_arguments(
+            debug=False, sources=["src"], output_dir="out", jobs=1,
+            cache_dir="cache", cache_size=1, no_cache=True
+        )
+        mock_compile_all.return_value = iter([
+            Result("src/a.yaml", "out/a.json", None, None)
+        ])
+
+        cli.main()
+        mock_compile_all.assert_called_once_with(
+            ["src"], "out", 1, None, DEFAULT_OPTIONS, None, False, False
+        )
+
+    @patch.dict("os.environ", {"PTOLEMY_CACHE_DIR": "env-cache"})
+    @patch("sys.stderr", new_callable=StringIO)
+    @patch("ptolemy.cli.compile_all")
+    @patch("ptolemy.cli.setup_logger")
+    @patch("ptolemy.cli.parse_arguments")
+    def test_main_with_cache_from_environment(
+            self, mock_parse_arguments, mock_setup_logger, mock_compile_all,
+            mock_stderr
+    ):
+        mock_parse_arguments.return_value = get_arguments(
+            sources=["src"], output_dir="out"
+        )
+        mock_compile_all.return_value = iter([
+            Result("src/a.yaml", "out/a.json", None, False)
+        ])
+
+        cli.main()
+        cache = mock_compile_all.call_args[0][3]
+        self.assertEqual(cache.directory, "env-cache")
+        self.assertEqual(cache.max_size, DEFAULT_MAX_SIZE)
+
+    @patch("ptolemy.cli.compile_to_stdout")
+    @patch("ptolemy.cli.setup_logger")
+    @patch("ptolemy.cli.parse_arguments")
+    def test_main_with_cache_without_output_dir(
+            self, mock_parse_arguments, mock_setup_logger,
+            mock_compile_to_stdout
+    ):
+        for arguments in [
+                get_arguments(cache_dir="cache"),
+                get_arguments(cache_size=1),
+                get_arguments(cache_dir="cache", output_dir="out",
+                              dry_run=True)
+        ]:
+            mock_parse_arguments.return_value = arguments
+            with self.assertRaises(SystemExit) as context:
+                cli.main()
+            self.assertEqual(
+                context.exception.code,
+                "--output-dir is required to use --cache-dir or --cache-size."
+            )
+        mock_compile_to_stdout.assert_not_called()
+
+    @patch.dict("os.environ", {"PTOLEMY_CACHE_DIR": "env-cache"})
+    @patch("sys.stderr", new_callable=StringIO)
+    @patch("ptolemy.cli.compile_to_stdout")
+    @patch("ptolemy.cli.setup_logger")
+    @patch("ptolemy.cli.parse_arguments")
+    def test_main_with_cache_from_environment_without_output_dir(
+            self, mock_parse_arguments, mock_setup_logger,
+            mock_compile_to_stdout, mock_stderr
+    ):
+        mock_parse_arguments.return_value = get_arguments()
+        cli.main()
+        self.assertEqual(
+            mock_stderr.getvalue(),
+            "$PTOLEMY_CACHE_DIR is only used with --output-dir.\n"
+        )
+        mock_compile_to_stdout.assert_called_once_with(
+            "source", mock_parse_arguments.return_value,
+            mock_setup_logger.return_value
+        )
+
+        mock_stderr.truncate(0)
+        mock_parse_arguments.return_value = get_arguments(no_cache=True)
+        cli.main()
+        self.assertEqual(mock_stderr.getvalue(), "")
+
+    @patch("sys.stderr", new_callable=StringIO)
+    def test_parse_arguments_with_invalid_shards(self, mock_stderr):
+        for shards in ["0", "-2"]:
+            with self.assertRaises(SystemExit):
+                cli.parse_arguments(["--shards", shards, "-o", "out", "src"])
+            self.assertIn(
+                "argument --shards: must be a whole number of at least 1",
+                mock_stderr.getvalue()
+            )
+
+    @patch("sys.stderr", new_callable=StringIO)
+    def test_parse_arguments_with_invalid_cache_size(self, mock_stderr):
+        self.assertEqual(
+            cli.parse_arguments(["--cache-size", "5", "src"]).cache_size, 5
+        )
+        for cache_size in ["0", "-2", "many"]:
+            with self.assertRaises(SystemExit):
+                cli.parse_arguments(["--cache-size", cache_size, "src"])
+            self.assertIn(
+                "must be a whole number of at least 1", mock_stderr.getvalue()
+            )
+
+    @patch("sys.stderr", new_callable=StringIO)
+    @patch("ptolemy.cli.compile_all")
+    @patch("ptolemy.cli.setup_logger")
+    @patch("ptolemy.cli.parse_arguments")
+    def test_main_with_output_dir_and_failure(
+            self, mock_parse_arguments, mock_setup_logger, mock_compile_all,
+            mock_stderr
+    ):
+        mock_parse_arguments.return_value = get_arguments(
+            debug=False, sources=["src"], output_dir="out", jobs=1,
+            cache_dir=None, cache_size=100, no_cache=False
+        )
+        mock_compile_all.return_value = iter([
+            Result("src/a.yaml", "out/a.json", None, None),
+            Result("src/b.yaml", "out/b.json", "Broken.", None)
+        ])
+
+        with self.assertRaises(SystemExit) as context:
+            cli.main()
+        self.assertEqual(
+            context.exception.code,
+            "1 of 2 source files could not be compiled."
+        )
+        self.assertEqual(mock_stderr.getvalue(), "src/b.yaml: Broken.\n")
+
+    @patch("ptolemy.cli.compile_all")
+    @patch("ptolemy.cli.setup_logger")
+    @patch("ptolemy.cli.parse_arguments")
+    def test_main_with_output_dir_and_no_sources(
+            self, mock_parse_arguments, mock_setup_logger, mock_compile_all
+    ):
+        mock_parse_arguments.return_value = get_arguments(
+            debug=False, sources=["src"], output_dir="out", jobs=1,
+            cache_dir=None, cache_size=100, no_cache=False
+        )
+        mock_compile_all.return_value = iter([])
+
+        with self.assertRaises(SystemExit) as context:
+            cli.main()
+        self.assertEqual(
+            context.exception.code, "No source files were found."
+        )
+
+    @patch("sys.stdout", new_callable=StringIO)
+    @patch("ptolemy.cli.Source")
+    @patch("ptolemy.cli.setup_logger")
+    @patch("ptolemy.cli.parse_arguments")
+    def test_main_with_dry_run(
+            self, mock_parse_arguments, mock_setup_logger, mock_Source,
+            mock_stdout
+    ):
+        mock_parse_arguments.return_value = get_arguments(
+            sources=["source.yaml"], dry_run=True, max_rules=10
+        )
+        mock_plan = mock_Source.return_value.plan.return_value
+        mock_plan.report.return_value = "report"
+
+        cli.main()
+        self.assertEqual(mock_stdout.getvalue(), "report\n")
+        mock_plan.check.assert_called_once_with(10, None)
+
+    @patch("sys.stdout", new_callable=StringIO)
+    @patch("ptolemy.cli.find_sources")
+    @patch("ptolemy.cli.Source")
+    @patch("ptolemy.cli.setup_logger")
+    @patch("ptolemy.cli.parse_arguments")
+    def test_main_with_dry_run_and_many_sources(
+            self, mock_parse_arguments, mock_setup_logger, mock_Source,
+            mock_find_sources, mock_stdout
+    ):
+        mock_parse_arguments.return_value = get_arguments(
+            sources=["src"], dry_run=True
+        )
+        mock_find_sources.return_value = [
+            ("src/a.yaml", "a.yaml"), ("src/b.yaml", "b.yaml")
+        ]
+        mock_plan = mock_Source.return_value.plan.return_value
+        mock_plan.report.return_value = "report"
+
+        cli.main()
+        self.assertEqual(
+            mock_stdout.getvalue(),
+            "src/a.yaml\nreport\n\nsrc/b.yaml\nreport\n"
+        )
+
+    @patch("sys.stderr", new_callable=StringIO)
+    @patch("sys.stdout", new_callable=StringIO)
+    @patch("ptolemy.cli.Source")
+    @patch("ptolemy.cli.setup_logger")
+    @patch("ptolemy.cli.parse_arguments")
+    def test_main_with_dry_run_over_limit(
+            self, mock_parse_arguments, mock_setup_logger, mock_Source,
+            mock_stdout, mock_stderr
+    ):
+        mock_parse_arguments.return_value = get_arguments(
+            sources=["source.yaml"], dry_run=True, max_rules=1
+        )
+        mock_plan = mock_Source.return_value.plan.return_value
+        mock_plan.report.return_value = "report"
+        mock_plan.check.side_effect = \
+            ptolemy_exceptions.MappingTooLargeError("Too large.")
+
+        with self.assertRaises(SystemExit):
+            cli.main()
+        self.assertEqual(mock_stderr.getvalue(), "source.yaml: Too large.\n")
+
+    @patch("ptolemy.cli.load_weights")
+    @patch("ptolemy.cli.compile_all")
+    @patch("ptolemy.cli.setup_logger")
+    @patch("ptolemy.cli.parse_arguments")
+    def test_main_with_shards(
+            self, mock_parse_arguments, mock_setup_logger, mock_compile_all,
+            mock_load_weights
+    ):
+        mock_parse_arguments.return_value = get_arguments(
+            sources=["src"], output_dir="out", shards=4,
+            shard_stats="stats.csv", shard_weight="bytes"
+        )
+        mock_load_weights.return_value = sentinel.weights
+        mock_compile_all.return_value = iter([
+            Result("src/a.yaml", "out/a.json", None, None)
+        ])
+
+        cli.main()
+        mock_load_weights.assert_called_once_with("stats.csv", "bytes")
+        self.assertEqual(
+            mock_compile_all.call_args[0][5], (4, sentinel.weights)
+        )
+
+    @patch("ptolemy.cli.setup_logger")
+    @patch("ptolemy.cli.parse_arguments")
+    def test_main_with_shards_and_missing_shard_stats(
+            self, mock_parse_arguments, mock_setup_logger
+    ):
+        mock_parse_arguments.return_value = get_arguments(
+            sources=["src"], output_dir="out", shards=4,
+            shard_stats="missing.csv", shard_weight="bytes"
+        )
+
+        with self.assertRaises(SystemExit) as context:
+            cli.main()
+        self.assertIsInstance(
+            context.exception.code, ptolemy_exceptions.InvalidFileError
+        )
+
+    @patch("ptolemy.cli.setup_logger")
+    @patch("ptolemy.cli.parse_arguments")
+    def test_main_with_shards_and_no_output_dir(
+            self, mock_parse_arguments, mock_setup_logger
+    ):
+        mock_parse_arguments.return_value = get_arguments(shards=4)
+
+        with self.assertRaises(SystemExit):
+            cli.main()
+
+    def test_parse_serve_arguments(self):
+        arguments = cli.parse_serve_arguments(
+            ["--socket", "ptolemy.sock", "-w", "4", "-O", "selection"]
+        )
+        self.assertEqual(arguments.socket, "ptolemy.sock")
+        self.assertEqual(arguments.workers, 4)
+        self.assertEqual(arguments.host, "127.0.0.1")
+        self.assertEqual(
+            cli.get_source_options(arguments),
+            dict(DEFAULT_OPTIONS, optimisations=["selection"])
+        )
+
+    @patch("sys.argv", ["ptolemy", "serve", "--port", "9000"])
+    @patch("ptolemy.cli.parse_arguments")
+    def test_main_with_command(self, mock_parse_arguments):
+        mock_serve = Mock()
+        with patch.dict(cli.COMMANDS, {"serve": mock_serve}):
+            cli.main()
+        mock_serve.assert_called_once_with(["--port", "9000"])
+        self.assertFalse(mock_parse_arguments.called)
+
+    @patch("sys.stderr", new_callable=StringIO)
+    @patch("ptolemy.server.start_server")
+    @patch("ptolemy.cli.setup_logger")
+    def test_serve(self, mock_setup_logger, mock_start_server, mock_stderr):
+        server = mock_start_server.return_value
+        server.url = "unix:ptolemy.sock"
+        server.serve_forever.side_effect = KeyboardInterrupt
+
+        cli.serve(["--socket", "ptolemy.sock", "--max-rules", "10"])
+        mock_start_server.assert_called_once_with(
+            "ptolemy.sock", dict(DEFAULT_OPTIONS, max_rules=10), 1
+        )
+        server.server_close.assert_called_once_with()
+        self.assertEqual(
+            mock_stderr.getvalue(), "Listening on unix:ptolemy.sock\n"
+        )
+
+    @patch("ptolemy.server.start_server")
+    @patch("ptolemy.cli.setup_logger")
+    def test_serve_with_invalid_catalog(
+            self, mock_setup_logger, mock_start_server
+    ):
+        mock_start_server.side_effect = \
+            ptolemy_exceptions.InvalidFileError("No catalog.")
+
+        with self.assertRaises(SystemExit):
+            cli.serve(["--catalog", "missing.json"])
+
+    def test_parse_watch_arguments(self):
+        arguments = cli.parse_watch_arguments(
+            ["-o", "out", "--poll", "--debounce", "0.5", "src"]
+        )
+        self.assertEqual(arguments.output_dir, "out")
+        self.assertEqual(arguments.sources, ["src"])
+        self.assertTrue(arguments.poll)
+        self.assertEqual(arguments.debounce, 0.5)
+
+    @patch("sys.stderr", new_callable=StringIO)
+    def test_write_build(self, mock_stderr):
+        cli.write_build(Build([
+            Result("src/a.yaml", "out/a.json", None, None),
+            Result("src/b.yaml", "out/b.json", "Too large.", None)
+        ], 0.0123, 3, 4))
+        self.assertEqual(
+            mock_stderr.getvalue(),
+            "src/b.yaml: Too large.\n"
+            "Built in 12.3 ms: 2 compiled, 1 failed, 3 of 4 items reused.\n"
+        )
+
+        mock_stderr.truncate(0)
+        mock_stderr.seek(0)
+        cli.write_build(Build([], 0.001, 0, 0, ["out/c.json"]))
+        self.assertEqual(
+            mock_stderr.getvalue(),
+            "Removed 'out/c.json', as its source was removed.\n"
+        )
+
+    @patch("sys.stderr", new_callable=StringIO)
+    @patch("ptolemy.watch.wait_for_changes")
+    @patch("ptolemy.watch.get_watcher")
+    @patch("ptolemy.cli.setup_logger")
+    def test_watch(
+            self, mock_setup_logger, mock_get_watcher, mock_wait_for_changes,
+            mock_stderr
+    ):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        source_path = os.path.join(directory, "source.yaml")
+        shutil.copy(FIXTURE_PATH, source_path)
+        output_dir = os.path.join(directory, "mappings")
+        # The first change is to no source, so nothing is built.
+        mock_wait_for_changes.side_effect = [
+            {os.path.join(directory, "other.yaml")},
+            {os.path.abspath(source_path)},
+            KeyboardInterrupt
+        ]
+
+        cli.watch(["-o", output_dir, "--poll", source_path])
+        mock_get_watcher.assert_called_once_with([source_path], True, 1.0)
+        mock_get_watcher.return_value.close.assert_called_once_with()
+        self.assertEqual(
+            [line.split(":")[1] for line in
+             mock_stderr.getvalue().splitlines()],
+            [" 1 compiled, 0 failed, 0 of 1 items reused.",
+             " 1 compiled, 0 failed, 1 of 1 items reused."]
+        )
+        self.assertTrue(
+            os.path.isfile(os.path.join(output_dir, "source.json"))
+        )
+
+    @patch("ptolemy.cli.setup_logger")
+    @patch("ptolemy.cli.parse_arguments")
+    def test_main_with_previous_mapping_and_output_dir(
+            self, mock_parse_arguments, mock_setup_logger
+    ):
+        mock_parse_arguments.return_value = get_arguments(
+            sources=["src"], output_dir="out", previous_mapping="old.json"
+        )
+        with self.assertRaises(SystemExit):
+            cli.main()
+
+    @patch("sys.stdout", new_callable=StringIO)
+    @patch("ptolemy.cli.Source")
+    @patch("ptolemy.cli.setup_logger")
+    @patch("ptolemy.cli.parse_arguments")
+    def test_main_with_stream(
+            self, mock_parse_arguments, mock_setup_logger, mock_Source,
+            mock_stdout
+    ):
+        mock_parse_arguments.return_value = get_arguments(stream=True)
+        mock_Source.return_value.removals = []
+
+        cli.main()
+        self.assertIs(mock_Source.call_args[1]["streaming"], True)
+
+    @patch("sys.stdout", new_callable=StringIO)
+    @patch("ptolemy.cli.Source")
+    @patch("ptolemy.cli.setup_logger")
+    @patch("ptolemy.cli.parse_arguments")
+    def test_main_with_jobs(
+            self, mock_parse_arguments, mock_setup_logger, mock_Source,
+            mock_stdout
+    ):
+        mock_parse_arguments.return_value = get_arguments(jobs=4)
+        mock_Source.return_value.removals = []
+
+        cli.main()
+        self.assertEqual(mock_Source.call_args[1]["jobs"], 4)
+
+    @patch("sys.stderr", new_callable=StringIO)
+    @patch("sys.stdout", new_callable=StringIO)
+    @patch("ptolemy.cli.Source")
+    @patch("ptolemy.cli.setup_logger")
+    @patch("ptolemy.cli.parse_arguments")
+    def test_main_with_removals(
+            self, mock_parse_arguments, mock_setup_logger, mock_Source,
+            mock_stdout, mock_stderr
+    ):
+        mock_parse_arguments.return_value = get_arguments()
+        mock_Source.return_value.removals = [
+            Removal("rule A", "duplicate of an earlier rule"),
+            Removal("rule B", "its filters on id can never match", False)
+        ]
+
+        cli.main()
+        self.assertEqual(
+            mock_stderr.getvalue(),
+            "Removed rule A: duplicate of an earlier rule.\n"
+            "Kept rule B: its filters on id can never match.\n"
+        )
+
+    @patch("ptolemy.cli.compile_all")
+    @patch("ptolemy.cli.setup_logger")
+    @patch("ptolemy.cli.parse_arguments")
+    def test_main_with_stream_and_output_dir(
+            self, mock_parse_arguments, mock_setup_logger, mock_compile_all
+    ):
+        mock_parse_arguments.return_value = get_arguments(
+            sources=["src"], output_dir="out", cache_dir=None, stream=True
+        )
+        mock_compile_all.return_value = iter([
+            Result("src/a.yaml", "out/a.json", None, None)
+        ])
+
+        cli.main()
+        mock_compile_all.assert_called_once_with(
+            ["src"], "out", 1, None, dict(DEFAULT_OPTIONS, streaming=True),
+            None, False, False
+        )
+
+    @patch("ptolemy.cli.setup_logger")
+    @patch("ptolemy.cli.parse_arguments")
+    def test_main_with_stream_and_limits(
+            self, mock_parse_arguments, mock_setup_logger
+    ):
+        mock_parse_arguments.return_value = get_arguments(
+            stream=True, max_rules=10
+        )
+        with self.assertRaises(SystemExit):
+            cli.main()
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_diff(self, mock_stdout):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        rule = {
+            "rule-type": "selection", "rule-id": "1", "rule-name": "1",
+            "object-locator": {"schema-name": "Test", "table-name": "A"},
+            "rule-action": "include"
+        }
+        paths = []
+        for name, rules in [
+                ("old.json", [rule]),
+                ("new.json", [rule, dict(rule, **{"rule-id": "2"})])
+        ]:
+            paths.append(os.path.join(directory, name))
+            with open(paths[-1], "w") as mapping_file:
+                json.dump({"rules": rules}, mapping_file)
+
+        cli.diff(paths)
+        self.assertEqual(
+            mock_stdout.getvalue(),
+            "+ 2 selection include Test.A\n"
+            "1 added, 0 removed, 0 changed, 1 unchanged.\n"
+        )
+        with self.assertRaises(SystemExit) as context:
+            cli.diff(["--exit-code"] + paths)
+        self.assertEqual(context.exception.code, 1)
+        cli.diff(["--exit-code", paths[0], paths[0]])
+
+    @patch("ptolemy.cli.setup_logger")
+    def test_diff_with_missing_mapping(self, mock_setup_logger):
+        with self.assertRaises(SystemExit):
+            cli.diff(["missing.json", "missing.json"])
+
+    @patch("sys.stderr", new_callable=StringIO)
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_merge(self, mock_stdout, mock_stderr):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        rule = {
+            "rule-type": "selection", "rule-id": "1", "rule-name": "1",
+            "object-locator": {"schema-name": "Test", "table-name": "A"},
+            "rule-action": "include"
+        }
+        other_rule = dict(rule, **{
+            "object-locator": {"schema-name": "Test", "table-name": "B"}
+        })
+        paths = []
+        for name, rules in [
+                ("a.json", [rule]), ("b.json", [other_rule, rule])
+        ]:
+            paths.append(os.path.join(directory, name))
+            with open(paths[-1], "w") as mapping_file:
+                json.dump({"rules": rules}, mapping_file)
+
+        cli.merge(["--minify", "--stats", "json"] + paths)
+        self.assertEqual(
+            json.loads(mock_stdout.getvalue()),
+            {"rules": [rule, dict(other_rule, **{
+                "rule-id": "2", "rule-name": "2"
+            })]}
+        )
+        self.assertEqual(
+            mock_stderr.getvalue().splitlines()[0],
+            "Merged 2 rules from 2 mappings, leaving out 1 duplicates."
+        )
+
+    @patch("ptolemy.cli.setup_logger")
+    def test_merge_with_missing_mapping(self, mock_setup_logger):
+        with self.assertRaises(SystemExit):
+            cli.merge(["missing.json"])
+
+    @patch("sys.stdin", new_callable=StringIO)
+    @patch("sys.stderr", new_callable=StringIO)
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_explain(self, mock_stdout, mock_stderr, mock_stdin):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        rule = {
+            "rule-type": "selection", "rule-id": "1", "rule-name": "1",
+            "object-locator": {"schema-name": "Test", "table-name": "A%"},
+            "rule-action": "include"
+        }
+        path = os.path.join(directory, "mapping.json")
+        with open(path, "w") as mapping_file:
+            json.dump({"rules": [rule]}, mapping_file)
+
+        cli.explain([path, "Test.Ab", "Test.B"])
+        self.assertEqual(
+            mock_stdout.getvalue(),
+            "Test.Ab\n  1 selection include Test.A%\n"
+            "Test.B\n  no rules apply\n"
+        )
+
+        mock_stdout.truncate(0)
+        mock_stdout.seek(0)
+        mock_stdin.write("Test.Ab.id\n\nTest..B\n")
+        mock_stdin.seek(0)
+        with self.assertRaises(SystemExit) as context:
+            cli.explain(["--format", "json", path])
+        self.assertEqual(context.exception.code, 1)
+        self.assertEqual(
+            [json.loads(line) for line in mock_stdout.getvalue().splitlines()],
+            [{"query": "Test.Ab.id", "rules": [rule]}]
+        )
+        self.assertIn("Test..B", mock_stderr.getvalue())
+
+    @patch("sys.stderr", new_callable=StringIO)
+    def test_parse_explain_arguments(self, mock_stderr):
+        arguments = cli.parse_explain_arguments([
+            "-O", "selection", "--catalog", "catalog.json",
+            "--rule-ids", "content", "--max-rules", "10", "source.yaml"
+        ])
+        self.assertEqual(cli.get_rule_options(arguments), {
+            "max_rules": 10, "max_bytes": None,
+            "optimisations": ["selection"], "catalog": "catalog.json",
+            "keep_wildcards": False, "rule_ids": "content"
+        })
+        # The options for writing mappings make no difference to the rules.
+        for option in ["--minify", "--key-order", "--encoder"]:
+            with self.assertRaises(SystemExit):
+                cli.parse_explain_arguments([option, "source.yaml"])
+
+    @patch("ptolemy.cli.setup_logger")
+    def test_explain_with_invalid_source(self, mock_setup_logger):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "source.yaml")
+        with open(path, "w") as source_file:
+            source_file.write("selection: 3\n")
+
+        with self.assertRaises(SystemExit) as context:
+            cli.explain([path, "Test.A"])
+        self.assertEqual(
+            str(context.exception.code),
+            "The source file could not be validated. 3 is not of type "
+            "'object'"
+        )
+
+    @patch("ptolemy.cli.setup_logger")
+    def test_explain_with_missing_mapping(self, mock_setup_logger):
+        with self.assertRaises(SystemExit):
+            cli.explain(["missing.json", "Test.A"])
+
 
 if __name__ == "__main__":
     unittest.main()
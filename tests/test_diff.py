@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+import json
+import unittest
+
+from ptolemy import diff
+
+from tests.helpers import get_rule
+
+
+class DiffTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.old_rules = [
+            get_rule(1, "Test.A"), get_rule(2, "Test.B"), get_rule(3, "Test.C")
+        ]
+        self.new_rules = [
+            get_rule(1, "Test.A"), get_rule(3, "Test.D"), get_rule(4, "Test.E")
+        ]
+
+    def test_diff_rules(self):
+        mapping_diff = diff.diff_rules(self.old_rules, self.new_rules)
+        self.assertEqual(mapping_diff.added, [self.new_rules[2]])
+        self.assertEqual(mapping_diff.removed, [self.old_rules[1]])
+        self.assertEqual(mapping_diff.changed, [self.new_rules[1]])
+        self.assertEqual(mapping_diff.unchanged, 1)
+
+    def test_diff_rules_ignores_key_order(self):
+        old_rule = get_rule(1, "Test.A", filters=[{"b": 1, "a": 2}])
+        new_rule = json.loads(json.dumps(old_rule, sort_keys=True))
+        new_rule["filters"] = [{"a": 2, "b": 1}]
+        self.assertEqual(
+            diff.diff_rules([old_rule], [new_rule]).unchanged, 1
+        )
+        new_rule["rule-name"] = "named"
+        self.assertEqual(
+            diff.diff_rules([old_rule], [new_rule]).changed, [new_rule]
+        )
+
+    def test_format_diff(self):
+        mapping_diff = diff.diff_rules(self.old_rules, self.new_rules)
+        self.assertEqual(
+            diff.format_diff(mapping_diff),
+            "- 2 selection include Test.B\n"
+            "~ 3 selection include Test.D\n"
+            "+ 4 selection include Test.E\n"
+            "1 added, 1 removed, 1 changed, 1 unchanged."
+        )
+        self.assertEqual(
+            json.loads(diff.format_diff(mapping_diff, "json")),
+            {"added": ["4"], "removed": ["2"], "changed": ["3"],
+             "unchanged": 1}
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import random
+import re
+import shutil
+import tempfile
+import unittest
+
+import yaml
+
+from ptolemy.exceptions import InvalidFileError, InvalidQueryError
+from ptolemy.explain import (
+    format_explanation, load_rules, parse_query, RuleIndex
+)
+
+from tests.helpers import get_rule, LOCATOR_KEYS
+
+
+def applies(rule, names):
+    """
+    Return whether a rule applies to an object, comparing every level.
+
+    """
+    locator = rule["object-locator"]
+    for key, name in zip(LOCATOR_KEYS, names):
+        if key not in locator:
+            break
+        pattern = ".*".join(
+            re.escape(part) for part in locator[key].lower().split("%")
+        )
+        if not re.match(pattern + r"\Z", name.lower(), re.DOTALL):
+            return False
+    return True
+
+
+class RuleIndexTestCase(unittest.TestCase):
+
+    def test_explain(self):
+        rules = [
+            get_rule(1, "Test.Emp%"),
+            get_rule(2, "Test.Dept"),
+            get_rule(3, "Test.EmpAudit", rule_action="exclude"),
+            get_rule(4, "Test.Employee.id", "transformation", "rename"),
+            get_rule(5, "Test.Employee.na%", "transformation", "rename"),
+            get_rule(6, "%.%", "transformation", "convert-lowercase"),
+            get_rule(7, "Test", "transformation", "rename"),
+            get_rule(8, "Te%", "transformation", "add-prefix")
+        ]
+        index = RuleIndex(rules)
+
+        def explain(names):
+            return [rule["rule-id"] for rule in index.explain(names)]
+
+        self.assertEqual(
+            explain(("Test", "Employee")), ["1", "4", "5", "6", "7", "8"]
+        )
+        self.assertEqual(
+            explain(("test", "EMPAUDIT")), ["1", "3", "6", "7", "8"]
+        )
+        self.assertEqual(
+            explain(("Test", "Employee", "name")),
+            ["1", "5", "6", "7", "8"]
+        )
+        self.assertEqual(explain(("Test", "Dept")), ["2", "6", "7", "8"])
+        self.assertEqual(explain(("Test",)), [str(i) for i in range(1, 9)])
+        self.assertEqual(explain(("Other", "X")), ["6"])
+
+    def test_explain_matches_every_rule(self):
+        generator = random.Random(0)
+        parts = ["a", "ab", "b", "A"]
+
+        def get_name(wildcards):
+            name = "".join(generator.sample(parts, generator.randint(0, 2)))
+            if wildcards and generator.random() < 0.4:
+                position = generator.randint(0, len(name))
+                name = name[:position] + "%" + name[position:]
+            return name or "a"
+
+        for _ in range(50):
+            rules = [
+                get_rule(i, ".".join(
+                    get_name(True) for _ in range(generator.randint(1, 3))
+                ))
+                for i in range(50)
+            ]
+            index = RuleIndex(rules)
+            for _ in range(20):
+                names = tuple(
+                    get_name(False) for _ in range(generator.randint(1, 3))
+                )
+                self.assertEqual(
+                    index.explain(names),
+                    [rule for rule in rules if applies(rule, names)],
+                    names
+                )
+
+    def test_explain_skips_rules_without_names(self):
+        rule = get_rule(1, "Test")
+        rule["object-locator"] = {}
+        index = RuleIndex([rule, get_rule(2, "Test")])
+        self.assertEqual(index.explain(("Test",)), [get_rule(2, "Test")])
+
+
+class ExplainTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write_file(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as output:
+            output.write(content)
+        return path
+
+    def test_parse_query(self):
+        self.assertEqual(parse_query("Test"), ("Test",))
+        self.assertEqual(
+            parse_query(" Test.Employee.id\n"), ("Test", "Employee", "id")
+        )
+        for query in ["", "Test..id", "Test.Employee.id.x"]:
+            with self.assertRaises(InvalidQueryError):
+                parse_query(query)
+
+    def test_load_rules(self):
+        rules = [get_rule(1, "Test.A"), get_rule(2, "Test.B")]
+        path = self.write_file("mapping.json", json.dumps({"rules": rules}))
+        self.assertEqual(load_rules(path), rules)
+
+        path = self.write_file("source.yaml", yaml.safe_dump({
+            "selection": {"include": [{"object-locators": {
+                "schema-names": ["Test"], "table-names": ["A", "B"]
+            }}]}
+        }))
+        self.assertEqual(load_rules(path), rules)
+
+        path = self.write_file("mapping.json", '{"rules": [{}]}')
+        with self.assertRaises(InvalidFileError):
+            load_rules(path)
+
+    def test_format_explanation(self):
+        rules = [get_rule(1, "Test.%")]
+        self.assertEqual(
+            format_explanation("Test.A", rules),
+            "Test.A\n  1 selection include Test.%"
+        )
+        self.assertEqual(
+            format_explanation("Test.A", []), "Test.A\n  no rules apply"
+        )
+        self.assertEqual(
+            json.loads(format_explanation("Test.A", rules, "json")),
+            {"query": "Test.A", "rules": rules}
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+
+import random
+import unittest
+
+from ptolemy.filters import optimise_filters, simplify_filters
+from ptolemy.optimise import apply_optimisations, Removal
+from ptolemy.rule import Rule, expand_item
+
+
+def condition(operator, *values):
+    if operator == "between":
+        return {
+            "filter-operator": operator, "start-value": values[0],
+            "end-value": values[1]
+        }
+    return {"filter-operator": operator, "value": values[0]}
+
+
+def column_filter(column_name, *conditions):
+    return {
+        "filter-type": "source", "column-name": column_name,
+        "filter-conditions": list(conditions)
+    }
+
+
+def matches(filters, row, key):
+    """
+    Return whether a row matches filters as DMS evaluates them, comparing
+    values by key.
+
+    """
+    for filter_ in filters:
+        value = row.get(filter_["column-name"])
+        if value is None:
+            return False
+        value = key(value)
+        for condition_ in filter_["filter-conditions"]:
+            operator = condition_["filter-operator"]
+            if operator == "between":
+                if key(condition_["start-value"]) <= value <= \
+                        key(condition_["end-value"]):
+                    break
+            elif operator == "eq" and value == key(condition_["value"]) or \
+                    operator == "gte" and value >= key(condition_["value"]) \
+                    or operator == "ste" and value <= key(condition_["value"]):
+                break
+        else:
+            return False
+    return True
+
+
+class SimplifyFiltersTestCase(unittest.TestCase):
+
+    def test_merges_ranges(self):
+        filters = [column_filter(
+            "empid", condition("between", "100", "200"),
+            condition("between", "150", "300"), condition("eq", "250"),
+            condition("eq", "400"), condition("eq", "400")
+        )]
+        self.assertEqual(simplify_filters(filters), ([column_filter(
+            "empid", condition("between", "100", "300"),
+            condition("eq", "400")
+        )], []))
+
+    def test_merges_filters_on_a_column(self):
+        filters = [
+            column_filter("empid", condition("gte", "100")),
+            column_filter("name", condition("eq", "Smith")),
+            column_filter("empid", condition("ste", "200"))
+        ]
+        self.assertEqual(simplify_filters(filters), ([
+            column_filter("empid", condition("between", "100", "200")),
+            column_filter("name", condition("eq", "Smith"))
+        ], []))
+
+    def test_writes_unbounded_range(self):
+        filters = [column_filter(
+            "empid", condition("gte", "100"), condition("ste", "200"),
+            condition("eq", "150")
+        )]
+        self.assertEqual(simplify_filters(filters), ([column_filter(
+            "empid", condition("ste", "100"), condition("gte", "100")
+        )], []))
+
+    def test_keeps_simplest_filters(self):
+        for filters in [
+                [column_filter("empid", condition("gte", "100"))],
+                [column_filter(
+                    "empid", condition("eq", "1"), condition("eq", "3")
+                )],
+                [column_filter(
+                    "empid", condition("between", "1", "2"),
+                    condition("between", "3", "4")
+                )],
+                [
+                    column_filter("empid", condition("eq", "1")),
+                    column_filter("name", condition("eq", "Smith"))
+                ]
+        ]:
+            self.assertIs(simplify_filters(filters)[0], filters)
+
+    def test_only_merges_values_of_the_same_shape(self):
+        # "9" is less than "10" as a number, but not as text.
+        filters = [
+            column_filter("empid", condition("gte", "9")),
+            column_filter("empid", condition("ste", "10"))
+        ]
+        self.assertIs(simplify_filters(filters)[0], filters)
+
+        filters = [column_filter(
+            "hired", condition("between", "2019-01-01", "2019-12-31"),
+            condition("between", "2019-06-01", "2020-06-30")
+        )]
+        self.assertEqual(simplify_filters(filters)[0], [column_filter(
+            "hired", condition("between", "2019-01-01", "2020-06-30")
+        )])
+
+        # The order of dates written day first is not the order of the
+        # text.
+        filters = [column_filter(
+            "hired", condition("between", "01/01/2019", "31/12/2019"),
+            condition("between", "01/06/2019", "30/06/2020")
+        )]
+        self.assertIs(simplify_filters(filters)[0], filters)
+
+    def test_simplifies_unordered_values(self):
+        filters = [
+            column_filter(
+                "name", condition("eq", "Smith"), condition("eq", "Jones"),
+                condition("eq", "Smith"), condition("between", "Ng", "Ng")
+            ),
+            column_filter(
+                "name", condition("eq", "Smith"), condition("gte", "Smith")
+            ),
+            column_filter(
+                "name", condition("eq", "Jones"), condition("eq", "Smith"),
+                condition("eq", "Ng"), condition("eq", "Lee")
+            )
+        ]
+        self.assertEqual(simplify_filters(filters), ([
+            column_filter(
+                "name", condition("eq", "Smith"), condition("eq", "Jones"),
+                condition("eq", "Ng")
+            ),
+            column_filter("name", condition("gte", "Smith"))
+        ], []))
+
+    def test_finds_filters_which_never_match(self):
+        filters = [
+            column_filter("empid", condition("ste", "100")),
+            column_filter("empid", condition("gte", "200")),
+            column_filter("name", condition("eq", "A"), condition("eq", "A"))
+        ]
+        self.assertEqual(simplify_filters(filters), ([
+            column_filter("empid", condition("ste", "100")),
+            column_filter("empid", condition("gte", "200")),
+            column_filter("name", condition("eq", "A"))
+        ], ["empid"]))
+
+        filters = [column_filter("empid", condition("between", "9", "1"))]
+        self.assertEqual(simplify_filters(filters), (filters, ["empid"]))
+
+    def test_leaves_unknown_filters(self):
+        for filters in [
+                [column_filter("empid", {
+                    "filter-operator": "eq", "value": "1", "end-value": "2"
+                })],
+                [column_filter("empid", {"filter-operator": "eq"})],
+                [column_filter("empid", {
+                    "filter-operator": "eq", "end-value": "2"
+                })],
+                [column_filter("empid", {"filter-operator": "noteq"})],
+                [column_filter("empid")],
+                [dict(
+                    column_filter("empid", condition("eq", "1")),
+                    **{"filter-type": "target"}
+                )]
+        ]:
+            self.assertEqual(
+                simplify_filters(filters + filters), (filters + filters, [])
+            )
+
+    def test_simplified_filters_are_equivalent(self):
+        generator = random.Random(0)
+        value_sets = [
+            ["{0:03d}".format(i) for i in range(0, 1000, 50)],
+            ["2019-{0:02d}-01".format(i) for i in range(1, 13)],
+            ["9", "10", "1", "95", "100"],
+            ["a", "B", "b", "A"]
+        ]
+        operators = ["eq", "gte", "ste", "between"]
+        keys = [lambda value: value, lambda value: value.lower()]
+        for _ in range(1000):
+            values = generator.choice(value_sets)
+            filters = [
+                column_filter(generator.choice(["x", "y"]), *[
+                    condition(
+                        generator.choice(operators),
+                        *sorted(generator.sample(values, 2))
+                    ) if generator.random() < 0.8 else condition(
+                        "between", *generator.sample(values, 2)
+                    )
+                    for _ in range(generator.randint(1, 4))
+                ])
+                for _ in range(generator.randint(1, 4))
+            ]
+            simplified, never_matching = simplify_filters(filters)
+            # Each value, and values between them.
+            row_values = sorted(set(values + [
+                value + "5" for value in values
+            ] + [None]), key=lambda value: value or "")
+            for key in keys:
+                if values is value_sets[2]:
+                    key = int if key is keys[0] else str
+                    row_values = [
+                        value for value in row_values
+                        if value is None or value.isdigit()
+                    ]
+                matched = False
+                for x in row_values:
+                    for y in row_values:
+                        row = {"x": x, "y": y}
+                        self.assertEqual(
+                            matches(simplified, row, key),
+                            matches(filters, row, key),
+                            (filters, simplified, row)
+                        )
+                        matched = matched or matches(filters, row, key)
+                if never_matching:
+                    self.assertFalse(matched)
+
+
+class OptimiseFiltersTestCase(unittest.TestCase):
+
+    def optimise(self, rules):
+        removals = []
+        kept = list(apply_optimisations(
+            lambda: iter(rules), [optimise_filters], removals
+        ))
+        return kept, removals
+
+    def test_optimise_filters(self):
+        data_item = {
+            "object-locators": {
+                "schema-names": ["Test"],
+                "table-names": ["Employee", "Manager"]
+            },
+            "filters": [
+                column_filter("empid", condition("gte", "100")),
+                column_filter("empid", condition("ste", "200"))
+            ]
+        }
+        rules = list(expand_item("selection", "include", data_item))
+        rules.append(Rule.from_dict({
+            "rule-type": "selection", "rule-action": "exclude",
+            "object-locator": {"schema-name": "Test", "table-name": "Audit"}
+        }))
+
+        kept, removals = self.optimise(rules)
+
+        self.assertEqual(removals, [])
+        self.assertEqual(kept[2], rules[2])
+        self.assertEqual([rule.names for rule in kept], [
+            rule.names for rule in rules
+        ])
+        self.assertEqual(kept[0].data["filters"], [
+            column_filter("empid", condition("between", "100", "200"))
+        ])
+        # The rules expanded from an item share its simplified filters.
+        self.assertIs(kept[0].data, kept[1].data)
+
+    def test_flags_filters_which_never_match(self):
+        rule = Rule.from_dict({
+            "rule-type": "selection", "rule-action": "include",
+            "object-locator": {"schema-name": "Test", "table-name": "A"},
+            "filters": [
+                column_filter("empid", condition("eq", "1")),
+                column_filter("empid", condition("eq", "2"))
+            ]
+        })
+
+        kept, removals = self.optimise([rule])
+
+        self.assertEqual(kept, [rule])
+        self.assertEqual(removals, [Removal(
+            "selection include rule for Test.A",
+            "its filters on empid can never match", False
+        )])
@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import unittest
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+from mock import patch
+
+from ptolemy import ids
+from ptolemy.exceptions import InvalidFileError
+from ptolemy.rule import expand_item
+from ptolemy.source import Source
+
+
+SOURCE = {
+    "selection": {
+        "include": [
+            {
+                "object-locators": {
+                    "schema-names": ["Test"],
+                    "table-names": ["A", "B", "C"]
+                }
+            }
+        ]
+    },
+    "transformation": {
+        "rename": [
+            {
+                "object-locators": {
+                    "schema-names": ["Test"],
+                    "table-names": ["A"]
+                },
+                "rule-target": "table",
+                "value": "Z",
+                "rule-name": "rename-a"
+            }
+        ]
+    }
+}
+
+
+def get_rules(mapping_table):
+    return json.loads(mapping_table)["rules"]
+
+
+def get_rule_ids(mapping_table):
+    return {
+        (rule["rule-action"], rule["object-locator"]["table-name"]):
+        rule["rule-id"] for rule in get_rules(mapping_table)
+    }
+
+
+class IdsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_mapping(self, mapping_table):
+        path = os.path.join(self.directory, "previous.json")
+        with open(path, "w") as mapping_file:
+            mapping_file.write(mapping_table)
+        return path
+
+    def test_get_rule_digest(self):
+        rule = next(expand_item("selection", "include", {
+            "object-locators": {"schema-names": ["Test"], "table-names": ["A"]}
+        }))
+        numbered = dict(rule.to_dict(), **{"rule-id": "7", "rule-name": "7"})
+        self.assertEqual(
+            ids.get_rule_digest(rule), ids.get_rule_digest(numbered)
+        )
+        numbered["rule-name"] = "named"
+        self.assertNotEqual(
+            ids.get_rule_digest(rule), ids.get_rule_digest(numbered)
+        )
+
+    def test_content_rule_ids(self):
+        rule_ids = get_rule_ids(Source(rule_ids="content").compile_string(
+            SOURCE
+        ))
+        self.assertTrue(all(
+            len(rule_id) == ids.CONTENT_ID_LENGTH
+            for rule_id in rule_ids.values()
+        ))
+
+        source = json.loads(json.dumps(SOURCE))
+        source["selection"]["include"].insert(0, {
+            "object-locators": {"schema-names": ["Test"], "table-names": ["0"]}
+        })
+        new_rule_ids = get_rule_ids(
+            Source(rule_ids="content").compile_string(source)
+        )
+        del new_rule_ids[("include", "0")]
+        self.assertEqual(new_rule_ids, rule_ids)
+
+    def test_content_rule_ids_are_unique(self):
+        rule_ids = ids.RuleIds("content")
+        rule = {
+            "rule-type": "selection", "rule-action": "include",
+            "object-locator": {"schema-name": "Test", "table-name": "A"}
+        }
+        first = rule_ids.assign(rule)
+        second = rule_ids.assign(rule)
+        self.assertNotEqual(first, second)
+        self.assertEqual(int(second), int(first) + 1)
+
+    @patch("ptolemy.ids.CONTENT_ID_COUNT", 8)
+    def test_content_rule_ids_with_collisions_are_independent_of_order(self):
+        rules = [
+            rule.to_dict() for rule in expand_item("selection", "include", {
+                "object-locators": {
+                    "schema-names": ["Test"],
+                    "table-names": ["A", "B", "C", "D", "E", "F"]
+                }
+            })
+        ]
+        numbers = [
+            ids._get_content_key(ids.get_rule_digest(rule)) >> 32
+            for rule in rules
+        ]
+        self.assertLess(len(set(numbers)), len(numbers))
+
+        def assign(rules):
+            rule_ids = ids.RuleIds("content")
+            rule_ids.prepare(rules)
+            return {
+                rule["object-locator"]["table-name"]: rule_ids.assign(rule)
+                for rule in rules
+            }
+
+        expected = assign(rules)
+        self.assertEqual(len(set(expected.values())), len(rules))
+        for permutation in itertools.permutations(rules):
+            self.assertEqual(assign(list(permutation)), expected)
+
+        # Rules whose digests give an ID another rule's digest gives are
+        # never given it, so the other rule keeps it.
+        for rule, number in zip(rules, numbers):
+            if numbers.count(number) == 1:
+                self.assertEqual(
+                    expected[rule["object-locator"]["table-name"]],
+                    str(ids.CONTENT_ID_FIRST + number)
+                )
+
+    @patch("ptolemy.ids.CONTENT_ID_COUNT", 8)
+    def test_content_rule_ids_with_collisions_in_sources(self):
+        source = json.loads(json.dumps(SOURCE))
+        table_names = source["selection"]["include"][0]["object-locators"][
+            "table-names"
+        ]
+        table_names.extend(["D", "E", "F"])
+        rule_ids = get_rule_ids(
+            Source(rule_ids="content").compile_string(source)
+        )
+
+        table_names.reverse()
+        self.assertEqual(get_rule_ids(
+            Source(rule_ids="content").compile_string(source)
+        ), rule_ids)
+        path = os.path.join(self.directory, "source.json")
+        with open(path, "w") as source_file:
+            json.dump(source, source_file)
+        stream = StringIO()
+        Source(path, rule_ids="content", streaming=True).write(stream)
+        self.assertEqual(get_rule_ids(stream.getvalue()), rule_ids)
+        for shard in Source(path, rule_ids="content").compile_shards(2):
+            shard_rule_ids = [rule["rule-id"] for rule in get_rules(shard)]
+            self.assertEqual(
+                len(set(shard_rule_ids)), len(shard_rule_ids)
+            )
+
+    def test_content_rule_ids_with_optimisations(self):
+        source = json.loads(json.dumps(SOURCE))
+        source["selection"]["include"].append(
+            source["selection"]["include"][0]
+        )
+        path = os.path.join(self.directory, "source.json")
+        with open(path, "w") as source_file:
+            json.dump(source, source_file)
+
+        source = Source(
+            path, rule_ids="content", optimisations=["selection"]
+        )
+        stream = StringIO()
+        source.write(stream)
+        self.assertEqual(len(source.removals), 3)
+        self.assertEqual(stream.getvalue(), Source(
+            path, rule_ids="content", optimisations=["selection"]
+        ).compile())
+
+    def test_prepare_content_rule_ids_with_previous_rule_ids(self):
+        rules = [
+            rule.to_dict() for rule in expand_item("selection", "include", {
+                "object-locators": {
+                    "schema-names": ["Test"], "table-names": ["A", "B"]
+                }
+            })
+        ]
+        first_id = str(ids.CONTENT_ID_FIRST + (
+            ids._get_content_key(ids.get_rule_digest(rules[0])) >> 32
+        ))
+        # The rule which had the first rule's ID keeps it, and the first
+        # rule is given the next.
+        previous = {ids.get_rule_digest(rules[1]): first_id}
+        rule_ids = ids.RuleIds("content", previous)
+        rule_ids.prepare(rules)
+        self.assertEqual(
+            [rule_ids.assign(rule) for rule in rules],
+            [str(int(first_id) + 1), first_id]
+        )
+
+        rule_ids = ids.RuleIds("position")
+        rule_ids.prepare(iter(()))
+        self.assertEqual(rule_ids.assign(rules[0]), "1")
+
+    def test_previous_rule_ids(self):
+        previous_path = self.write_mapping(Source().compile_string(SOURCE))
+        source = json.loads(json.dumps(SOURCE))
+        source["selection"]["include"][0]["object-locators"][
+            "table-names"
+        ] = ["0", "A", "C"]
+        mapping_table = Source(
+            previous_mapping=previous_path
+        ).compile_string(source)
+
+        # A and C and the rename keep their IDs, and 0 is given the next.
+        self.assertEqual(get_rule_ids(mapping_table), {
+            ("include", "0"): "5", ("include", "A"): "1",
+            ("include", "C"): "3", ("rename", "A"): "4"
+        })
+        self.assertEqual(
+            [rule["rule-name"] for rule in get_rules(mapping_table)],
+            ["5", "1", "3", "rename-a"]
+        )
+
+    def test_previous_rule_ids_with_content_rule_ids(self):
+        previous_path = self.write_mapping(Source().compile_string(SOURCE))
+        source = json.loads(json.dumps(SOURCE))
+        source["selection"]["include"][0]["object-locators"][
+            "table-names"
+        ].append("D")
+        rule_ids = get_rule_ids(Source(
+            rule_ids="content", previous_mapping=previous_path
+        ).compile_string(source))
+        self.assertEqual(rule_ids[("include", "A")], "1")
+        self.assertEqual(
+            len(rule_ids[("include", "D")]), ids.CONTENT_ID_LENGTH
+        )
+
+    def test_load_mapping_with_invalid_mapping(self):
+        for mapping_table in ["{", '{"rules": [{"rule-id": "1"}]}', "[]"]:
+            with self.assertRaises(InvalidFileError):
+                ids.load_mapping(self.write_mapping(mapping_table))
+        with self.assertRaises(InvalidFileError):
+            ids.load_mapping(os.path.join(self.directory, "missing.json"))
+
+    def test_iter_mapping(self):
+        mapping_table = Source().compile_string(SOURCE)
+        path = self.write_mapping(mapping_table)
+        self.assertEqual(
+            list(ids.iter_mapping(path)), ids.load_mapping(path)
+        )
+        path = self.write_mapping(
+            '{"version": 1, "rules": [{"rule-type": "selection", '
+            '"rule-id": 1, "rule-action": "include", "object-locator": {}}]}'
+        )
+        self.assertEqual(
+            [rule["rule-id"] for rule in ids.iter_mapping(path)], ["1"]
+        )
+
+    def test_iter_mapping_with_invalid_mapping(self):
+        for mapping_table in [
+                "{", '{"rules": [{"rule-id": "1"}]}', "[]", "{}",
+                '{"rules": {}}', '{"rules": []} []'
+        ]:
+            with self.assertRaises(InvalidFileError):
+                list(ids.iter_mapping(self.write_mapping(mapping_table)))
+        with self.assertRaises(InvalidFileError):
+            list(ids.iter_mapping(
+                os.path.join(self.directory, "missing.json")
+            ))
+
+
+if __name__ == "__main__":
+    unittest.main()
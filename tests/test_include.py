@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+
+from ptolemy import include
+from ptolemy.exceptions import InvalidFileError
+from ptolemy.loader import load_source
+from ptolemy.source import Source
+
+
+class IncludeTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.source_path = os.path.join(self.directory, "source.yaml")
+        self.write("_tables.yaml", "payroll: [Salary, Bonus]\nhr: [Staff]\n")
+        self.write("fragments/_items.json", json.dumps([
+            {
+                "object-locators": {
+                    "schema-names": ["HR"],
+                    "table-names": {"$ref": "../_tables.yaml#/hr"}
+                }
+            }
+        ]))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        include._fragments.clear()
+
+    def write(self, name, contents):
+        path = os.path.join(self.directory, name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, "w") as f:
+            f.write(contents)
+        return path
+
+    def resolve(self, source):
+        return include.resolve_references(
+            load_source(source), self.source_path
+        )
+
+    def test_resolve_references(self):
+        source, includes = self.resolve(
+            "selection:\n"
+            "  include:\n"
+            "    - object-locators:\n"
+            "        schema-names: [Payroll]\n"
+            "        table-names: [Pension, $ref: _tables.yaml#/payroll]\n"
+            "    - $ref: fragments/_items.json\n"
+        )
+        self.assertEqual(source, {"selection": {"include": [
+            {
+                "object-locators": {
+                    "schema-names": ["Payroll"],
+                    "table-names": ["Pension", "Salary", "Bonus"]
+                }
+            },
+            {
+                "object-locators": {
+                    "schema-names": ["HR"], "table-names": ["Staff"]
+                }
+            }
+        ]}})
+        self.assertEqual(includes, [
+            os.path.join(self.directory, "_tables.yaml"),
+            os.path.join(self.directory, "fragments", "_items.json")
+        ])
+
+    def test_resolve_reference_to_list_item(self):
+        source, _ = self.resolve(
+            "table-names: [Pension, $ref: '_tables.yaml#/payroll/1']\n"
+        )
+        # A fragment which is not a list is a single item of the list.
+        self.assertEqual(source, {"table-names": ["Pension", "Bonus"]})
+
+    def test_source_without_references_is_unchanged(self):
+        source = {"selection": {"include": [{"rule-name": "a"}]}}
+        self.assertIs(
+            include.resolve_references(source, self.source_path)[0], source
+        )
+
+    @patch("ptolemy.include.READ_SIZE", 4)
+    def test_file_has_references(self):
+        for source_string, expected in [
+                (b"", False),
+                (b"selection: {}", False),
+                (b"a: {$ref: b}", True),
+                (b"ab$r", False),
+                (b"abc$ref", True),
+                (b"abc$r\nef", False)
+        ]:
+            source_file = io.BytesIO(source_string)
+            source_file.seek(1)
+            self.assertEqual(
+                include.file_has_references(source_file), expected
+            )
+            self.assertEqual(source_file.tell(), 1)
+
+    def test_fragments_are_parsed_once(self):
+        source = "$ref: fragments/_items.json"
+        with patch(
+                "ptolemy.include.load_source", side_effect=load_source
+        ) as mock_load_source:
+            first, _ = self.resolve(source)
+            second, _ = self.resolve(source)
+        self.assertEqual(mock_load_source.call_count, 2)
+        self.assertIs(first, second)
+
+    def test_changed_fragments_are_parsed_again(self):
+        source = "$ref: fragments/_items.json"
+        self.resolve(source)
+        path = self.write("_tables.yaml", "hr: [Staff, Manager]\n")
+        os.utime(path, (0, 0))
+        resolved, _ = self.resolve(source)
+        self.assertEqual(
+            resolved[0]["object-locators"]["table-names"],
+            ["Staff", "Manager"]
+        )
+
+    def test_cycles(self):
+        self.write("_a.yaml", "$ref: _b.yaml")
+        self.write("_b.yaml", "[$ref: _a.yaml]")
+        with self.assertRaises(InvalidFileError) as context:
+            self.resolve("$ref: _a.yaml")
+        self.assertIn("includes itself", str(context.exception))
+
+        with self.assertRaises(InvalidFileError):
+            include.resolve_references(
+                {"$ref": "source.yaml"}, self.source_path
+            )
+
+    def test_cycles_through_cached_fragments(self):
+        self.write("_c.yaml", "$ref: source.yaml")
+        self.write("source.yaml", "[Staff]")
+        include.resolve_references(
+            {"$ref": "_c.yaml"}, os.path.join(self.directory, "other.yaml")
+        )
+        with self.assertRaises(InvalidFileError):
+            include.resolve_references({"$ref": "_c.yaml"}, self.source_path)
+
+    def test_invalid_references(self):
+        for reference in [
+                "missing.yaml", "_tables.yaml#/missing", "#/payroll", 3
+        ]:
+            with self.assertRaises(InvalidFileError):
+                include.resolve_references(
+                    {"$ref": reference}, self.source_path
+                )
+
+    def test_references_to_invalid_list_indexes(self):
+        self.assertEqual(
+            self.resolve("$ref: '_tables.yaml#/payroll/0'")[0], "Salary"
+        )
+        for index in ["-1", "-", "01", "+1", "1.0", " 1", "1 ", ""]:
+            with self.assertRaises(InvalidFileError) as context:
+                include.resolve_references(
+                    {"$ref": "_tables.yaml#/payroll/" + index},
+                    self.source_path
+                )
+            self.assertEqual(
+                str(context.exception),
+                "The reference {0!r} does not refer to anything.".format(
+                    "_tables.yaml#/payroll/" + index
+                )
+            )
+
+    def test_references_not_allowed(self):
+        with self.assertRaises(InvalidFileError):
+            include.resolve_references(
+                {"$ref": "_tables.yaml"}, self.source_path, allowed=False
+            )
+
+    def test_source_includes(self):
+        self.write(
+            "source.yaml",
+            "selection:\n  include:\n    - $ref: fragments/_items.json\n"
+        )
+        source = Source(self.source_path)
+        mapping = json.loads(source.compile())
+        self.assertEqual(
+            mapping["rules"][0]["object-locator"],
+            {"schema-name": "HR", "table-name": "Staff"}
+        )
+        self.assertEqual(len(source.includes), 2)
+        self.assertEqual(source.get_includes(), source.includes)
+
+
+if __name__ == "__main__":
+    unittest.main()
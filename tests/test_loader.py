@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+import glob
+import json
+import os
+import unittest
+
+import yaml
+
+from ptolemy import loader
+from ptolemy.exceptions import InvalidFileError
+from ptolemy.source import Source
+
+
+FIXTURES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "integration_tests",
+    "fixtures"
+)
+
+
+class LoaderTestCase(unittest.TestCase):
+
+    def test_load_source_with_yaml(self):
+        source = loader.load_source(b"selection:\n  include: []\n")
+        self.assertEqual(source, {"selection": {"include": []}})
+
+    def test_load_source_with_json_content(self):
+        source = loader.load_source(b' {"selection": {"include": []}}')
+        self.assertEqual(source, {"selection": {"include": []}})
+
+    def test_load_source_with_yaml_flow_mapping(self):
+        source = loader.load_source(u"{selection: {include: []}}")
+        self.assertEqual(source, {"selection": {"include": []}})
+
+    def test_load_source_with_json_extension(self):
+        source = loader.load_source(
+            b'\xef\xbb\xbf{"selection": {}}', "source.JSON"
+        )
+        self.assertEqual(source, {"selection": {}})
+
+    def test_load_source_with_invalid_json(self):
+        with self.assertRaises(InvalidFileError):
+            loader.load_source(b"selection: {}", "source.json")
+
+    def test_load_source_with_invalid_yaml(self):
+        with self.assertRaises(yaml.YAMLError):
+            loader.load_source(b"selection: [")
+
+    def test_json_sources_compile_like_yaml_sources(self):
+        source_paths = glob.glob(os.path.join(FIXTURES_DIR, "src", "*.yaml"))
+        for source_path in sorted(source_paths):
+            with open(source_path, "rb") as source_file:
+                source_string = source_file.read()
+            json_source_string = json.dumps(yaml.safe_load(source_string))
+
+            self.assertEqual(
+                Source("source.json").compile_string(json_source_string),
+                Source("source.yaml").compile_string(source_string)
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
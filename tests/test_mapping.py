@@ -1,10 +1,46 @@
 # -*- coding: utf-8 -*-
 
+import copy
+import json
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
 import unittest
 
 from mock import patch, sentinel
 
-from ptolemy.mapping import Mapping
+from ptolemy.exceptions import PtolemyBaseError
+from ptolemy.mapping import JSONFormat, Mapping
+from ptolemy.rule import Rule
+
+
+RULES = [
+    {
+        "object-locator": {"schema-name": "Test", "table-name": "%"},
+        "rule-action": "include",
+        "rule-type": "selection",
+        "filters": [{
+            "filter-type": "source",
+            "column-name": "Caf\u00e9",
+            "filter-conditions": [{"filter-operator": "eq", "value": "1"}]
+        }]
+    },
+    {
+        "object-locator": {"schema-name": "Test", "table-name": "A"},
+        "rule-action": "rename",
+        "rule-type": "transformation",
+        "rule-target": "table",
+        "value": "B",
+        "rule-name": "named"
+    }
+]
+
+
+def get_json(json_format, rules=RULES):
+    mapping = Mapping(json_format=json_format)
+    mapping.mapping["rules"] = [Rule.from_dict(rule) for rule in rules]
+    return mapping.to_json()
 
 
 class MappingTestCase(unittest.TestCase):
@@ -55,3 +91,96 @@ class MappingTestCase(unittest.TestCase):
         ]
         self.mapping._number_rules()
         self.assertEqual(self.mapping.mapping["rules"], expected_rules)
+
+    def test_write_without_rules(self):
+        stream = StringIO()
+        self.mapping.write(stream)
+        self.assertEqual(stream.getvalue(), Mapping().to_json())
+
+    def test_write_matches_to_json(self):
+        rules = [
+            {
+                "object-locator": {"schema-name": "Test", "table-name": "%"},
+                "rule-action": "include",
+                "rule-type": "selection"
+            },
+            {
+                "filters": [{"column-name": "a\nb", "filter-conditions": []}],
+                "rule-action": "exclude",
+                "rule-name": "named"
+            }
+        ]
+        expected_mapping = Mapping()
+        expected_mapping.mapping["rules"] = copy.deepcopy(rules)
+
+        stream = StringIO()
+        self.mapping.mapping["rules"] = iter(rules)
+        self.mapping.write(stream)
+        self.assertEqual(stream.getvalue(), expected_mapping.to_json())
+
+    def test_minified(self):
+        self.assertEqual(
+            get_json(JSONFormat(True, "sorted", "json"), RULES[1:]),
+            '{"rules":[{"object-locator":{"schema-name":"Test",'
+            '"table-name":"A"},"rule-action":"rename","rule-id":"1",'
+            '"rule-name":"named","rule-target":"table",'
+            '"rule-type":"transformation","value":"B"}]}'
+        )
+        self.assertEqual(
+            get_json(JSONFormat(True, "sorted", "json"), []),
+            '{"rules":[]}'
+        )
+
+    def test_canonical_key_order(self):
+        self.assertEqual(
+            get_json(JSONFormat(True, "canonical", "json"), RULES[1:]),
+            '{"rules":[{"rule-type":"transformation","rule-id":"1",'
+            '"rule-name":"named","object-locator":{"schema-name":"Test",'
+            '"table-name":"A"},"rule-action":"rename",'
+            '"rule-target":"table","value":"B"}]}'
+        )
+
+    def test_formats_hold_the_same_rules(self):
+        expected_rules = json.loads(get_json(None))
+        for minified in [False, True]:
+            for key_order in ["sorted", "canonical"]:
+                self.assertEqual(
+                    json.loads(get_json(
+                        JSONFormat(minified, key_order, "json")
+                    )),
+                    expected_rules
+                )
+
+    def test_encoders_write_the_same_bytes(self):
+        try:
+            import orjson  # noqa: F401
+        except ImportError:
+            self.skipTest("requires orjson")
+        for minified in [False, True]:
+            for key_order in ["sorted", "canonical"]:
+                self.assertEqual(
+                    get_json(JSONFormat(minified, key_order, "orjson")),
+                    get_json(JSONFormat(minified, key_order, "json"))
+                )
+
+    def test_encoders_write_the_same_bytes_for_escaped_characters(self):
+        try:
+            import orjson  # noqa: F401
+        except ImportError:
+            self.skipTest("requires orjson")
+        rules = copy.deepcopy(RULES)
+        rules[1]["object-locator"]["table-name"] = "A\x7fB"
+        for minified in [False, True]:
+            self.assertEqual(
+                get_json(JSONFormat(minified, "sorted", "orjson"), rules),
+                get_json(JSONFormat(minified, "sorted", "json"), rules)
+            )
+
+    @patch.dict("sys.modules", {"orjson": None})
+    def test_missing_encoder(self):
+        with self.assertRaises(PtolemyBaseError):
+            Mapping(json_format=JSONFormat(False, "sorted", "orjson"))
+        self.assertEqual(
+            get_json(JSONFormat(False, "sorted", "auto")),
+            get_json(JSONFormat(False, "sorted", "json"))
+        )
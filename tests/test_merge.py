@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+from mock import patch
+
+from ptolemy.exceptions import InvalidFileError
+from ptolemy.mapping import JSONFormat
+from ptolemy.merge import merge_mappings, MergeResult
+from ptolemy.source import Source
+from ptolemy.stats import Stats
+
+
+def get_source(table_names, **data):
+    item = {
+        "object-locators": {
+            "schema-names": ["Test"], "table-names": table_names
+        }
+    }
+    item.update(data)
+    return {"selection": {"include": [item]}}
+
+
+class MergeTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write_mapping(self, name, mapping_table):
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as mapping_file:
+            mapping_file.write(mapping_table)
+        return path
+
+    def merge(self, paths, **kwargs):
+        stream = StringIO()
+        result = merge_mappings(paths, stream, **kwargs)
+        return stream.getvalue(), result
+
+    def test_merge_mappings(self):
+        paths = [
+            self.write_mapping(
+                "a.json", Source().compile_string(get_source(["A", "B"]))
+            ),
+            self.write_mapping(
+                "b.json", Source().compile_string(
+                    get_source(["B", "C"], **{"rule-name": "named"})
+                )
+            ),
+            self.write_mapping(
+                "c.json", Source().compile_string(get_source(["B", "A"]))
+            )
+        ]
+
+        mapping_table, result = self.merge(paths)
+
+        self.assertEqual(result, MergeResult(3, 4, 2))
+        # The merged mapping is the mapping the sources compile to
+        # together, less the duplicates.
+        expected = json.loads(Source().compile_string(
+            get_source(["A", "B"])
+        ))["rules"]
+        expected.extend(json.loads(Source().compile_string(
+            get_source(["B", "C"], **{"rule-name": "named"})
+        ))["rules"])
+        for i, rule in enumerate(expected):
+            rule["rule-id"] = str(i + 1)
+            if rule["rule-name"] != "named":
+                rule["rule-name"] = rule["rule-id"]
+        self.assertEqual(mapping_table, json.dumps(
+            {"rules": expected}, indent=4, sort_keys=True
+        ))
+
+    def test_merge_mappings_in_format(self):
+        path = self.write_mapping(
+            "a.json", Source().compile_string(get_source(["A"]))
+        )
+        json_format = JSONFormat(True, "canonical", "json")
+        mapping_table, _ = self.merge([path], json_format=json_format)
+        self.assertEqual(
+            mapping_table,
+            Source(json_format=json_format).compile_string(
+                get_source(["A"])
+            )
+        )
+
+    def test_merge_mappings_with_content_rule_ids(self):
+        source = get_source(["A", "B"])
+        path = self.write_mapping("a.json", Source().compile_string(source))
+        mapping_table, _ = self.merge([path, path], rule_ids="content")
+        self.assertEqual(
+            mapping_table, Source(rule_ids="content").compile_string(source)
+        )
+
+    @patch("ptolemy.ids.CONTENT_ID_COUNT", 8)
+    def test_merge_mappings_with_colliding_content_rule_ids(self):
+        paths = [
+            self.write_mapping(
+                "a.json", Source().compile_string(get_source(["A", "B", "C"]))
+            ),
+            self.write_mapping(
+                "b.json", Source().compile_string(get_source(["D", "E", "F"]))
+            )
+        ]
+
+        def get_rule_ids(paths):
+            mapping_table, _ = self.merge(paths, rule_ids="content")
+            return {
+                rule["object-locator"]["table-name"]: rule["rule-id"]
+                for rule in json.loads(mapping_table)["rules"]
+            }
+
+        rule_ids = get_rule_ids(paths)
+        self.assertEqual(len(set(rule_ids.values())), 6)
+        self.assertEqual(get_rule_ids(paths[::-1]), rule_ids)
+
+    def test_merge_mappings_with_stats(self):
+        path = self.write_mapping(
+            "a.json", Source().compile_string(get_source(["A", "B"]))
+        )
+        stats = Stats()
+        mapping_table, _ = self.merge([path, path], stats=stats)
+        self.assertEqual(stats.rules, 2)
+        self.assertEqual(stats.output_bytes, len(mapping_table))
+
+    def test_merge_mappings_with_invalid_mapping(self):
+        path = self.write_mapping("a.json", '{"rules": [{}]}')
+        with self.assertRaises(InvalidFileError):
+            self.merge([path])
+        with self.assertRaises(InvalidFileError):
+            self.merge([os.path.join(self.directory, "missing.json")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+import json
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+import unittest
+
+from mock import patch
+
+from ptolemy import parallel
+from ptolemy.mapping import JSONFormat, Mapping
+from ptolemy.rule import expand_item
+from ptolemy.stats import Stats
+
+
+def get_item(schemas, tables, columns=0, **data):
+    object_locators = {
+        "schema-names": ["S{0}".format(i) for i in range(schemas)],
+        "table-names": ["T{0}".format(i) for i in range(tables)]
+    }
+    if columns:
+        object_locators["column-names"] = [
+            "C{0}".format(i) for i in range(columns)
+        ]
+    return dict(data, **{"object-locators": object_locators})
+
+
+ITEMS = [
+    ("selection", "include", get_item(3, 4, 5)),
+    ("selection", "exclude", get_item(1, 1)),
+    ("selection", "include", get_item(1, 0)),
+    ("transformation", "rename", get_item(
+        2, 7, **{"rule-target": "table", "value": "new"}
+    )),
+    ("selection", "include", get_item(1, 13)),
+    ("selection", "include", get_item(3, 2, 9))
+]
+
+
+def expand(items):
+    return [
+        rule for rule_type, rule_action, data_item in items
+        for rule in expand_item(rule_type, rule_action, data_item)
+    ]
+
+
+def write_serially(items, json_format=None):
+    stream = StringIO()
+    mapping = Mapping(json_format=json_format)
+    mapping.mapping["rules"] = iter(expand(items))
+    mapping.write(stream)
+    return stream.getvalue()
+
+
+def write_in_parallel(items, jobs, json_format=None, stats=None):
+    stream = StringIO()
+    parallel.write_mapping(stream, iter(items), jobs, json_format, stats)
+    return stream.getvalue()
+
+
+class SplitItemsTestCase(unittest.TestCase):
+
+    def test_split_items(self):
+        for chunk_rules in [1, 2, 3, 4, 7, 10, 60, 1000]:
+            chunks = list(parallel.split_items(ITEMS, chunk_rules))
+            self.assertEqual(
+                expand(item for chunk, _ in chunks for item in chunk),
+                expand(ITEMS)
+            )
+            for chunk, size in chunks:
+                self.assertEqual(len(expand(chunk)), size)
+                self.assertLess(size, 2 * chunk_rules)
+
+    def test_split_items_by_first_locator(self):
+        chunks = list(parallel.split_items(ITEMS[:1], 20))
+        self.assertEqual([size for _, size in chunks], [20, 20, 20])
+        self.assertEqual(
+            [
+                chunk[0][2]["object-locators"]["schema-names"]
+                for chunk, _ in chunks
+            ],
+            [["S0"], ["S1"], ["S2"]]
+        )
+
+    def test_split_items_by_last_locator(self):
+        chunks = list(parallel.split_items(ITEMS[:1], 2))
+        self.assertEqual(
+            [item[2]["object-locators"] for item in chunks[2][0]],
+            [
+                {
+                    "schema-names": ["S0"],
+                    "table-names": ["T0"],
+                    "column-names": ["C4"]
+                },
+                {
+                    "schema-names": ["S0"],
+                    "table-names": ["T1"],
+                    "column-names": ["C0", "C1"]
+                }
+            ]
+        )
+
+    def test_split_items_keeps_small_items(self):
+        chunks = list(parallel.split_items(ITEMS, 1000))
+        self.assertEqual(chunks, [(ITEMS, 142)])
+
+
+class WriteMappingTestCase(unittest.TestCase):
+
+    def test_write_mapping(self):
+        for json_format in [
+                None,
+                JSONFormat(True, "sorted", "json"),
+                JSONFormat(False, "canonical", "json"),
+                JSONFormat(True, "canonical", "auto")
+        ]:
+            for chunk_rules in [1, 7, 1000]:
+                with patch.object(parallel, "CHUNK_RULES", chunk_rules):
+                    self.assertEqual(
+                        write_in_parallel(ITEMS, 2, json_format),
+                        write_serially(ITEMS, json_format)
+                    )
+
+    @patch.object(parallel, "CHUNK_RULES", 5)
+    def test_write_mapping_with_stats(self):
+        stats = Stats()
+        mapping = write_in_parallel(ITEMS, 3, stats=stats)
+
+        self.assertEqual(mapping, write_serially(ITEMS))
+        self.assertEqual(list(stats.rule_counts.items()), [
+            (("selection", "include"), 127),
+            (("selection", "exclude"), 1),
+            (("transformation", "rename"), 14)
+        ])
+        self.assertEqual(stats.output_bytes, len(mapping))
+        self.assertIn("expand", stats.phases)
+
+    def test_write_mapping_in_current_process(self):
+        with patch("multiprocessing.Pool") as mock_Pool:
+            for items, jobs in [(ITEMS, 4), (ITEMS * 1000, 1)]:
+                self.assertEqual(
+                    write_in_parallel(items, jobs), write_serially(items)
+                )
+        mock_Pool.assert_not_called()
+
+    @patch("multiprocessing.cpu_count", return_value=1)
+    def test_write_mapping_with_a_worker_per_cpu(self, mock_cpu_count):
+        with patch("multiprocessing.Pool") as mock_Pool:
+            self.assertEqual(
+                write_in_parallel(ITEMS, 0), write_serially(ITEMS)
+            )
+        mock_cpu_count.assert_called_once_with()
+        mock_Pool.assert_not_called()
+
+    def test_write_mapping_without_rules(self):
+        for items in [[], ITEMS[2:3]]:
+            mapping = write_in_parallel(items, 2)
+            self.assertEqual(mapping, write_serially(items))
+            self.assertEqual(json.loads(mapping), {"rules": []})
+
+    def test_encode_chunk(self):
+        output, stats = parallel.encode_chunk(
+            ITEMS[1:2], 41, JSONFormat(True, "sorted", "json")
+        )
+        self.assertEqual(json.loads("[" + output[1:] + "]"), [{
+            "rule-type": "selection", "rule-id": "41", "rule-name": "41",
+            "object-locator": {"schema-name": "S0", "table-name": "T0"},
+            "rule-action": "exclude"
+        }])
+        self.assertIsNone(stats)
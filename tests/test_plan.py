@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+import glob
+import os
+import unittest
+
+from mock import patch
+
+from ptolemy.exceptions import MappingTooLargeError
+from ptolemy.mapping import JSONFormat
+from ptolemy.plan import Plan, _sum_number_lengths
+from ptolemy.source import Source
+
+
+FIXTURES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "integration_tests",
+    "fixtures",
+    "src"
+)
+
+
+class PlanTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.source = {
+            "selection": {
+                "include": [
+                    {
+                        "object-locators": {
+                            "schema-names": ["s1", "s2"],
+                            "table-names": [u"té", "t2", "t3"]
+                        },
+                        "rule-name": "named"
+                    }
+                ]
+            },
+            "transformation": {
+                "convert-lowercase": [
+                    {
+                        "object-locators": {
+                            "schema-names": ["s{0}".format(i)
+                                             for i in range(5)],
+                            "table-names": ["t"],
+                            "column-names": ["c{0}".format(i)
+                                             for i in range(3)]
+                        },
+                        "rule-target": "column"
+                    }
+                ]
+            }
+        }
+
+    def test_plan(self):
+        plan = Plan(self.source)
+        source = Source("file/path")
+        source.source = self.source
+
+        self.assertEqual(
+            [item.rules for item in plan.items], [6, 15]
+        )
+        self.assertEqual(plan.rules, 21)
+        self.assertEqual(plan.size, len(source._generate_mapping().to_json()))
+
+    def test_plan_without_rules(self):
+        self.source["transformation"]["convert-lowercase"][0][
+            "object-locators"]["column-names"] = []
+        del self.source["selection"]["include"]
+        plan = Plan(self.source)
+        self.assertEqual(plan.rules, 0)
+        self.assertEqual(plan.size, len('{\n    "rules": []\n}'))
+
+    def test_plan_matches_fixtures(self):
+        for source_path in glob.glob(os.path.join(FIXTURES_DIR, "*.yaml")):
+            plan = Source(source_path).plan()
+            mapping_table = Source(source_path).compile()
+            self.assertEqual(plan.size, len(mapping_table), source_path)
+
+    def test_plan_in_each_format(self):
+        for minified in [False, True]:
+            for key_order in ["sorted", "canonical"]:
+                json_format = JSONFormat(minified, key_order, "json")
+                source = Source(json_format=json_format)
+                mapping_table = source.compile_string(self.source)
+                self.assertEqual(
+                    Plan(self.source, json_format).size, len(mapping_table)
+                )
+
+    def test_plan_with_content_rule_ids(self):
+        source = Source(rule_ids="content")
+        mapping_table = source.compile_string(self.source)
+        self.assertEqual(
+            Plan(self.source, rule_ids="content").size, len(mapping_table)
+        )
+
+    def test_check_within_limits(self):
+        Plan(self.source).check(max_rules=21, max_bytes=10 ** 6)
+
+    def test_check_with_too_many_rules(self):
+        with self.assertRaises(MappingTooLargeError):
+            Plan(self.source).check(max_rules=20)
+
+    def test_check_with_too_many_bytes(self):
+        with self.assertRaises(MappingTooLargeError):
+            Plan(self.source).check(max_bytes=100)
+
+    @patch("ptolemy.source.Source._iter_rules")
+    def test_source_checks_limits_before_expanding(self, mock_iter_rules):
+        source = Source("file/path", max_rules=1)
+        with self.assertRaises(MappingTooLargeError):
+            source.compile_string(
+                "selection: {include: [{object-locators: "
+                "{schema-names: [a, b], table-names: ['%']}}]}"
+            )
+        self.assertFalse(mock_iter_rules.called)
+
+    def test_report(self):
+        report = Plan(self.source).report().splitlines()
+        self.assertEqual(len(report), 4)
+        self.assertEqual(report[-1].split(), ["total", "21", str(
+            Plan(self.source).size
+        )])
+
+    def test_sum_number_lengths(self):
+        for first, last in [(1, 9), (1, 10), (5, 123), (99, 1001), (3, 2)]:
+            self.assertEqual(
+                _sum_number_lengths(first, last),
+                sum(len(str(i)) for i in range(first, last + 1))
+            )
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from ptolemy.mapping import Mapping
+from ptolemy.rule import expand_item, ExpansionCache, Rule
+
+
+RULE = {
+    "object-locator": {"schema-name": "Test", "table-name": "Employee"},
+    "rule-action": "include",
+    "rule-type": "selection",
+    "filters": [{"filter-type": "source", "column-name": "id"}]
+}
+
+
+class RuleTestCase(unittest.TestCase):
+
+    def test_from_dict_and_to_dict(self):
+        rule = Rule.from_dict(RULE)
+        self.assertEqual(rule.to_dict(), RULE)
+        self.assertEqual(rule.names, ("Test", "Employee"))
+        self.assertEqual(rule, Rule.from_dict(dict(RULE)))
+
+    def test_reads_like_a_dict(self):
+        rule = Rule.from_dict(RULE)
+        self.assertEqual(rule["rule-type"], "selection")
+        self.assertEqual(rule["rule-action"], "include")
+        self.assertEqual(rule["object-locator"], RULE["object-locator"])
+        self.assertEqual(rule.get("filters"), RULE["filters"])
+        self.assertIsNone(rule.get("rule-name"))
+        self.assertEqual(rule.locate("table-name"), "Employee")
+        self.assertEqual(rule.locate("column-name", "%"), "%")
+
+    def test_compares_by_value(self):
+        rule = Rule.from_dict(RULE)
+        self.assertFalse(rule != Rule.from_dict(RULE))
+        self.assertNotEqual(
+            rule, Rule.from_dict(dict(RULE, **{"rule-action": "exclude"}))
+        )
+        self.assertNotEqual(rule, RULE)
+        self.assertTrue(rule != RULE)
+        self.assertEqual(repr(rule), "Rule({0!r})".format(rule.to_dict()))
+
+    def test_expand_item_shares_data(self):
+        data_item = {
+            "object-locators": {
+                "schema-names": ["Test"],
+                "table-names": ["A", "B"],
+                "column-names": ["id"]
+            },
+            "rule-target": "column",
+            "value": "new"
+        }
+        rules = list(expand_item("transformation", "rename", data_item))
+
+        self.assertEqual(
+            [rule.names for rule in rules],
+            [("Test", "A", "id"), ("Test", "B", "id")]
+        )
+        self.assertIs(rules[0].data, rules[1].data)
+        self.assertIs(rules[0].location_keys, rules[1].location_keys)
+        self.assertEqual(rules[1].to_dict(), {
+            "object-locator": {
+                "schema-name": "Test", "table-name": "B", "column-name": "id"
+            },
+            "rule-action": "rename",
+            "rule-target": "column",
+            "rule-type": "transformation",
+            "value": "new"
+        })
+
+    def test_mapping_numbers_copies_of_rules(self):
+        rule = Rule.from_dict(RULE)
+        first = Mapping()
+        first.mapping["rules"] = [rule]
+        second = Mapping()
+        second.mapping["rules"] = [Rule.from_dict(RULE), rule]
+
+        self.assertIn('"rule-id": "1"', first.to_json())
+        self.assertIn('"rule-id": "2"', second.to_json())
+        self.assertNotIn("rule-id", rule.to_dict())
+
+    def test_expansion_cache(self):
+        item = {
+            "object-locators": {"schema-names": ["Test"], "table-names": ["A"]}
+        }
+        other_item = {
+            "object-locators": {"schema-names": ["Test"], "table-names": ["B"]}
+        }
+        cache = ExpansionCache()
+        rules = cache.expand("selection", "include", item)
+        self.assertEqual(
+            rules, list(expand_item("selection", "include", item))
+        )
+        cache.expand("selection", "include", other_item)
+        cache.prune()
+
+        self.assertIs(
+            cache.expand("selection", "include", dict(item)), rules
+        )
+        self.assertIsNot(cache.expand("selection", "exclude", item), rules)
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+        # other_item was not expanded since the last prune.
+        cache.prune()
+        cache.expand("selection", "include", other_item)
+        self.assertEqual(cache.misses, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
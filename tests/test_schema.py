@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+import unittest
+
+from jsonschema import Draft4Validator
+from jsonschema.exceptions import ValidationError
+from mock import patch
+import yaml
+
+from ptolemy import schema, schema_compiler, source_validator
+
+
+class SchemaTestCase(unittest.TestCase):
+
+    def test_source_schema_json_matches_yaml(self):
+        yaml_file_path = os.path.join(
+            os.path.dirname(schema.SOURCE_SCHEMA_FILE_PATH),
+            "source-schema.yaml"
+        )
+        with open(yaml_file_path) as yaml_file:
+            yaml_schema = yaml.safe_load(yaml_file)
+        with open(schema.SOURCE_SCHEMA_FILE_PATH) as json_file:
+            json_schema = json.load(json_file)
+        # If this fails, run `make schema` to regenerate the JSON schema.
+        self.assertEqual(json_schema, yaml_schema)
+
+    def test_load_source_schema_is_cached(self):
+        self.assertIs(schema.load_source_schema(), schema.load_source_schema())
+
+    def test_get_validator_is_cached(self):
+        self.assertIs(schema.get_validator(), schema.get_validator())
+
+    def test_validate_with_valid_source(self):
+        schema.validate({
+            "selection": {
+                "include": [
+                    {
+                        "object-locators": {
+                            "schema-names": ["Test"],
+                            "table-names": ["%"]
+                        }
+                    }
+                ]
+            }
+        })
+
+    def test_validate_with_invalid_source(self):
+        with self.assertRaises(ValidationError):
+            schema.validate({"selection": {"incorrect-key": []}})
+
+    def test_validate_uses_generated_validator(self):
+        self.assertIs(
+            schema.get_source_validator(), source_validator.validate
+        )
+
+    @patch("ptolemy.schema._source_validator", None)
+    @patch("ptolemy.source_validator.SCHEMA_DIGEST", "outdated")
+    def test_validate_with_outdated_generated_validator(self):
+        # The schema has changed since the validator was generated, so
+        # sources are validated by jsonschema.
+        self.assertEqual(
+            schema.get_source_validator(), schema.get_validator().validate
+        )
+
+
+FIXTURES_DIRECTORY = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "integration_tests",
+    "fixtures", "src"
+)
+
+WRONG_VALUES = [3, "x", None, [], {}, ["x"], [3], {"x": "y"}, "eq"]
+
+
+def load_fixtures():
+    fixtures = []
+    for file_name in sorted(os.listdir(FIXTURES_DIRECTORY)):
+        with open(os.path.join(FIXTURES_DIRECTORY, file_name)) as fixture:
+            fixtures.append(yaml.safe_load(fixture))
+    return fixtures
+
+
+def get_example(value_schema):
+    """
+    Return a valid value for a schema, with every property it allows.
+
+    """
+    if "enum" in value_schema:
+        return value_schema["enum"][0]
+    if value_schema["type"] == "object":
+        return {
+            key: get_example(property_schema)
+            for key, property_schema in value_schema["properties"].items()
+        }
+    if value_schema["type"] == "array":
+        return [get_example(value_schema["items"])]
+    return "x"
+
+
+def get_rule_action_sources():
+    """
+    Return a source for each rule type and action, with an item using every
+    property the action allows. Sources require a selection, so the others
+    select a table too.
+
+    """
+    selection = {"include": [
+        {"object-locators": {"schema-names": ["x"], "table-names": ["x"]}}
+    ]}
+    sources = []
+    rule_types = schema.load_source_schema()["properties"]
+    for rule_type, rule_type_schema in sorted(rule_types.items()):
+        rule_actions = rule_type_schema["properties"]
+        for rule_action, rule_action_schema in sorted(rule_actions.items()):
+            source = {"selection": selection}
+            source[rule_type] = {
+                rule_action: get_example(rule_action_schema)
+            }
+            sources.append(source)
+    return sources
+
+
+def mutate(value):
+    """
+    Yield copies of value with one node changed, to make invalid sources.
+
+    """
+    for wrong_value in WRONG_VALUES:
+        yield wrong_value
+    if isinstance(value, dict):
+        yield dict(value, unexpected=1)
+        yield dict(value, unexpected=1, another=2)
+        yield dict(value, **{"1": 1})
+        for key in value:
+            yield {k: v for k, v in value.items() if k != key}
+            for mutated in mutate(value[key]):
+                yield dict(value, **{key: mutated})
+    elif isinstance(value, list):
+        yield value + [3]
+        yield value + [{}]
+        for i, item in enumerate(value):
+            for mutated in mutate(item):
+                yield value[:i] + [mutated] + value[i + 1:]
+
+
+def compile_validator(value_schema):
+    """
+    Return the validate function generated for a schema.
+
+    """
+    namespace = {"__name__": "ptolemy.generated", "__package__": "ptolemy"}
+    exec(schema_compiler.compile_schema(value_schema, "digest"), namespace)
+    return namespace["validate"]
+
+
+def get_error(validate, source):
+    try:
+        validate(source)
+    except ValidationError as error:
+        return (
+            error.message, list(error.path), list(error.schema_path),
+            error.validator, error.validator_value, error.instance,
+            error.schema
+        )
+    return None
+
+
+class SourceValidatorTestCase(unittest.TestCase):
+
+    def test_source_validator_is_up_to_date(self):
+        # If this fails, run `make schema` to regenerate the validator.
+        with open(source_validator.__file__.replace(".pyc", ".py")) as module:
+            self.assertEqual(module.read(), schema_compiler.compile_schema(
+                schema.load_source_schema(), schema.get_source_schema_digest()
+            ))
+
+    def test_validators_accept_fixtures(self):
+        fixtures = load_fixtures()
+        self.assertTrue(fixtures)
+        for fixture in fixtures:
+            schema.get_validator().validate(fixture)
+            source_validator.validate(fixture)
+
+    def test_validators_agree_on_invalid_sources(self):
+        jsonschema_validate = schema.get_validator().validate
+        invalid = 0
+        for fixture in load_fixtures():
+            for source in mutate(fixture):
+                expected = get_error(jsonschema_validate, source)
+                self.assertEqual(
+                    get_error(source_validator.validate, source), expected
+                )
+                invalid += expected is not None
+        self.assertGreater(invalid, 1000)
+
+    def test_validators_agree_on_every_rule_action(self):
+        jsonschema_validate = schema.get_validator().validate
+        sources = get_rule_action_sources()
+        self.assertEqual(len(sources), 12)
+        for source in sources:
+            self.assertIsNone(get_error(jsonschema_validate, source))
+            self.assertIsNone(get_error(source_validator.validate, source))
+            for mutated in mutate(source):
+                self.assertEqual(
+                    get_error(source_validator.validate, mutated),
+                    get_error(jsonschema_validate, mutated),
+                    mutated
+                )
+
+    def test_compile_schema_with_unsupported_keyword(self):
+        with self.assertRaises(ValueError):
+            schema_compiler.compile_schema(
+                {"type": "object", "minProperties": 1}, "digest"
+            )
+
+    def test_compile_schema_with_unsupported_type(self):
+        with self.assertRaises(ValueError):
+            schema_compiler.compile_schema({"type": "integer"}, "digest")
+
+    def test_compile_schema_agrees_with_jsonschema(self):
+        # Schemas using the keywords in ways the source schema does not.
+        for value_schema in [
+                {},
+                {"type": ["object", "array"]},
+                {"required": ["a"], "properties": {"a": {"type": "string"}}},
+                {"properties": {"a": {"title": "A"}}, "items": {}},
+                {"items": {"type": "string", "enum": ["x"]}}
+        ]:
+            validate = compile_validator(value_schema)
+            jsonschema_validate = Draft4Validator(value_schema).validate
+            with patch(
+                    "ptolemy.schema.load_source_schema",
+                    return_value=value_schema
+            ):
+                for value in WRONG_VALUES + [{"a": 1}, {"a": "x"}, [3]]:
+                    self.assertEqual(
+                        get_error(validate, value),
+                        get_error(jsonschema_validate, value),
+                        (value_schema, value)
+                    )
+
+    def test_compile_schema_with_unsupported_values(self):
+        for value_schema in [
+                {"enum": ["x", 1]},
+                {"additionalProperties": {"type": "string"}},
+                {"items": [{"type": "string"}]}
+        ]:
+            with self.assertRaises(ValueError):
+                schema_compiler.compile_schema(value_schema, "digest")
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_main(self, mock_stdout):
+        schema_compiler.main()
+        with open(source_validator.__file__.replace(".pyc", ".py")) as module:
+            self.assertEqual(mock_stdout.getvalue(), module.read())
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from ptolemy.optimise import apply_optimisations, Removal
+from ptolemy.selection import remove_redundant_rules
+
+from tests.helpers import selection_rule, transformation_rule
+
+
+class SelectionTestCase(unittest.TestCase):
+
+    def optimise(self, rules):
+        removals = []
+        kept = list(apply_optimisations(
+            lambda: iter(rules), [remove_redundant_rules], removals
+        ))
+        return kept, removals
+
+    def test_keeps_distinct_rules(self):
+        rules = [
+            selection_rule("Test.A"),
+            selection_rule("Test.B"),
+            selection_rule("Other.%"),
+            selection_rule("Test.%", action="exclude")
+        ]
+        kept, removals = self.optimise(rules)
+        self.assertEqual(kept, rules)
+        self.assertEqual(removals, [])
+
+    def test_removes_exact_duplicates(self):
+        rules = [
+            transformation_rule("convert-lowercase", "Test", "schema"),
+            selection_rule("Test.A"),
+            transformation_rule("convert-lowercase", "Test", "schema")
+        ]
+        kept, removals = self.optimise(rules)
+        self.assertEqual(kept, rules[:2])
+        self.assertEqual(removals, [Removal(
+            "transformation convert-lowercase rule for Test",
+            "duplicate of an earlier rule"
+        )])
+
+    def test_removes_rules_covered_by_wildcards(self):
+        rules = [
+            selection_rule("Test.Employee"),
+            selection_rule("Test.DMS%"),
+            selection_rule("Test.%"),
+            selection_rule("Test.DMS_Table", action="exclude"),
+            selection_rule("Tester.Employee")
+        ]
+        kept, removals = self.optimise(rules)
+        self.assertEqual(kept, rules[2:])
+        self.assertEqual(removals, [
+            Removal(
+                "selection include rule for Test.Employee",
+                "covered by the rule for Test.%"
+            ),
+            Removal(
+                "selection include rule for Test.DMS%",
+                "covered by the rule for Test.%"
+            )
+        ])
+
+    def test_removes_rules_covered_by_schema_wildcards(self):
+        rules = [
+            selection_rule("Test.Employee"),
+            selection_rule("T%.E%")
+        ]
+        kept, _ = self.optimise(rules)
+        self.assertEqual(kept, rules[1:])
+
+    def test_keeps_first_of_identical_locators(self):
+        rules = [
+            selection_rule("Test.%", **{"rule-name": "first"}),
+            selection_rule("Test.%", **{"rule-name": "second"})
+        ]
+        kept, _ = self.optimise(rules)
+        self.assertEqual(kept, rules[:1])
+
+    def test_keeps_filtered_rules(self):
+        filters = [{
+            "filter-type": "source",
+            "column-name": "id",
+            "filter-conditions": [{"filter-operator": "eq", "value": "1"}]
+        }]
+        rules = [
+            selection_rule("Test.Employee", filters=filters),
+            selection_rule("Test.%", filters=filters),
+            selection_rule("Test.Dept")
+        ]
+        kept, _ = self.optimise(rules)
+        self.assertEqual(kept, rules)
+
+    def test_without_recording_removals(self):
+        rules = [selection_rule("Test.A"), selection_rule("Test.A")]
+        kept = list(apply_optimisations(
+            lambda: iter(rules), [remove_redundant_rules]
+        ))
+        self.assertEqual(kept, rules[:1])
@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+try:
+    from httplib import HTTPConnection
+except ImportError:
+    from http.client import HTTPConnection
+
+from mock import patch
+
+from ptolemy import server
+from ptolemy.source import Source
+
+
+FIXTURE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "integration_tests", "fixtures", "src", "single_filter.yaml"
+)
+
+
+def read_fixture():
+    with open(FIXTURE_PATH, "rb") as fixture_file:
+        return fixture_file.read()
+
+
+class ServerTestCase(unittest.TestCase):
+
+    def start(self, address=("127.0.0.1", 0), options=None, workers=1):
+        compile_server = server.start_server(address, options, workers)
+        thread = threading.Thread(target=compile_server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        def stop():
+            compile_server.shutdown()
+            compile_server.server_close()
+            thread.join()
+        self.addCleanup(stop)
+        return compile_server
+
+    def request(self, compile_server, method, path, body=None):
+        host, port = compile_server.server_address
+        connection = HTTPConnection(host, port)
+        try:
+            connection.request(method, path, body)
+            response = connection.getresponse()
+            return response.status, response.read().decode("utf-8")
+        finally:
+            connection.close()
+
+    def test_compile(self):
+        compile_server = self.start()
+        status, body = self.request(
+            compile_server, "POST", "/compile", read_fixture()
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(body, Source(FIXTURE_PATH).compile() + "\n")
+
+    def test_compile_with_invalid_source(self):
+        compile_server = self.start()
+        status, body = self.request(
+            compile_server, "POST", "/compile", b"selection: 3"
+        )
+        self.assertEqual(status, 400)
+        self.assertEqual(json.loads(body), {
+            "error": "The source file could not be validated. 3 is not of "
+                     "type 'object'"
+        })
+
+    def test_compile_with_fragment(self):
+        compile_server = self.start()
+        status, body = self.request(
+            compile_server, "POST", "/compile", b"$ref: /etc/passwd"
+        )
+        self.assertEqual(status, 400)
+        self.assertIn("cannot be included", json.loads(body)["error"])
+
+    def test_compile_with_options(self):
+        compile_server = self.start(options={"max_rules": 100})
+        status, body = self.request(
+            compile_server, "POST", "/compile?max_rules=0", read_fixture()
+        )
+        self.assertEqual(status, 400)
+        self.assertIn("more than the limit of 0", json.loads(body)["error"])
+
+    def test_compile_with_unknown_parameter(self):
+        compile_server = self.start()
+        status, body = self.request(
+            compile_server, "POST", "/compile?optimise=everything",
+            read_fixture()
+        )
+        self.assertEqual(status, 400)
+        self.assertEqual(
+            json.loads(body), {"error": "Unknown optimisation 'everything'."}
+        )
+
+    @patch("ptolemy.server.compile_source")
+    def test_compile_with_internal_error(self, mock_compile_source):
+        mock_compile_source.side_effect = RuntimeError
+        compile_server = self.start()
+        status, _ = self.request(
+            compile_server, "POST", "/compile", read_fixture()
+        )
+        self.assertEqual(status, 500)
+        self.assertEqual(compile_server.counters.failures, 1)
+
+    def test_compile_without_content_length(self):
+        compile_server = self.start()
+        host, port = compile_server.server_address
+        connection = HTTPConnection(host, port)
+        try:
+            connection.putrequest("POST", "/compile")
+            connection.endheaders()
+            response = connection.getresponse()
+            self.assertEqual(response.status, 411)
+            self.assertEqual(json.loads(response.read().decode("utf-8")), {
+                "error": "A Content-Length is required."
+            })
+        finally:
+            connection.close()
+
+    def test_compile_with_invalid_content_length(self):
+        compile_server = self.start()
+        for content_length, status, error in [
+                ("-1", 400,
+                 "The Content-Length must not be negative, not -1."),
+                ("many", 400, None),
+                ("11", 413, "The source is larger than the limit of 10 bytes.")
+        ]:
+            host, port = compile_server.server_address
+            connection = HTTPConnection(host, port)
+            try:
+                connection.putrequest("POST", "/compile")
+                connection.putheader("Content-Length", content_length)
+                with patch("ptolemy.server.MAX_SOURCE_BYTES", 10):
+                    connection.endheaders()
+                    response = connection.getresponse()
+                self.assertEqual(response.status, status)
+                self.assertEqual(response.getheader("Connection"), "close")
+                body = json.loads(response.read().decode("utf-8"))
+                if error is not None:
+                    self.assertEqual(body, {"error": error})
+            finally:
+                connection.close()
+        self.assertEqual(compile_server.counters.to_dict()["requests"], 0)
+
+    def test_compile_with_catalog(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        catalog_path = os.path.join(directory, "catalog.json")
+        with open(catalog_path, "w") as catalog_file:
+            json.dump(
+                [{"table_schema": "Test", "table_name": "Employee"}],
+                catalog_file
+            )
+        compile_server = self.start(options={"catalog": catalog_path})
+        status, body = self.request(
+            compile_server, "POST", "/compile", read_fixture()
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(body, Source(FIXTURE_PATH).compile() + "\n")
+
+    def test_not_found(self):
+        compile_server = self.start()
+        self.assertEqual(
+            self.request(compile_server, "GET", "/compile")[0], 404
+        )
+        self.assertEqual(
+            self.request(compile_server, "POST", "/stats", b"")[0], 404
+        )
+
+    def test_stats(self):
+        compile_server = self.start()
+        self.request(compile_server, "POST", "/compile", read_fixture())
+        self.request(compile_server, "POST", "/compile", b"selection: 3")
+
+        status, body = self.request(compile_server, "GET", "/stats")
+        self.assertEqual(status, 200)
+        counters = json.loads(body)
+        self.assertEqual(counters["requests"], 2)
+        self.assertEqual(counters["failures"], 1)
+        self.assertEqual(counters["in_flight"], 0)
+        self.assertEqual(
+            counters["output_bytes"], len(Source(FIXTURE_PATH).compile())
+        )
+        self.assertGreater(counters["latency_ms"]["max"], 0)
+
+    def test_url(self):
+        compile_server = self.start()
+        self.assertEqual(
+            compile_server.url,
+            "http://127.0.0.1:{0}".format(compile_server.server_address[1])
+        )
+
+    @patch("multiprocessing.cpu_count", return_value=1)
+    def test_start_server_with_a_worker_per_cpu(self, mock_cpu_count):
+        compile_server = self.start(workers=0)
+        mock_cpu_count.assert_called_once_with()
+        self.assertIsNone(compile_server.pool)
+
+    @patch("ptolemy.server.CompileServer", side_effect=socket.error)
+    @patch("multiprocessing.Pool")
+    def test_start_server_with_error(self, mock_Pool, mock_CompileServer):
+        with self.assertRaises(socket.error):
+            server.start_server(("127.0.0.1", 0), workers=2)
+        mock_Pool.return_value.terminate.assert_called_once_with()
+
+    def test_compile_in_pool(self):
+        compile_server = self.start(workers=2)
+        self.assertIsNotNone(compile_server.pool)
+        status, body = self.request(
+            compile_server, "POST", "/compile", read_fixture()
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(body, Source(FIXTURE_PATH).compile() + "\n")
+
+    @unittest.skipUnless(hasattr(socket, "AF_UNIX"), "requires unix sockets")
+    def test_compile_over_unix_socket(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        socket_path = os.path.join(directory, "ptolemy.sock")
+        compile_server = self.start(socket_path)
+        self.assertEqual(compile_server.url, "unix:" + socket_path)
+
+        source_string = read_fixture()
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            client.connect(socket_path)
+            client.sendall(
+                "POST /compile HTTP/1.0\r\nContent-Length: {0}\r\n\r\n".format(
+                    len(source_string)
+                ).encode("ascii") + source_string
+            )
+            response = b""
+            while True:
+                data = client.recv(4096)
+                if not data:
+                    break
+                response += data
+        finally:
+            client.close()
+
+        headers, body = response.decode("utf-8").split("\r\n\r\n", 1)
+        self.assertTrue(headers.startswith("HTTP/1.1 200 "))
+        self.assertEqual(body, Source(FIXTURE_PATH).compile() + "\n")
+
+    @unittest.skipUnless(hasattr(socket, "AF_UNIX"), "requires unix sockets")
+    def test_start_server_replaces_stale_unix_socket(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        socket_path = os.path.join(directory, "ptolemy.sock")
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(socket_path)
+        stale.close()
+
+        compile_server = self.start(socket_path)
+        self.assertEqual(compile_server.url, "unix:" + socket_path)
+
+    def test_get_request_options(self):
+        options = {"max_rules": 10, "optimisations": []}
+        self.assertEqual(
+            server.get_request_options(options, {
+                "optimise": ["selection"], "max_bytes": ["100"]
+            }),
+            {"max_rules": 10, "max_bytes": 100, "optimisations": ["selection"]}
+        )
+        with self.assertRaises(ValueError):
+            server.get_request_options(options, {"max_rules": ["many"]})
+        with self.assertRaises(ValueError):
+            server.get_request_options(options, {"rules": ["10"]})
+
+    def test_counters_without_requests(self):
+        result = server.Counters().to_dict()
+        self.assertEqual(result["requests"], 0)
+        self.assertEqual(result["latency_ms"]["max"], 0)
+
+    def test_counters(self):
+        counters = server.Counters()
+        for seconds in [0.001, 0.002, 0.003, 0.004]:
+            counters.start()
+            counters.finish(seconds, False, 10)
+        counters.start()
+
+        result = counters.to_dict()
+        self.assertEqual(result["requests"], 4)
+        self.assertEqual(result["in_flight"], 1)
+        self.assertEqual(result["output_bytes"], 40)
+        self.assertAlmostEqual(result["latency_ms"]["mean"], 2.5)
+        self.assertAlmostEqual(result["latency_ms"]["p50"], 3)
+        self.assertAlmostEqual(result["latency_ms"]["max"], 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
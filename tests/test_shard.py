@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from ptolemy.exceptions import InvalidFileError, ShardingError
+from ptolemy.shard import load_weights, shard_rules
+from ptolemy.source import Source
+
+from tests.helpers import selection_rule, transformation_rule
+
+
+def get_tables(shard):
+    return [
+        rule.locate("table-name") for rule in shard
+        if rule.rule_type == "selection" and rule.rule_action == "include"
+    ]
+
+
+class ShardTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_shard_rules_balances_table_count(self):
+        rules = [selection_rule("Test." + str(i)) for i in range(5)]
+        shards = shard_rules(rules, 2)
+        self.assertEqual(
+            [get_tables(shard) for shard in shards],
+            [["0", "2", "4"], ["1", "3"]]
+        )
+
+    def test_shard_rules_with_fewer_tables_than_shards(self):
+        shards = shard_rules([selection_rule("Test.%")], 3)
+        self.assertEqual(len(shards), 1)
+
+    def test_shard_rules_without_include_rules(self):
+        with self.assertRaises(ShardingError):
+            shard_rules([selection_rule("Test.A", action="exclude")], 2)
+        with self.assertRaises(ShardingError):
+            shard_rules([], 2)
+
+    def test_shard_rules_with_invalid_shard_count(self):
+        for shard_count in [0, -2]:
+            with self.assertRaises(ValueError):
+                shard_rules([selection_rule("Test.A")], shard_count)
+
+    def test_shard_rules_balances_weights(self):
+        rules = [selection_rule("Test." + table) for table in "abcd"]
+        weights = {
+            ("Test", "a"): 100, ("Test", "b"): 60, ("Test", "c"): 50,
+            ("Test", "d"): 10
+        }
+        shards = shard_rules(rules, 2, weights)
+        self.assertEqual(
+            [get_tables(shard) for shard in shards], [["a", "d"], ["b", "c"]]
+        )
+
+    def test_shard_rules_weighs_patterns_by_matching_tables(self):
+        rules = [
+            selection_rule("Test.DMS%"),
+            selection_rule("Test.Big"),
+            selection_rule("Test.Small")
+        ]
+        weights = {
+            ("Test", "DMS1"): 50, ("Test", "DMS2"): 50, ("Test", "Big"): 90,
+            ("Test", "Small"): 1
+        }
+        shards = shard_rules(rules, 2, weights)
+        self.assertEqual(
+            [get_tables(shard) for shard in shards],
+            [["DMS%"], ["Big", "Small"]]
+        )
+
+    def test_shard_rules_keeps_overlapping_tables_together(self):
+        rules = [
+            selection_rule("Test.%"),
+            selection_rule("Test.Foo"),
+            selection_rule("Test.Bar"),
+            selection_rule("Oth%.A%"),
+            selection_rule("Other.Audit"),
+            selection_rule("Other.Batch"),
+            selection_rule("Third.X")
+        ]
+        shards = shard_rules(rules, 3)
+        self.assertEqual(
+            sorted(get_tables(shard) for shard in shards),
+            [["%", "Foo", "Bar"], ["A%", "Audit"], ["Batch", "X"]]
+        )
+
+    def test_shard_rules_copies_applicable_rules(self):
+        rules = [
+            selection_rule("Test.Employee"),
+            selection_rule("Test.Dept"),
+            selection_rule("Test.Emp%", action="exclude"),
+            transformation_rule("convert-lowercase", "Test.Employee"),
+            transformation_rule("convert-lowercase", "Test.Dep%"),
+            transformation_rule("convert-lowercase", "Test"),
+            transformation_rule("convert-lowercase", "Other")
+        ]
+        shards = shard_rules(rules, 2)
+        self.assertEqual(shards, [
+            [rules[0], rules[2], rules[3], rules[5]],
+            [rules[1], rules[4], rules[5]]
+        ])
+
+    def test_shard_rules_copies_rules_with_schema_patterns(self):
+        rules = [
+            selection_rule("Test.Employee"),
+            selection_rule("Other.Dept"),
+            transformation_rule("convert-lowercase", "T%.Emp%"),
+            transformation_rule("convert-lowercase", "%.Dept")
+        ]
+        shards = shard_rules(rules, 2)
+        self.assertEqual(shards, [
+            [rules[0], rules[2]],
+            [rules[1], rules[3]]
+        ])
+
+    def test_compile_shards_numbers_each_shard(self):
+        source = Source("file/path")
+        mapping_tables = source.compile_shards(2, source_string=b"""
+selection:
+  include:
+    - object-locators:
+        schema-names: [Test]
+        table-names: [Employee, Dept]
+transformation:
+  convert-lowercase:
+    - object-locators:
+        schema-names: [Test]
+      rule-target: schema
+""")
+        for mapping_table in mapping_tables:
+            rules = json.loads(mapping_table)["rules"]
+            self.assertEqual(
+                [(rule["rule-id"], rule["rule-name"]) for rule in rules],
+                [("1", "1"), ("2", "2")]
+            )
+
+    def test_load_weights_from_csv(self):
+        stats_file_path = os.path.join(self.directory, "stats.csv")
+        with open(stats_file_path, "w") as stats_file:
+            stats_file.write("schema,table,rows\nTest,Employee,1000\n")
+        self.assertEqual(
+            load_weights(stats_file_path, "rows"), {("Test", "Employee"): 1000}
+        )
+
+    def test_load_weights_from_json(self):
+        stats_file_path = os.path.join(self.directory, "stats.json")
+        with open(stats_file_path, "w") as stats_file:
+            json.dump(
+                [{"schema": "Test", "table": "Employee", "bytes": 25}],
+                stats_file
+            )
+        self.assertEqual(
+            load_weights(stats_file_path, "bytes"), {("Test", "Employee"): 25}
+        )
+
+    def test_load_weights_with_missing_column(self):
+        stats_file_path = os.path.join(self.directory, "stats.csv")
+        with open(stats_file_path, "w") as stats_file:
+            stats_file.write("schema,table,rows\nTest,Employee,1000\n")
+        with self.assertRaises(InvalidFileError):
+            load_weights(stats_file_path, "bytes")
+
+    def test_load_weights_with_missing_file(self):
+        with self.assertRaises(InvalidFileError):
+            load_weights(os.path.join(self.directory, "missing.csv"), "rows")
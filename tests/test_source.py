@@ -1,5 +1,12 @@
 # -*- coding: utf-8 -*-
 
+import json
+import os
+import shutil
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
 import tempfile
 import unittest
 
@@ -7,8 +14,35 @@ from mock import Mock, patch, sentinel
 
 from jsonschema.exceptions import ValidationError
 
+from ptolemy import parallel
 from ptolemy.exceptions import InvalidFileError
-from ptolemy.source import Source
+from ptolemy.source import Source, compile_source
+
+
+FIXTURES_DIRECTORY = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "integration_tests", "fixtures", "src"
+)
+
+STREAMED_SOURCE = b"""
+selection:
+  include:
+    - object-locators:
+        schema-names: [Test]
+        table-names: [Emp%, Other]
+    - $ref: _items.yaml
+  exclude:
+    - object-locators:
+        schema-names: [Test]
+        table-names: [Employee_History]
+transformation:
+  add-prefix:
+    - object-locators:
+        schema-names: [Test]
+        table-names: ["%"]
+      rule-target: table
+      value: pre_
+"""
 
 
 class SourceTestCase(unittest.TestCase):
@@ -23,6 +57,10 @@ class SourceTestCase(unittest.TestCase):
         self.assertEqual(source.file_path, "/path/file.yaml")
         self.assertEqual(source.source, None)
 
+    def test_compile_without_file(self):
+        with self.assertRaises(InvalidFileError):
+            Source().compile()
+
     def test_compile_with_invalid_file(self):
         self.source.file_path = "/this/file/does/not.exist"
         with self.assertRaises(InvalidFileError):
@@ -104,7 +142,42 @@ class SourceTestCase(unittest.TestCase):
         ]
 
         rules = self.source._get_rules()
-        self.assertEqual(rules, expected_rules)
+        self.assertEqual([rule.to_dict() for rule in rules], expected_rules)
+
+    def test_iter_rules_is_lazy(self):
+        names = [str(i) for i in range(1000)]
+        self.source.source = {
+            "selection": {
+                "include": [
+                    {
+                        "object-locators": {
+                            "schema-names": names,
+                            "table-names": names
+                        }
+                    }
+                ]
+            }
+        }
+        rules = self.source._iter_rules()
+        self.assertEqual(next(rules)["object-locator"], {
+            "schema-name": "0",
+            "table-name": "0"
+        })
+
+    def test_write(self):
+        source_string = b"""
+selection:
+  include:
+    - object-locators:
+        schema-names: [Test]
+        table-names: ["%", "Other"]
+      rule-name: test
+"""
+        stream = StringIO()
+        self.source.write(stream, source_string)
+        self.assertEqual(
+            stream.getvalue(), self.source.compile_string(source_string)
+        )
 
     def test_get_object_locations(self):
         # See comment in test_get_rules().
@@ -126,3 +199,216 @@ class SourceTestCase(unittest.TestCase):
         object_locations = self.source._get_object_locations(object_locators)
 
         self.assertEqual(object_locations, expected_object_locations)
+
+    def test_get_object_locations_without_column_names(self):
+        object_locators = {
+            "schema-names": ["s1"],
+            "table-names": ["t1", "t2"]
+        }
+        expected_object_locations = [
+            {"schema-name": "s1", "table-name": "t1"},
+            {"schema-name": "s1", "table-name": "t2"}
+        ]
+        object_locations = self.source._get_object_locations(object_locators)
+
+        self.assertEqual(object_locations, expected_object_locations)
+
+    def test_compile_string_with_optimisations(self):
+        source = Source("file/path", optimisations=["selection"])
+        mapping_table = source.compile_string(b"""
+selection:
+  include:
+    - object-locators:
+        schema-names: [Test]
+        table-names: [Employee, "%"]
+""")
+        self.assertEqual(mapping_table.count('"rule-id"'), 1)
+        self.assertEqual(len(source.removals), 1)
+
+    def test_compile_string_with_parsed_source(self):
+        source = {
+            "selection": {
+                "include": [
+                    {
+                        "object-locators": {
+                            "schema-names": ["Test"],
+                            "table-names": ["Employee"]
+                        }
+                    }
+                ]
+            }
+        }
+        self.assertEqual(
+            Source().compile_string(source),
+            Source().compile_string(b"""
+selection:
+  include:
+    - object-locators:
+        schema-names: [Test]
+        table-names: [Employee]
+""")
+        )
+
+    def test_compile_source(self):
+        mapping_table = compile_source(
+            b"""
+selection:
+  include:
+    - object-locators:
+        schema-names: [Test]
+        table-names: [Employee, "%"]
+""",
+            optimisations=["selection"]
+        )
+        self.assertEqual(mapping_table.count('"rule-id"'), 1)
+
+    def test_compile_source_with_invalid_source(self):
+        with self.assertRaises(ValidationError):
+            compile_source({"selection": []})
+
+
+class StreamingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.source_path = os.path.join(self.directory, "source.yaml")
+        with open(self.source_path, "wb") as f:
+            f.write(STREAMED_SOURCE)
+        with open(os.path.join(self.directory, "_items.yaml"), "w") as f:
+            f.write("- object-locators:\n"
+                    "    schema-names: [Test]\n"
+                    "    table-names: [Audit]\n")
+        self.catalog_path = os.path.join(self.directory, "catalog.json")
+        with open(self.catalog_path, "w") as f:
+            json.dump([
+                {"TABLE_SCHEMA": "Test", "TABLE_NAME": table}
+                for table in ["Employee", "Employee_History", "Audit"]
+            ], f)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, source_path, **options):
+        stream = StringIO()
+        source = Source(source_path, **options)
+        source.write(stream)
+        return stream.getvalue(), source
+
+    def test_write_streamed_fixtures(self):
+        for file_name in sorted(os.listdir(FIXTURES_DIRECTORY)):
+            source_path = os.path.join(FIXTURES_DIRECTORY, file_name)
+            self.assertEqual(
+                self.write(source_path, streaming=True)[0],
+                self.write(source_path)[0]
+            )
+
+    def test_write_streamed_source_with_options(self):
+        for options in [
+                {},
+                {"optimisations": ["selection"]},
+                {"rule_ids": "content"},
+                {"catalog": self.catalog_path},
+                {"catalog": self.catalog_path, "keep_wildcards": True}
+        ]:
+            mapping, source = self.write(self.source_path, **options)
+            streamed_mapping, streamed_source = self.write(
+                self.source_path, streaming=True, **options
+            )
+            self.assertEqual(streamed_mapping, mapping)
+            self.assertEqual(streamed_source.includes, source.includes)
+            self.assertEqual(streamed_source.removals, source.removals)
+            self.assertEqual(streamed_source.resolutions, source.resolutions)
+            self.assertIsNone(streamed_source.source)
+
+    def test_write_streamed_string(self):
+        stream = StringIO()
+        Source(self.source_path, streaming=True).write(
+            stream, STREAMED_SOURCE
+        )
+        self.assertEqual(stream.getvalue(), self.write(self.source_path)[0])
+
+    def test_compile_shards_of_streamed_source(self):
+        self.assertEqual(
+            Source(self.source_path, streaming=True).compile_shards(2),
+            Source(self.source_path).compile_shards(2)
+        )
+
+    def test_write_streamed_source_with_invalid_item(self):
+        with open(self.source_path, "wb") as f:
+            f.write(STREAMED_SOURCE.replace(b"value: pre_", b"value: 3"))
+        with self.assertRaises(ValidationError) as streamed_context:
+            self.write(self.source_path, streaming=True)
+        with self.assertRaises(ValidationError) as context:
+            self.write(self.source_path)
+        self.assertEqual(
+            streamed_context.exception.message, context.exception.message
+        )
+        self.assertEqual(
+            list(streamed_context.exception.path),
+            ["transformation", "add-prefix", 0, "value"]
+        )
+        self.assertEqual(
+            list(streamed_context.exception.path),
+            list(context.exception.path)
+        )
+
+    def test_write_streamed_source_with_invalid_structure(self):
+        with open(self.source_path, "wb") as f:
+            f.write(STREAMED_SOURCE + b"unexpected: []\n")
+        with self.assertRaises(ValidationError) as context:
+            self.write(self.source_path, streaming=True)
+        self.assertIn("'unexpected' was unexpected", context.exception.message)
+
+    def test_streamed_source_with_limits(self):
+        with self.assertRaises(ValueError):
+            Source(self.source_path, streaming=True, max_rules=10)
+
+
+class ParallelTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.source_path = os.path.join(self.directory, "source.yaml")
+        with open(self.source_path, "wb") as f:
+            f.write(STREAMED_SOURCE)
+        with open(os.path.join(self.directory, "_items.yaml"), "w") as f:
+            f.write("- object-locators:\n"
+                    "    schema-names: [Test]\n"
+                    "    table-names: [Audit]\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, source_path, **options):
+        stream = StringIO()
+        Source(source_path, **options).write(stream)
+        return stream.getvalue()
+
+    @patch.object(parallel, "CHUNK_RULES", 2)
+    def test_write_fixtures_in_parallel(self):
+        for file_name in sorted(os.listdir(FIXTURES_DIRECTORY)):
+            source_path = os.path.join(FIXTURES_DIRECTORY, file_name)
+            self.assertEqual(
+                self.write(source_path, jobs=2), self.write(source_path)
+            )
+
+    @patch.object(parallel, "CHUNK_RULES", 1)
+    def test_write_streamed_source_in_parallel(self):
+        self.assertEqual(
+            self.write(self.source_path, jobs=2, streaming=True),
+            self.write(self.source_path)
+        )
+
+    @patch("ptolemy.source.write_mapping")
+    def test_write_in_parallel_with_options(self, mock_write_mapping):
+        for options in [
+                {"optimisations": ["selection"]},
+                {"rule_ids": "content"}
+        ]:
+            self.assertEqual(
+                self.write(self.source_path, jobs=2, **options),
+                self.write(self.source_path, **options)
+            )
+        # Optimised rules, and rules numbered by their content, depend on
+        # the rules before them, so they are expanded by one process.
+        mock_write_mapping.assert_not_called()
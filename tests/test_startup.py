@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+
+import subprocess
+import sys
+import unittest
+
+
+# Third party and slow standard library modules which must only be imported
+# on the paths which use them, so that ptolemy starts quickly.
+LAZY_MODULES = ["jsonschema", "yaml", "multiprocessing", "sqlite3"]
+
+
+class StartupTestCase(unittest.TestCase):
+
+    def test_cli_does_not_import_lazy_modules(self):
+        output = subprocess.check_output([
+            sys.executable, "-c",
+            "import sys; import ptolemy.cli; "
+            "print(' '.join(sorted(set(name.split('.')[0] "
+            "for name in sys.modules))))"
+        ])
+        imported = output.decode("utf-8").split()
+        self.assertEqual(
+            [module for module in LAZY_MODULES if module in imported], []
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
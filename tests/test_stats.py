@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+import unittest
+
+from mock import patch
+
+from ptolemy.source import Source
+from ptolemy.stats import Stats
+
+
+SOURCE = b"""
+selection:
+  include:
+    - object-locators:
+        schema-names: [Test]
+        table-names: [Employee, Dept]
+transformation:
+  convert-lowercase:
+    - object-locators:
+        schema-names: [Test]
+      rule-target: schema
+"""
+
+
+class StatsTestCase(unittest.TestCase):
+
+    @patch("ptolemy.stats.default_timer")
+    def test_phases_are_timed_exclusively(self, mock_default_timer):
+        mock_default_timer.side_effect = [0, 1, 4, 10]
+        stats = Stats()
+        with stats.phase("serialise"):
+            with stats.phase("expand"):
+                pass
+        self.assertEqual(stats.phases, {"serialise": 7, "expand": 3})
+
+    @patch("ptolemy.stats.default_timer")
+    def test_iterate(self, mock_default_timer):
+        mock_default_timer.side_effect = [0, 1, 2, 4, 5, 8]
+        stats = Stats()
+        self.assertEqual(list(stats.iterate("expand", "ab")), ["a", "b"])
+        self.assertEqual(stats.phases, {"expand": 6})
+
+    def test_update(self):
+        stats = Stats()
+        stats.phases["parse"] = 1
+        stats.rule_counts[("selection", "include")] = 2
+        stats.output_bytes = 10
+        stats.peak_memory = 100
+        other = Stats()
+        other.phases["parse"] = 2
+        other.rule_counts[("selection", "exclude")] = 1
+        other.output_bytes = 5
+        other.peak_memory = 50
+
+        stats.update(other)
+        self.assertEqual(stats.to_dict(), {
+            "phases": {"parse": 3},
+            "rules": {"selection": {"include": 2, "exclude": 1}},
+            "total_rules": 3,
+            "output_bytes": 15,
+            "peak_memory": 100
+        })
+
+    def test_report(self):
+        stats = Stats()
+        stats.phases["expand"] = 0.003
+        stats.phases["parse"] = 0.0015
+        stats.rule_counts[("selection", "include")] = 2
+        stats.rule_counts[("transformation", "rename")] = 1
+        stats.output_bytes = 120
+        stats.peak_memory = 2048
+
+        self.assertEqual(stats.report().splitlines(), [
+            "phase                                           ms",
+            "parse                                          1.5",
+            "expand                                         3.0",
+            "total                                          4.5",
+            "",
+            "rule-type        rule-action                 rules",
+            "selection        include                         2",
+            "transformation   rename                          1",
+            "total                                            3",
+            "",
+            "output bytes                                   120",
+            "peak memory                                   2048"
+        ])
+
+    def test_source_records_stats(self):
+        stats = Stats()
+        source = Source("file/path", optimisations=["selection"], stats=stats)
+        stream = StringIO()
+        with stats.trace_memory():
+            source.write(stream, SOURCE)
+
+        self.assertEqual(
+            list(stats.to_dict()["phases"]),
+            ["parse", "validate", "expand", "optimise", "number", "serialise"]
+        )
+        self.assertEqual(stats.to_dict()["rules"], {
+            "selection": {"include": 2},
+            "transformation": {"convert-lowercase": 1}
+        })
+        self.assertEqual(stats.output_bytes, len(stream.getvalue()))
+        self.assertGreater(stats.peak_memory, 0)
+
+    def test_compile_string_records_output_bytes(self):
+        stats = Stats()
+        mapping_table = Source("file/path", stats=stats).compile_string(
+            SOURCE
+        )
+        self.assertEqual(stats.output_bytes, len(mapping_table))
+        self.assertEqual(stats.rules, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
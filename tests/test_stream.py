@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+
+import io
+import json
+import os
+import unittest
+
+from mock import patch
+import yaml
+
+from ptolemy.exceptions import InvalidFileError
+from ptolemy.stream import END, JSONReader, SourceStream
+
+
+FIXTURES_DIRECTORY = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "integration_tests", "fixtures", "src"
+)
+
+
+def stream(source_string, source_file_path="source.yaml", resolve=None):
+    """
+    Return the items of a source, and its skeleton.
+
+    """
+    source_stream = SourceStream(
+        io.BytesIO(source_string), source_file_path, resolve
+    )
+    return list(source_stream), source_stream.skeleton
+
+
+def get_items(source):
+    return [
+        (rule_type, rule_action, data_item)
+        for rule_type, rule_type_data in source.items()
+        for rule_action, rule_action_data in rule_type_data.items()
+        for data_item in rule_action_data
+    ]
+
+
+class SourceStreamTestCase(unittest.TestCase):
+
+    def test_stream_fixtures(self):
+        for file_name in sorted(os.listdir(FIXTURES_DIRECTORY)):
+            with open(os.path.join(FIXTURES_DIRECTORY, file_name), "rb") as f:
+                source_string = f.read()
+            source = yaml.safe_load(source_string)
+            expected_skeleton = {
+                rule_type: {rule_action: [] for rule_action in data}
+                for rule_type, data in source.items()
+            }
+
+            items, skeleton = stream(source_string)
+            self.assertEqual(items, get_items(source))
+            self.assertEqual(skeleton, expected_skeleton)
+
+            items, skeleton = stream(
+                json.dumps(source, indent=2).encode("utf-8"), "source.json"
+            )
+            self.assertEqual(items, get_items(source))
+            self.assertEqual(skeleton, expected_skeleton)
+
+    def test_stream_yaml_with_aliases(self):
+        items, _ = stream(b"""
+selection:
+  include:
+    - object-locators: &locators
+        schema-names: [Test]
+        table-names: &tables [A, B]
+  exclude:
+    - object-locators:
+        schema-names: [Other]
+        table-names: *tables
+    - object-locators: *locators
+""")
+        self.assertEqual([item[2] for item in items], [
+            {"object-locators": {
+                "schema-names": ["Test"], "table-names": ["A", "B"]
+            }},
+            {"object-locators": {
+                "schema-names": ["Other"], "table-names": ["A", "B"]
+            }},
+            {"object-locators": {
+                "schema-names": ["Test"], "table-names": ["A", "B"]
+            }}
+        ])
+
+    def test_stream_loads_unexpected_values_whole(self):
+        items, skeleton = stream(b"""
+selection: &selection
+  include: {object-locators: 3}
+  exclude: [1, 2]
+transformation: [1]
+""")
+        self.assertEqual(items, [
+            ("selection", "exclude", 1), ("selection", "exclude", 2)
+        ])
+        self.assertEqual(skeleton, {
+            "selection": {"include": {"object-locators": 3}, "exclude": []},
+            "transformation": [1]
+        })
+
+    def test_stream_source_which_is_not_a_mapping(self):
+        self.assertEqual(stream(b"- 1\n- 2\n"), ([], [1, 2]))
+        self.assertEqual(stream(b""), ([], None))
+        self.assertEqual(stream(b"[1]", "source.json"), ([], [1]))
+
+    def test_stream_resolves_items(self):
+        def resolve(value):
+            if value == [{"$ref": "items"}]:
+                return [{"a": 1}, {"a": 2}]
+            return value
+
+        items, _ = stream(
+            b'{"selection": {"include": [{"$ref": "items"}, {"b": 3}]}}',
+            resolve=resolve
+        )
+        self.assertEqual([item[2] for item in items], [
+            {"a": 1}, {"a": 2}, {"b": 3}
+        ])
+
+    def test_stream_resolves_items_loaded_whole(self):
+        def resolve(value):
+            if value == {"$ref": "items"}:
+                return [{"a": 1}, {"a": 2}]
+            return value
+
+        items, skeleton = stream(
+            b'{"selection": {"include": {"$ref": "items"}}}',
+            resolve=resolve
+        )
+        self.assertEqual([item[2] for item in items], [{"a": 1}, {"a": 2}])
+        self.assertEqual(skeleton, {"selection": {"include": []}})
+
+    def test_stream_with_duplicate_keys(self):
+        with self.assertRaises(InvalidFileError):
+            stream(b"selection:\n  include: []\nselection: {}\n")
+        with self.assertRaises(InvalidFileError):
+            stream(b'{"selection": {}, "selection": {}}')
+
+    def test_stream_yaml_with_merge_key(self):
+        with self.assertRaises(InvalidFileError):
+            stream(b"base: &base {}\nselection:\n  <<: *base\n")
+
+    def test_stream_yaml_with_unhashable_key(self):
+        with self.assertRaises(yaml.YAMLError):
+            stream(b"selection:\n  ? [include]\n  : []\n")
+
+    @patch("ptolemy.stream._yaml_loader_class", None)
+    @patch("ptolemy.stream.get_yaml_loader", return_value=yaml.SafeLoader)
+    def test_stream_yaml_with_pure_python_loader(self, _):
+        items, skeleton = stream(b"selection:\n  include: [1, 2]\n")
+        self.assertEqual(items, [
+            ("selection", "include", 1), ("selection", "include", 2)
+        ])
+        self.assertEqual(skeleton, {"selection": {"include": []}})
+
+    def test_stream_yaml_with_many_documents(self):
+        with self.assertRaises(yaml.YAMLError):
+            stream(b"selection: {}\n---\nselection: {}\n")
+
+    def test_stream_invalid_json(self):
+        for source_string in [
+                b'{"selection": {"include": [1,]}}',
+                b'{"selection": {"include": [1 2]}}',
+                b'{"selection" {}}',
+                b'{"selection": {}, }',
+                b'{"selection": {}} []',
+                b'{"selection": {"include": [{"a": }]}}'
+        ]:
+            with self.assertRaises(InvalidFileError):
+                stream(source_string, "source.json")
+
+    @patch("ptolemy.stream.CHUNK_SIZE", 7)
+    def test_stream_json_across_chunks(self):
+        source = {
+            "selection": {
+                "include": [
+                    {"object-locators": {
+                        "schema-names": [u"Tëst"], "table-names": ["A"] * 20
+                    }},
+                    12345678901234567890
+                ]
+            }
+        }
+        items, skeleton = stream(
+            json.dumps(source, ensure_ascii=False).encode("utf-8"),
+            "source.json"
+        )
+        self.assertEqual(items, get_items(source))
+        self.assertEqual(skeleton, {"selection": {"include": []}})
+
+
+class JSONReaderTestCase(unittest.TestCase):
+
+    def test_read(self):
+        reader = JSONReader(
+            io.BytesIO(b'{"rules": [{"rule-id": 1}, 2], "other": null}'),
+            "mapping.json", "mapping"
+        )
+        self.assertTrue(reader.start_mapping())
+        self.assertEqual(reader.next_key(), "rules")
+        self.assertFalse(reader.start_mapping())
+        self.assertTrue(reader.start_sequence())
+        values = []
+        while reader.next_item():
+            values.append(reader.load_value())
+        self.assertEqual(values, [{"rule-id": 1}, 2])
+        self.assertEqual(reader.next_key(), "other")
+        self.assertIsNone(reader.load_value())
+        self.assertIs(reader.next_key(), END)
+        reader.finish()
+
+    def test_read_invalid_json(self):
+        reader = JSONReader(io.BytesIO(b'{"rules" []}'), "m.json", "mapping")
+        reader.start_mapping()
+        with self.assertRaises(InvalidFileError) as context:
+            reader.next_key()
+        self.assertIn("The mapping 'm.json' is not valid JSON.", str(
+            context.exception
+        ))
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from ptolemy.optimise import apply_optimisations, Removal
+from ptolemy.transformation import remove_redundant_transformations
+
+from tests.helpers import selection_rule, transformation_rule
+
+
+class TransformationTestCase(unittest.TestCase):
+
+    def optimise(self, rules):
+        removals = []
+        kept = list(apply_optimisations(
+            lambda: iter(rules), [remove_redundant_transformations],
+            removals
+        ))
+        return kept, removals
+
+    def test_keeps_distinct_rules(self):
+        rules = [
+            selection_rule("Test.%"),
+            transformation_rule("convert-lowercase", "Test.%"),
+            transformation_rule("rename", "Test.A", value="B"),
+            transformation_rule("rename", "Other.A", value="C"),
+            transformation_rule("add-prefix", "Test.%", value="pre_"),
+            transformation_rule("rename", "Test", target="schema", value="T"),
+            transformation_rule(
+                "rename", "Test.A.id", target="column", value="key"
+            )
+        ]
+        kept, removals = self.optimise(rules)
+        self.assertEqual(kept, rules)
+        self.assertEqual(removals, [])
+
+    def test_removes_rules_without_effect(self):
+        rules = [
+            transformation_rule("add-prefix", "Test.%", value=""),
+            transformation_rule("remove-suffix", "Test.A", value=""),
+            transformation_rule(
+                "replace-prefix", "Test.%", **{"old-value": "a", "value": "a"}
+            ),
+            transformation_rule(
+                "replace-suffix", "Test.%", **{"old-value": "a", "value": "b"}
+            )
+        ]
+        kept, removals = self.optimise(rules)
+        self.assertEqual(kept, rules[3:])
+        self.assertEqual(removals, [
+            Removal(
+                "transformation add-prefix rule for Test.%", "has no effect"
+            ),
+            Removal(
+                "transformation remove-suffix rule for Test.A",
+                "has no effect"
+            ),
+            Removal(
+                "transformation replace-prefix rule for Test.%",
+                "has no effect"
+            )
+        ])
+
+    def test_removes_shadowed_rules(self):
+        rules = [
+            transformation_rule("convert-lowercase", "Test.A"),
+            transformation_rule("convert-lowercase", "Test.%"),
+            transformation_rule("convert-lowercase", "Test.Ab%"),
+            transformation_rule("convert-lowercase", "Test.%"),
+            transformation_rule("convert-lowercase", "Test", target="schema"),
+            transformation_rule(
+                "remove-column", "Test.A.%", target="column"
+            ),
+            transformation_rule(
+                "remove-column", "Test.A.tmp", target="column"
+            )
+        ]
+        kept, removals = self.optimise(rules)
+        self.assertEqual(kept, [rules[1], rules[4], rules[5]])
+        self.assertEqual(removals, [
+            Removal(
+                "transformation convert-lowercase rule for Test.A",
+                "shadowed by the convert-lowercase rule for Test.%"
+            ),
+            Removal(
+                "transformation convert-lowercase rule for Test.Ab%",
+                "shadowed by the convert-lowercase rule for Test.%"
+            ),
+            Removal(
+                "transformation convert-lowercase rule for Test.%",
+                "shadowed by the convert-lowercase rule for Test.%"
+            ),
+            Removal(
+                "transformation remove-column rule for Test.A.tmp",
+                "shadowed by the remove-column rule for Test.A.%"
+            )
+        ])
+
+    def test_keeps_shadowed_rules_overlapping_other_rules(self):
+        # Whether Test.A ends up in lowercase may depend on the order the
+        # rules are applied in.
+        rules = [
+            transformation_rule("convert-lowercase", "Test.%"),
+            transformation_rule("add-prefix", "Test.A", value="Pre_"),
+            transformation_rule("convert-lowercase", "Test.A")
+        ]
+        kept, removals = self.optimise(rules)
+        self.assertEqual(kept, rules)
+        self.assertEqual(removals, [])
+
+    def test_removes_shadowed_rules_overlapping_rules_without_effect(self):
+        rules = [
+            transformation_rule("convert-lowercase", "Test.%"),
+            transformation_rule("add-prefix", "Test.A", value=""),
+            transformation_rule("convert-lowercase", "Test.A")
+        ]
+        kept, removals = self.optimise(rules)
+        self.assertEqual(kept, rules[:1])
+        self.assertEqual(len(removals), 2)
+
+    def test_flags_conflicts(self):
+        rules = [
+            transformation_rule("rename", "Test.%", value="X"),
+            transformation_rule("rename", "test.a", value="Y"),
+            transformation_rule("convert-lowercase", "Test.Emp%"),
+            transformation_rule("convert-uppercase", "Test.%loyee"),
+            transformation_rule(
+                "replace-prefix", "Test.B", **{"old-value": "a", "value": "a"}
+            ),
+            transformation_rule(
+                "replace-prefix", "Test.B", **{"old-value": "a", "value": "b"}
+            ),
+            transformation_rule("convert-uppercase", "Test.Dept%")
+        ]
+        kept, removals = self.optimise(rules)
+        self.assertEqual(kept, rules)
+        self.assertEqual(removals, [
+            Removal(
+                "transformation rename rule for test.a",
+                "conflicts with the rename rule for Test.%", False
+            ),
+            Removal(
+                "transformation convert-uppercase rule for Test.%loyee",
+                "conflicts with the convert-lowercase rule for Test.Emp%",
+                False
+            ),
+            Removal(
+                "transformation replace-prefix rule for Test.B",
+                "conflicts with the replace-prefix rule for Test.B", False
+            )
+        ])
+
+    def test_flags_repeated_rules(self):
+        rules = [
+            transformation_rule("add-prefix", "Test.%", value="pre_"),
+            transformation_rule("add-prefix", "Test.A", value="pre_")
+        ]
+        kept, removals = self.optimise(rules)
+        self.assertEqual(kept, rules)
+        self.assertEqual(removals, [Removal(
+            "transformation add-prefix rule for Test.A",
+            "repeats the add-prefix rule for Test.%, so may be applied twice",
+            False
+        )])
+
+    def test_many_rules(self):
+        rules = [transformation_rule("convert-lowercase", "Test.%")] + [
+            transformation_rule("rename", "Test.T{0}".format(i), value="t")
+            for i in range(2000)
+        ] + [
+            transformation_rule("convert-lowercase", "Test.U{0}".format(i))
+            for i in range(2000)
+        ]
+        kept, removals = self.optimise(rules)
+        self.assertEqual(kept, rules[:2001])
+        self.assertEqual(len(removals), 2000)
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from ptolemy.utils import atomic_open, atomic_write
+
+
+class UtilsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_atomic_write(self):
+        path = os.path.join(self.directory, "nested", "mapping.json")
+        atomic_write(path, u"mapping")
+        with open(path) as f:
+            self.assertEqual(f.read(), u"mapping")
+        self.assertEqual(os.listdir(os.path.dirname(path)), ["mapping.json"])
+
+    def test_atomic_open_with_error(self):
+        path = os.path.join(self.directory, "mapping.json")
+        with self.assertRaises(ValueError):
+            with atomic_open(path) as output_file:
+                output_file.write(u"partial")
+                raise ValueError()
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_atomic_open_in_file(self):
+        path = os.path.join(self.directory, "file")
+        atomic_write(path, u"")
+        with self.assertRaises(EnvironmentError):
+            with atomic_open(os.path.join(path, "sub", "mapping.json")):
+                pass
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+
+import errno
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from mock import Mock, patch
+
+from ptolemy import watch
+from ptolemy.source import Source
+
+
+FIXTURES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "integration_tests",
+    "fixtures"
+)
+
+SOURCE = """
+selection:
+  include:
+    - object-locators:
+        schema-names: [Test]
+        table-names: [Employee, Department]
+    - object-locators:
+        schema-names: [{0}]
+        table-names: [Salary]
+"""
+
+
+class WatchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.src_dir = os.path.join(self.directory, "src")
+        self.output_dir = os.path.join(self.directory, "mappings")
+        os.makedirs(os.path.join(self.src_dir, "nested"))
+        self.source_path = os.path.join(self.src_dir, "source.yaml")
+        self.write_source("Test")
+        shutil.copy(
+            os.path.join(FIXTURES_DIR, "src", "rename_a_table.yaml"),
+            os.path.join(self.src_dir, "nested", "rename_a_table.yaml")
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_source(self, schema_name):
+        with open(self.source_path, "w") as source_file:
+            source_file.write(SOURCE.format(schema_name))
+
+    def read_mapping(self):
+        with open(os.path.join(self.output_dir, "source.json")) as f:
+            return f.read()
+
+    def test_build(self):
+        builder = watch.Builder([self.src_dir], self.output_dir)
+        build = builder.build()
+        self.assertEqual(
+            [result.error for result in build.results], [None, None]
+        )
+        self.assertEqual((build.items_reused, build.items), (0, 4))
+        self.assertTrue(os.path.isfile(
+            os.path.join(self.output_dir, "nested", "rename_a_table.json")
+        ))
+
+        self.write_source("Payroll")
+        build = builder.build({os.path.abspath(self.source_path)})
+        self.assertEqual(
+            [result.source_path for result in build.results],
+            [self.source_path]
+        )
+        self.assertEqual((build.items_reused, build.items), (1, 2))
+        self.assertEqual(
+            self.read_mapping(), Source(self.source_path).compile() + "\n"
+        )
+        self.assertIn("Payroll", self.read_mapping())
+
+    def test_build_with_failure(self):
+        builder = watch.Builder(
+            [self.source_path], self.output_dir, {"max_rules": 1}
+        )
+        build = builder.build()
+        self.assertIn("limit of 1", build.results[0].error)
+        self.assertEqual(build.items, 0)
+
+    def test_build_with_conflicting_output_paths(self):
+        shutil.copy(
+            self.source_path, os.path.join(self.src_dir, "source.yml")
+        )
+        builder = watch.Builder([self.src_dir], self.output_dir)
+        build = builder.build()
+        self.assertEqual(
+            [result.error is None for result in build.results],
+            [False, False, True]
+        )
+        self.assertIn("as would the mapping of", build.results[0].error)
+        self.assertFalse(
+            os.path.exists(os.path.join(self.output_dir, "source.json"))
+        )
+
+    def test_build_forgets_removed_sources(self):
+        builder = watch.Builder([self.src_dir], self.output_dir)
+        builder.build()
+        output_path = os.path.join(self.output_dir, "source.json")
+        self.assertTrue(os.path.isfile(output_path))
+
+        os.remove(self.source_path)
+        build = builder.build({os.path.abspath(self.source_path)})
+        self.assertEqual(build.results, [])
+        self.assertEqual(build.removed, [output_path])
+        self.assertFalse(os.path.exists(output_path))
+        self.assertEqual(len(builder.expansion_caches), 1)
+        self.assertEqual(builder.build().removed, [])
+
+    def test_build_with_mapping_of_removed_source_missing(self):
+        builder = watch.Builder([self.src_dir], self.output_dir)
+        builder.build()
+        os.remove(self.source_path)
+        os.remove(os.path.join(self.output_dir, "source.json"))
+        self.assertEqual(builder.build().removed, [])
+
+    def test_build_with_mapping_of_removed_source_unremovable(self):
+        builder = watch.Builder([self.src_dir], self.output_dir)
+        builder.build()
+        os.remove(self.source_path)
+        with patch("os.remove", side_effect=OSError(errno.EACCES, "")):
+            with self.assertRaises(OSError):
+                builder.build()
+
+    def test_build_with_conflict_resolved_by_removal(self):
+        other_path = os.path.join(self.src_dir, "source.yml")
+        shutil.copy(self.source_path, other_path)
+        builder = watch.Builder([self.src_dir], self.output_dir)
+        builder.build()
+
+        # The other source's mapping is written instead of removed.
+        os.remove(other_path)
+        build = builder.build({os.path.abspath(other_path)})
+        self.assertEqual(
+            [(result.source_path, result.error) for result in build.results],
+            [(self.source_path, None)]
+        )
+        self.assertEqual(build.removed, [])
+        self.assertEqual(
+            self.read_mapping(), Source(self.source_path).compile() + "\n"
+        )
+
+    def test_build_with_fragments(self):
+        fragment_path = os.path.join(self.src_dir, "_tables.yaml")
+        with open(fragment_path, "w") as f:
+            f.write("[Employee]")
+        with open(self.source_path, "w") as f:
+            f.write(
+                "selection:\n  include:\n    - object-locators:\n"
+                "        schema-names: [Test]\n"
+                "        table-names: {$ref: _tables.yaml}\n"
+            )
+        builder = watch.Builder([self.src_dir], self.output_dir)
+        self.assertEqual(len(builder.build().results), 2)
+
+        with open(fragment_path, "w") as f:
+            f.write("[Salary]")
+        build = builder.build({os.path.abspath(fragment_path)})
+        self.assertEqual(
+            [result.source_path for result in build.results],
+            [self.source_path]
+        )
+        self.assertIn("Salary", self.read_mapping())
+
+    def test_polling_watcher(self):
+        watcher = watch.PollingWatcher([self.src_dir], interval=0.01)
+        self.assertEqual(watcher.wait(0.02), set())
+        self.write_source("Payroll")
+        self.assertEqual(
+            watcher.wait(1), {os.path.abspath(self.source_path)}
+        )
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "requires Linux")
+    def test_inotify_watcher(self):
+        watcher = watch.InotifyWatcher([self.src_dir])
+        self.addCleanup(watcher.close)
+        self.assertEqual(watcher.wait(0), set())
+
+        self.write_source("Payroll")
+        self.assertIn(os.path.abspath(self.source_path), watcher.wait(1))
+
+        new_dir = os.path.join(self.src_dir, "new")
+        os.makedirs(new_dir)
+        new_path = os.path.join(new_dir, "new.yaml")
+        shutil.copy(self.source_path, new_path)
+        changes = set()
+        while new_path not in changes:
+            new_changes = watcher.wait(1)
+            self.assertTrue(new_changes)
+            changes.update(new_changes)
+
+    def test_polling_watcher_with_missing_source(self):
+        watcher = watch.PollingWatcher(
+            [os.path.join(self.src_dir, "missing.yaml")], interval=0.01
+        )
+        self.assertEqual(watcher.wait(0.01), set())
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "requires Linux")
+    def test_inotify_watcher_with_file(self):
+        watcher = watch.InotifyWatcher([self.source_path])
+        self.addCleanup(watcher.close)
+        self.assertEqual(
+            list(watcher._directories.values()), [self.src_dir]
+        )
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "requires Linux")
+    def test_inotify_watcher_with_events(self):
+        watcher = watch.InotifyWatcher([self.src_dir])
+        self.addCleanup(watcher.close)
+        src_watch = [
+            watch_id for watch_id, directory in watcher._directories.items()
+            if directory == self.src_dir
+        ][0]
+
+        def event(watch_id, mask, name=b""):
+            return watch.INOTIFY_EVENT.pack(
+                watch_id, mask, 0, len(name)
+            ) + name
+
+        def wait(data):
+            with patch("select.select", return_value=([0], [], [])), \
+                    patch("os.read", return_value=data):
+                return watcher.wait(0)
+
+        # Events lost when the queue overflowed may be for any file.
+        self.assertIsNone(wait(
+            event(-1, watch.IN_Q_OVERFLOW) +
+            event(src_watch, watch.IN_CLOSE_WRITE, b"source.yaml\0\0\0")
+        ))
+        # Events for the directory itself, or for unknown or removed
+        # watches, are skipped.
+        self.assertEqual(wait(
+            event(src_watch, watch.IN_CLOSE_WRITE) +
+            event(src_watch, watch.IN_IGNORED) +
+            event(src_watch, watch.IN_CLOSE_WRITE, b"source.yaml")
+        ), set())
+        self.assertNotIn(src_watch, watcher._directories)
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "requires Linux")
+    def test_inotify_watcher_with_read_error(self):
+        watcher = watch.InotifyWatcher([self.src_dir])
+        self.addCleanup(watcher.close)
+        with patch("select.select", return_value=([0], [], [])):
+            with patch("os.read", side_effect=OSError(errno.EAGAIN, "")):
+                self.assertEqual(watcher.wait(0), set())
+            with patch("os.read", side_effect=OSError(errno.EBADF, "")):
+                with self.assertRaises(OSError):
+                    watcher.wait(0)
+
+    def test_inotify_watcher_without_inotify(self):
+        with patch("ctypes.CDLL", return_value=Mock(spec=[])):
+            with self.assertRaises(OSError) as context:
+                watch.InotifyWatcher([self.src_dir])
+        self.assertEqual(context.exception.errno, errno.ENOSYS)
+
+        libc = Mock()
+        libc.inotify_init1.return_value = -1
+        with patch("ctypes.CDLL", return_value=libc), \
+                patch("ctypes.get_errno", return_value=errno.EMFILE):
+            with self.assertRaises(OSError) as context:
+                watch.InotifyWatcher([self.src_dir])
+        self.assertEqual(context.exception.errno, errno.EMFILE)
+
+    def test_inotify_watcher_with_add_watch_error(self):
+        read_fd, write_fd = os.pipe()
+        self.addCleanup(os.close, write_fd)
+        libc = Mock()
+        libc.inotify_init1.return_value = read_fd
+        libc.inotify_add_watch.return_value = -1
+
+        # Directories removed before they are watched are skipped.
+        with patch("ctypes.CDLL", return_value=libc), \
+                patch("ctypes.get_errno", return_value=errno.ENOENT):
+            watcher = watch.InotifyWatcher([self.src_dir])
+        self.addCleanup(watcher.close)
+        self.assertEqual(watcher._directories, {})
+
+        with patch("ctypes.CDLL", return_value=libc), \
+                patch("ctypes.get_errno", return_value=errno.ENOSPC):
+            with self.assertRaises(OSError) as context:
+                watch.InotifyWatcher([self.src_dir])
+        self.assertEqual(context.exception.errno, errno.ENOSPC)
+
+    def test_get_watched_directories(self):
+        self.assertEqual(
+            watch.get_watched_directories(
+                [self.src_dir, "more/*/*.yaml", "source.yaml", "dir/a.yaml"]
+            ),
+            [
+                (self.src_dir, True), ("more", True), (".", False),
+                ("dir", False)
+            ]
+        )
+
+    def test_get_watcher_with_poll(self):
+        watcher = watch.get_watcher([self.src_dir], poll=True, interval=2)
+        self.assertIsInstance(watcher, watch.PollingWatcher)
+        self.assertEqual(watcher.interval, 2)
+
+    @patch("ptolemy.watch.InotifyWatcher")
+    def test_get_watcher(self, mock_InotifyWatcher):
+        self.assertIs(
+            watch.get_watcher([self.src_dir]),
+            mock_InotifyWatcher.return_value
+        )
+        mock_InotifyWatcher.side_effect = OSError(errno.ENOSYS, "")
+        self.assertIsInstance(
+            watch.get_watcher([self.src_dir]), watch.PollingWatcher
+        )
+
+    def test_wait_for_changes(self):
+        watcher = Mock()
+        watcher.wait.side_effect = [set(), {"a"}, {"b"}, set()]
+        self.assertEqual(watch.wait_for_changes(watcher, 0.5), {"a", "b"})
+        watcher.wait.assert_called_with(0.5)
+
+    def test_wait_for_changes_with_lost_events(self):
+        watcher = Mock()
+        watcher.wait.side_effect = [{"a"}, None, {"b"}, set()]
+        self.assertIsNone(watch.wait_for_changes(watcher))
+
+
+if __name__ == "__main__":
+    unittest.main()